@@ -0,0 +1,288 @@
+"""
+Vex - AI Cascade Load Test
+Drives ai_service.analyze_text at a fixed arrival rate against the local
+stub server, with a throwaway SQLite database — no network access needed.
+
+Reports throughput, latency percentiles, fallbacks per message (provider
+failures before a verdict) and the time spent in per-call stat reads/writes.
+
+Each message gets a unique suffix so every call reaches the providers; with
+--repeat-texts the samples are sent as-is and the verdict cache answers
+repeats (reported as "cached", not as verdicts or exhaustion).
+
+Examples:
+    python -m bench.ai_cascade_load --scenario flaky --rate 30 --duration 20
+    python -m bench.ai_cascade_load --providers litellm:fast,huggingface:hf --stub-config s.json
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Built-in scenarios: cascade order + stub behavior per model
+SCENARIOS: dict[str, dict] = {
+    "healthy": {
+        "providers": ["litellm:primary", "litellm:secondary"],
+        "models": {"primary": {}, "secondary": {}},
+    },
+    "flaky": {
+        "providers": ["litellm:primary", "blackbox:secondary", "huggingface:hf-zero-shot"],
+        "models": {
+            "primary": {"rate_limit_ratio": 0.30, "quota_ratio": 0.02},
+            "secondary": {"reject_params": ["temperature"], "error_ratio": 0.05},
+            "hf-zero-shot": {"latency_ms": 120},
+        },
+    },
+    "reasoning": {
+        "providers": ["litellm:thinker", "litellm:reasoner", "litellm:verbose"],
+        "models": {
+            "thinker": {"reasoning": "length", "latency_ms": 200},
+            "reasoner": {"reasoning": "reasoning_content"},
+            "verbose": {"reasoning": "think"},
+        },
+    },
+    "outage": {
+        "providers": ["litellm:primary", "litellm:secondary"],
+        "models": {"primary": {"error_ratio": 1.0}, "secondary": {"rate_limit_ratio": 0.9}},
+    },
+}
+
+SAMPLE_MESSAGES = [
+    "السلام عليكم كيف حالكم جميعا",
+    "متى موعد اللقاء القادم",
+    "شكرا على المعلومات المفيدة",
+    "انت غبي ولا تفهم شيئا",
+    "اخرس يا حمار",
+    "هل يوجد رابط للملف",
+    "صباح الخير على الجميع",
+    "كلامك تافه ولا قيمة له",
+]
+
+# Per-message instrumentation (one dict per analyze_text call)
+_probe: contextvars.ContextVar[dict | None] = contextvars.ContextVar("vex_bench_probe", default=None)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _instrument(ai_service) -> None:
+    """Wrap the stat helpers so each call's DB time and outcome is attributed
+    to the message being analyzed (analyze_text resolves them at call time)."""
+    record_usage = ai_service._record_usage
+    quota_check = ai_service._is_daily_quota_exhausted
+    run_cascade = ai_service._run_cascade
+
+    async def marked_run_cascade(*args, **kwargs):
+        probe = _probe.get()
+        if probe is not None:
+            probe["cascade"] = True
+        return await run_cascade(*args, **kwargs)
+
+    async def timed_record_usage(provider_key, status, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await record_usage(provider_key, status, *args, **kwargs)
+        finally:
+            probe = _probe.get()
+            if probe is not None:
+                probe["stat_s"] += time.perf_counter() - start
+                probe["statuses"].append(status)
+
+    async def timed_quota_check(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await quota_check(*args, **kwargs)
+        finally:
+            probe = _probe.get()
+            if probe is not None:
+                probe["stat_s"] += time.perf_counter() - start
+
+    ai_service._record_usage = timed_record_usage
+    ai_service._is_daily_quota_exhausted = timed_quota_check
+    ai_service._run_cascade = marked_run_cascade
+
+
+async def _seed_providers(specs: list[str], base_url: str) -> None:
+    from db.database import get_db
+    from db.models import AIEndpoint, AIProvider
+
+    async with get_db() as session:
+        for priority, spec in enumerate(specs, start=1):
+            provider_type, _, model = spec.partition(":")
+            if provider_type not in ("litellm", "blackbox", "huggingface"):
+                raise SystemExit(f"unsupported provider type for offline runs: {provider_type!r}")
+            endpoint = AIEndpoint(
+                name=f"stub-{provider_type}", provider_type=provider_type,
+                api_key="stub-key", base_url=base_url,
+            )
+            session.add(endpoint)
+            await session.flush()
+            session.add(AIProvider(
+                name=model, provider_type=provider_type, api_key="stub-key",
+                model=model, base_url=base_url, endpoint_id=endpoint.id,
+                priority=priority, is_active=True,
+            ))
+
+
+async def run(args) -> dict:
+    from bench.ai_stub_server import StubState, serve_stub
+
+    scenario = SCENARIOS[args.scenario]
+    providers = args.providers.split(",") if args.providers else scenario["providers"]
+
+    state = StubState()
+    state.load({"models": scenario.get("models", {})})
+    if args.stub_config:
+        with open(args.stub_config, encoding="utf-8") as f:
+            state.load(json.load(f))
+
+    if args.stub_url:
+        stub_url, stop_stub = args.stub_url.rstrip("/"), None
+    else:
+        port = _free_port()
+        stop_stub = await serve_stub(state, port=port)
+        stub_url = f"http://127.0.0.1:{port}"
+
+    # Environment must be in place before the service modules are imported
+    os.environ["BLACKBOX_BASE_URL"] = stub_url
+    os.environ["HF_INFERENCE_URL"] = f"{stub_url}/models"
+
+    from db.database import init_db
+    from bot.services import ai_service
+
+    await init_db()
+    await _seed_providers(providers, stub_url)
+    _instrument(ai_service)
+
+    rng = random.Random(args.seed)
+    records: list[dict] = []
+    dropped = 0
+    sequence = 0
+    inflight: set[asyncio.Task] = set()
+
+    async def one(text: str):
+        probe = {"stat_s": 0.0, "statuses": [], "error": None, "cascade": False}
+        _probe.set(probe)
+        start = time.perf_counter()
+        try:
+            probe["score"] = await ai_service.analyze_text(text)
+        except Exception as e:  # surfaced in the report, not swallowed
+            probe["error"] = repr(e)
+        probe["latency_s"] = time.perf_counter() - start
+        records.append(probe)
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    next_at = started
+    while next_at < deadline:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(inflight) >= args.max_inflight:
+            dropped += 1
+        else:
+            text = rng.choice(SAMPLE_MESSAGES)
+            if not args.repeat_texts:
+                # Unique text → no verdict cache hit, every call runs the cascade
+                sequence += 1
+                text = f"{text} {sequence}"
+            task = asyncio.create_task(one(text))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+        gap = rng.expovariate(args.rate) if args.poisson else 1.0 / args.rate
+        next_at += gap
+
+    if inflight:
+        await asyncio.gather(*inflight)
+    elapsed = time.perf_counter() - started
+
+    if stop_stub is not None:
+        await stop_stub()
+
+    latencies = [r["latency_s"] * 1000 for r in records]
+    fallbacks = [sum(1 for s in r["statuses"] if s != "ok") for r in records]
+    stat_ms = [r["stat_s"] * 1000 for r in records]
+    verdicts = sum(1 for r in records if "ok" in r["statuses"])
+    # Answered from the verdict cache (or joined an identical in-flight call)
+    cached = sum(1 for r in records if not r["cascade"] and not r["error"])
+    return {
+        "scenario": args.scenario,
+        "providers": providers,
+        "target_rate": args.rate,
+        "duration_s": round(elapsed, 2),
+        "messages": len(records),
+        "dropped": dropped,
+        "errors": sum(1 for r in records if r["error"]),
+        "verdicts": verdicts,
+        "cached": cached,
+        "exhausted": len(records) - verdicts - cached,
+        "verdict_cache": ai_service.get_verdict_cache_stats(),
+        "throughput_msg_s": round(len(records) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50), 1),
+            "p90": round(_percentile(latencies, 90), 1),
+            "p95": round(_percentile(latencies, 95), 1),
+            "p99": round(_percentile(latencies, 99), 1),
+            "max": round(max(latencies, default=0.0), 1),
+        },
+        "fallbacks_per_msg": {
+            "mean": round(statistics.fmean(fallbacks), 3) if fallbacks else 0.0,
+            "histogram": dict(sorted(Counter(fallbacks).items())),
+        },
+        "stat_overhead_ms": {
+            "mean": round(statistics.fmean(stat_ms), 2) if stat_ms else 0.0,
+            "p95": round(_percentile(stat_ms, 95), 2),
+            "share_of_latency": round(sum(stat_ms) / sum(latencies), 3) if sum(latencies) else 0.0,
+        },
+        "stub_counters": dict(sorted(state.counters.items())) if stop_stub is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the Vex AI cascade")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="healthy")
+    parser.add_argument("--providers", help="Comma list of type:model, overrides the scenario order")
+    parser.add_argument("--rate", type=float, default=20.0, help="Messages per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to generate load")
+    parser.add_argument("--max-inflight", type=int, default=500, help="Drop arrivals above this")
+    parser.add_argument("--poisson", action="store_true", help="Exponential inter-arrival gaps")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat-texts", action="store_true", help="Send the samples unchanged (verdict cache hits)")
+    parser.add_argument("--stub-config", help="JSON behaviors merged over the scenario")
+    parser.add_argument("--stub-url", help="Use an already running stub instead of an in-process one")
+    parser.add_argument("--database-url", help="Defaults to a fresh temporary SQLite file")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmp = tempfile.mkdtemp(prefix="vex-bench-")
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp}/bench.db"
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Vex - Local AI Stub Server
+Offline stand-in for the remote AI providers used by the cascade.
+
+Speaks just enough of each API for ai_service.py to work against it:
+  - POST /v1/chat/completions   → OpenAI-compatible chat (litellm)
+  - POST /chat/completions      → same, at Blackbox's path (no /v1 prefix)
+  - GET  /v1/models             → OpenAI-compatible model listing
+  - POST /models/{model}        → HuggingFace zero-shot classification
+
+Every model can be given its own fault profile (latency, 429s, daily-quota
+messages, BadRequest parameter rejections, reasoning-style output), either
+from a JSON file at startup or at runtime through POST /stub/config.
+
+Run standalone:
+    python -m bench.ai_stub_server --port 8765 --config scenario.json
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field, fields
+from typing import Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger("vex.bench.stub")
+
+# Words that make the default scorer return a high abuse score
+ABUSIVE_MARKERS = ["غبي", "حمار", "كلب", "اخرس", "حقير", "تافه", "stupid", "idiot"]
+
+HF_TARGET_LABEL = "رسالة مسيئة أو شتم أو تحرش"
+
+
+@dataclass
+class StubBehavior:
+    """Fault / response profile for one model (or the server default)."""
+    # Base latency plus uniform jitter, in milliseconds
+    latency_ms: float = 40.0
+    jitter_ms: float = 20.0
+    # Probability of a plain per-minute 429
+    rate_limit_ratio: float = 0.0
+    # Probability of a 429 carrying a daily-quota exhaustion message
+    quota_ratio: float = 0.0
+    # Probability of a 500
+    error_ratio: float = 0.0
+    # Parameters rejected with a 400 BadRequest (e.g. ["temperature"])
+    reject_params: list[str] = field(default_factory=list)
+    # Reasoning output style: "" | "think" | "reasoning_content" | "length"
+    reasoning: str = ""
+    # Fixed score; None → derived from the message text
+    score: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StubBehavior":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class StubState:
+    """Mutable server state: behaviors per model and request counters."""
+
+    def __init__(self, default: StubBehavior | None = None, models: dict | None = None):
+        self.default = default or StubBehavior()
+        self.models: dict[str, StubBehavior] = models or {}
+        self.counters: Counter = Counter()
+        self.rng = random.Random(1)
+
+    def behavior(self, model: str) -> StubBehavior:
+        return self.models.get(model, self.default)
+
+    def load(self, data: dict) -> None:
+        if "default" in data:
+            self.default = StubBehavior.from_dict(data["default"])
+        for name, spec in (data.get("models") or {}).items():
+            self.models[name] = StubBehavior.from_dict(spec)
+
+    def snapshot(self) -> dict:
+        return {
+            "default": asdict(self.default),
+            "models": {k: asdict(v) for k, v in self.models.items()},
+            "counters": dict(self.counters),
+        }
+
+
+def score_text(text: str, behavior: StubBehavior) -> float:
+    """Deterministic score: fixed if configured, otherwise keyword-driven
+    with a stable per-text wobble so repeated texts score identically."""
+    if behavior.score is not None:
+        return behavior.score
+    wobble = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:4], 16) / 0xFFFF
+    if any(marker in text for marker in ABUSIVE_MARKERS):
+        return round(0.80 + 0.19 * wobble, 2)
+    return round(0.02 + 0.20 * wobble, 2)
+
+
+def _extract_message(prompt: str) -> str:
+    """Pull the user message out of the cascade prompt («...»)."""
+    start, end = prompt.rfind("«"), prompt.rfind("»")
+    if start != -1 and end > start:
+        return prompt[start + 1:end]
+    return prompt
+
+
+def _openai_error(status: int, message: str, err_type: str, code: str | None = None, param: str | None = None):
+    return JSONResponse(
+        {"error": {"message": message, "type": err_type, "param": param, "code": code}},
+        status_code=status,
+    )
+
+
+async def _inject_faults(state: StubState, model: str, behavior: StubBehavior) -> Optional[JSONResponse]:
+    """Sleep for the configured latency, then maybe return a fault response."""
+    delay = behavior.latency_ms + state.rng.uniform(0, behavior.jitter_ms)
+    await asyncio.sleep(delay / 1000)
+
+    roll = state.rng.random()
+    if roll < behavior.quota_ratio:
+        state.counters[f"{model}:quota"] += 1
+        return _openai_error(
+            429,
+            "You exceeded your current quota, please check your plan and billing details.",
+            "insufficient_quota", code="insufficient_quota",
+        )
+    roll -= behavior.quota_ratio
+    if roll < behavior.rate_limit_ratio:
+        state.counters[f"{model}:rate_limit"] += 1
+        return _openai_error(429, "Rate limit reached for requests", "rate_limit_error", code="rate_limit_exceeded")
+    roll -= behavior.rate_limit_ratio
+    if roll < behavior.error_ratio:
+        state.counters[f"{model}:error"] += 1
+        return _openai_error(500, "The server had an error while processing your request.", "server_error")
+    return None
+
+
+def create_stub_app(state: StubState | None = None) -> FastAPI:
+    """Build the stub FastAPI app around a (possibly shared) StubState."""
+    state = state or StubState()
+    app = FastAPI(title="Vex AI Stub", docs_url=None, redoc_url=None)
+    app.state.stub = state
+
+    @app.get("/v1/models")
+    async def list_models():
+        names = sorted(set(state.models) | {"stub-default"})
+        return {"object": "list", "data": [{"id": n, "object": "model", "owned_by": "stub"} for n in names]}
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "")
+        behavior = state.behavior(model)
+        state.counters[f"{model}:requests"] += 1
+
+        for param in behavior.reject_params:
+            if param in body:
+                state.counters[f"{model}:bad_request"] += 1
+                return _openai_error(
+                    400, f"Unsupported parameter: '{param}' is not supported with this model.",
+                    "invalid_request_error", param=param,
+                )
+
+        fault = await _inject_faults(state, model, behavior)
+        if fault is not None:
+            return fault
+
+        prompt = (body.get("messages") or [{}])[-1].get("content", "")
+        score = score_text(_extract_message(prompt), behavior)
+        content: Optional[str] = f"{score:.2f}"
+        reasoning_content = None
+        finish_reason = "stop"
+
+        if behavior.reasoning == "think":
+            content = f"<think>The message needs a score on the scale 0.0 to 1.0. Considering tone.</think>\n{score:.2f}"
+        elif behavior.reasoning == "reasoning_content":
+            reasoning_content = f"Weighing the rules... final answer: {score:.2f}"
+            content = None
+        elif behavior.reasoning == "length":
+            # Spends a small budget on thinking; answers once given room
+            cap = body.get("max_tokens")
+            if cap is not None and cap < 4000:
+                content, finish_reason = "", "length"
+
+        state.counters[f"{model}:ok"] += 1
+        completion_tokens = 4 if content else 0
+        prompt_tokens = max(1, len(prompt) // 4)
+        message = {"role": "assistant", "content": content}
+        if reasoning_content is not None:
+            message["reasoning_content"] = reasoning_content
+        return {
+            "id": f"stub-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.post("/models/{model:path}")
+    async def hf_zero_shot(model: str, request: Request):
+        body = await request.json()
+        behavior = state.behavior(model)
+        state.counters[f"{model}:requests"] += 1
+        fault = await _inject_faults(state, model, behavior)
+        if fault is not None:
+            return fault
+
+        text = body.get("inputs", "")
+        labels = (body.get("parameters") or {}).get("candidate_labels") or ["رسالة عادية", HF_TARGET_LABEL]
+        score = score_text(text, behavior)
+        scored = sorted(
+            ((label, score if label == HF_TARGET_LABEL else 1.0 - score) for label in labels),
+            key=lambda pair: pair[1], reverse=True,
+        )
+        state.counters[f"{model}:ok"] += 1
+        return {
+            "sequence": text,
+            "labels": [label for label, _ in scored],
+            "scores": [round(s, 4) for _, s in scored],
+        }
+
+    @app.get("/stub/config")
+    async def get_config():
+        return state.snapshot()
+
+    @app.post("/stub/config")
+    async def set_config(request: Request):
+        state.load(await request.json())
+        return {"ok": True, **state.snapshot()}
+
+    @app.post("/stub/reset")
+    async def reset_counters():
+        state.counters.clear()
+        return {"ok": True}
+
+    return app
+
+
+async def serve_stub(state: StubState, host: str = "127.0.0.1", port: int = 8765):
+    """Start the stub in the running event loop; returns once it accepts requests.
+
+    Returns an async ``stop()`` callable that shuts the server down cleanly.
+    """
+    config = uvicorn.Config(create_stub_app(state), host=host, port=port, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    async def stop():
+        server.should_exit = True
+        await task
+
+    return stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI / HuggingFace stub for Vex load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--config", help="JSON file: {\"default\": {...}, \"models\": {name: {...}}}")
+    args = parser.parse_args()
+
+    state = StubState()
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            state.load(json.load(f))
+    uvicorn.run(create_stub_app(state), host=args.host, port=args.port, log_level="info", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Vex - Webhook Ingestion Benchmark
+Fires Telegram-style updates at the webhook through an in-process ASGI
+client (no sockets, no Telegram) and reports accepted updates per second,
+request latency and load shedding.
+
+  fast    the WebhookFastPathMiddleware in front of the real dashboard app
+  legacy  the previous handler (request.json + Update.de_json inline)
+          behind DashboardAuthMiddleware, for comparison
+
+A drain task plays the bot's update processor; --handler-ms slows it down
+to show the bounded queue shedding with 429 instead of growing.
+
+Examples:
+    python -m bench.webhook_load --requests 20000 --concurrency 64
+    python -m bench.webhook_load --mode fast --handler-ms 2 --queue-size 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SECRET = "bench-secret"
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _payload(update_id: int) -> bytes:
+    return json.dumps({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": -1001234567890, "type": "supergroup", "title": "Bench"},
+            "from": {"id": 1000 + update_id % 500, "is_bot": False, "first_name": "User"},
+            "text": "السلام عليكم ورحمة الله، هذه رسالة اختبار للأداء",
+        },
+    }, ensure_ascii=False).encode()
+
+
+def _legacy_app(bot_app):
+    """The webhook as it was: JSON + de_json inside the request, behind auth."""
+    from fastapi import FastAPI, Request
+    from starlette.responses import Response
+    from telegram import Update
+    from web.auth import DashboardAuthMiddleware
+
+    legacy = FastAPI()
+    legacy.add_middleware(DashboardAuthMiddleware)
+
+    @legacy.post("/telegram-update")
+    async def telegram_webhook(request: Request):
+        data = await request.json()
+        update = Update.de_json(data=data, bot=bot_app.bot)
+        await bot_app.update_queue.put(update)
+        return Response(status_code=200, content="OK")
+
+    return legacy
+
+
+async def run_mode(mode: str, args) -> dict:
+    import httpx
+    from telegram import Bot
+    from web import webhook
+
+    bot_app = SimpleNamespace(bot=Bot("123456:BENCH"), update_queue=asyncio.Queue())
+    if mode == "fast":
+        from web.app import app as asgi_app
+        ingest = webhook.ingest
+        ingest.attach(bot_app)
+    else:
+        ingest = None
+        asgi_app = _legacy_app(bot_app)
+
+    delivered = 0
+
+    async def drain():
+        nonlocal delivered
+        while True:
+            await bot_app.update_queue.get()
+            delivered += 1
+            if args.handler_ms:
+                await asyncio.sleep(args.handler_ms / 1000)
+
+    drainer = asyncio.create_task(drain())
+    bodies = [_payload(i) for i in range(args.requests)]
+    statuses: Counter = Counter()
+    latencies: list[float] = []
+    cursor = iter(range(args.requests))
+    headers = {"content-type": "application/json", "x-telegram-bot-api-secret-token": SECRET}
+
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for i in cursor:
+                start = time.perf_counter()
+                r = await client.post("/telegram-update", content=bodies[i], headers=headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[r.status_code] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+        # Wait until everything accepted has reached the update queue consumer
+        accepted = statuses[200]
+        drain_deadline = time.perf_counter() + 30
+        while delivered < accepted and time.perf_counter() < drain_deadline:
+            await asyncio.sleep(0.01)
+        total_elapsed = time.perf_counter() - started
+
+    drainer.cancel()
+    if ingest:
+        await ingest.stop()
+
+    return {
+        "mode": mode,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "statuses": dict(sorted(statuses.items())),
+        "duration_s": round(elapsed, 3),
+        "accepted_per_s": round(accepted / elapsed, 1) if elapsed else 0.0,
+        "delivered": delivered,
+        "delivered_per_s": round(delivered / total_elapsed, 1) if total_elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            "p50": round(_percentile(latencies, 50), 3),
+            "p95": round(_percentile(latencies, 95), 3),
+            "p99": round(_percentile(latencies, 99), 3),
+            "max": round(max(latencies, default=0.0), 3),
+        },
+        "ingest": ingest.metrics() if ingest else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for Vex webhook ingestion")
+    parser.add_argument("--mode", choices=["fast", "legacy", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent client requests")
+    parser.add_argument("--queue-size", type=int, default=2000, help="Fast path raw queue bound")
+    parser.add_argument("--consumers", type=int, default=2, help="Fast path decoding consumers")
+    parser.add_argument("--handler-ms", type=float, default=0.0, help="Simulated per-update processing time")
+    args = parser.parse_args()
+
+    # Environment must be in place before the web modules are imported
+    os.environ["WEBHOOK_SECRET"] = SECRET
+    os.environ["WEBHOOK_QUEUE_SIZE"] = str(args.queue_size)
+    os.environ["WEBHOOK_CONSUMERS"] = str(args.consumers)
+    os.environ.setdefault(
+        "DATABASE_URL", f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='vex-bench-')}/bench.db"
+    )
+
+    modes = ["legacy", "fast"] if args.mode == "both" else [args.mode]
+    reports = [asyncio.run(run_mode(mode, args)) for mode in modes]
+    print(json.dumps(reports, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,11 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from db.database import init_db
 from bot.core.config import load_bot_config
 from web.app import start_web_server
+from web.webhook import get_webhook_secret
+from bot.core import fanout
+from bot.core.invalidation import start_invalidation_listener, stop_invalidation_listener
+from bot.services.reputation_service import flush_reputation
+from bot.services.escalation_service import flush_strikes
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -30,6 +35,8 @@ async def main():
     # 1. Initialize database tables
     logger.info("🗄 Initializing database...")
     await init_db()
+    # Follow cache invalidations published by other processes
+    start_invalidation_listener()
 
     # 2. Check if setup is complete
     config = await load_bot_config()
@@ -39,7 +46,25 @@ async def main():
         logger.info("✅ Bot configuration found. Starting bot and web dashboard...")
         from bot.core.bot import create_bot_application
 
-        app = await create_bot_application(config)
+        role = fanout.get_role()
+        if role == "worker":
+            await run_worker(config)
+            return
+
+        workers = []
+        if role == "ingest":
+            # Publish updates to the bus; worker processes run the handlers
+            bus = fanout.create_bus()
+            count = fanout.get_partition_count()
+            app = await create_bot_application(
+                config, update_processor=fanout.FanoutPublisher(bus, count)
+            )
+            spawn = int(os.getenv("VEX_SPAWN_WORKERS", "0"))
+            if spawn:
+                workers = await fanout.spawn_workers(spawn)
+            logger.info(f"📤 Ingest mode: {count} partitions, bus={type(bus).__name__}")
+        else:
+            app = await create_bot_application(config)
 
         # Start web server in background
         web_task = asyncio.create_task(
@@ -56,7 +81,11 @@ async def main():
             if webhook_url:
                 # Webhook Mode
                 logger.info(f"🔗 Starting in Webhook mode. URL: {webhook_url}/telegram-update")
-                await app.bot.set_webhook(url=f"{webhook_url}/telegram-update", drop_pending_updates=True)
+                await app.bot.set_webhook(
+                    url=f"{webhook_url}/telegram-update",
+                    drop_pending_updates=True,
+                    secret_token=get_webhook_secret(),
+                )
                 logger.info("🚀 Bot is running (Webhooks enabled)!")
             else:
                 # Polling Mode
@@ -74,6 +103,12 @@ async def main():
                 if not webhook_url:
                     await app.updater.stop()
                 await app.stop()
+                await flush_reputation()
+                await flush_strikes()
+                await stop_invalidation_listener()
+                for proc in workers:
+                    proc.terminate()
+                    await proc.wait()
     else:
         # 3b. Setup not complete → start only web dashboard (setup wizard)
         logger.info("⚙️ Setup not complete. Starting Setup Wizard on web...")
@@ -81,5 +116,34 @@ async def main():
         await start_web_server(bot_app=None)
 
 
+async def run_worker(config):
+    """Worker process: run the handler stack for the owned bus partitions.
+    No web server and no updater — updates come from the ingest process."""
+    from bot.core.bot import create_bot_application
+    from bot.services.alert_aggregator import configure_ids
+
+    bus = fanout.create_bus()
+    count = fanout.get_partition_count()
+    partitions = fanout.get_owned_partitions()
+    # Telegram's global send limit is shared by all workers
+    app = await create_bot_application(config, global_rate=30.0 / count)
+    configure_ids(partitions[0] + count, count)
+
+    logger.info(f"🛠 Worker for partitions {partitions}/{count} starting...")
+    async with app:
+        await bus.start()
+        await app.start()
+        try:
+            await fanout.run_worker(app, bus, partitions)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await app.stop()
+            await bus.close()
+            await flush_reputation()
+            await flush_strikes()
+            await stop_invalidation_listener()
+
+
 if __name__ == "__main__":
     asyncio.run(main())
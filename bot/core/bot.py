@@ -4,21 +4,36 @@ Creates and configures the python-telegram-bot Application
 """
 import logging
 
-from telegram.ext import Application
+from typing import Optional
+
+from telegram.ext import Application, BaseUpdateProcessor
 
 from db.models import BotConfig
+from bot.core.rate_limiter import PriorityRateLimiter
+from bot.core.update_processor import ChatOrderedUpdateProcessor
 
 logger = logging.getLogger("vex.bot")
 
 
-async def create_bot_application(config: BotConfig) -> Application:
-    """Create and configure the Telegram bot application"""
+async def create_bot_application(
+    config: BotConfig,
+    update_processor: Optional[BaseUpdateProcessor] = None,
+    global_rate: float = 30.0,
+) -> Application:
+    """Create and configure the Telegram bot application.
+    Fan-out mode passes its own update processor (ingest) and a share of the
+    global send rate (workers) — see bot.core.fanout."""
 
     # Build application
     app = (
         Application.builder()
         .token(config.bot_token)
-        .concurrent_updates(True)
+        # Bounded concurrency, ordered per chat, admins/callbacks first
+        .concurrent_updates(
+            update_processor or ChatOrderedUpdateProcessor(max_workers=32, max_pending=5000)
+        )
+        # All outbound calls go through prioritized token buckets
+        .rate_limiter(PriorityRateLimiter(global_rate=global_rate))
         .build()
     )
 
@@ -43,6 +58,11 @@ def _register_handlers(app: Application):
     from bot.handlers.antispam.media_filter import register_media_filter_handlers
     from bot.handlers.antispam.word_filter import register_word_filter_handlers
     from bot.handlers.antispam.lock import register_lock_handlers
+    from bot.handlers.antispam.raid import register_raid_handlers
+    from bot.handlers.antispam.flood import register_flood_handlers
+    from bot.handlers.antispam.escalation import register_escalation_handlers
+    from bot.handlers.antispam.purge import register_purge_handlers
+    from bot.handlers.antispam.media_block import register_media_block_handlers
     from bot.handlers.antispam.welcome import register_welcome_handlers
     from bot.handlers.antispam.rules import register_rules_handlers
     from bot.handlers.antispam.words import register_words_handlers
@@ -56,8 +76,13 @@ def _register_handlers(app: Application):
     register_admin_handlers(app)
     register_settings_handlers(app)
     register_media_filter_handlers(app)
+    register_media_block_handlers(app)
     register_word_filter_handlers(app)
     register_lock_handlers(app)
+    register_raid_handlers(app)
+    register_flood_handlers(app)
+    register_escalation_handlers(app)
+    register_purge_handlers(app)
     register_welcome_handlers(app)
     register_rules_handlers(app)
     register_words_handlers(app)
@@ -3,15 +3,21 @@ Vex - Configuration Loader
 Loads bot config from database instead of env variables
 """
 import logging
-from typing import Optional
+from typing import Any, Optional
 
 from sqlalchemy import select
 
 from db.database import get_db
 from db.models import BotConfig
+from bot.core.invalidation import on_invalidate, publish_invalidation
 
 logger = logging.getLogger("vex.config")
 
+# AI settings read on the message hot path; kept until a "config" event
+_cache: dict[str, Any] = {}
+
+on_invalidate("config", lambda _key: _cache.clear())
+
 
 async def load_bot_config() -> Optional[BotConfig]:
     """Load bot configuration from database"""
@@ -65,10 +71,13 @@ async def mark_setup_complete() -> None:
 
 async def get_ai_prompt_override() -> Optional[str]:
     """Return the custom AI prompt if set, otherwise None (use built-in default)."""
+    if "prompt" in _cache:
+        return _cache["prompt"]
     async with get_db() as session:
         result = await session.execute(select(BotConfig).limit(1))
         config = result.scalar_one_or_none()
-        return config.ai_prompt_override if config else None
+        _cache["prompt"] = config.ai_prompt_override if config else None
+        return _cache["prompt"]
 
 
 async def set_ai_prompt_override(prompt: Optional[str]) -> None:
@@ -79,6 +88,8 @@ async def set_ai_prompt_override(prompt: Optional[str]) -> None:
         if config:
             config.ai_prompt_override = prompt
 
+    await publish_invalidation("config")
+
 
 async def get_ai_debug_channel_id() -> Optional[int]:
     """Return the configured AI debug channel ID, or None if not set."""
@@ -96,17 +107,23 @@ async def set_ai_debug_channel_id(channel_id: Optional[int]) -> None:
         if config:
             config.ai_debug_channel_id = channel_id
 
+    await publish_invalidation("config")
+
 
 async def get_ai_thresholds() -> tuple[float, float]:
     """Return (alert_threshold, auto_delete_threshold). Defaults: 0.50 and 0.90."""
+    if "thresholds" in _cache:
+        return _cache["thresholds"]
     async with get_db() as session:
         result = await session.execute(select(BotConfig).limit(1))
         config = result.scalar_one_or_none()
         if config:
             alert = config.ai_alert_threshold if config.ai_alert_threshold is not None else 0.50
             auto_del = config.ai_auto_delete_threshold if config.ai_auto_delete_threshold is not None else 0.90
-            return alert, auto_del
-        return 0.50, 0.90
+            _cache["thresholds"] = (alert, auto_del)
+        else:
+            _cache["thresholds"] = (0.50, 0.90)
+        return _cache["thresholds"]
 
 
 async def set_ai_thresholds(alert_threshold: float, auto_delete_threshold: float) -> None:
@@ -117,3 +134,57 @@ async def set_ai_thresholds(alert_threshold: float, auto_delete_threshold: float
         if config:
             config.ai_alert_threshold = max(0.0, min(1.0, alert_threshold))
             config.ai_auto_delete_threshold = max(0.0, min(1.0, auto_delete_threshold))
+
+    await publish_invalidation("config")
+
+
+async def get_ai_shadow_sample_rate() -> float:
+    """Return the share of Layer-3 messages mirrored to shadow models. Default: 0.10."""
+    async with get_db() as session:
+        result = await session.execute(select(BotConfig).limit(1))
+        config = result.scalar_one_or_none()
+        if config and config.ai_shadow_sample_rate is not None:
+            return config.ai_shadow_sample_rate
+        return 0.10
+
+
+async def set_ai_shadow_sample_rate(rate: float) -> None:
+    """Save the shadow sample rate (clamped to 0.0 – 1.0)."""
+    async with get_db() as session:
+        result = await session.execute(select(BotConfig).limit(1))
+        config = result.scalar_one_or_none()
+        if config:
+            config.ai_shadow_sample_rate = max(0.0, min(1.0, rate))
+
+    await publish_invalidation("config")
+
+
+DEBUG_MODES = ("digest", "message")
+
+
+async def get_ai_debug_settings() -> dict:
+    """Return debug channel delivery settings: mode, sample_rate, digest_interval."""
+    async with get_db() as session:
+        result = await session.execute(select(BotConfig).limit(1))
+        config = result.scalar_one_or_none()
+        mode = config.ai_debug_mode if config and config.ai_debug_mode in DEBUG_MODES else "digest"
+        return {
+            "mode": mode,
+            "sample_rate": config.ai_debug_sample_rate
+            if config and config.ai_debug_sample_rate is not None else 1.0,
+            "digest_interval": config.ai_debug_digest_interval
+            if config and config.ai_debug_digest_interval else 300,
+        }
+
+
+async def set_ai_debug_settings(mode: str, sample_rate: float, digest_interval: int) -> None:
+    """Save debug channel delivery settings (interval clamped to 30s – 24h)."""
+    async with get_db() as session:
+        result = await session.execute(select(BotConfig).limit(1))
+        config = result.scalar_one_or_none()
+        if config:
+            config.ai_debug_mode = mode if mode in DEBUG_MODES else "digest"
+            config.ai_debug_sample_rate = max(0.0, min(1.0, sample_rate))
+            config.ai_debug_digest_interval = max(30, min(86400, int(digest_interval)))
+
+    await publish_invalidation("config")
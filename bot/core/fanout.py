@@ -0,0 +1,272 @@
+"""
+Vex - Update Fan-out
+Scale-out mode: one ingest process receives updates (webhook or polling),
+serves the dashboard and runs the scheduled jobs, and publishes every
+update to a bus partition chosen by chat ID. N worker processes each run
+the handler stack for the partitions they own, so all updates of a chat
+land in one worker, in order.
+
+Roles (VEX_ROLE):
+  all     single process, updates handled in place (default)
+  ingest  publish updates instead of handling them; with VEX_SPAWN_WORKERS=N
+          also start N local worker processes
+  worker  handle the partitions in VEX_PARTITIONS (e.g. "0,2") out of
+          VEX_PARTITION_COUNT
+
+Bus (VEX_UPDATE_BUS):
+  sql     the configured database (SQLite or Postgres) — default
+  memory  this process only; a stand-in for tests and local runs
+  pkg.module:Class   an external broker implementing UpdateBus
+
+Each partition must be owned by exactly one worker. Updates are removed
+from the bus once handed to the worker's handler stack (at-most-once if a
+worker dies mid-batch). Caches stay consistent across the processes through
+bot.core.invalidation.
+"""
+import asyncio
+import importlib
+import json
+import logging
+import os
+import re
+import sys
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import select, delete
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from db.database import get_db
+from db.models import UpdateOutboxItem
+
+logger = logging.getLogger("vex.core.fanout")
+
+# Admin alert buttons are pressed in the admin group, but their state lives in
+# the worker that raised the alert: route them by the source chat ID, or by
+# the aggregated alert ID (allocated per partition, see alert_aggregator)
+_ROUTED_CALLBACK = re.compile(r"^guard_(?:delete|keep|purge)(?:_all)?:(-?\d+)")
+
+
+def get_role() -> str:
+    return os.getenv("VEX_ROLE", "all").lower()
+
+
+def get_partition_count() -> int:
+    return max(1, int(os.getenv("VEX_PARTITION_COUNT", os.getenv("VEX_SPAWN_WORKERS", "1"))))
+
+
+def get_owned_partitions() -> list[int]:
+    count = get_partition_count()
+    raw = os.getenv("VEX_PARTITIONS", "")
+    if not raw.strip():
+        return list(range(count))
+    return sorted({int(p) % count for p in raw.split(",") if p.strip()})
+
+
+def partition_for(update: Update, count: int) -> int:
+    if count <= 1:
+        return 0
+    query = update.callback_query
+    if query and query.data:
+        match = _ROUTED_CALLBACK.match(query.data)
+        if match:
+            return int(match.group(1)) % count
+    chat, user = update.effective_chat, update.effective_user
+    key = chat.id if chat else user.id if user else 0
+    return key % count
+
+
+# ─── Bus Interface ────────────────────────────────────────────────────────────
+
+@dataclass
+class BusMessage:
+    id: Any
+    partition: int
+    payload: str
+
+
+class UpdateBus(ABC):
+    """Partitioned queue; order is kept within a partition."""
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def publish(self, partition: int, payload: str) -> None:
+        """Append a message to a partition (order within a partition is kept)."""
+
+    @abstractmethod
+    async def fetch(self, partitions: Sequence[int], limit: int = 100) -> list[BusMessage]:
+        """Next messages of these partitions; may wait briefly and return []."""
+
+    @abstractmethod
+    async def ack(self, messages: list[BusMessage]) -> None:
+        """Drop handled messages."""
+
+
+class MemoryUpdateBus(UpdateBus):
+    """In-process bus: publisher and workers share this object."""
+
+    def __init__(self):
+        self._partitions: dict[int, deque[BusMessage]] = {}
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+
+    async def publish(self, partition: int, payload: str) -> None:
+        self._seq += 1
+        self._partitions.setdefault(partition, deque()).append(BusMessage(self._seq, partition, payload))
+        self._wakeup.set()
+
+    async def fetch(self, partitions: Sequence[int], limit: int = 100) -> list[BusMessage]:
+        for _ in range(2):
+            batch: list[BusMessage] = []
+            for p in partitions:
+                queue = self._partitions.get(p)
+                while queue and len(batch) < limit:
+                    batch.append(queue.popleft())
+            if batch:
+                return sorted(batch, key=lambda m: m.id)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=0.5)
+            except asyncio.TimeoutError:
+                pass
+        return []
+
+    async def ack(self, messages: list[BusMessage]) -> None:
+        pass  # Removed at fetch
+
+
+class SQLUpdateBus(UpdateBus):
+    """Bus on the bot's database (update_outbox). Publishes are buffered and
+    written in batches by one flusher, which keeps their order."""
+
+    FLUSH_INTERVAL = 0.02
+    FLUSH_BATCH = 500
+    POLL_INTERVAL = 0.05
+
+    def __init__(self):
+        self._buffer: list[UpdateOutboxItem] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def close(self) -> None:
+        if self._flusher:
+            await self._flusher
+
+    async def publish(self, partition: int, payload: str) -> None:
+        self._buffer.append(UpdateOutboxItem(partition_id=partition, payload=payload))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while self._buffer:
+            if len(self._buffer) < self.FLUSH_BATCH:
+                await asyncio.sleep(self.FLUSH_INTERVAL)
+            batch, self._buffer = self._buffer[:self.FLUSH_BATCH], self._buffer[self.FLUSH_BATCH:]
+            try:
+                async with get_db() as session:
+                    session.add_all(batch)
+            except Exception as e:
+                logger.error(f"[FANOUT] Could not publish {len(batch)} updates: {e}")
+
+    async def fetch(self, partitions: Sequence[int], limit: int = 100) -> list[BusMessage]:
+        async with get_db() as session:
+            result = await session.execute(
+                select(UpdateOutboxItem)
+                .where(UpdateOutboxItem.partition_id.in_(list(partitions)))
+                .order_by(UpdateOutboxItem.id)
+                .limit(limit)
+            )
+            rows = result.scalars().all()
+        if not rows:
+            await asyncio.sleep(self.POLL_INTERVAL)
+        return [BusMessage(r.id, r.partition_id, r.payload) for r in rows]
+
+    async def ack(self, messages: list[BusMessage]) -> None:
+        if not messages:
+            return
+        async with get_db() as session:
+            await session.execute(
+                delete(UpdateOutboxItem).where(UpdateOutboxItem.id.in_([m.id for m in messages]))
+            )
+
+
+BUS_TYPES: dict[str, type[UpdateBus]] = {"sql": SQLUpdateBus, "memory": MemoryUpdateBus}
+
+
+def create_bus(spec: Optional[str] = None) -> UpdateBus:
+    """Bus from a name in BUS_TYPES or "package.module:Class"."""
+    spec = spec or os.getenv("VEX_UPDATE_BUS", "sql")
+    if spec in BUS_TYPES:
+        return BUS_TYPES[spec]()
+    module_name, _, class_name = spec.partition(":")
+    bus_class = getattr(importlib.import_module(module_name), class_name)
+    return bus_class()
+
+
+# ─── Ingest Side ──────────────────────────────────────────────────────────────
+
+class FanoutPublisher(BaseUpdateProcessor):
+    """Update processor for the ingest role: publishes instead of handling.
+    Runs one update at a time, so updates of a chat are published in order."""
+
+    def __init__(self, bus: UpdateBus, partition_count: int):
+        super().__init__(max_concurrent_updates=1)
+        self.bus = bus
+        self.partition_count = partition_count
+        self.published = 0
+
+    async def initialize(self) -> None:
+        await self.bus.start()
+
+    async def shutdown(self) -> None:
+        await self.bus.close()
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        coroutine.close()  # Handlers run in the workers
+        if not isinstance(update, Update):
+            return
+        await self.bus.publish(partition_for(update, self.partition_count), update.to_json())
+        self.published += 1
+
+
+async def spawn_workers(count: int) -> list[asyncio.subprocess.Process]:
+    """Start `count` local worker processes, one partition each."""
+    procs = []
+    for i in range(count):
+        env = {
+            **os.environ,
+            "VEX_ROLE": "worker",
+            "VEX_PARTITION_COUNT": str(count),
+            "VEX_PARTITIONS": str(i),
+        }
+        env.pop("VEX_SPAWN_WORKERS", None)
+        procs.append(await asyncio.create_subprocess_exec(sys.executable, "-m", "bot", env=env))
+        logger.info(f"[FANOUT] Started worker {i}/{count} (pid {procs[-1].pid})")
+    return procs
+
+
+# ─── Worker Side ──────────────────────────────────────────────────────────────
+
+async def run_worker(app, bus: UpdateBus, partitions: Sequence[int], high_water: int = 500) -> None:
+    """Feed the app's update queue from the bus until cancelled."""
+    processor = app.update_processor
+    logger.info(f"[FANOUT] Worker consuming partitions {list(partitions)}")
+    while True:
+        while app.update_queue.qsize() + getattr(processor, "backlog", 0) >= high_water:
+            await asyncio.sleep(0.01)
+        messages = await bus.fetch(partitions)
+        for message in messages:
+            try:
+                update = Update.de_json(json.loads(message.payload), app.bot)
+            except Exception as e:
+                logger.warning(f"[FANOUT] Dropped undecodable update {message.id}: {e}")
+                continue
+            await app.update_queue.put(update)
+        await bus.ack(messages)
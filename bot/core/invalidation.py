@@ -0,0 +1,219 @@
+"""
+Vex - Cache Invalidation
+In-memory caches (group settings, AI config, providers, policies …)
+register a listener per topic; service write paths call
+publish_invalidation() after their change is committed.
+
+Every event bumps the topic's row in cache_versions. Other processes learn
+about it through Postgres LISTEN/NOTIFY (the NOTIFY is sent in the same
+transaction as the bump) or, on SQLite, by polling that table. Versions
+make missed events detectable: a gap — a dropped LISTEN connection, two
+bumps between polls — invalidates the whole topic instead of one key, so
+caches stay coherent without expiry timers.
+
+Topics and keys:
+  group         telegram group ID   managed flag, blocked words, media settings, raid / flood policy, AI rules
+  ai_policy     telegram group ID   per-group adaptive AI policy
+  ai_providers  —                   cascade / shadow models and endpoints
+  config        —                   bot-wide AI settings (thresholds, prompt, debug, shadow rate)
+  media_blocks  telegram group ID   blocked files / sticker packs (None = the global list)
+  image_hashes  —                   perceptual hashes of known spam images
+  domain_rules  telegram group ID   link domain allow / deny lists (None = the global list)
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from collections import Counter
+from typing import Any, Callable, Optional
+
+from sqlalchemy import select, text, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from db.database import engine, get_db
+from db.models import CacheVersion
+
+logger = logging.getLogger("vex.core.invalidation")
+
+ORIGIN = f"{socket.gethostname()}:{os.getpid()}"
+NOTIFY_CHANNEL = "vex_invalidate"
+POLL_INTERVAL_SECONDS = 1.0
+# LISTEN connection is pinged this often so a dead one is noticed
+KEEPALIVE_SECONDS = 30.0
+# Versions are also compared this often while listening, in case an event
+# was lost without the connection dropping
+RESYNC_SECONDS = 300.0
+RECONNECT_SECONDS = 5.0
+
+_listeners: dict[str, list[Callable[[Any], None]]] = {}
+_seen: dict[str, int] = {}           # topic → last version applied here
+_synced = False                      # Versions adopted once at startup
+_task: Optional[asyncio.Task] = None
+stats: Counter = Counter()
+
+
+def on_invalidate(topic: str, listener: Callable[[Any], None]) -> None:
+    """Call listener(key) whenever `topic` is invalidated (key None = everything)."""
+    _listeners.setdefault(topic, []).append(listener)
+
+
+def _run_listeners(topic: str, key: Any) -> None:
+    for listener in _listeners.get(topic, []):
+        try:
+            listener(key)
+        except Exception as e:
+            logger.warning(f"[INVALIDATE] Listener for '{topic}' failed: {e}")
+
+
+# ─── Publishing ───────────────────────────────────────────────────────────────
+
+async def publish_invalidation(topic: str, key: Any = None) -> None:
+    """Invalidate `topic` (or one key of it) here and in every other process."""
+    _run_listeners(topic, key)
+    stats["published"] += 1
+    try:
+        await _bump(topic, key)
+    except Exception as e:
+        # Local caches are already clean; other processes catch up on the next event
+        stats["publish_errors"] += 1
+        logger.warning(f"[INVALIDATE] Could not publish '{topic}': {e}")
+
+
+async def _bump(topic: str, key: Any) -> int:
+    postgres = engine.dialect.name == "postgresql"
+    insert = pg_insert if postgres else sqlite_insert
+    encoded_key = json.dumps(key)
+    stmt = insert(CacheVersion).values(topic=topic, version=1, key=encoded_key, origin=ORIGIN)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CacheVersion.topic],
+        set_={
+            "version": CacheVersion.version + 1,
+            "key": encoded_key,
+            "origin": ORIGIN,
+            "updated_at": func.now(),
+        },
+    ).returning(CacheVersion.version)
+    async with get_db() as session:
+        version = (await session.execute(stmt)).scalar_one()
+        if postgres:
+            payload = json.dumps({"topic": topic, "key": key, "version": version, "origin": ORIGIN})
+            await session.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": NOTIFY_CHANNEL, "payload": payload},
+            )
+    return version
+
+
+# ─── Receiving ────────────────────────────────────────────────────────────────
+
+def _apply(topic: str, version: int, key: Any, origin: str) -> None:
+    """Apply a remote version of `topic`, invalidating everything on a gap."""
+    seen = _seen.get(topic, 0)
+    if version <= seen:
+        return
+    _seen[topic] = version
+    if version > seen + 1:
+        stats["gaps"] += 1
+        logger.debug(f"[INVALIDATE] '{topic}' jumped {seen} → {version}, dropping all")
+        _run_listeners(topic, None)
+    elif origin != ORIGIN:
+        stats["received"] += 1
+        _run_listeners(topic, key)
+
+
+async def _sync_versions() -> None:
+    """Compare every topic against cache_versions (start, reconnect, each poll,
+    and every RESYNC_SECONDS while listening).
+    The first sync only adopts the versions: no cache has been filled yet."""
+    global _synced
+    async with get_db() as session:
+        rows = (await session.execute(select(CacheVersion))).scalars().all()
+    for row in rows:
+        if not _synced:
+            _seen[row.topic] = row.version
+        else:
+            _apply(row.topic, row.version, json.loads(row.key) if row.key else None, row.origin or "")
+    _synced = True
+
+
+def _on_notify(payload: str) -> None:
+    try:
+        event = json.loads(payload)
+        _apply(event["topic"], int(event["version"]), event.get("key"), event.get("origin", ""))
+    except (ValueError, KeyError, TypeError):
+        logger.warning(f"[INVALIDATE] Ignoring malformed event: {payload[:200]}")
+
+
+async def _listen_postgres() -> None:
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+        events: asyncio.Queue = asyncio.Queue()
+        await driver.add_listener(NOTIFY_CHANNEL, lambda *args: events.put_nowait(args[-1]))
+        # Subscribed first, then synced: nothing committed in between is missed
+        await _sync_versions()
+        logger.info("[INVALIDATE] Listening on Postgres NOTIFY")
+        next_sync = time.monotonic() + RESYNC_SECONDS
+        while True:
+            try:
+                payload = await asyncio.wait_for(events.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # On the driver connection, which autocommits: through SQLAlchemy
+                # the ping would open a transaction that is never closed, and
+                # Postgres holds NOTIFY back from a session inside a transaction
+                await driver.execute("SELECT 1")
+            else:
+                _on_notify(payload)
+            if time.monotonic() >= next_sync:
+                await _sync_versions()
+                next_sync = time.monotonic() + RESYNC_SECONDS
+
+
+async def _poll_versions() -> None:
+    await _sync_versions()
+    logger.info(f"[INVALIDATE] Polling cache versions every {POLL_INTERVAL_SECONDS:g}s")
+    while True:
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+        await _sync_versions()
+
+
+async def _run() -> None:
+    while True:
+        try:
+            if engine.dialect.name == "postgresql":
+                await _listen_postgres()
+            else:
+                await _poll_versions()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stats["listener_errors"] += 1
+            logger.warning(f"[INVALIDATE] Listener failed, retrying in {RECONNECT_SECONDS:g}s: {e}")
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+
+def start_invalidation_listener() -> None:
+    """Start following other processes' events (inside the running loop)."""
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_run())
+
+
+async def stop_invalidation_listener() -> None:
+    global _task
+    if _task:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+
+
+def get_invalidation_metrics() -> dict:
+    return {
+        "listening": _task is not None and not _task.done(),
+        "transport": "notify" if engine.dialect.name == "postgresql" else "poll",
+        "versions": dict(_seen),
+        **{k: stats[k] for k in ("published", "received", "gaps", "publish_errors", "listener_errors")},
+    }
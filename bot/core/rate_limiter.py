@@ -0,0 +1,426 @@
+"""
+Vex - Outbound Rate Limiter
+Central scheduler for every Bot API request, plugged into the Application
+through python-telegram-bot's rate limiter hook.
+
+Requests wait in priority lanes and are released against token buckets:
+  - a global bucket (~30 requests/s across all chats)
+  - a per-chat bucket for sends (~1 message/s)
+  - a per-group bucket for sends (20 messages/minute)
+
+Lanes, highest first: DELETE (deletions, bans, restrictions), ALERT
+(moderation alerts and admin replies), ANNOUNCE (welcome, lock notices),
+DEBUG (debug-channel posts). The dispatcher always serves the highest lane
+that is allowed to go, so a deletion never waits behind queued debug logs.
+Callers pick a lane with ``rate_limit_args=Lane.X``; otherwise it is
+inferred from the endpoint.
+
+Within a lane, waiters queue per chat (sends and other requests apart) and
+the chats sit in a heap keyed by when their head may go next, so one pass
+of the dispatcher only looks at chats that are due, however many requests
+a throttled chat has queued. Every lane is bounded; past its limit a
+request fails fast with OutboundQueueFull.
+"""
+import asyncio
+import enum
+import heapq
+import itertools
+import logging
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+
+from telegram.error import RetryAfter, TelegramError
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger("vex.core.rate_limiter")
+
+JSONDict = Dict[str, Any]
+
+
+class Lane(enum.IntEnum):
+    DELETE = 0
+    ALERT = 1
+    ANNOUNCE = 2
+    DEBUG = 3
+
+
+# Endpoints that are never throttled (reads, callback answers, webhook setup)
+_UNTHROTTLED_PREFIXES = ("get", "answer", "setWebhook", "deleteWebhook", "logOut", "close")
+# Moderation actions that go with deletions
+_MODERATION_ENDPOINTS = {
+    "deleteMessage", "deleteMessages", "banChatMember", "unbanChatMember",
+    "restrictChatMember", "setChatPermissions",
+}
+# Endpoints that post a new message (subject to per-chat / per-group limits)
+_SEND_PREFIXES = ("send", "copyMessage", "copyMessages", "forwardMessage", "forwardMessages")
+
+# Max waiting requests per lane; beyond this a request fails fast. Deletions
+# are coalesced up to 100 per request, so a full DELETE lane is a backlog of
+# far more messages than a raid produces
+LANE_LIMITS = {Lane.DELETE: 5000, Lane.ALERT: 2000, Lane.ANNOUNCE: 1000, Lane.DEBUG: 500}
+
+
+class OutboundQueueFull(TelegramError):
+    """Raised when a low-priority lane is full and the request was dropped."""
+
+
+class _Bucket:
+    """Classic token bucket; `rate` tokens per second up to `capacity`."""
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0 = now)."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+@dataclass
+class _Waiter:
+    seq: int
+    lane: Lane
+    chat_id: Optional[int]
+    is_send: bool
+    future: asyncio.Future
+    enqueued: float = field(default_factory=time.monotonic)
+
+
+class _ChatQueue:
+    """FIFO of one chat's waiters in a lane (sends and other requests apart)."""
+    __slots__ = ("key", "waiters", "scheduled")
+
+    def __init__(self, key: tuple):
+        self.key = key
+        self.waiters: deque[_Waiter] = deque()
+        self.scheduled = False
+
+
+class _LaneQueue:
+    """A lane's waiters: per-chat FIFOs plus a heap of (due time, seq, chat)
+    holding each non-empty chat once."""
+
+    def __init__(self):
+        self.chats: dict[tuple, _ChatQueue] = {}
+        self.heap: list[tuple[float, int, _ChatQueue]] = []
+        self.size = 0
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, waiter: _Waiter) -> None:
+        key = (waiter.chat_id, waiter.is_send)
+        chat = self.chats.get(key)
+        if chat is None:
+            chat = self.chats[key] = _ChatQueue(key)
+        chat.waiters.append(waiter)
+        self.size += 1
+        if not chat.scheduled:
+            self.schedule(chat, waiter.enqueued)
+
+    def discard(self, waiter: _Waiter) -> None:
+        chat = self.chats.get((waiter.chat_id, waiter.is_send))
+        if chat is not None and waiter in chat.waiters:
+            chat.waiters.remove(waiter)
+            self.size -= 1
+        # An emptied chat leaves the heap when it comes up
+
+    def schedule(self, chat: _ChatQueue, due: float) -> None:
+        chat.scheduled = True
+        heapq.heappush(self.heap, (due, next(self._seq), chat))
+
+    def pop_due(self, now: float) -> tuple[Optional[_ChatQueue], float]:
+        """Next non-empty chat due by `now` (taken off the heap), else the
+        time until the earliest one is due."""
+        while self.heap:
+            due, _, chat = self.heap[0]
+            if due > now:
+                return None, due - now
+            heapq.heappop(self.heap)
+            chat.scheduled = False
+            if chat.waiters:
+                return chat, 0.0
+            del self.chats[chat.key]
+        return None, float("inf")
+
+    def release(self, chat: _ChatQueue, due: float) -> None:
+        """Put a chat taken with pop_due back, or drop it once empty."""
+        if chat.waiters:
+            self.schedule(chat, due)
+        else:
+            del self.chats[chat.key]
+
+    def oldest(self) -> Optional[float]:
+        return min((c.waiters[0].enqueued for c in self.chats.values() if c.waiters), default=None)
+
+    def drain(self):
+        for chat in self.chats.values():
+            yield from chat.waiters
+        self.chats.clear()
+        self.heap.clear()
+        self.size = 0
+
+
+class PriorityRateLimiter(BaseRateLimiter[int]):
+    """Priority-lane token-bucket limiter (see module docstring)."""
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3.0,
+        group_per_minute: float = 20.0,
+        max_retries: int = 2,
+    ):
+        self._global = _Bucket(global_rate, global_rate)
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._group_rate = group_per_minute / 60.0
+        self._group_burst = group_per_minute
+        self._max_retries = max_retries
+
+        self._chats: dict[int, _Bucket] = {}
+        self._groups: dict[int, _Bucket] = {}
+        self._lanes: dict[Lane, _LaneQueue] = {lane: _LaneQueue() for lane in Lane}
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        # Metrics
+        self._granted: Counter = Counter()
+        self._dropped: Counter = Counter()
+        self._retry_after: Counter = Counter()
+        self._wait_total: Counter = Counter()
+        self._wait_max: dict[Lane, float] = {lane: 0.0 for lane in Lane}
+
+    # ── BaseRateLimiter interface ─────────────────────────────────────────────
+
+    async def initialize(self) -> None:
+        global _active
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        _active = self
+
+    async def shutdown(self) -> None:
+        global _active
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        for lane in self._lanes.values():
+            for waiter in lane.drain():
+                if not waiter.future.done():
+                    waiter.future.cancel()
+        if _active is self:
+            _active = None
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, JSONDict, List[JSONDict]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, JSONDict, List[JSONDict]]:
+        if endpoint.startswith(_UNTHROTTLED_PREFIXES) or self._dispatcher is None:
+            return await callback(*args, **kwargs)
+
+        lane = Lane(rate_limit_args) if rate_limit_args is not None else self._infer_lane(endpoint)
+        chat_id = self._chat_id(data)
+        is_send = endpoint.startswith(_SEND_PREFIXES)
+
+        for attempt in range(self._max_retries + 1):
+            await self._acquire(lane, chat_id, is_send)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as exc:
+                self._retry_after[lane] += 1
+                self._block(chat_id, exc.retry_after)
+                if attempt == self._max_retries:
+                    logger.warning(f"[OUTBOUND] {endpoint} still limited after {attempt} retries")
+                    raise
+                logger.info(f"[OUTBOUND] RetryAfter {exc.retry_after}s on {endpoint} chat={chat_id}")
+        raise AssertionError("unreachable")
+
+    # ── Scheduling ────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _infer_lane(endpoint: str) -> Lane:
+        if endpoint in _MODERATION_ENDPOINTS:
+            return Lane.DELETE
+        return Lane.ALERT
+
+    @staticmethod
+    def _chat_id(data: Dict[str, Any]) -> Optional[int]:
+        try:
+            return int(data.get("chat_id"))
+        except (TypeError, ValueError):
+            return None
+
+    def _block(self, chat_id: Optional[int], seconds: Union[int, float, Any]) -> None:
+        """Honor a RetryAfter: pause the chat's buckets, or everything if unknown."""
+        until = time.monotonic() + float(getattr(seconds, "total_seconds", lambda: seconds)()) + 0.1
+        if chat_id is None:
+            self._global.blocked_until = max(self._global.blocked_until, until)
+        else:
+            self._chat_bucket(chat_id).blocked_until = until
+            if chat_id < 0:
+                self._group_bucket(chat_id).blocked_until = until
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _chat_bucket(self, chat_id: int) -> _Bucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = _Bucket(self._chat_rate, self._chat_burst)
+        return bucket
+
+    def _group_bucket(self, chat_id: int) -> _Bucket:
+        bucket = self._groups.get(chat_id)
+        if bucket is None:
+            bucket = self._groups[chat_id] = _Bucket(self._group_rate, self._group_burst)
+        return bucket
+
+    async def _acquire(self, lane: Lane, chat_id: Optional[int], is_send: bool) -> None:
+        queue = self._lanes[lane]
+        limit = LANE_LIMITS[lane]
+        if limit is not None and len(queue) >= limit:
+            self._dropped[lane] += 1
+            raise OutboundQueueFull(f"Outbound {lane.name} lane is full ({limit})")
+        waiter = _Waiter(
+            seq=next(self._seq), lane=lane, chat_id=chat_id, is_send=is_send,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        queue.add(waiter)
+        self._wakeup.set()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            queue.discard(waiter)
+            raise
+
+    def _chat_wait(self, waiter: _Waiter, now: float) -> float:
+        """Seconds until this waiter's chat-level buckets allow it."""
+        if waiter.chat_id is None:
+            return 0.0
+        wait = self._chat_bucket(waiter.chat_id).wait_time(now) if waiter.is_send else max(
+            0.0, self._chat_bucket(waiter.chat_id).blocked_until - now
+        )
+        if waiter.is_send and waiter.chat_id < 0:
+            wait = max(wait, self._group_bucket(waiter.chat_id).wait_time(now))
+        return wait
+
+    def _grant(self, waiter: _Waiter, now: float) -> None:
+        self._global.take(now)
+        if waiter.chat_id is not None and waiter.is_send:
+            self._chat_bucket(waiter.chat_id).take(now)
+            if waiter.chat_id < 0:
+                self._group_bucket(waiter.chat_id).take(now)
+        waited = now - waiter.enqueued
+        self._granted[waiter.lane] += 1
+        self._wait_total[waiter.lane] += waited
+        self._wait_max[waiter.lane] = max(self._wait_max[waiter.lane], waited)
+        if not waiter.future.done():
+            waiter.future.set_result(None)
+
+    def _next_ready(self, now: float) -> tuple[Optional[tuple[_LaneQueue, _ChatQueue]], float]:
+        """Highest-priority chat whose head waiter may go now (taken off its
+        lane's heap), else the shortest wait. Chats found still throttled
+        (their buckets changed since they were scheduled) are rescheduled."""
+        soonest = float("inf")
+        for lane in Lane:
+            queue = self._lanes[lane]
+            while True:
+                chat, wait = queue.pop_due(now)
+                if chat is None:
+                    soonest = min(soonest, wait)
+                    break
+                wait = self._chat_wait(chat.waiters[0], now)
+                if wait <= 0:
+                    return (queue, chat), 0.0
+                queue.release(chat, now + wait)
+        return None, soonest
+
+    async def _dispatch_loop(self) -> None:
+        last_gc = time.monotonic()
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            global_wait = self._global.wait_time(now)
+            ready, chat_wait = (None, float("inf")) if global_wait > 0 else self._next_ready(now)
+            if ready:
+                queue, chat = ready
+                waiter = chat.waiters.popleft()
+                queue.size -= 1
+                if not waiter.future.done():
+                    self._grant(waiter, now)
+                queue.release(chat, now + (self._chat_wait(chat.waiters[0], now) if chat.waiters else 0.0))
+                continue
+
+            if now - last_gc > 60:
+                self._chats = {k: b for k, b in self._chats.items() if not b.idle(now)}
+                self._groups = {k: b for k, b in self._groups.items() if not b.idle(now)}
+                last_gc = now
+
+            timeout = global_wait if global_wait > 0 else chat_wait
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=None if timeout == float("inf") else timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    # ── Metrics ───────────────────────────────────────────────────────────────
+
+    def metrics(self) -> dict:
+        lanes = {}
+        for lane in Lane:
+            queue = self._lanes[lane]
+            now = time.monotonic()
+            granted = self._granted[lane]
+            lanes[lane.name.lower()] = {
+                "queued": len(queue),
+                "oldest_wait_s": round(now - oldest, 3) if (oldest := queue.oldest()) is not None else 0.0,
+                "granted": granted,
+                "dropped": self._dropped[lane],
+                "retry_after": self._retry_after[lane],
+                "avg_wait_ms": round(self._wait_total[lane] / granted * 1000, 1) if granted else 0.0,
+                "max_wait_ms": round(self._wait_max[lane] * 1000, 1),
+            }
+        return {
+            "lanes": lanes,
+            "tracked_chats": len(self._chats),
+            "global_blocked_s": round(max(0.0, self._global.blocked_until - time.monotonic()), 1),
+        }
+
+
+_active: Optional[PriorityRateLimiter] = None
+
+
+def get_outbound_metrics() -> Optional[dict]:
+    """Metrics of the running limiter, or None when the bot is not running."""
+    return _active.metrics() if _active else None
@@ -0,0 +1,240 @@
+"""
+Vex - Update Processor
+Replaces PTB's unbounded concurrent_updates(True) with:
+
+  - a bounded number of updates running at once (workers)
+  - strict arrival order within a chat — an edit never overtakes the
+    original message, a welcome never overtakes the join — while different
+    chats run in parallel
+  - a priority lane for callback queries and updates from bot admins / the
+    admin group: they are served before ordinary traffic, both across chats
+    and inside their own chat's queue
+
+PTB's own semaphore (max_concurrent_updates) caps how many updates may wait
+here at all; beyond it they stay unstarted in PTB, so a flood cannot grow
+memory without bound.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from bot.services.admin_service import list_admin_ids, get_admin_group_id
+
+logger = logging.getLogger("vex.core.update_processor")
+
+HIGH, NORMAL = 0, 1
+_ADMIN_TTL_SECONDS = 60.0
+_TOP_CHATS = 10
+
+
+@dataclass(eq=False)
+class _Item:
+    priority: int
+    seq: int
+    turn: asyncio.Future
+    enqueued: float = field(default_factory=time.monotonic)
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Per-chat FIFO with bounded global concurrency (see module docstring)."""
+
+    def __init__(self, max_workers: int = 32, max_pending: int = 5000):
+        # PTB's semaphore bounds waiting + running updates inside this processor
+        super().__init__(max_concurrent_updates=max_pending)
+        self.max_workers = max_workers
+        self._seq = itertools.count()
+        self._queues: dict[Any, deque[_Item]] = {}
+        self._active_chats: set = set()
+        self._ready: list[tuple[int, int, Any]] = []     # heap of (priority, seq, chat key)
+        self._running = 0
+        self._waiting = 0
+
+        self._admin_ids: set[int] = set()
+        self._admin_group_id: Optional[int] = None
+        self._admins_loaded = 0.0
+        self._admin_refresh: Optional[asyncio.Task] = None
+
+        # Metrics
+        self._processed = 0
+        self._high_processed = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._chat_lag: dict[Any, float] = {}
+
+    # ── BaseUpdateProcessor interface ─────────────────────────────────────────
+
+    async def initialize(self) -> None:
+        global _active
+        _active = self
+        await self._refresh_admins()
+
+    async def shutdown(self) -> None:
+        global _active
+        if self._admin_refresh and not self._admin_refresh.done():
+            self._admin_refresh.cancel()
+        if _active is self:
+            _active = None
+
+    async def do_process_update(self, update: object, coroutine: "Awaitable[Any]") -> None:
+        key = self._chat_key(update)
+        item = _Item(priority=self._priority(update), seq=next(self._seq),
+                     turn=asyncio.get_running_loop().create_future())
+        self._enqueue(key, item)
+        self._pump()
+
+        try:
+            await item.turn
+        except asyncio.CancelledError:
+            if item.turn.done() and not item.turn.cancelled():
+                self._finish(key)          # Granted just before the cancel
+            else:
+                queue = self._queues.get(key)
+                if queue and item in queue:
+                    queue.remove(item)
+                    self._waiting -= 1
+                self._drop_empty(key)
+            coroutine.close()
+            raise
+
+        lag = time.monotonic() - item.enqueued
+        self._lag_total += lag
+        self._lag_max = max(self._lag_max, lag)
+        self._chat_lag[key] = lag
+        try:
+            await coroutine
+        finally:
+            self._processed += 1
+            self._high_processed += item.priority == HIGH
+            self._finish(key)
+
+    # ── Scheduling ────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _chat_key(update: object) -> Any:
+        if isinstance(update, Update):
+            if update.effective_chat:
+                return update.effective_chat.id
+            if update.effective_user:
+                return ("user", update.effective_user.id)
+        # No chat/user (polls, errors, custom objects): one shared ordered lane
+        return None
+
+    def _priority(self, update: object) -> int:
+        if not isinstance(update, Update):
+            return NORMAL
+        self._maybe_refresh_admins()
+        if update.callback_query:
+            return HIGH
+        chat, user = update.effective_chat, update.effective_user
+        if chat and chat.id == self._admin_group_id:
+            return HIGH
+        if user and user.id in self._admin_ids:
+            return HIGH
+        return NORMAL
+
+    def _enqueue(self, key: Any, item: _Item) -> None:
+        queue = self._queues.setdefault(key, deque())
+        if item.priority == HIGH:
+            # Ahead of the chat's ordinary updates, behind earlier priority ones
+            index = next((i for i, other in enumerate(queue) if other.priority != HIGH), len(queue))
+            queue.insert(index, item)
+        else:
+            queue.append(item)
+        self._waiting += 1
+        if key not in self._active_chats and queue[0] is item:
+            heapq.heappush(self._ready, (item.priority, item.seq, key))
+
+    def _pump(self) -> None:
+        while self._running < self.max_workers and self._ready:
+            _, _, key = heapq.heappop(self._ready)
+            queue = self._queues.get(key)
+            if key in self._active_chats or not queue:
+                continue            # Stale heap entry
+            item = queue.popleft()
+            self._waiting -= 1
+            self._active_chats.add(key)
+            self._running += 1
+            item.turn.set_result(None)
+
+    def _finish(self, key: Any) -> None:
+        self._running -= 1
+        self._active_chats.discard(key)
+        queue = self._queues.get(key)
+        if queue:
+            head = queue[0]
+            heapq.heappush(self._ready, (head.priority, head.seq, key))
+        else:
+            self._drop_empty(key)
+        self._pump()
+
+    def _drop_empty(self, key: Any) -> None:
+        if key in self._queues and not self._queues[key]:
+            del self._queues[key]
+            self._chat_lag.pop(key, None)
+
+    # ── Admin lookup (refreshed in the background, never awaited per update) ──
+
+    def _maybe_refresh_admins(self) -> None:
+        if time.monotonic() - self._admins_loaded < _ADMIN_TTL_SECONDS:
+            return
+        if self._admin_refresh is None or self._admin_refresh.done():
+            self._admin_refresh = asyncio.create_task(self._refresh_admins())
+
+    async def _refresh_admins(self) -> None:
+        self._admins_loaded = time.monotonic()
+        try:
+            self._admin_ids = await list_admin_ids()
+            self._admin_group_id = await get_admin_group_id()
+        except Exception as e:
+            logger.warning(f"[UPDATES] Could not refresh admin list: {e}")
+
+    # ── Metrics ───────────────────────────────────────────────────────────────
+
+    @property
+    def backlog(self) -> int:
+        """Updates waiting for their turn (not yet running)."""
+        return self._waiting
+
+    def metrics(self) -> dict:
+        now = time.monotonic()
+        chats = []
+        for key, queue in self._queues.items():
+            if queue:
+                chats.append({
+                    "chat": key if not isinstance(key, tuple) else f"user:{key[1]}",
+                    "queued": len(queue),
+                    "oldest_wait_s": round(now - min(i.enqueued for i in queue), 3),
+                    "last_lag_ms": round(self._chat_lag.get(key, 0.0) * 1000, 1),
+                })
+        chats.sort(key=lambda c: (c["queued"], c["oldest_wait_s"]), reverse=True)
+        processed = self._processed
+        return {
+            "running": self._running,
+            "max_workers": self.max_workers,
+            "queued": sum(c["queued"] for c in chats),
+            "queued_high": sum(1 for q in self._queues.values() for i in q if i.priority == HIGH),
+            "max_pending": self.max_concurrent_updates,
+            "active_chats": len(self._active_chats),
+            "waiting_chats": len(chats),
+            "processed": processed,
+            "processed_high": self._high_processed,
+            "avg_lag_ms": round(self._lag_total / processed * 1000, 1) if processed else 0.0,
+            "max_lag_ms": round(self._lag_max * 1000, 1),
+            "top_chats": chats[:_TOP_CHATS],
+        }
+
+
+_active: Optional[ChatOrderedUpdateProcessor] = None
+
+
+def get_update_metrics() -> Optional[dict]:
+    """Metrics of the running processor, or None when the bot is not running."""
+    return _active.metrics() if _active else None
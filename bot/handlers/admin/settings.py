@@ -13,7 +13,7 @@ from telegram.ext import (
 from bot.services.admin_service import is_admin, is_admin_group
 from bot.services.group_service import (
     list_managed_groups, get_managed_group, deactivate_group,
-    toggle_media_setting, get_group_media_setting,
+    toggle_media_setting, get_group_media_setting, media_setting_value,
 )
 from bot.services.ai_provider_service import list_providers
 from bot.core.config import get_ai_prompt_override, set_ai_prompt_override
@@ -163,7 +163,7 @@ async def media_settings_callback(update: Update, context: ContextTypes.DEFAULT_
     keyboard = []
     settings = group.media_settings or {}
     for key, label in MEDIA_LABELS.items():
-        status = "✅" if settings.get(key, True) else "❌"
+        status = "✅" if media_setting_value(settings, key) else "❌"
         keyboard.append([
             InlineKeyboardButton(status, callback_data=f"toggle_media#{group_id}#{key}"),
             InlineKeyboardButton(label, callback_data=f"noop"),
@@ -198,7 +198,7 @@ async def toggle_media_callback(update: Update, context: ContextTypes.DEFAULT_TY
     keyboard = []
     settings = group.media_settings or {}
     for key, label in MEDIA_LABELS.items():
-        status = "✅" if settings.get(key, True) else "❌"
+        status = "✅" if media_setting_value(settings, key) else "❌"
         keyboard.append([
             InlineKeyboardButton(status, callback_data=f"toggle_media#{group_id}#{key}"),
             InlineKeyboardButton(label, callback_data=f"noop"),
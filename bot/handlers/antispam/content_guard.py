@@ -1,14 +1,35 @@
+import asyncio
 import logging
 import re
 import unicodedata
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ChatMemberAdministrator, ChatMemberOwner
+from telegram import Update, ChatMemberAdministrator, ChatMemberOwner
+from telegram.error import BadRequest
 from telegram.ext import Application, MessageHandler, ContextTypes, filters
 
 from bot.services.admin_service import is_admin, get_admin_group_id
 from bot.services.group_service import is_managed_group, list_blocked_words
-from bot.services.ai_service import analyze_text as ai_analyze_text
-from bot.core.config import get_ai_debug_channel_id, get_ai_thresholds
+from bot.services.ai_service import (
+    try_analyze_text as ai_try_analyze_text, is_cascade_available, get_group_ai_config,
+)
+from bot.services.ai_retry_service import (
+    enqueue_retry, purge_expired, get_due_items, mark_failed, remove_item,
+)
+from bot.services.ai_shadow_service import mirror_to_shadow
+from bot.services.ai_policy_service import (
+    decide as ai_policy_decide, get_policy as get_ai_policy, is_trusted,
+)
+from bot.services.chat_context_service import remember as remember_context, recent as recent_context, build_context
+from bot.services.reputation_service import (
+    note_message, note_violation, reputation_flush_job, FLUSH_INTERVAL_SECONDS as REPUTATION_FLUSH_SECONDS,
+)
+from bot.services.deletion_service import delete_message
+from bot.services.raid_service import record as raid_record, is_raid_mode
+from bot.services.duplicate_service import Copy, check_duplicate
+from bot.services.ai_debug_service import record_verdict, debug_digest_job
+from bot.services.alert_aggregator import AlertItem, submit_alert, text_fingerprint
+from bot.core.fanout import get_role, get_owned_partitions, get_partition_count
+from bot.handlers.antispam.escalation import strike
 
 logger = logging.getLogger("vex.handlers.antispam.content_guard")
 
@@ -88,10 +109,21 @@ async def check_against_blacklists(normalized_text: str, chat_id: int) -> bool:
     return False
 
 
+_LINK_PATTERN = re.compile(r"(https?://|www\.|t\.me/|@\w{5,})", re.IGNORECASE)
+
+
+def _has_link(message) -> bool:
+    """Links, invite links or @mentions (entities or plain text)."""
+    entities = (message.entities or ()) + (message.caption_entities or ())
+    if any(e.type in ("url", "text_link", "mention") for e in entities):
+        return True
+    return bool(_LINK_PATTERN.search(message.text or message.caption or ""))
+
+
 AI_THRESHOLD = 0.65  # legacy constant (no longer used directly — thresholds come from DB)
 
 
-async def send_admin_alert(
+def send_admin_alert(
     context: ContextTypes.DEFAULT_TYPE,
     admin_group_id: int,
     user_name: str,
@@ -101,41 +133,66 @@ async def send_admin_alert(
     chat_id: int,
     message_id: int,
     auto_deleted: bool = False,
+    deferred: bool = False,
 ) -> None:
-    """Send an alert to the admin group with action buttons (or auto-delete notice)."""
-    score_pct = int(abuse_score * 100)
-
-    if auto_deleted:
-        alert_text = (
-            f"🗑️ **تم الحذف التلقائي — نسبة الإساءة {score_pct}%**\n\n"
-            f"👤 المستخدم: [{user_name}](tg://user?id={user_id})\n"
-            f"💬 الرسالة المحذوفة:\n`{original_text[:300]}`"
-        )
-        keyboard = None
-    else:
-        alert_text = (
-            f"⚠️ **اشتباه برسالة مسيئة بنسبة {score_pct}%**\n\n"
-            f"👤 المستخدم: [{user_name}](tg://user?id={user_id})\n"
-            f"💬 الرسالة الأصلية:\n`{original_text[:300]}`"
-        )
-        chat_id_clean = str(chat_id).lstrip("-").removeprefix("100")
-        msg_link = f"https://t.me/c/{chat_id_clean}/{message_id}"
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("🔗 اذهب للرسالة", url=msg_link)],
-            [
-                InlineKeyboardButton("🗑️ احذف الرسالة", callback_data=f"guard_delete:{chat_id}:{message_id}"),
-                InlineKeyboardButton("✅ لا تحذف", callback_data=f"guard_keep:{chat_id}:{message_id}"),
-            ]
-        ])
-
-    await context.bot.send_message(
-        chat_id=admin_group_id,
-        text=alert_text,
-        reply_markup=keyboard,
-        parse_mode="Markdown",
+    """Alert the admin group (with action buttons, or as an auto-delete notice).
+    Repeat offenders and copy-paste waves fold into one live alert, which is
+    sent in the background."""
+    submit_alert(
+        context.bot,
+        admin_group_id,
+        AlertItem(
+            chat_id=chat_id,
+            message_id=message_id,
+            user_id=user_id,
+            user_name=user_name,
+            text=original_text,
+            score=abuse_score,
+            auto_deleted=auto_deleted,
+            deferred=deferred,
+        ),
+        fingerprint=text_fingerprint(normalize_arabic(original_text)),
     )
 
 
+# ─── Cross-group Duplicates ───────────────────────────────────────────────────
+
+DUPLICATE_REASON = "🔁 رسالة مكررة عبر المجموعات"
+
+
+async def remove_duplicates(context: ContextTypes.DEFAULT_TYPE, fingerprint: str, copies: list[Copy]) -> None:
+    """Delete every copy of a flagged spam text and fold them into one admin alert."""
+    results = await asyncio.gather(*(delete_message(context.bot, c.chat_id, c.message_id) for c in copies))
+    for c, ok in zip(copies, results):
+        if ok:
+            await raid_record(context.bot, c.chat_id, "deletions")
+            # Counted against reputation but not the strike ladder: a
+            # duplicate alone is too weak a signal for mute / ban
+            await note_violation(c.chat_id, c.user_id)
+    logger.info(f"[GUARD-DUP] Deleted {sum(results)}/{len(copies)} copies of {fingerprint}")
+
+    admin_group_id = await get_admin_group_id()
+    if not admin_group_id:
+        return
+    for c, ok in zip(copies, results):
+        submit_alert(
+            context.bot,
+            admin_group_id,
+            AlertItem(
+                chat_id=c.chat_id,
+                message_id=c.message_id,
+                user_id=c.user_id,
+                user_name=c.user_name,
+                text=c.text,
+                score=1.0,
+                auto_deleted=ok,
+                deferred=False,
+                reason=DUPLICATE_REASON,
+            ),
+            fingerprint=fingerprint,
+        )
+
+
 # ─── Main Handler ─────────────────────────────────────────────────────────────
 
 async def content_guard_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -169,106 +226,216 @@ async def content_guard_handler(update: Update, context: ContextTypes.DEFAULT_TY
     if not original_text:
         return
 
+    await note_message(chat.id, user.id)
+
     # ── Layer 1: Normalize ────────────────────────────────────────────────────
     normalized = normalize_arabic(original_text)
     if not normalized:
         return
 
+    user_name = user.full_name or user.username or str(user.id)
+
+    # ── Spam waves: same text across groups → delete every copy ───────────────
+    # Trusted members neither feed nor trigger waves
+    cluster, copies = None, []
+    if not await is_trusted(chat.id, user.id):
+        cluster, copies = check_duplicate(
+            normalized, Copy(chat.id, message.message_id, user.id, user_name, original_text),
+        )
+    if cluster:
+        await remove_duplicates(context, cluster.fingerprint, copies)
+        return
+
     # ── Layer 2: Blacklist Check → delete immediately ─────────────────────────
     if await check_against_blacklists(normalized, chat.id):
         logger.info(f"[GUARD-L2] Blocked word detected. Deleting message from {user.id} in {chat.id}")
-        try:
-            await message.delete()
-        except Exception as e:
-            logger.warning(f"[GUARD-L2] Could not delete message: {e}")
+        if await delete_message(context.bot, chat.id, message.message_id):
+            await raid_record(context.bot, chat.id, "deletions")
+            await note_violation(chat.id, user.id)
+            await strike(context.bot, chat.id, user.id, user_name)
+        else:
+            logger.warning(f"[GUARD-L2] Could not delete message {message.message_id}")
         return  # Stop here, do not proceed to AI layer
 
+    # ── Raid mode: strict and cheap — links go, nothing reaches the AI ────────
+    if is_raid_mode(chat.id):
+        if _has_link(message):
+            logger.info(f"[GUARD-RAID] Link removed from {user.id} in {chat.id}")
+            if await delete_message(context.bot, chat.id, message.message_id):
+                await raid_record(context.bot, chat.id, "deletions")
+                await note_violation(chat.id, user.id)
+                await strike(context.bot, chat.id, user.id, user_name)
+        return
+
     # ── Layer 3: AI Analysis ──────────────────────────────────────────────────
     admin_group_id = await get_admin_group_id()
     if not admin_group_id:
         return  # No admin group configured, skip AI layer silently
 
-    score = await ai_analyze_text(normalized)
-    alert_threshold, auto_delete_threshold = await get_ai_thresholds()
+    # Context mode: the messages before this one, taken before it joins them
+    policy = await get_ai_policy(chat.id)
+    history = []
+    if policy["context_messages"] > 0:
+        history = recent_context(chat.id, policy["context_messages"])
+        remember_context(chat.id, normalized)
+
+    # Adaptive policy: trusted members skip the AI, new / low-trust ones are
+    # judged more strictly, under load established members are only sampled
+    decision = await ai_policy_decide(chat.id, user.id)
+    if not decision.score:
+        return
+
+    ai_context = None
+    if policy["context_messages"] > 0:
+        reply = message.reply_to_message
+        reply_text = normalize_arabic(reply.text or reply.caption or "") if reply else None
+        ai_context = build_context(history, reply_text, policy["context_tokens"])
+
+    score = await ai_try_analyze_text(normalized, chat.id, ai_context)
+    if score is None:
+        # Every provider failed — re-score later instead of letting it through
+        await enqueue_retry(chat.id, message.message_id, user.id, user_name, original_text, normalized)
+        return
+
+    # Candidate models see the same message in the background; no effect here
+    mirror_to_shadow(normalized, score, (await get_group_ai_config(chat.id)).rules)
+    await apply_ai_verdict(
+        context, admin_group_id, chat.id, message.message_id,
+        user.id, user_name, original_text, score, margin=decision.margin,
+    )
+
+
+async def apply_ai_verdict(
+    context: ContextTypes.DEFAULT_TYPE,
+    admin_group_id: int,
+    chat_id: int,
+    message_id: int,
+    user_id: int,
+    user_name: str,
+    original_text: str,
+    score: float,
+    deferred: bool = False,
+    margin: float = 0.0,
+) -> None:
+    """Act on an AI score: auto-delete / alert admins per the group's
+    thresholds (lowered by `margin` for new / low-trust members), then mirror
+    the result to the debug channel. deferred=True marks a late verdict from
+    the retry queue (the message may be gone by then)."""
+    config = await get_group_ai_config(chat_id)
+    alert_threshold, auto_delete_threshold = config.alert_threshold, config.auto_delete_threshold
+    if margin:
+        alert_threshold = max(0.0, alert_threshold - margin)
+        auto_delete_threshold = max(alert_threshold, auto_delete_threshold - margin)
+    tag = "GUARD-L3-RETRY" if deferred else "GUARD-L3"
     logger.info(
-        f"[GUARD-L3] AI score={score:.2f} alert>={alert_threshold} auto_del>={auto_delete_threshold} "
-        f"user={user.id} chat={chat.id}"
+        f"[{tag}] AI score={score:.2f} alert>={alert_threshold} auto_del>={auto_delete_threshold} "
+        f"user={user_id} chat={chat_id}"
     )
 
-    user_name = user.full_name or user.username or str(user.id)
-    action_taken = False
+    if score >= alert_threshold:
+        await note_violation(chat_id, user_id)
 
     if score >= auto_delete_threshold:
         # Auto-delete and notify admins
-        action_taken = True
-        try:
-            await message.delete()
-            logger.info(f"[GUARD-L3] Auto-deleted message from {user.id} in {chat.id} (score={score:.2f})")
-        except Exception as e:
-            logger.warning(f"[GUARD-L3] Could not auto-delete message: {e}")
-        try:
-            await send_admin_alert(
-                context=context,
-                admin_group_id=admin_group_id,
-                user_name=user_name,
-                user_id=user.id,
-                original_text=original_text,
-                abuse_score=score,
-                chat_id=chat.id,
-                message_id=message.message_id,
-                auto_deleted=True,
-            )
-        except Exception as e:
-            logger.error(f"[GUARD-L3] Failed to send auto-delete notice: {e}")
+        if await delete_message(context.bot, chat_id, message_id):
+            await raid_record(context.bot, chat_id, "deletions")
+            await strike(context.bot, chat_id, user_id, user_name)
+            logger.info(f"[{tag}] Auto-deleted message from {user_id} in {chat_id} (score={score:.2f})")
+        else:
+            logger.warning(f"[{tag}] Could not auto-delete message {message_id}")
+            if deferred:
+                return  # Already gone (or deleted by an admin) — nothing to report
+        send_admin_alert(
+            context=context,
+            admin_group_id=admin_group_id,
+            user_name=user_name,
+            user_id=user_id,
+            original_text=original_text,
+            abuse_score=score,
+            chat_id=chat_id,
+            message_id=message_id,
+            auto_deleted=True,
+            deferred=deferred,
+        )
 
     elif score >= alert_threshold:
         # Alert admins, let them decide
-        action_taken = True
-        logger.info(f"[GUARD-L3] Alerting admins for message from {user.id} in {chat.id} (score={score:.2f})")
-        try:
-            await send_admin_alert(
-                context=context,
-                admin_group_id=admin_group_id,
-                user_name=user_name,
-                user_id=user.id,
-                original_text=original_text,
-                abuse_score=score,
-                chat_id=chat.id,
-                message_id=message.message_id,
-                auto_deleted=False,
-            )
-        except Exception as e:
-            logger.error(f"[GUARD-L3] Failed to send admin alert: {e}")
-
-    # ── Debug Channel ──────────────────────────────────────────────────────────
-    debug_ch = await get_ai_debug_channel_id()
-    if debug_ch:
-        try:
-            bar = int(score * 10)
-            bar_filled = '█' * bar + '░' * (10 - bar)
-            if score >= auto_delete_threshold:
-                action_label = "🗑️ حذف تلقائي"
-            elif score >= alert_threshold:
-                action_label = "🚨 تنبيه أرسل للمشرفين"
-            else:
-                action_label = "✅ لم يتخذ إجراء"
-            debug_text = (
-                f"🔬 *AI Debug Log*\n"
-                f"────────────────────\n"
-                f"💬 *الرسالة:* `{original_text[:300]}`\n"
-                f"📊 *النتيجة:* `{score:.2f}` / 1.0\n"
-                f"[{bar_filled}] {score*100:.0f}%\n"
-                f"⚡ *تنبيه من:* `{alert_threshold:.0%}` | *حذف من:* `{auto_delete_threshold:.0%}`\n"
-                f"📍 *المجموعة:* `{chat.id}`\n"
-                f"🛡 *الإجراء:* {action_label}"
-            )
-            await context.bot.send_message(
-                chat_id=debug_ch,
-                text=debug_text,
-                parse_mode="Markdown",
-            )
-        except Exception as e:
-            logger.warning(f"[GUARD-DEBUG] Failed to send debug message: {e}")
+        if deferred and not await message_exists(context.bot, chat_id, message_id):
+            logger.info(f"[{tag}] Message {message_id} in {chat_id} no longer exists, alert skipped")
+            return
+        logger.info(f"[{tag}] Alerting admins for message from {user_id} in {chat_id} (score={score:.2f})")
+        send_admin_alert(
+            context=context,
+            admin_group_id=admin_group_id,
+            user_name=user_name,
+            user_id=user_id,
+            original_text=original_text,
+            abuse_score=score,
+            chat_id=chat_id,
+            message_id=message_id,
+            auto_deleted=False,
+            deferred=deferred,
+        )
+
+    # ── Debug Channel (digest or per-message, see ai_debug_service) ──────────
+    if score >= auto_delete_threshold:
+        action = "delete"
+    elif score >= alert_threshold:
+        action = "alert"
+    else:
+        action = "none"
+    await record_verdict(
+        context.bot, chat_id, original_text, score, action,
+        alert_threshold, auto_delete_threshold, deferred=deferred,
+    )
+
+
+async def message_exists(bot, chat_id: int, message_id: int) -> bool:
+    """Best-effort existence check without side effects: editing another
+    user's message always fails, but with "not found" only if it is gone."""
+    try:
+        await bot.edit_message_reply_markup(chat_id=chat_id, message_id=message_id)
+    except BadRequest as e:
+        return "not found" not in str(e).lower()
+    except Exception:
+        pass
+    return True
+
+
+# ─── Deferred Re-scoring ──────────────────────────────────────────────────────
+
+RETRY_INTERVAL_SECONDS = 30
+RETRY_BATCH_SIZE = 20
+
+
+async def retry_deferred_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Re-score queued messages once the cascade has a provider available."""
+    await purge_expired()
+    if not await is_cascade_available():
+        return
+    # A worker re-scores only its own groups: their alerts, reputation and
+    # strikes live in this process
+    if get_role() == "worker":
+        items = await get_due_items(RETRY_BATCH_SIZE, get_owned_partitions(), get_partition_count())
+    else:
+        items = await get_due_items(RETRY_BATCH_SIZE)
+    if not items:
+        return
+    admin_group_id = await get_admin_group_id()
+
+    for item in items:
+        score = await ai_try_analyze_text(item.normalized_text, item.chat_id)
+        if score is None:
+            await mark_failed(item.id)
+            # Still down — leave the rest for the next tick
+            break
+        await remove_item(item.id)
+        if not admin_group_id or not await is_managed_group(item.chat_id):
+            continue
+        await apply_ai_verdict(
+            context, admin_group_id, item.chat_id, item.message_id,
+            item.user_id, item.user_name, item.original_text, score, deferred=True,
+        )
 
 
 # ─── Handler Registration ─────────────────────────────────────────────────────
@@ -282,3 +449,18 @@ def register_content_guard_handlers(app: Application):
         ),
         group=12,  # Runs after word_filter (group=11)
     )
+    if app.job_queue:
+        # The retry queue is shared in the database: drained where the groups'
+        # updates are handled (each worker takes its own partitions), not by ingest
+        if get_role() != "ingest":
+            app.job_queue.run_repeating(
+                retry_deferred_job, interval=RETRY_INTERVAL_SECONDS, first=RETRY_INTERVAL_SECONDS,
+                name="ai_retry_queue",
+            )
+        # Checks every 30s; posts once the configured digest interval has passed
+        app.job_queue.run_repeating(debug_digest_job, interval=30, first=30, name="ai_debug_digest")
+        # Member reputation is written behind, by each process for its own groups
+        app.job_queue.run_repeating(
+            reputation_flush_job, interval=REPUTATION_FLUSH_SECONDS, first=REPUTATION_FLUSH_SECONDS,
+            name="reputation_flush",
+        )
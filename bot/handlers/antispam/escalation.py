@@ -0,0 +1,78 @@
+"""
+Vex - Escalation Handler
+Applies the group's strike ladder: filters call strike() after deleting a
+member's message, and a member who reaches a rung is muted or banned.
+Notices to the group are posted from background tasks, so the handler
+never waits on the ANNOUNCE lane
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from telegram import Bot, ChatPermissions
+from telegram.ext import Application
+
+from bot.services.escalation_service import (
+    add_strike, escalation_flush_job, escalation_purge_job, FLUSH_INTERVAL_SECONDS,
+)
+from bot.core.rate_limiter import Lane
+
+logger = logging.getLogger("vex.handlers.antispam.escalation")
+
+_notices: set[asyncio.Task] = set()
+
+
+def send_notice(bot: Bot, chat_id: int, text: str) -> None:
+    """Post a moderation notice to the group in the background"""
+    task = asyncio.create_task(_post_notice(bot, chat_id, text))
+    _notices.add(task)
+    task.add_done_callback(_notices.discard)
+
+
+async def _post_notice(bot: Bot, chat_id: int, text: str) -> None:
+    try:
+        await bot.send_message(chat_id, text, parse_mode="Markdown", rate_limit_args=Lane.ANNOUNCE)
+    except Exception as e:
+        logger.warning(f"[ESCALATION] Could not post notice in {chat_id}: {e}")
+
+
+async def strike(bot: Bot, chat_id: int, user_id: int, user_name: str = "") -> None:
+    """Count a deleted message against its sender and act on the ladder"""
+    try:
+        step = await add_strike(chat_id, user_id)
+    except Exception as e:
+        logger.warning(f"[ESCALATION] Could not count strike for {user_id} in {chat_id}: {e}")
+        return
+    if not step:
+        return
+
+    action, policy = step
+    name = (user_name or str(user_id)).replace("[", "").replace("]", "")
+    mention = f"[{name}](tg://user?id={user_id})"
+    try:
+        # Moderation calls share the deletion lane: ahead of notices, within the limits
+        if action == "ban":
+            await bot.ban_chat_member(chat_id, user_id, rate_limit_args=Lane.DELETE)
+            notice = f"⛔ تم حظر {mention} بعد تكرار المخالفات"
+        else:
+            until = datetime.now(timezone.utc) + timedelta(minutes=policy["mute_minutes"])
+            await bot.restrict_chat_member(
+                chat_id, user_id, ChatPermissions(can_send_messages=False), until_date=until,
+                rate_limit_args=Lane.DELETE,
+            )
+            notice = f"🔇 تم كتم {mention} لمدة {policy['mute_minutes']} دقيقة بعد تكرار المخالفات"
+    except Exception as e:
+        logger.warning(f"[ESCALATION] Could not {action} {user_id} in {chat_id}: {e}")
+        return
+    send_notice(bot, chat_id, notice)
+
+
+def register_escalation_handlers(app: Application):
+    """Schedule the write-behind of strike counters"""
+    if app.job_queue:
+        # Each process writes the counters of its own groups
+        app.job_queue.run_repeating(
+            escalation_flush_job, interval=FLUSH_INTERVAL_SECONDS, first=FLUSH_INTERVAL_SECONDS,
+            name="escalation_flush",
+        )
+        app.job_queue.run_repeating(escalation_purge_job, interval=86400, first=3600, name="escalation_purge")
@@ -0,0 +1,91 @@
+"""
+Vex - Flood Handler
+Cuts off users posting too fast before any other filter, database lookup
+or AI analysis sees their messages
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+
+from telegram import Update, ChatMemberAdministrator, ChatMemberOwner, ChatPermissions
+from telegram.ext import Application, ApplicationHandlerStop, MessageHandler, ContextTypes, filters
+
+from bot.services.group_service import is_managed_group
+from bot.services.admin_service import is_admin
+from bot.services.deletion_service import delete_message
+from bot.services.flood_service import check_flood, forgive
+from bot.services.raid_service import record as raid_record
+from bot.handlers.antispam.escalation import send_notice
+
+logger = logging.getLogger("vex.handlers.antispam.flood")
+
+
+async def _is_exempt(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Bot admins and group admins may post as fast as they like"""
+    chat = update.effective_chat
+    user = update.effective_user
+    if await is_admin(user.id):
+        return True
+    try:
+        member = await context.bot.get_chat_member(chat.id, user.id)
+        return isinstance(member, (ChatMemberAdministrator, ChatMemberOwner))
+    except Exception:
+        return False
+
+
+async def _punish(update: Update, context: ContextTypes.DEFAULT_TYPE, policy: dict) -> None:
+    chat = update.effective_chat
+    user = update.effective_user
+    name = (user.first_name or str(user.id)).replace("[", "").replace("]", "")
+    try:
+        if policy["action"] == "mute":
+            until = datetime.now(timezone.utc) + timedelta(minutes=policy["mute_minutes"])
+            await context.bot.restrict_chat_member(
+                chat.id, user.id, ChatPermissions(can_send_messages=False), until_date=until,
+            )
+            notice = f"🔇 تم كتم [{name}](tg://user?id={user.id}) لمدة {policy['mute_minutes']} دقيقة بسبب التكرار"
+        elif policy["action"] == "kick":
+            await context.bot.ban_chat_member(chat.id, user.id)
+            await context.bot.unban_chat_member(chat.id, user.id, only_if_banned=True)
+            notice = f"🚪 تم طرد [{name}](tg://user?id={user.id}) بسبب التكرار"
+        else:
+            return
+    except Exception as e:
+        logger.warning(f"[FLOOD] Could not {policy['action']} {user.id} in {chat.id}: {e}")
+        return
+    send_notice(context.bot, chat.id, notice)
+
+
+async def flood_guard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Stop a flooding sender's messages here: delete them and, on the
+    message that crossed the limit, apply the group's action"""
+    message = update.effective_message
+    chat = update.effective_chat
+    user = update.effective_user
+    if not message or not chat or not user or message.sender_chat:
+        return
+
+    if not await is_managed_group(chat.id):
+        return
+
+    verdict = await check_flood(chat.id, user.id)
+    if not verdict:
+        return
+
+    if verdict.punish:
+        # Only senders over the limit cost an admin lookup
+        if await _is_exempt(update, context):
+            forgive(chat.id, user.id)
+            return
+        await _punish(update, context, verdict.policy)
+
+    if await delete_message(context.bot, chat.id, message.message_id):
+        await raid_record(context.bot, chat.id, "deletions")
+    raise ApplicationHandlerStop
+
+
+def register_flood_handlers(app: Application):
+    """Register the flood guard"""
+    app.add_handler(
+        MessageHandler(filters.ChatType.GROUPS & ~filters.StatusUpdate.ALL, flood_guard),
+        group=-1,  # Before every filter; the raid monitor (group=-2) still counts the message
+    )
@@ -17,6 +17,7 @@ from bot.services.group_service import (
     clear_lock_schedule, get_permission_settings, toggle_permission_setting,
 )
 from bot.services.admin_service import is_admin_group
+from bot.core.rate_limiter import Lane
 
 logger = logging.getLogger("vex.handlers.antispam.lock")
 
@@ -47,7 +48,7 @@ async def close_group(bot, chat_id, message_text=None):
     try:
         await bot.set_chat_permissions(chat_id, ChatPermissions())
         if message_text:
-            await bot.send_message(chat_id, message_text, parse_mode="Markdown")
+            await bot.send_message(chat_id, message_text, parse_mode="Markdown", rate_limit_args=Lane.ANNOUNCE)
     except Exception as e:
         logger.error(f"Error closing group {chat_id}: {e}")
 
@@ -75,7 +76,7 @@ async def open_group(bot, chat_id, message_text=None):
             ),
         )
         if message_text:
-            await bot.send_message(chat_id, message_text, parse_mode="Markdown")
+            await bot.send_message(chat_id, message_text, parse_mode="Markdown", rate_limit_args=Lane.ANNOUNCE)
     except Exception as e:
         logger.error(f"Error opening group {chat_id}: {e}")
 
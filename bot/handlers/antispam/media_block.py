@@ -0,0 +1,130 @@
+"""
+Vex - Media Blocklist Handler
+Block a specific file or sticker pack by replying to it:
+  #حظر_الوسائط / /block_media        this file (add "عام" / "global" for every group)
+  #حظر_الحزمة / /block_pack          the replied sticker's whole pack
+  #الغاء_حظر_الوسائط / /unblock_media
+  #حظر_الصورة / /block_image         the replied photo and its re-encoded copies,
+                                     in every group (bot admins only)
+"""
+import logging
+
+from telegram import Update, ChatMemberAdministrator, ChatMemberOwner
+from telegram.ext import Application, MessageHandler, ContextTypes, filters
+
+from bot.services.group_service import is_managed_group
+from bot.services.admin_service import is_admin
+from bot.services.deletion_service import delete_message
+from bot.services.media_block_service import (
+    media_fingerprint, add_media_block, remove_media_block,
+)
+from bot.services.image_hash_service import block_photo
+
+logger = logging.getLogger("vex.handlers.antispam.media_block")
+
+GLOBAL_ARGS = ("عام", "global")
+
+
+async def _can_manage(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Bot admins and group admins manage the group's list"""
+    user = update.effective_user
+    if await is_admin(user.id):
+        return True
+    try:
+        member = await context.bot.get_chat_member(update.effective_chat.id, user.id)
+        return isinstance(member, (ChatMemberAdministrator, ChatMemberOwner))
+    except Exception:
+        return False
+
+
+async def _target(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """(replied message, scope) or None after telling the user why not.
+    scope is the chat ID, or None for the global list (bot admins only)."""
+    message = update.effective_message
+    chat = update.effective_chat
+    if not await is_managed_group(chat.id) or not await _can_manage(update, context):
+        return None
+
+    reply_to = message.reply_to_message
+    if not reply_to or not media_fingerprint(reply_to)[0]:
+        await message.reply_text("⚠️ يجب الرد على رسالة تحتوي على وسائط")
+        return None
+
+    args = (message.text or "").split()[1:]
+    if args and args[0].lower() in GLOBAL_ARGS:
+        if not await is_admin(update.effective_user.id):
+            await message.reply_text("⚠️ الحظر العام لمشرفي البوت فقط")
+            return None
+        return reply_to, None
+    return reply_to, chat.id
+
+
+async def block_media_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Block the replied file"""
+    target = await _target(update, context)
+    if not target:
+        return
+    reply_to, scope = target
+    file_unique_id, _, media_type = media_fingerprint(reply_to)
+    result = await add_media_block(scope, "file", file_unique_id, media_type, update.effective_user.id)
+    await delete_message(context.bot, reply_to.chat_id, reply_to.message_id)
+    await update.effective_message.reply_text(result)
+
+
+async def block_pack_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Block the replied sticker's pack"""
+    target = await _target(update, context)
+    if not target:
+        return
+    reply_to, scope = target
+    _, set_name, _ = media_fingerprint(reply_to)
+    if not set_name:
+        await update.effective_message.reply_text("⚠️ يجب الرد على ملصق من حزمة")
+        return
+    result = await add_media_block(scope, "sticker_set", set_name, "sticker", update.effective_user.id)
+    await delete_message(context.bot, reply_to.chat_id, reply_to.message_id)
+    await update.effective_message.reply_text(result)
+
+
+async def unblock_media_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Unblock the replied file (and its sticker pack)"""
+    target = await _target(update, context)
+    if not target:
+        return
+    reply_to, scope = target
+    file_unique_id, set_name, _ = media_fingerprint(reply_to)
+    result = await remove_media_block(scope, [v for v in (file_unique_id, set_name) if v])
+    await update.effective_message.reply_text(result)
+
+
+async def block_image_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Add the replied photo to the perceptual-hash index"""
+    message = update.effective_message
+    if not await is_admin(update.effective_user.id):
+        return
+    reply_to = message.reply_to_message
+    if not reply_to or not reply_to.photo:
+        await message.reply_text("⚠️ يجب الرد على صورة")
+        return
+    label = " ".join((message.text or "").split()[1:])[:100] or None
+    result = await block_photo(context.bot, reply_to.photo, label, update.effective_user.id)
+    if result.startswith("✅"):
+        await delete_message(context.bot, reply_to.chat_id, reply_to.message_id)
+    await message.reply_text(result)
+
+
+def register_media_block_handlers(app: Application):
+    """Register media blocklist commands"""
+    groups = filters.ChatType.GROUPS & filters.REPLY
+    app.add_handler(MessageHandler(
+        groups & filters.Regex(r"^[/#]?(حظر_الوسائط|block_media)(?:@\S+)?(?:\s|$)"), block_media_command,
+    ))
+    app.add_handler(MessageHandler(
+        groups & filters.Regex(r"^[/#]?(حظر_الحزمة|block_pack)(?:@\S+)?(?:\s|$)"), block_pack_command,
+    ))
+    app.add_handler(MessageHandler(
+        groups & filters.Regex(r"^[/#]?(الغاء_حظر_الوسائط|unblock_media)(?:@\S+)?(?:\s|$)"), unblock_media_command,
+    ))
+    app.add_handler(MessageHandler(
+        groups & filters.Regex(r"^[/#]?(حظر_الصورة|block_image)(?:@\S+)?(?:\s|$)"), block_image_command,
+    ))
@@ -6,10 +6,16 @@ Deletes messages containing blocked media types in managed groups.
 import logging
 
 from telegram import Update, ChatMemberAdministrator, ChatMemberOwner
-from telegram.ext import Application, MessageHandler, ContextTypes, filters
+from telegram.ext import Application, ApplicationHandlerStop, MessageHandler, ContextTypes, filters
 
 from bot.services.group_service import is_managed_group, get_group_media_setting
 from bot.services.admin_service import is_admin
+from bot.services.deletion_service import delete_message
+from bot.services.raid_service import record as raid_record
+from bot.services.media_block_service import media_fingerprint, is_media_blocked
+from bot.services.image_hash_service import match_photo
+from bot.services.domain_service import check_links, is_telegram_host
+from bot.handlers.antispam.escalation import strike
 
 logger = logging.getLogger("vex.handlers.antispam.media_filter")
 
@@ -44,6 +50,27 @@ async def filter_media_messages(update: Update, context: ContextTypes.DEFAULT_TY
     if await is_admin(user.id) or await _is_group_admin(update, context):
         return
 
+    # Blocked file or sticker pack (in-memory sets, no download)
+    file_unique_id, set_name, _ = media_fingerprint(message)
+    if file_unique_id and await is_media_blocked(chat.id, file_unique_id, set_name):
+        await _delete_message(context, message, strike_sender=True)
+        return
+
+    # Re-encoded copies of known spam images (perceptual hash)
+    if message.photo:
+        hit = await match_photo(context.bot, message.photo)
+        if hit:
+            logger.info(f"[PHASH] Known spam image (distance {hit[0]}) from {user.id} in {chat.id}")
+            await _delete_message(context, message, strike_sender=True)
+            return
+
+    # Domain allow / deny lists (group and global)
+    link_verdict, hosts = await check_links(chat.id, message)
+    if link_verdict == "deny":
+        logger.info(f"[DOMAINS] Denied domain {hosts[0]} from {user.id} in {chat.id}")
+        await _delete_message(context, message, strike_sender=True)
+        return
+
     # Determine message media type
     media_type = None
     if message.photo:
@@ -78,34 +105,49 @@ async def filter_media_messages(update: Update, context: ContextTypes.DEFAULT_TY
         entities = message.entities or message.caption_entities
         for entity in entities:
             if entity.type in ("url", "text_link"):
-                if not await get_group_media_setting(chat.id, "link"):
-                    await _delete_message(message)
+                # Allow-listed domains pass; the rest follow the link settings
+                if link_verdict != "allow" and not await _links_allowed(chat.id, hosts):
+                    await _delete_message(context, message)
                     return
             elif entity.type == "phone_number":
                 if not await get_group_media_setting(chat.id, "mobile"):
-                    await _delete_message(message)
+                    await _delete_message(context, message)
                     return
             elif entity.type == "hashtag":
                 if not await get_group_media_setting(chat.id, "hashtag"):
-                    await _delete_message(message)
+                    await _delete_message(context, message)
                     return
             elif entity.type == "mention":
                 if not await get_group_media_setting(chat.id, "tag"):
-                    await _delete_message(message)
+                    await _delete_message(context, message)
                     return
 
     # Check media type filter
     if media_type and not await get_group_media_setting(chat.id, media_type):
-        await _delete_message(message)
+        await _delete_message(context, message)
         return
 
 
-async def _delete_message(message):
-    """Safely delete a message"""
-    try:
-        await message.delete()
-    except Exception as e:
-        logger.warning(f"Could not delete message: {e}")
+async def _links_allowed(chat_id: int, hosts: list) -> bool:
+    """Links to Telegram follow the telegram_link setting (which falls back to
+    link until an admin sets it), all others the link setting"""
+    kinds = {"telegram_link" if is_telegram_host(h) else "link" for h in hosts} or {"link"}
+    for kind in kinds:
+        if not await get_group_media_setting(chat_id, kind):
+            return False
+    return True
+
+
+async def _delete_message(context: ContextTypes.DEFAULT_TYPE, message, strike_sender: bool = False):
+    """Safely delete a message (coalesced with other deletions in the chat).
+    strike_sender counts known spam (not a disabled media type) on the ladder"""
+    if await delete_message(context.bot, message.chat_id, message.message_id):
+        await raid_record(context.bot, message.chat_id, "deletions")
+        if strike_sender and message.from_user:
+            await strike(context.bot, message.chat_id, message.from_user.id, message.from_user.first_name)
+        # Gone: the word filter and the AI layer have nothing left to check
+        raise ApplicationHandlerStop
+    logger.warning(f"Could not delete message {message.message_id}")
 
 
 def register_media_filter_handlers(app: Application):
@@ -7,6 +7,11 @@ import logging
 from telegram import Update
 from telegram.ext import Application, CallbackQueryHandler, ContextTypes
 
+from bot.services.deletion_service import delete_message
+from bot.services.alert_aggregator import get_group, resolve_alert, delete_all, keep_all
+from bot.services.reputation_service import note_keep
+from bot.services.recent_messages_service import purge_user, DEFAULT_PURGE_MINUTES
+
 logger = logging.getLogger("vex.handlers.antispam.moderation_callbacks")
 
 
@@ -28,14 +33,13 @@ async def handle_guard_delete(update: Update, context: ContextTypes.DEFAULT_TYPE
         await query.edit_message_text("⚠️ خطأ في رقم الرسالة.")
         return
 
+    # Later messages from this user/text start a fresh alert
+    resolve_alert(query.message.chat_id, query.message.message_id)
+
     # Attempt to delete the user's original message from the group
-    deleted = False
-    try:
-        await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-        deleted = True
+    deleted = await delete_message(context.bot, chat_id, message_id)
+    if deleted:
         logger.info(f"[GUARD-CB] Message {message_id} in {chat_id} deleted by admin {admin.id}")
-    except Exception as e:
-        logger.warning(f"[GUARD-CB] Could not delete message {message_id} in {chat_id}: {e}")
 
     # Update the alert message in the admin group
     if deleted:
@@ -71,6 +75,22 @@ async def handle_guard_keep(update: Update, context: ContextTypes.DEFAULT_TYPE):
     admin_name = admin.full_name or admin.username or str(admin.id)
 
     logger.info(f"[GUARD-CB] Message kept by admin {admin.id}")
+    group = resolve_alert(query.message.chat_id, query.message.message_id)
+
+    # A kept alert outweighs one violation of the member who posted it.
+    # Callback data: guard_keep:{chat_id}:{message_id}:{user_id}; alerts sent
+    # before the user ID was added are matched against the alert group
+    try:
+        parts = [int(p) for p in query.data.split(":")[1:]]
+    except (ValueError, AttributeError):
+        parts = []
+    if len(parts) == 3:
+        await note_keep(parts[0], parts[2])
+    elif len(parts) == 2 and group:
+        for item in group.items:
+            if (item.chat_id, item.message_id) == tuple(parts):
+                await note_keep(item.chat_id, item.user_id)
+                break
 
     # Update the alert message to reflect the decision
     try:
@@ -82,7 +102,76 @@ async def handle_guard_keep(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.warning(f"[GUARD-CB] Could not edit alert message: {e}")
 
 
+async def handle_guard_purge(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin pressed 'Delete recent messages' for the alerted member."""
+    query = update.callback_query
+
+    # Parse callback data: guard_purge:{chat_id}:{user_id}
+    try:
+        _, chat_id_str, user_id_str = query.data.split(":")
+        chat_id, user_id = int(chat_id_str), int(user_id_str)
+    except (ValueError, AttributeError) as e:
+        logger.error(f"[GUARD-CB] Failed to parse callback data '{query.data}': {e}")
+        await query.answer("⚠️ خطأ في بيانات التنبيه", show_alert=True)
+        return
+
+    deleted, found = await purge_user(context.bot, chat_id, user_id, DEFAULT_PURGE_MINUTES)
+    await query.answer(f"🧹 حُذفت {deleted} من {found} رسالة خلال آخر {DEFAULT_PURGE_MINUTES} دقيقة", show_alert=True)
+
+    admin = update.effective_user
+    admin_name = admin.full_name or admin.username or str(admin.id)
+    logger.info(f"[GUARD-CB] Admin {admin.id} purged {deleted}/{found} messages of {user_id} in {chat_id}")
+    if deleted:
+        try:
+            await query.edit_message_text(
+                text=f"{query.message.text}\n\n🧹 **حُذفت {deleted} رسالة للعضو** بواسطة [{admin_name}](tg://user?id={admin.id})",
+                parse_mode="Markdown",
+                reply_markup=query.message.reply_markup,
+            )
+        except Exception as e:
+            logger.warning(f"[GUARD-CB] Could not edit alert message: {e}")
+
+
+async def _aggregated_group(update: Update):
+    """Resolve the alert group behind a guard_*_all button, or None if expired."""
+    query = update.callback_query
+    try:
+        group = get_group(int(query.data.split(":")[1]))
+    except (ValueError, IndexError, AttributeError):
+        group = None
+    if group is None or group.resolved:
+        await query.answer("انتهت صلاحية هذا التنبيه", show_alert=True)
+        return None
+    await query.answer()
+    return group
+
+
+async def handle_guard_delete_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin pressed 'Delete all' on an aggregated alert."""
+    group = await _aggregated_group(update)
+    if group is None:
+        return
+    admin = update.effective_user
+    admin_name = admin.full_name or admin.username or str(admin.id)
+    await delete_all(context.bot, group, admin_name, admin.id)
+
+
+async def handle_guard_keep_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin pressed 'Keep all' on an aggregated alert."""
+    group = await _aggregated_group(update)
+    if group is None:
+        return
+    admin = update.effective_user
+    admin_name = admin.full_name or admin.username or str(admin.id)
+    for item in group.pending:
+        await note_keep(item.chat_id, item.user_id)
+    await keep_all(context.bot, group, admin_name, admin.id)
+
+
 def register_moderation_callback_handlers(app: Application):
     """Register Layer 4 callback handlers."""
     app.add_handler(CallbackQueryHandler(handle_guard_delete, pattern=r"^guard_delete:"))
     app.add_handler(CallbackQueryHandler(handle_guard_keep, pattern=r"^guard_keep:"))
+    app.add_handler(CallbackQueryHandler(handle_guard_delete_all, pattern=r"^guard_delete_all:"))
+    app.add_handler(CallbackQueryHandler(handle_guard_keep_all, pattern=r"^guard_keep_all:"))
+    app.add_handler(CallbackQueryHandler(handle_guard_purge, pattern=r"^guard_purge:"))
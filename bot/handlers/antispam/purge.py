@@ -0,0 +1,78 @@
+"""
+Vex - Purge Handler
+Remembers the IDs of recent group messages and deletes a member's recent
+messages on request. Reply to one of their messages:
+  #تنظيف / /purge [minutes]       their messages from the last N minutes
+                                  (default 60, group admins only)
+"""
+import logging
+
+from telegram import Update, ChatMemberAdministrator, ChatMemberOwner
+from telegram.ext import Application, MessageHandler, ContextTypes, filters
+
+from bot.services.group_service import is_managed_group
+from bot.services.admin_service import is_admin
+from bot.services.deletion_service import delete_message
+from bot.services.recent_messages_service import record, purge_user, DEFAULT_PURGE_MINUTES
+
+logger = logging.getLogger("vex.handlers.antispam.purge")
+
+
+async def recent_messages_monitor(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Remember every member message of a managed group (IDs only, in memory)"""
+    message = update.effective_message
+    chat = update.effective_chat
+    user = update.effective_user
+    if not message or not chat or not user or message.sender_chat:
+        return
+    if await is_managed_group(chat.id):
+        record(chat.id, message.message_id, user.id)
+
+
+async def _can_purge(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    user = update.effective_user
+    if await is_admin(user.id):
+        return True
+    try:
+        member = await context.bot.get_chat_member(update.effective_chat.id, user.id)
+        return isinstance(member, (ChatMemberAdministrator, ChatMemberOwner))
+    except Exception:
+        return False
+
+
+async def purge_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Delete the replied member's recent messages"""
+    message = update.effective_message
+    chat = update.effective_chat
+    if not await is_managed_group(chat.id) or not await _can_purge(update, context):
+        return
+
+    target = message.reply_to_message.from_user
+    if not target or target.is_bot:
+        await message.reply_text("⚠️ يجب الرد على رسالة من عضو")
+        return
+
+    args = (message.text or "").split()[1:]
+    try:
+        minutes = int(args[0]) if args else DEFAULT_PURGE_MINUTES
+    except ValueError:
+        await message.reply_text("⚠️ المدة يجب أن تكون عدداً من الدقائق")
+        return
+
+    deleted, found = await purge_user(context.bot, chat.id, target.id, minutes)
+    # The replied message may be older than the ring remembers
+    await delete_message(context.bot, chat.id, message.reply_to_message.message_id)
+    await delete_message(context.bot, chat.id, message.message_id)
+    logger.info(f"[PURGE] {update.effective_user.id} purged {target.id} in {chat.id}: {deleted}/{found}")
+
+
+def register_purge_handlers(app: Application):
+    """Register the recent-message monitor and the purge command"""
+    app.add_handler(
+        MessageHandler(filters.ChatType.GROUPS & ~filters.StatusUpdate.ALL, recent_messages_monitor),
+        group=-3,  # Before the raid monitor and the flood guard, which may stop the update
+    )
+    app.add_handler(MessageHandler(
+        filters.ChatType.GROUPS & filters.REPLY & filters.Regex(r"^[/#]?(تنظيف|purge)(?:@\S+)?(?:\s|$)"),
+        purge_command,
+    ))
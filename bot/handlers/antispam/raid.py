@@ -0,0 +1,92 @@
+"""
+Vex - Raid Handler
+Feeds joins and messages of managed groups into the raid counters and
+locks the group when a raid is detected
+"""
+import logging
+from datetime import datetime, timedelta
+
+from telegram import Update
+from telegram.ext import Application, MessageHandler, ContextTypes, filters
+
+from bot.services.group_service import is_managed_group
+from bot.services.admin_service import get_admin_group_id
+from bot.services.raid_service import record, end_raid_mode, set_lockdown_handler
+from bot.handlers.antispam.lock import scheduler, close_group, open_group
+from bot.core.rate_limiter import Lane
+
+logger = logging.getLogger("vex.handlers.antispam.raid")
+
+TRIGGER_LABELS = {
+    "joins": "انضمام عدد كبير من الأعضاء",
+    "messages": "سيل من الرسائل",
+    "deletions": "حذف عدد كبير من الرسائل المخالفة",
+}
+
+
+async def raid_monitor(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Count every join / message in a managed group (in memory only)"""
+    message = update.effective_message
+    chat = update.effective_chat
+    if not message or not chat:
+        return
+
+    if not await is_managed_group(chat.id):
+        return
+
+    if message.new_chat_members:
+        joined = sum(1 for m in message.new_chat_members if not m.is_bot)
+        await record(context.bot, chat.id, "joins", joined)
+    elif not message.left_chat_member:
+        await record(context.bot, chat.id, "messages")
+
+
+async def lockdown(bot, chat_id: int, policy: dict, trigger: str) -> None:
+    """Raid detected: close the group for the cooldown (action "lock") and
+    tell the admin group. With action "strict" only moderation tightens."""
+    minutes = policy["cooldown_minutes"]
+    reason = TRIGGER_LABELS.get(trigger, trigger)
+
+    if policy["action"] == "lock":
+        await close_group(
+            bot, chat_id,
+            f"🚨 **تم قفل المجموعة تلقائياً**\nالسبب: {reason}\nسيتم فتحها بعد {minutes} دقيقة.",
+        )
+    scheduler.add_job(
+        end_lockdown, 'date',
+        run_date=datetime.now(scheduler.timezone) + timedelta(minutes=minutes),
+        args=[bot, chat_id, policy["action"] == "lock"],
+        id=f"raid_unlock_{chat_id}",
+        replace_existing=True,
+    )
+
+    admin_group_id = await get_admin_group_id()
+    if admin_group_id:
+        action = "قفل المجموعة" if policy["action"] == "lock" else "وضع الإشراف الصارم"
+        try:
+            await bot.send_message(
+                admin_group_id,
+                f"🚨 **رصد هجوم** في المجموعة `{chat_id}`\n"
+                f"السبب: {reason}\nالإجراء: {action} لمدة {minutes} دقيقة",
+                parse_mode="Markdown",
+                rate_limit_args=Lane.ALERT,
+            )
+        except Exception as e:
+            logger.warning(f"[RAID] Could not notify admin group: {e}")
+
+
+async def end_lockdown(bot, chat_id: int, reopen: bool) -> None:
+    """Cooldown over: restore permissions and normal moderation"""
+    end_raid_mode(chat_id)
+    if reopen:
+        await open_group(bot, chat_id, "✅ **تم فتح المجموعة** بعد انتهاء الحماية من الهجوم.")
+    logger.info(f"[RAID] Raid mode ended in {chat_id}")
+
+
+def register_raid_handlers(app: Application):
+    """Register the raid monitor"""
+    set_lockdown_handler(lockdown)
+    app.add_handler(
+        MessageHandler(filters.ChatType.GROUPS, raid_monitor),
+        group=-2,  # Counts before any other handler (even the flood guard) can stop the update
+    )
@@ -12,8 +12,10 @@ from telegram.ext import (
 
 from bot.services.group_service import (
     is_managed_group, get_welcome_config, update_welcome_message,
-    toggle_welcome, get_managed_group,
+    toggle_welcome, toggle_welcome_delete_last, get_managed_group,
 )
+from bot.services.reputation_service import note_join
+from bot.services.welcome_service import queue_welcome
 
 logger = logging.getLogger("vex.handlers.antispam.welcome")
 
@@ -31,34 +33,14 @@ async def welcome_new_members(update: Update, context: ContextTypes.DEFAULT_TYPE
     if not await is_managed_group(chat.id):
         return
 
-    config = await get_welcome_config(chat.id)
-    if not config or not config.is_active or not config.message:
-        return
-
-    for member in message.new_chat_members:
-        if member.is_bot:
-            continue
-
-        # Replace placeholders
-        welcome_text = config.message.replace(
-            "{name}", member.first_name or ""
-        ).replace(
-            "{username}", f"@{member.username}" if member.username else member.first_name or ""
-        ).replace(
-            "{group}", chat.title or ""
-        )
-
-        try:
-            sent = await chat.send_message(welcome_text, parse_mode="Markdown")
+    members = [m for m in message.new_chat_members if not m.is_bot]
+    # Newcomers get full AI coverage regardless of load
+    for member in members:
+        await note_join(chat.id, member.id)
 
-            # Delete previous welcome message if configured
-            if config.delete_last_message and config.last_message_id:
-                try:
-                    await context.bot.delete_message(chat.id, config.last_message_id)
-                except Exception:
-                    pass
-        except Exception as e:
-            logger.warning(f"Error sending welcome: {e}")
+    if members:
+        # One welcome per join wave, sent once the chat's window closes
+        await queue_welcome(context.bot, chat.id, chat.title or "", members)
 
 
 async def welcome_settings_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -74,6 +56,7 @@ async def welcome_settings_callback(update: Update, context: ContextTypes.DEFAUL
         return
 
     status = "✅" if config and config.is_active else "❌"
+    delete_last = "✅" if config and config.delete_last_message else "❌"
 
     keyboard = InlineKeyboardMarkup([
         [
@@ -84,6 +67,10 @@ async def welcome_settings_callback(update: Update, context: ContextTypes.DEFAUL
             f"♻️ حالة الترحيب : {status}",
             callback_data=f"toggle_welcome#{group_id}",
         )],
+        [InlineKeyboardButton(
+            f"🗑 حذف الترحيب السابق : {delete_last}",
+            callback_data=f"toggle_welcome_delete#{group_id}",
+        )],
         [InlineKeyboardButton("🔙 رجوع", callback_data=f"group_settings#{group_id}")],
     ])
 
@@ -125,6 +112,17 @@ async def toggle_welcome_callback(update: Update, context: ContextTypes.DEFAULT_
     await welcome_settings_callback(update, context)
 
 
+async def toggle_welcome_delete_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Toggle deleting the previous welcome message"""
+    query = update.callback_query
+    await query.answer()
+
+    group_id = int(query.data.split("#")[1])
+    await toggle_welcome_delete_last(group_id)
+
+    await welcome_settings_callback(update, context)
+
+
 async def edit_welcome_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Start editing welcome message"""
     query = update.callback_query
@@ -170,6 +168,7 @@ def register_welcome_handlers(app: Application):
     app.add_handler(CallbackQueryHandler(welcome_settings_callback, pattern=r"^welcome_settings#"))
     app.add_handler(CallbackQueryHandler(show_welcome_callback, pattern=r"^show_welcome#"))
     app.add_handler(CallbackQueryHandler(toggle_welcome_callback, pattern=r"^toggle_welcome#"))
+    app.add_handler(CallbackQueryHandler(toggle_welcome_delete_callback, pattern=r"^toggle_welcome_delete#"))
 
     # Conversation for editing welcome
     conv_handler = ConversationHandler(
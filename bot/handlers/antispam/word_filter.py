@@ -5,10 +5,14 @@ Checks messages for blocked words and deletes them
 import logging
 
 from telegram import Update, ChatMemberAdministrator, ChatMemberOwner
-from telegram.ext import Application, MessageHandler, ContextTypes, filters
+from telegram.ext import Application, ApplicationHandlerStop, MessageHandler, ContextTypes, filters
 
 from bot.services.group_service import is_managed_group, check_blocked_word
 from bot.services.admin_service import is_admin
+from bot.services.deletion_service import delete_message
+from bot.services.raid_service import record as raid_record
+from bot.services.reputation_service import note_violation
+from bot.handlers.antispam.escalation import strike
 
 logger = logging.getLogger("vex.handlers.antispam.word_filter")
 
@@ -44,10 +48,14 @@ async def filter_blocked_words(update: Update, context: ContextTypes.DEFAULT_TYP
 
     # Check against blocked words
     if await check_blocked_word(chat.id, text):
-        try:
-            await message.delete()
-        except Exception as e:
-            logger.warning(f"Could not delete blocked word message: {e}")
+        if await delete_message(context.bot, chat.id, message.message_id):
+            await raid_record(context.bot, chat.id, "deletions")
+            await note_violation(chat.id, user.id)
+            await strike(context.bot, chat.id, user.id, user.first_name)
+            # Gone: the content guard would only count the same strike again
+            raise ApplicationHandlerStop
+        else:
+            logger.warning("Could not delete blocked word message")
 
 
 def register_word_filter_handlers(app: Application):
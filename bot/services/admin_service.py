@@ -88,6 +88,13 @@ async def list_admins() -> str:
         return "📜 **مشرفين البوت :**\n\n" + "\n".join(lines)
 
 
+async def list_admin_ids() -> set[int]:
+    """Telegram IDs of all bot admins"""
+    async with get_db() as session:
+        result = await session.execute(select(Admin.telegram_id))
+        return set(result.scalars().all())
+
+
 async def get_admin_group_id() -> Optional[int]:
     """Get the admin group telegram ID"""
     async with get_db() as session:
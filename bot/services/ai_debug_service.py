@@ -0,0 +1,252 @@
+"""
+Vex - AI Debug Channel
+Delivers Layer-3 verdicts to the debug channel in one of two modes:
+
+  - digest:  records are buffered and posted as one summary every N seconds
+             (or as soon as the buffer is full) — score histogram, top-scoring
+             messages and action counts per group
+  - message: one post per analysis, for troubleshooting; posts wait in a
+             queue of at most MESSAGE_QUEUE_MAX, and analyses beyond it go
+             into the digest instead
+
+Analyses that led to no action are sampled (alerts and deletions always
+count). Posts are sent from background tasks through the DEBUG outbound
+lane, so they never hold up a handler or delay moderation traffic.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from telegram import Bot
+
+from bot.core.invalidation import on_invalidate
+from bot.core.config import get_ai_debug_channel_id, get_ai_debug_settings
+from bot.core.rate_limiter import Lane
+from bot.services.group_service import list_managed_groups
+
+logger = logging.getLogger("vex.services.ai_debug")
+
+# Buffered records beyond this trigger an immediate digest
+DIGEST_MAX_RECORDS = 500
+DIGEST_TOP_MESSAGES = 5
+DIGEST_MAX_GROUPS = 10
+# Per-message posts waiting for the DEBUG lane (its channel gets ~20/min)
+MESSAGE_QUEUE_MAX = 50
+_TELEGRAM_TEXT_LIMIT = 4000
+
+ACTION_LABELS = {
+    "delete": "🗑️ حذف تلقائي",
+    "alert": "🚨 تنبيه أرسل للمشرفين",
+    "none": "✅ لم يتخذ إجراء",
+}
+
+
+@dataclass
+class _Digest:
+    started_at: float = field(default_factory=time.time)
+    total: int = 0
+    deferred: int = 0
+    histogram: list[int] = field(default_factory=lambda: [0] * 10)
+    per_group: dict[int, Counter] = field(default_factory=dict)
+    # Min-heap of (score, seq, chat_id, text) holding the top-scoring messages
+    top: list[tuple] = field(default_factory=list)
+
+
+_digest = _Digest()
+_seq = itertools.count()
+# (channel, settings); kept until a "config" event
+_settings: Optional[tuple[Optional[int], dict]] = None
+_flush_lock = asyncio.Lock()
+_flush_tasks: set[asyncio.Task] = set()
+_outbox: deque[tuple[int, str]] = deque()        # (channel, text) in message mode
+_drain_task: Optional[asyncio.Task] = None
+_posted = 0
+
+
+def invalidate_debug_cache() -> None:
+    """Forget the cached channel / delivery settings."""
+    global _settings
+    _settings = None
+
+
+on_invalidate("config", lambda _key: invalidate_debug_cache())
+
+
+async def _load_settings() -> tuple[Optional[int], dict]:
+    global _settings
+    if _settings is None:
+        _settings = (await get_ai_debug_channel_id(), await get_ai_debug_settings())
+    return _settings
+
+
+def _md(text: str) -> str:
+    """Escape user text for legacy Markdown."""
+    for ch in ("\\", "_", "*", "`", "["):
+        text = text.replace(ch, "\\" + ch)
+    return text
+
+
+# ─── Recording ────────────────────────────────────────────────────────────────
+
+async def record_verdict(
+    bot: Bot,
+    chat_id: int,
+    text: str,
+    score: float,
+    action: str,
+    alert_threshold: float,
+    auto_delete_threshold: float,
+    deferred: bool = False,
+) -> None:
+    """Report one AI verdict (action: delete | alert | none) to the debug channel."""
+    channel, settings = await _load_settings()
+    if not channel:
+        return
+    if action == "none" and random.random() >= settings["sample_rate"]:
+        return
+
+    if settings["mode"] == "message" and len(_outbox) < MESSAGE_QUEUE_MAX:
+        _outbox.append((channel, _format_message(
+            chat_id, text, score, action, alert_threshold, auto_delete_threshold, deferred,
+        )))
+        _start_drain(bot)
+        return
+
+    _digest.total += 1
+    _digest.deferred += deferred
+    _digest.histogram[min(9, int(score * 10))] += 1
+    _digest.per_group.setdefault(chat_id, Counter())[action] += 1
+    entry = (score, next(_seq), chat_id, text[:120])
+    if len(_digest.top) < DIGEST_TOP_MESSAGES:
+        heapq.heappush(_digest.top, entry)
+    elif score > _digest.top[0][0]:
+        heapq.heapreplace(_digest.top, entry)
+
+    if _digest.total >= DIGEST_MAX_RECORDS and not _flush_lock.locked():
+        task = asyncio.create_task(flush_digest(bot))
+        _flush_tasks.add(task)
+        task.add_done_callback(_flush_tasks.discard)
+
+
+def _start_drain(bot: Bot) -> None:
+    global _drain_task
+    if _drain_task is None or _drain_task.done():
+        _drain_task = asyncio.create_task(_drain_outbox(bot))
+
+
+async def _drain_outbox(bot: Bot) -> None:
+    while _outbox:
+        channel, text = _outbox.popleft()
+        await _send(bot, channel, text)
+
+
+def _format_message(
+    chat_id: int, text: str, score: float, action: str,
+    alert_threshold: float, auto_delete_threshold: float, deferred: bool,
+) -> str:
+    bar = int(score * 10)
+    bar_filled = '█' * bar + '░' * (10 - bar)
+    action_label = ACTION_LABELS[action] + (" (تحليل متأخر)" if deferred else "")
+    return (
+        f"🔬 *AI Debug Log*\n"
+        f"────────────────────\n"
+        f"💬 *الرسالة:* `{text[:300].replace('`', chr(39))}`\n"
+        f"📊 *النتيجة:* `{score:.2f}` / 1.0\n"
+        f"[{bar_filled}] {score*100:.0f}%\n"
+        f"⚡ *تنبيه من:* `{alert_threshold:.0%}` | *حذف من:* `{auto_delete_threshold:.0%}`\n"
+        f"📍 *المجموعة:* `{chat_id}`\n"
+        f"🛡 *الإجراء:* {action_label}"
+    )
+
+
+# ─── Digest ───────────────────────────────────────────────────────────────────
+
+async def flush_digest(bot: Bot, force: bool = True) -> bool:
+    """Post the buffered digest. With force=False only once the configured
+    interval has passed. Returns True if a digest was posted."""
+    global _digest
+    async with _flush_lock:
+        channel, settings = await _load_settings()
+        if not _digest.total:
+            _digest.started_at = time.time()
+            return False
+        if not force and time.time() - _digest.started_at < settings["digest_interval"]:
+            return False
+        digest, _digest = _digest, _Digest()
+        if not channel:
+            return False
+        titles = {g.telegram_group_id: g.group_name for g in await list_managed_groups()}
+        return await _send(bot, channel, _format_digest(digest, settings, titles))
+
+
+def _format_digest(digest: _Digest, settings: dict, titles: dict[int, str]) -> str:
+    minutes = max(1, round((time.time() - digest.started_at) / 60))
+    actions = Counter()
+    for counts in digest.per_group.values():
+        actions.update(counts)
+
+    lines = [
+        "🔬 *AI Debug Digest*",
+        "────────────────────",
+        f"⏱ آخر {minutes} دقيقة · {digest.total} تحليل"
+        + (f" · {digest.deferred} متأخر" if digest.deferred else ""),
+        f"🗑️ {actions['delete']} · 🚨 {actions['alert']} · ✅ {actions['none']}",
+    ]
+    if settings["sample_rate"] < 1:
+        lines.append(f"🎯 عينة الرسائل بدون إجراء: {settings['sample_rate']:.0%}")
+
+    lines += ["", "📊 *توزيع النتائج*"]
+    peak = max(digest.histogram) or 1
+    for i, count in enumerate(digest.histogram):
+        bar = '█' * round(count / peak * 12)
+        lines.append(f"`{i / 10:.1f}–{(i + 1) / 10:.1f}` {bar} {count}")
+
+    lines += ["", "🔝 *أعلى الرسائل*"]
+    for score, _, chat_id, text in sorted(digest.top, reverse=True):
+        title = _md((titles.get(chat_id) or str(chat_id))[:40])
+        lines.append(f"`{score:.2f}` · {title} — {_md(text)}")
+
+    lines += ["", "📍 *حسب المجموعة*"]
+    groups = sorted(digest.per_group.items(), key=lambda kv: sum(kv[1].values()), reverse=True)
+    for chat_id, counts in groups[:DIGEST_MAX_GROUPS]:
+        title = _md((titles.get(chat_id) or str(chat_id))[:40])
+        lines.append(
+            f"• {title}: {sum(counts.values())} · 🗑️ {counts['delete']} · 🚨 {counts['alert']}"
+        )
+    if len(groups) > DIGEST_MAX_GROUPS:
+        lines.append(f"… و{len(groups) - DIGEST_MAX_GROUPS} مجموعات أخرى")
+
+    text = "\n".join(lines)
+    return text if len(text) <= _TELEGRAM_TEXT_LIMIT else text[:_TELEGRAM_TEXT_LIMIT] + "…"
+
+
+async def _send(bot: Bot, channel: int, text: str) -> bool:
+    global _posted
+    try:
+        await bot.send_message(
+            chat_id=channel,
+            text=text,
+            parse_mode="Markdown",
+            rate_limit_args=Lane.DEBUG,
+        )
+        _posted += 1
+        return True
+    except Exception as e:
+        logger.warning(f"[GUARD-DEBUG] Failed to send debug message: {e}")
+        return False
+
+
+async def debug_digest_job(context) -> None:
+    """Periodic job: post the digest once the configured interval has passed."""
+    await flush_digest(context.bot, force=False)
+
+
+def get_debug_runtime() -> dict:
+    """Buffered digest records, queued posts and posts since start-up."""
+    return {"buffered": _digest.total, "queued": len(_outbox), "posted": _posted}
@@ -0,0 +1,376 @@
+"""
+Vex - AI Evaluation Service
+Runs a labeled corpus against selected cascade models and a chosen rule
+set, in the background, so prompt / model changes can be measured before
+they go live.
+
+Jobs live in memory (the last few are kept for the dashboard). Each job
+reports, per model: accuracy / precision / recall at the current alert
+threshold, false auto-deletes, latency percentiles and estimated tokens.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional, List
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from db.database import get_db
+from db.models import AIEvalCorpus, AIProvider
+from bot.core.config import get_ai_prompt_override, get_ai_thresholds
+from bot.services.ai_service import (
+    score_with_provider, build_provider_prompt, prompt_version, estimate_tokens,
+)
+
+logger = logging.getLogger("vex.services.ai_eval")
+
+MAX_CORPUS_ITEMS = 5000
+MAX_KEPT_JOBS = 10
+DEFAULT_ENDPOINT_CONCURRENCY = 4
+
+# Accepted spellings for labels in uploaded corpora
+_POSITIVE_LABELS = {"1", "true", "abusive", "abuse", "bad", "spam", "مسيء", "مسيئة"}
+_NEGATIVE_LABELS = {"0", "false", "ok", "normal", "clean", "good", "عادي", "عادية", "سليم"}
+
+
+# ─── Corpus Parsing & CRUD ────────────────────────────────────────────────────
+
+def _parse_label(raw) -> Optional[int]:
+    if isinstance(raw, bool):
+        return int(raw)
+    if isinstance(raw, (int, float)):
+        return 1 if raw >= 0.5 else 0
+    value = str(raw).strip().lower()
+    if value in _POSITIVE_LABELS:
+        return 1
+    if value in _NEGATIVE_LABELS:
+        return 0
+    return None
+
+
+def parse_corpus(raw: str) -> List[dict]:
+    """Parse an uploaded corpus.
+
+    Accepts a JSON array, JSON lines ({"text": ..., "label": ...}) or plain
+    lines "label<TAB>text" / "label,text". Invalid lines are skipped.
+    """
+    raw = (raw or "").strip()
+    rows: list = []
+    if raw.startswith("["):
+        rows = json.loads(raw)
+    else:
+        for line in raw.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    continue
+                continue
+            sep = "\t" if "\t" in line else ","
+            label, _, text = line.partition(sep)
+            rows.append({"label": label, "text": text})
+
+    items = []
+    for row in rows:
+        if not isinstance(row, dict):
+            continue
+        text = str(row.get("text") or "").strip()
+        label = _parse_label(row.get("label"))
+        if text and label is not None:
+            items.append({"text": text, "label": label})
+        if len(items) >= MAX_CORPUS_ITEMS:
+            break
+    return items
+
+
+async def add_corpus(name: str, items: List[dict]) -> AIEvalCorpus:
+    async with get_db() as session:
+        corpus = AIEvalCorpus(name=name, items=items)
+        session.add(corpus)
+        await session.flush()
+        await session.refresh(corpus)
+        return corpus
+
+
+async def list_corpora() -> List[AIEvalCorpus]:
+    async with get_db() as session:
+        result = await session.execute(
+            select(AIEvalCorpus).order_by(AIEvalCorpus.created_at.desc())
+        )
+        return list(result.scalars().all())
+
+
+async def get_corpus(corpus_id: int) -> Optional[AIEvalCorpus]:
+    async with get_db() as session:
+        result = await session.execute(
+            select(AIEvalCorpus).where(AIEvalCorpus.id == corpus_id)
+        )
+        return result.scalar_one_or_none()
+
+
+async def delete_corpus(corpus_id: int) -> bool:
+    async with get_db() as session:
+        result = await session.execute(
+            select(AIEvalCorpus).where(AIEvalCorpus.id == corpus_id)
+        )
+        corpus = result.scalar_one_or_none()
+        if corpus:
+            await session.delete(corpus)
+            return True
+        return False
+
+
+# ─── Job State ────────────────────────────────────────────────────────────────
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+@dataclass
+class ModelResult:
+    """Running tallies for one model in one job."""
+    provider_id: int
+    name: str
+    model: str
+    done: int = 0
+    errors: int = 0
+    tp: int = 0
+    fp: int = 0
+    tn: int = 0
+    fn: int = 0
+    false_deletes: int = 0   # normal messages at/above the auto-delete threshold
+    tokens: int = 0
+    latencies_ms: list = field(default_factory=list)
+    last_error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        scored = self.tp + self.fp + self.tn + self.fn
+        return {
+            "provider_id": self.provider_id,
+            "name": self.name,
+            "model": self.model,
+            "done": self.done,
+            "errors": self.errors,
+            "accuracy": round((self.tp + self.tn) / scored, 4) if scored else None,
+            "precision": round(self.tp / (self.tp + self.fp), 4) if self.tp + self.fp else None,
+            "recall": round(self.tp / (self.tp + self.fn), 4) if self.tp + self.fn else None,
+            "false_deletes": self.false_deletes,
+            "latency_p50_ms": round(_percentile(self.latencies_ms, 50), 1),
+            "latency_p95_ms": round(_percentile(self.latencies_ms, 95), 1),
+            "est_tokens": self.tokens,
+            "est_tokens_per_msg": round(self.tokens / self.done, 1) if self.done else 0,
+            "last_error": self.last_error,
+        }
+
+
+@dataclass
+class EvalJob:
+    id: str
+    corpus_id: int
+    corpus_name: str
+    total: int
+    prompt_version: str
+    alert_threshold: float
+    auto_delete_threshold: float
+    results: dict = field(default_factory=dict)   # provider_id → ModelResult
+    status: str = "running"                        # running | done | cancelled | failed
+    error: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    task: Optional[asyncio.Task] = None
+    # Bumped on every progress change; SSE streams wait on it
+    version: int = 0
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def touch(self) -> None:
+        self.version += 1
+        self.changed.set()
+
+    def snapshot(self) -> dict:
+        return {
+            "id": self.id,
+            "corpus_id": self.corpus_id,
+            "corpus_name": self.corpus_name,
+            "total": self.total,
+            "prompt_version": self.prompt_version,
+            "alert_threshold": self.alert_threshold,
+            "auto_delete_threshold": self.auto_delete_threshold,
+            "status": self.status,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "models": [r.to_dict() for r in self.results.values()],
+        }
+
+
+_jobs: dict[str, EvalJob] = {}
+
+
+def get_job(job_id: str) -> Optional[EvalJob]:
+    return _jobs.get(job_id)
+
+
+def list_jobs() -> List[dict]:
+    return [job.snapshot() for job in sorted(_jobs.values(), key=lambda j: j.started_at, reverse=True)]
+
+
+def cancel_job(job_id: str) -> bool:
+    job = _jobs.get(job_id)
+    if not job or job.status != "running" or not job.task:
+        return False
+    job.task.cancel()
+    return True
+
+
+def _prune_jobs() -> None:
+    finished = sorted(
+        (j for j in _jobs.values() if j.status != "running"),
+        key=lambda j: j.started_at,
+    )
+    while len(_jobs) > MAX_KEPT_JOBS and finished:
+        _jobs.pop(finished.pop(0).id, None)
+
+
+# ─── Job Runner ───────────────────────────────────────────────────────────────
+
+async def start_eval_job(
+    corpus_id: int,
+    provider_ids: List[int],
+    prompt_source: str = "current",
+    draft_rules: Optional[str] = None,
+    endpoint_concurrency: int = DEFAULT_ENDPOINT_CONCURRENCY,
+) -> Optional[EvalJob]:
+    """Start a background evaluation. prompt_source: current | default | draft.
+
+    Returns None if the corpus or every selected model is missing.
+    """
+    corpus = await get_corpus(corpus_id)
+    if not corpus or not corpus.items:
+        return None
+
+    async with get_db() as session:
+        result = await session.execute(
+            select(AIProvider)
+            .options(selectinload(AIProvider.endpoint))
+            .where(AIProvider.id.in_(provider_ids))
+            .order_by(AIProvider.priority)
+        )
+        providers = list(result.scalars().all())
+    if not providers:
+        return None
+
+    if prompt_source == "draft":
+        rules = (draft_rules or "").strip() or None
+    elif prompt_source == "default":
+        rules = None
+    else:
+        rules = await get_ai_prompt_override()
+    alert_thr, auto_del_thr = await get_ai_thresholds()
+
+    job = EvalJob(
+        id=uuid.uuid4().hex[:12],
+        corpus_id=corpus.id,
+        corpus_name=corpus.name,
+        total=len(corpus.items),
+        prompt_version=prompt_version(rules),
+        alert_threshold=alert_thr,
+        auto_delete_threshold=auto_del_thr,
+    )
+    for p in providers:
+        job.results[p.id] = ModelResult(provider_id=p.id, name=p.name, model=p.model)
+
+    _jobs[job.id] = job
+    _prune_jobs()
+    job.task = asyncio.create_task(
+        _run_job(job, providers, list(corpus.items), rules, max(1, endpoint_concurrency))
+    )
+    logger.info(
+        f"[EVAL] Job {job.id} started: corpus={corpus.id} items={job.total} "
+        f"models={[p.id for p in providers]} prompt={job.prompt_version}"
+    )
+    return job
+
+
+async def _run_job(job: EvalJob, providers: List[AIProvider], items: List[dict], rules, cap: int):
+    # One queue per endpoint, drained by `cap` workers: models sharing a
+    # connection share its cap, and only that many calls exist at a time
+    queues: dict[str, asyncio.Queue] = {}
+    for item in items:
+        for p in providers:
+            key = p.endpoint_id or f"legacy:{p.id}"
+            queues.setdefault(key, asyncio.Queue()).put_nowait((p, item))
+
+    async def score_one(provider: AIProvider, item: dict):
+        res: ModelResult = job.results[provider.id]
+        start = time.perf_counter()
+        try:
+            score, raw = await score_with_provider(provider, item["text"], rules)
+        except Exception as e:
+            res.errors += 1
+            res.last_error = str(e)[:300]
+            score = None
+            raw = ""
+        elapsed = (time.perf_counter() - start) * 1000
+
+        res.done += 1
+        if score is not None:
+            res.latencies_ms.append(elapsed)
+            prompt = build_provider_prompt(provider.provider_type, rules, item["text"])
+            res.tokens += estimate_tokens(prompt) + estimate_tokens(raw)
+            flagged = score >= job.alert_threshold
+            if item["label"]:
+                res.tp += flagged
+                res.fn += not flagged
+            else:
+                res.fp += flagged
+                res.tn += not flagged
+                res.false_deletes += score >= job.auto_delete_threshold
+        job.touch()
+
+    async def worker(queue: asyncio.Queue):
+        while not queue.empty():
+            await score_one(*queue.get_nowait())
+
+    try:
+        await asyncio.gather(*(worker(q) for q in queues.values() for _ in range(min(cap, q.qsize()))))
+        job.status = "done"
+    except asyncio.CancelledError:
+        job.status = "cancelled"
+    except Exception as e:
+        logger.error(f"[EVAL] Job {job.id} failed: {e}")
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        job.finished_at = time.time()
+        job.touch()
+        logger.info(f"[EVAL] Job {job.id} finished with status={job.status}")
+
+
+async def stream_job(job: EvalJob, min_interval: float = 0.5, keepalive: float = 15.0):
+    """Yield job snapshots as they change (at most every min_interval seconds),
+    ending with the final snapshot once the job stops running. Yields None
+    after `keepalive` seconds without progress so callers can ping."""
+    seen = -1
+    while True:
+        job.changed.clear()
+        if job.version != seen:
+            seen = job.version
+            yield job.snapshot()
+            if job.status != "running":
+                return
+            await asyncio.sleep(min_interval)
+            continue
+        try:
+            await asyncio.wait_for(job.changed.wait(), timeout=keepalive)
+        except asyncio.TimeoutError:
+            yield None
@@ -0,0 +1,202 @@
+"""
+Vex - Adaptive AI Policy
+Decides, per message, whether Layer 3 spends an AI call on it.
+
+New and low-trust members are always scored, and judged with lower
+thresholds. Trusted members — long in the group, many messages, no
+violation an admin has not outweighed with "keep" — are not scored at
+all. Everyone else is sampled at a rate that falls as load rises —
+in-flight cascade runs, the deferred re-scoring backlog and today's quota
+use — so under a flood the limited provider capacity goes where the risk
+is highest.
+
+Member history comes from reputation_service (persisted, so it survives
+restarts).
+"""
+import logging
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from bot.core.invalidation import on_invalidate
+from bot.services.ai_service import get_inflight_count, get_daily_quota_usage
+from bot.services.ai_retry_service import get_queue_depth
+from bot.services.group_service import get_group_ai_policy
+from bot.services.reputation_service import get_reputation, get_reputation_stats
+
+logger = logging.getLogger("vex.services.ai_policy")
+
+# Per-group keys and their defaults (ManagedGroup.ai_policy overrides these)
+DEFAULT_AI_POLICY: dict = {
+    # False → score every message (pre-policy behavior)
+    "adaptive": True,
+    # A member is "new" for this long after a seen join …
+    "new_user_hours": 72,
+    # … and until they have posted this many messages
+    "new_user_messages": 20,
+    # Sample rate for established members with no load …
+    "established_rate": 1.0,
+    # … falling linearly to this floor at full load
+    "min_rate": 0.05,
+    # Cascade backlog (in-flight + deferred) where shedding starts / maxes out
+    "queue_soft_limit": 8,
+    "queue_hard_limit": 40,
+    # Share of daily quota where shedding starts (maxes out at 100%)
+    "quota_soft_limit": 0.7,
+    # Members this many days in the group with this many messages and no
+    # open violation are trusted and skip the AI (0 days = never)
+    "trusted_days": 30,
+    "trusted_messages": 200,
+    # New and low-trust members are alerted / auto-deleted this much lower
+    "strict_margin": 0.1,
+    # Earlier messages of the chat shown to the AI with each message (0 = off) …
+    "context_messages": 0,
+    # … cut to this many (estimated) tokens, the replied-to message first
+    "context_tokens": 150,
+}
+
+_LOAD_TTL_SECONDS = 5.0
+_QUOTA_TTL_SECONDS = 60.0
+
+
+@dataclass
+class PolicyDecision:
+    score: bool
+    reason: str          # disabled | new_user | low_trust | trusted | sampled | shed
+    rate: float = 1.0
+    pressure: float = 0.0
+    # Subtracted from the alert / auto-delete thresholds for this message
+    margin: float = 0.0
+
+
+_policies: dict[int, dict] = {}          # kept until an "ai_policy" event
+_load_cache: Optional[tuple[float, int]] = None
+_quota_cache: Optional[tuple[float, float]] = None
+_decisions: Counter = Counter()
+
+
+# ─── Policy & Load ────────────────────────────────────────────────────────────
+
+def invalidate_policy(chat_id: Optional[int] = None) -> None:
+    """Drop cached per-group policies (all groups if chat_id is None)."""
+    if chat_id is None:
+        _policies.clear()
+    else:
+        _policies.pop(chat_id, None)
+
+
+on_invalidate("ai_policy", invalidate_policy)
+
+
+async def get_policy(chat_id: int) -> dict:
+    """Effective policy for a group: defaults merged with its overrides."""
+    cached = _policies.get(chat_id)
+    if cached is not None:
+        return cached
+    overrides = await get_group_ai_policy(chat_id) or {}
+    policy = {**DEFAULT_AI_POLICY, **{k: v for k, v in overrides.items() if k in DEFAULT_AI_POLICY}}
+    _policies[chat_id] = policy
+    return policy
+
+
+async def _backlog() -> int:
+    global _load_cache
+    now = time.monotonic()
+    if not _load_cache or now - _load_cache[0] >= _LOAD_TTL_SECONDS:
+        _load_cache = (now, await get_queue_depth())
+    return get_inflight_count() + _load_cache[1]
+
+
+async def _quota_used() -> float:
+    global _quota_cache
+    now = time.monotonic()
+    if not _quota_cache or now - _quota_cache[0] >= _QUOTA_TTL_SECONDS:
+        _quota_cache = (now, await get_daily_quota_usage())
+    return _quota_cache[1]
+
+
+def _clamp(value: float) -> float:
+    return max(0.0, min(1.0, value))
+
+
+async def get_load() -> dict:
+    """Current load signals and the resulting pressure (0.0–1.0) per default limits."""
+    backlog = await _backlog()
+    quota = await _quota_used()
+    return {
+        "backlog": backlog,
+        "quota_used": round(quota, 4),
+        "pressure": round(compute_pressure(backlog, quota, DEFAULT_AI_POLICY), 3),
+    }
+
+
+def compute_pressure(backlog: int, quota_used: float, policy: dict) -> float:
+    soft, hard = policy["queue_soft_limit"], policy["queue_hard_limit"]
+    queue_pressure = _clamp((backlog - soft) / max(1, hard - soft))
+    quota_soft = policy["quota_soft_limit"]
+    quota_pressure = _clamp((quota_used - quota_soft) / max(1e-6, 1.0 - quota_soft))
+    return max(queue_pressure, quota_pressure)
+
+
+# ─── Decision ─────────────────────────────────────────────────────────────────
+
+def _is_trusted(policy: dict, record, now: float) -> bool:
+    return (
+        policy["trusted_days"] > 0
+        and record.messages >= policy["trusted_messages"]
+        and now - record.member_since >= policy["trusted_days"] * 86400
+    )
+
+
+async def is_trusted(chat_id: int, user_id: int) -> bool:
+    """Long-standing member with no open violation (exempt from the AI and
+    from duplicate-wave deletion)."""
+    policy = await get_policy(chat_id)
+    record = await get_reputation(chat_id, user_id)
+    return not record.open_violations and _is_trusted(policy, record, time.time())
+
+
+async def decide(chat_id: int, user_id: int) -> PolicyDecision:
+    """Should this member's message get an AI call right now?"""
+    policy = await get_policy(chat_id)
+    record = await get_reputation(chat_id, user_id)
+    now = time.time()
+
+    if not policy["adaptive"]:
+        decision = PolicyDecision(True, "disabled")
+    elif record.messages <= policy["new_user_messages"] or (
+        record.joined_at is not None
+        and now - record.joined_at < policy["new_user_hours"] * 3600
+    ):
+        decision = PolicyDecision(True, "new_user", margin=policy["strict_margin"])
+    elif record.open_violations:
+        decision = PolicyDecision(True, "low_trust", margin=policy["strict_margin"])
+    elif _is_trusted(policy, record, now):
+        decision = PolicyDecision(False, "trusted")
+    else:
+        pressure = compute_pressure(await _backlog(), await _quota_used(), policy)
+        top, floor = policy["established_rate"], min(policy["min_rate"], policy["established_rate"])
+        rate = top - (top - floor) * pressure
+        scored = random.random() < rate
+        decision = PolicyDecision(scored, "sampled" if scored else "shed", round(rate, 3), round(pressure, 3))
+
+    _decisions[decision.reason] += 1
+    if decision.reason == "shed":
+        logger.info(
+            f"[AI-POLICY] Shed message from {user_id} in {chat_id} "
+            f"(rate={decision.rate:.2f} pressure={decision.pressure:.2f})"
+        )
+    else:
+        logger.debug(
+            f"[AI-POLICY] {'Score' if decision.score else 'Skip'} message from {user_id} in {chat_id}: {decision.reason} "
+            f"(rate={decision.rate:.2f} pressure={decision.pressure:.2f})"
+        )
+    return decision
+
+
+def get_policy_stats() -> dict:
+    """Decision counters since start-up, by reason."""
+    reputation = get_reputation_stats()
+    return {"decisions": dict(_decisions), "tracked_members": reputation["cached"], "reputation": reputation}
@@ -10,6 +10,7 @@ from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 
 from db.database import get_db
+from bot.core.invalidation import publish_invalidation
 from db.models import AIProvider, AIEndpoint
 
 logger = logging.getLogger("vex.services.ai_provider")
@@ -79,7 +80,9 @@ async def update_endpoint(
             endpoint.api_key = api_key
         if base_url is not None:
             endpoint.base_url = base_url.strip() or None
-        return True
+
+    await publish_invalidation("ai_providers")
+    return True
 
 
 async def delete_endpoint(endpoint_id: int) -> bool:
@@ -89,10 +92,12 @@ async def delete_endpoint(endpoint_id: int) -> bool:
             select(AIEndpoint).where(AIEndpoint.id == endpoint_id)
         )
         endpoint = result.scalar_one_or_none()
-        if endpoint:
-            await session.delete(endpoint)
-            return True
-        return False
+        if not endpoint:
+            return False
+        await session.delete(endpoint)
+
+    await publish_invalidation("ai_providers")
+    return True
 
 
 # ─── Models (cascade entries) ─────────────────────────────────────────────────
@@ -146,7 +151,9 @@ async def add_provider(
         session.add(provider)
         await session.flush()
         await session.refresh(provider)
-        return provider
+
+    await publish_invalidation("ai_providers")
+    return provider
 
 
 async def delete_provider(provider_id: int) -> bool:
@@ -156,10 +163,12 @@ async def delete_provider(provider_id: int) -> bool:
             select(AIProvider).where(AIProvider.id == provider_id)
         )
         provider = result.scalar_one_or_none()
-        if provider:
-            await session.delete(provider)
-            return True
-        return False
+        if not provider:
+            return False
+        await session.delete(provider)
+
+    await publish_invalidation("ai_providers")
+    return True
 
 
 async def toggle_provider(provider_id: int) -> Optional[bool]:
@@ -169,10 +178,27 @@ async def toggle_provider(provider_id: int) -> Optional[bool]:
             select(AIProvider).where(AIProvider.id == provider_id)
         )
         provider = result.scalar_one_or_none()
-        if provider:
-            provider.is_active = not provider.is_active
-            return provider.is_active
-        return None
+        if not provider:
+            return None
+        provider.is_active = not provider.is_active
+
+    await publish_invalidation("ai_providers")
+    return provider.is_active
+
+
+async def toggle_provider_shadow(provider_id: int) -> Optional[bool]:
+    """Move a model in or out of shadow mode. Returns new state or None if not found."""
+    async with get_db() as session:
+        result = await session.execute(
+            select(AIProvider).where(AIProvider.id == provider_id)
+        )
+        provider = result.scalar_one_or_none()
+        if not provider:
+            return None
+        provider.is_shadow = not provider.is_shadow
+
+    await publish_invalidation("ai_providers")
+    return provider.is_shadow
 
 
 async def reorder_providers(ordered_ids: List[int]) -> bool:
@@ -192,7 +218,9 @@ async def reorder_providers(ordered_ids: List[int]) -> bool:
         for p in providers.values():  # leftovers keep relative order at the end
             p.priority = rank
             rank += 1
-        return True
+
+    await publish_invalidation("ai_providers")
+    return True
 
 
 async def move_provider(provider_id: int, direction: str) -> bool:
@@ -224,4 +252,6 @@ async def move_provider(provider_id: int, direction: str) -> bool:
             providers[swap_idx].priority,
             providers[idx].priority,
         )
-        return True
+
+    await publish_invalidation("ai_providers")
+    return True
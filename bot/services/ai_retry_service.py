@@ -0,0 +1,108 @@
+"""
+Vex - AI Deferred Re-scoring Queue
+Messages that got no verdict because the whole cascade failed are parked
+here instead of being let through, and re-scored once providers recover.
+
+The queue is persistent (survives restarts) and bounded both in size and
+in age: the oldest entries are dropped when it is full, and entries older
+than MAX_AGE are discarded — a verdict that late is no longer useful.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+
+from sqlalchemy import select, delete, func
+
+from db.database import get_db
+from db.models import AIRetryItem
+
+logger = logging.getLogger("vex.services.ai_retry")
+
+MAX_QUEUE_SIZE = 1000
+MAX_AGE = timedelta(hours=6)
+MAX_ATTEMPTS = 12
+# Backoff between attempts on the same item (doubles, capped)
+BASE_BACKOFF = timedelta(seconds=30)
+MAX_BACKOFF = timedelta(minutes=15)
+
+
+async def enqueue_retry(
+    chat_id: int,
+    message_id: int,
+    user_id: int,
+    user_name: str,
+    original_text: str,
+    normalized_text: str,
+) -> None:
+    """Park a message for later re-scoring, evicting the oldest if full."""
+    async with get_db() as session:
+        session.add(AIRetryItem(
+            chat_id=chat_id,
+            message_id=message_id,
+            user_id=user_id,
+            user_name=user_name[:200],
+            original_text=original_text,
+            normalized_text=normalized_text,
+            next_attempt_at=datetime.utcnow(),
+        ))
+        await session.flush()
+        size = (await session.execute(select(func.count(AIRetryItem.id)))).scalar_one()
+        if size > MAX_QUEUE_SIZE:
+            oldest = await session.execute(
+                select(AIRetryItem.id).order_by(AIRetryItem.id).limit(size - MAX_QUEUE_SIZE)
+            )
+            ids = [row[0] for row in oldest.all()]
+            await session.execute(delete(AIRetryItem).where(AIRetryItem.id.in_(ids)))
+            logger.warning(f"[AI-RETRY] Queue full, dropped {len(ids)} oldest item(s)")
+    logger.info(f"[AI-RETRY] Deferred message {message_id} in {chat_id}")
+
+
+async def purge_expired() -> int:
+    """Drop items past MAX_AGE or MAX_ATTEMPTS. Returns how many were removed."""
+    cutoff = datetime.utcnow() - MAX_AGE
+    async with get_db() as session:
+        result = await session.execute(
+            delete(AIRetryItem).where(
+                (AIRetryItem.created_at < cutoff) | (AIRetryItem.attempts >= MAX_ATTEMPTS)
+            )
+        )
+        removed = result.rowcount or 0
+    if removed:
+        logger.warning(f"[AI-RETRY] Discarded {removed} expired item(s) without a verdict")
+    return removed
+
+
+async def get_due_items(
+    limit: int = 20, partitions: Optional[Sequence[int]] = None, partition_count: int = 1,
+) -> List[AIRetryItem]:
+    """Oldest items whose backoff has elapsed; with `partitions`, only those
+    of chats in these fan-out partitions (chat_id mod partition_count)."""
+    query = select(AIRetryItem).where(AIRetryItem.next_attempt_at <= datetime.utcnow())
+    if partitions is not None:
+        # SQL % keeps the sign of negative chat IDs; fan-out uses Python's floor mod
+        partition = ((AIRetryItem.chat_id % partition_count) + partition_count) % partition_count
+        query = query.where(partition.in_(list(partitions)))
+    async with get_db() as session:
+        result = await session.execute(query.order_by(AIRetryItem.id).limit(limit))
+        return list(result.scalars().all())
+
+
+async def mark_failed(item_id: int) -> None:
+    """Record another failed attempt and push the item back."""
+    async with get_db() as session:
+        item = await session.get(AIRetryItem, item_id)
+        if not item:
+            return
+        item.attempts += 1
+        backoff = min(MAX_BACKOFF, BASE_BACKOFF * (2 ** (item.attempts - 1)))
+        item.next_attempt_at = datetime.utcnow() + backoff
+
+
+async def remove_item(item_id: int) -> None:
+    async with get_db() as session:
+        await session.execute(delete(AIRetryItem).where(AIRetryItem.id == item_id))
+
+
+async def get_queue_depth() -> int:
+    async with get_db() as session:
+        return (await session.execute(select(func.count(AIRetryItem.id)))).scalar_one()
@@ -7,21 +7,41 @@ Supported provider types:
   - google_studio  → Google AI Studio (Gemini models)
   - blackbox       → Blackbox.ai (OpenAI-compatible endpoint)
   - huggingface    → Hugging Face Inference API (zero-shot classification)
+
+Each group may bring its own rules and thresholds; everything downstream
+of the rules (compiled prompts, the verdict cache, coalescing of identical
+requests) is keyed by the rule set's version, so groups on the same rules
+share entries.
 """
+import asyncio
+import hashlib
 import logging
+import os
 import re
-from datetime import date, datetime
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
 from typing import Optional
 
 from sqlalchemy import select, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import selectinload
 
-from db.database import get_db
+from db.database import engine, get_db
 from db.models import AIProviderStat, AIProvider
-from bot.core.config import get_ai_prompt_override
+from bot.core.config import get_ai_prompt_override, get_ai_thresholds
+from bot.services.group_service import get_group_ai_rules
+from bot.core.invalidation import on_invalidate
 
 logger = logging.getLogger("vex.services.ai")
 
+# Remote API base URLs — overridable so load tests can point the cascade at
+# a local stub server (bench/ai_stub_server.py) instead of real providers
+BLACKBOX_BASE_URL = os.getenv("BLACKBOX_BASE_URL", "https://api.blackbox.ai")
+HF_INFERENCE_URL = os.getenv("HF_INFERENCE_URL", "https://api-inference.huggingface.co/models")
+
 # Daily quota safety limits per type
 DAILY_LIMITS: dict[str, int] = {
     "google_studio": 1450,
@@ -64,37 +84,23 @@ PERMANENT_ERROR_KEYWORDS = [
 
 # ─── DB Stats Helpers ─────────────────────────────────────────────────────────
 
-async def _get_or_create_stat(session, provider_key: str, today: date) -> AIProviderStat:
-    result = await session.execute(
-        select(AIProviderStat).where(
-            and_(
-                AIProviderStat.provider_key == provider_key,
-                AIProviderStat.stat_date == today,
-            )
-        )
-    )
-    stat = result.scalar_one_or_none()
-    if not stat:
-        stat = AIProviderStat(
-            provider_key=provider_key,
-            stat_date=today,
-            requests_count=0,
-        )
-        session.add(stat)
-        await session.flush()
-    return stat
-
-
 async def _record_usage(provider_key: str, status: str, error: Optional[str] = None, raw_response: Optional[str] = None):
-    today = date.today()
+    # One upsert per call: concurrent calls, in this process or another,
+    # neither duplicate the day's row nor lose each other's increments
+    now = datetime.utcnow()
+    values = {"last_status": status, "last_error": error, "last_used_at": now}
+    if raw_response is not None:
+        values["last_raw_response"] = raw_response[:500]
+    insert = pg_insert if engine.dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(AIProviderStat).values(
+        provider_key=provider_key, stat_date=date.today(), requests_count=1, **values,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AIProviderStat.provider_key, AIProviderStat.stat_date],
+        set_={"requests_count": AIProviderStat.requests_count + 1, **values},
+    )
     async with get_db() as session:
-        stat = await _get_or_create_stat(session, provider_key, today)
-        stat.requests_count += 1
-        stat.last_status = status
-        stat.last_error = error
-        if raw_response is not None:
-            stat.last_raw_response = raw_response[:500]
-        stat.last_used_at = datetime.utcnow()
+        await session.execute(stmt)
 
 
 async def _is_daily_quota_exhausted(provider_key: str, daily_limit: int) -> bool:
@@ -116,6 +122,95 @@ async def _is_daily_quota_exhausted(provider_key: str, daily_limit: int) -> bool
         return stat.requests_count >= daily_limit
 
 
+# ─── Provider Health (in-memory) ──────────────────────────────────────────────
+# Outcome of the most recent calls per provider, used by background work
+# (deferred re-scoring) to decide whether the cascade is worth trying again.
+
+@dataclass
+class ProviderHealth:
+    consecutive_failures: int = 0
+    last_status: str = ""
+    last_success_at: float = 0.0
+    # time.monotonic() before which the provider is presumed unavailable
+    retry_after: float = 0.0
+
+
+_health: dict[int, ProviderHealth] = {}
+
+_MINUTE_COOLDOWN = 60.0
+_PERMANENT_COOLDOWN = 600.0
+_MAX_ERROR_BACKOFF = 300.0
+
+
+def _seconds_until_midnight() -> float:
+    now = datetime.now()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (tomorrow - now).total_seconds()
+
+
+def _record_health(provider_id: int, status: str) -> None:
+    h = _health.setdefault(provider_id, ProviderHealth())
+    now = time.monotonic()
+    h.last_status = status
+    if status == "ok":
+        h.consecutive_failures = 0
+        h.last_success_at = now
+        h.retry_after = 0.0
+        return
+    h.consecutive_failures += 1
+    if status == "rate_limit_minute":
+        h.retry_after = now + _MINUTE_COOLDOWN
+    elif status == "rate_limit_day":
+        h.retry_after = now + _seconds_until_midnight()
+    elif status == "permanent":
+        h.retry_after = now + _PERMANENT_COOLDOWN
+    else:
+        h.retry_after = now + min(_MAX_ERROR_BACKOFF, 5.0 * 2 ** (h.consecutive_failures - 1))
+
+
+def get_provider_health() -> dict[int, ProviderHealth]:
+    """Snapshot of the in-memory health state, keyed by provider id."""
+    return dict(_health)
+
+
+def is_provider_available(provider_id: int) -> bool:
+    """False while a provider is cooling down after a failure."""
+    h = _health.get(provider_id)
+    return h is None or h.retry_after <= time.monotonic()
+
+
+# Live cascade (active, non-shadow, by priority); kept until an "ai_providers" event
+_live_providers: Optional[list[AIProvider]] = None
+
+
+def _invalidate_live_providers(_key=None) -> None:
+    global _live_providers
+    _live_providers = None
+
+
+on_invalidate("ai_providers", _invalidate_live_providers)
+
+
+async def _load_live_providers() -> list[AIProvider]:
+    global _live_providers
+    if _live_providers is None:
+        async with get_db() as session:
+            result = await session.execute(
+                select(AIProvider)
+                .options(selectinload(AIProvider.endpoint))
+                .where(AIProvider.is_active == True, AIProvider.is_shadow == False)
+                .order_by(AIProvider.priority)
+            )
+            _live_providers = list(result.scalars().all())
+    return _live_providers
+
+
+async def is_cascade_available() -> bool:
+    """True if at least one live (non-shadow) provider is not cooling down."""
+    providers = await _load_live_providers()
+    return any(is_provider_available(p.id) for p in providers)
+
+
 # ─── Provider Callers ─────────────────────────────────────────────────────────
 # Fixed prefix — always prepended (not editable by user)
 _FIXED_PREFIX_AR = (
@@ -158,14 +253,47 @@ _FIXED_SUFFIX_EN = (
 )
 
 
-def _build_prompt_ar(custom_rules: str | None, text: str) -> str:
-    rules = custom_rules.strip() if custom_rules and custom_rules.strip() else _DEFAULT_RULES_AR
-    return _FIXED_PREFIX_AR + rules + _FIXED_SUFFIX_AR.replace("{text}", text[:500])
+# Optional conversation context — inserted between the rules and the message
+_CONTEXT_AR = "\n\nسياق المحادثة (لفهم الرسالة فقط، لا تقيّمه):\n{context}"
+_CONTEXT_EN = "\n\nConversation context (to understand the message only, do not rate it):\n{context}"
+
+
+_PROMPT_PARTS = {
+    "ar": (_FIXED_PREFIX_AR, _DEFAULT_RULES_AR, _FIXED_SUFFIX_AR),
+    "en": (_FIXED_PREFIX_EN, _DEFAULT_RULES_EN, _FIXED_SUFFIX_EN),
+}
+_CONTEXT_PARTS = {"ar": _CONTEXT_AR, "en": _CONTEXT_EN}
+# (language, rules version) → text before the context / before and after the message
+_compiled_prompts: dict[tuple[str, str], tuple[str, str, str]] = {}
+MAX_COMPILED_PROMPTS = 512
+
+
+def _compile_prompt(language: str, custom_rules: str | None) -> tuple[str, str, str]:
+    key = (language, prompt_version(custom_rules))
+    compiled = _compiled_prompts.get(key)
+    if compiled is None:
+        prefix, default_rules, suffix = _PROMPT_PARTS[language]
+        rules = custom_rules.strip() if custom_rules and custom_rules.strip() else default_rules
+        head, tail = suffix.split("{text}")
+        if len(_compiled_prompts) >= MAX_COMPILED_PROMPTS:
+            _compiled_prompts.clear()
+        compiled = _compiled_prompts[key] = (prefix + rules, head, tail)
+    return compiled
+
+
+def _build_prompt(language: str, custom_rules: str | None, text: str, context: str | None) -> str:
+    base, head, tail = _compile_prompt(language, custom_rules)
+    if context:
+        base += _CONTEXT_PARTS[language].format(context=context)
+    return base + head + text[:500] + tail
 
 
-def _build_prompt_en(custom_rules: str | None, text: str) -> str:
-    rules = custom_rules.strip() if custom_rules and custom_rules.strip() else _DEFAULT_RULES_EN
-    return _FIXED_PREFIX_EN + rules + _FIXED_SUFFIX_EN.replace("{text}", text[:500])
+def _build_prompt_ar(custom_rules: str | None, text: str, context: str | None = None) -> str:
+    return _build_prompt("ar", custom_rules, text, context)
+
+
+def _build_prompt_en(custom_rules: str | None, text: str, context: str | None = None) -> str:
+    return _build_prompt("en", custom_rules, text, context)
 
 
 def _extract_score(raw: str) -> float:
@@ -199,14 +327,15 @@ def _extract_score(raw: str) -> float:
     raise ValueError(f"no score 0.0-1.0 found in response: {raw[:200]!r}")
 
 
-async def _call_google_studio(api_key: str, model: str, text: str) -> tuple[float, str]:
+async def _call_google_studio(
+    api_key: str, model: str, text: str, custom_rules: str | None, context: str | None = None,
+) -> tuple[float, str]:
     """Call Google AI Studio (Gemini) API."""
     import google.generativeai as genai
     genai.configure(api_key=api_key)
     gemini_model = genai.GenerativeModel(model or "gemini-1.5-flash")
 
-    custom = await get_ai_prompt_override()
-    prompt = _build_prompt_ar(custom, text)
+    prompt = _build_prompt_ar(custom_rules, text, context)
     response = await gemini_model.generate_content_async(prompt)
     return _extract_score(response.text), response.text
 
@@ -270,19 +399,22 @@ async def _openai_compatible_score(client, model: str, prompt: str) -> tuple[flo
     raise last_error or ValueError("adaptive call retries exhausted")
 
 
-async def _call_blackbox(api_key: str, model: str, text: str) -> tuple[float, str]:
+async def _call_blackbox(
+    api_key: str, model: str, text: str, custom_rules: str | None, context: str | None = None,
+) -> tuple[float, str]:
     """Call Blackbox.ai (OpenAI-compatible endpoint)."""
     import openai
     client = openai.AsyncOpenAI(
         api_key=api_key,
-        base_url="https://api.blackbox.ai",  # Correct base URL (no /api/v1)
+        base_url=BLACKBOX_BASE_URL,  # Correct base URL (no /api/v1)
     )
-    custom = await get_ai_prompt_override()
-    prompt = _build_prompt_en(custom, text)
+    prompt = _build_prompt_en(custom_rules, text, context)
     return await _openai_compatible_score(client, model or "blackboxai", prompt)
 
 
-async def _call_litellm(api_key: str, model: str, base_url: str, text: str) -> tuple[float, str]:
+async def _call_litellm(
+    api_key: str, model: str, base_url: str, text: str, custom_rules: str | None, context: str | None = None,
+) -> tuple[float, str]:
     """Call any LiteLLM-compatible endpoint (self-hosted or proxy).
 
     base_url example: http://my-server:4000
@@ -293,15 +425,14 @@ async def _call_litellm(api_key: str, model: str, base_url: str, text: str) -> t
         api_key=api_key or "no-key",
         base_url=base_url.rstrip("/") + "/v1" if not base_url.rstrip("/").endswith("/v1") else base_url,
     )
-    custom = await get_ai_prompt_override()
-    prompt = _build_prompt_en(custom, text)
+    prompt = _build_prompt_en(custom_rules, text, context)
     return await _openai_compatible_score(client, model, prompt)
 
 
 async def _call_huggingface(api_key: str, model: str, text: str) -> tuple[float, str]:
     """Call HuggingFace Inference API with zero-shot classification."""
     import httpx
-    url = f"https://api-inference.huggingface.co/models/{model}"
+    url = f"{HF_INFERENCE_URL.rstrip('/')}/{model}"
     headers = {"Authorization": f"Bearer {api_key}"}
     payload = {
         "inputs": text[:1000],
@@ -324,44 +455,251 @@ async def _call_huggingface(api_key: str, model: str, text: str) -> tuple[float,
 
 # ─── Dispatch caller by type ──────────────────────────────────────────────────
 
-async def _call_provider(provider: AIProvider, text: str) -> tuple[float, str]:
+async def _call_provider(
+    provider: AIProvider, text: str, custom_rules: str | None, context: str | None = None,
+) -> tuple[float, str]:
+    """Score one message with one provider. custom_rules=None → built-in rules;
+    context (earlier messages) is ignored by classifier-only providers."""
     # Credentials live on the linked endpoint; legacy rows fall back to inline values
     endpoint = getattr(provider, "endpoint", None)
     api_key = endpoint.api_key if endpoint else provider.api_key
     base_url = (endpoint.base_url if endpoint else None) or provider.base_url
 
     if provider.provider_type == "google_studio":
-        return await _call_google_studio(api_key, provider.model, text)
+        return await _call_google_studio(api_key, provider.model, text, custom_rules, context)
     elif provider.provider_type == "blackbox":
-        return await _call_blackbox(api_key, provider.model, text)
+        return await _call_blackbox(api_key, provider.model, text, custom_rules, context)
     elif provider.provider_type == "huggingface":
         return await _call_huggingface(api_key, provider.model, text)
     elif provider.provider_type == "litellm":
-        return await _call_litellm(api_key, provider.model, base_url or "http://localhost:4000", text)
+        return await _call_litellm(
+            api_key, provider.model, base_url or "http://localhost:4000", text, custom_rules, context,
+        )
     raise ValueError(f"Unknown provider type: {provider.provider_type}")
 
 
+def _failure_status(e: Exception) -> str:
+    """Usage status of a failed provider call (same rules as the cascade)."""
+    err_str = str(e).lower()
+    if any(kw in err_str for kw in PERMANENT_ERROR_KEYWORDS):
+        return "permanent"
+    if (
+        any(kw in err_str for kw in DAILY_EXHAUSTION_KEYWORDS)
+        and any(kw in err_str for kw in DAILY_EXHAUSTION_CONFIRM)
+    ):
+        return "rate_limit_day"
+    if any(kw in err_str for kw in MINUTE_RATE_KEYWORDS):
+        return "rate_limit_minute"
+    return "error"
+
+
+async def score_with_provider(provider: AIProvider, text: str, custom_rules: str | None) -> tuple[float, str]:
+    """Score one message with one specific provider, bypassing the cascade
+    (used by evaluations and shadow traffic). Calls count against the
+    provider's daily quota like live ones, and are refused once it is spent."""
+    key_label = f"{provider.provider_type}:{provider.id}:{provider.name}"
+    if await _is_daily_quota_exhausted(key_label, DAILY_LIMITS.get(provider.provider_type, 99999)):
+        raise RuntimeError(f"'{provider.name}' daily quota exhausted")
+    try:
+        score, raw_text = await _call_provider(provider, text, custom_rules)
+    except Exception as e:
+        status = _failure_status(e)
+        await _record_usage(key_label, "error" if status == "permanent" else status, str(e))
+        _record_health(provider.id, status)
+        raise
+    await _record_usage(key_label, "ok", raw_response=f"{(raw_text or '').strip()[:300]} → score={score:.2f}")
+    _record_health(provider.id, "ok")
+    return score, raw_text
+
+
+def build_provider_prompt(provider_type: str, custom_rules: str | None, text: str) -> str:
+    """The exact input a provider type receives for a message."""
+    if provider_type == "huggingface":
+        return text[:1000]
+    if provider_type == "google_studio":
+        return _build_prompt_ar(custom_rules, text)
+    return _build_prompt_en(custom_rules, text)
+
+
+def prompt_version(custom_rules: str | None) -> str:
+    """Short stable identifier for a rule set ("default" for built-in rules)."""
+    if not custom_rules or not custom_rules.strip():
+        return "default"
+    return hashlib.sha1(custom_rules.strip().encode("utf-8")).hexdigest()[:8]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars/token) — provider-agnostic cost estimate."""
+    return max(1, len(text or "") // 4)
+
+
+# ─── Per-group Rules ──────────────────────────────────────────────────────────
+
+@dataclass(frozen=True)
+class GroupAIConfig:
+    rules: Optional[str]          # None = built-in rules
+    version: str
+    alert_threshold: float
+    auto_delete_threshold: float
+
+
+# telegram group ID (None = bot-wide) → effective config; kept until a
+# "group" event for the chat or any "config" event
+_group_configs: dict[Optional[int], GroupAIConfig] = {}
+
+
+def _invalidate_group_config(telegram_group_id=None) -> None:
+    if telegram_group_id is None:
+        _group_configs.clear()
+    else:
+        _group_configs.pop(telegram_group_id, None)
+
+
+on_invalidate("group", _invalidate_group_config)
+on_invalidate("config", lambda _key: _group_configs.clear())
+
+
+async def get_group_ai_config(telegram_group_id: Optional[int]) -> GroupAIConfig:
+    """Rules and thresholds a group's messages are judged by: its own where
+    set, the bot-wide ones otherwise."""
+    cached = _group_configs.get(telegram_group_id)
+    if cached is not None:
+        return cached
+    rules, alert, auto_delete = (None, None, None)
+    if telegram_group_id is not None:
+        rules, alert, auto_delete = await get_group_ai_rules(telegram_group_id)
+    if not rules or not rules.strip():
+        rules = await get_ai_prompt_override()
+    default_alert, default_auto_delete = await get_ai_thresholds()
+    config = GroupAIConfig(
+        rules=rules,
+        version=prompt_version(rules),
+        alert_threshold=default_alert if alert is None else alert,
+        auto_delete_threshold=default_auto_delete if auto_delete is None else auto_delete,
+    )
+    _group_configs[telegram_group_id] = config
+    return config
+
+
+# ─── Verdict Cache ────────────────────────────────────────────────────────────
+# Identical text under the same rules (and the same context, if any) gets
+# the same score: repeats within VERDICT_TTL_SECONDS are answered from
+# memory, and concurrent requests for one (rules version, text, context)
+# share a single cascade run.
+
+VERDICT_TTL_SECONDS = 600
+VERDICT_CACHE_SIZE = 10_000
+
+_verdicts: "OrderedDict[tuple[str, str, str], tuple[float, float]]" = OrderedDict()   # → (time, score)
+_coalesced: dict[tuple[str, str, str], asyncio.Future] = {}
+verdict_stats: Counter = Counter()
+
+on_invalidate("ai_providers", lambda _key: _verdicts.clear())
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha1(value.encode("utf-8")).hexdigest()[:16]
+
+
+def _verdict_key(version: str, text: str, context: Optional[str] = None) -> tuple[str, str, str]:
+    return version, _digest(text), _digest(context) if context else ""
+
+
+def _cached_verdict(key: tuple[str, str, str]) -> Optional[float]:
+    entry = _verdicts.get(key)
+    if entry is None:
+        return None
+    if time.monotonic() - entry[0] >= VERDICT_TTL_SECONDS:
+        del _verdicts[key]
+        return None
+    _verdicts.move_to_end(key)
+    return entry[1]
+
+
+def _store_verdict(key: tuple[str, str, str], score: float) -> None:
+    _verdicts[key] = (time.monotonic(), score)
+    _verdicts.move_to_end(key)
+    if len(_verdicts) > VERDICT_CACHE_SIZE:
+        _verdicts.popitem(last=False)
+
+
+def get_verdict_cache_stats() -> dict:
+    return {
+        "cached": len(_verdicts),
+        "coalescing": len(_coalesced),
+        **{k: verdict_stats[k] for k in ("hits", "coalesced", "misses")},
+    }
+
+
 # ─── Main Public Entry Point ──────────────────────────────────────────────────
 
-async def analyze_text(text: str) -> float:
+async def analyze_text(
+    text: str, telegram_group_id: Optional[int] = None, context: Optional[str] = None,
+) -> float:
     """
-    Run the full AI cascade using providers stored in the database.
+    Run the full AI cascade using providers stored in the database, under
+    the group's rules (bot-wide rules when no group is given). `context`
+    (earlier messages, see chat_context_service) is shown to the model but
+    not rated.
     Returns a float 0.0–1.0 representing abuse probability.
     If all providers fail/exhausted, returns 0.0.
     """
-    # Load all active providers sorted by priority
-    async with get_db() as session:
-        result = await session.execute(
-            select(AIProvider)
-            .options(selectinload(AIProvider.endpoint))
-            .where(AIProvider.is_active == True)
-            .order_by(AIProvider.priority)
-        )
-        providers = list(result.scalars().all())
+    score = await try_analyze_text(text, telegram_group_id, context)
+    return 0.0 if score is None else score
+
+
+_inflight = 0
+
+
+def get_inflight_count() -> int:
+    """Cascade runs currently waiting on providers."""
+    return _inflight
+
+
+async def try_analyze_text(
+    text: str, telegram_group_id: Optional[int] = None, context: Optional[str] = None,
+) -> Optional[float]:
+    """
+    Same cascade as analyze_text, but returns None instead of 0.0 when no
+    provider produced a verdict (so callers can defer the message).
+    """
+    global _inflight
+    # Rules are resolved once per message, not once per provider attempt
+    config = await get_group_ai_config(telegram_group_id)
+    key = _verdict_key(config.version, text, context)
+    score = _cached_verdict(key)
+    if score is not None:
+        verdict_stats["hits"] += 1
+        return score
+    pending = _coalesced.get(key)
+    if pending is not None:
+        verdict_stats["coalesced"] += 1
+        return await asyncio.shield(pending)
+
+    verdict_stats["misses"] += 1
+    future = asyncio.get_running_loop().create_future()
+    _coalesced[key] = future
+    _inflight += 1
+    score = None
+    try:
+        score = await _run_cascade(text, config.rules, context)
+        if score is not None:
+            _store_verdict(key, score)
+        return score
+    finally:
+        _inflight -= 1
+        del _coalesced[key]
+        # Waiters get the same result; None (no verdict) makes them defer too
+        future.set_result(score)
+
+
+async def _run_cascade(text: str, custom_rules: Optional[str], context: Optional[str] = None) -> Optional[float]:
+    # All active providers sorted by priority
+    providers = await _load_live_providers()
 
     if not providers:
         logger.warning("[AI] No active providers configured.")
-        return 0.0
+        return None
 
     for provider in providers:
         key_label = f"{provider.provider_type}:{provider.id}:{provider.name}"
@@ -370,12 +708,14 @@ async def analyze_text(text: str) -> float:
         # Skip if today's daily quota exhausted
         if await _is_daily_quota_exhausted(key_label, daily_limit):
             logger.info(f"[AI] '{provider.name}' daily quota exhausted, skipping.")
+            _record_health(provider.id, "rate_limit_day")
             continue
 
         try:
-            score, raw_text = await _call_provider(provider, text)
+            score, raw_text = await _call_provider(provider, text, custom_rules, context)
             raw_summary = f"{(raw_text or '').strip()[:300]} → score={score:.2f}"
             await _record_usage(key_label, "ok", raw_response=raw_summary)
+            _record_health(provider.id, "ok")
             logger.info(f"[AI] '{provider.name}' → score={score:.2f} raw={raw_text!r:.120}")
             return score
 
@@ -386,6 +726,7 @@ async def analyze_text(text: str) -> float:
             if any(kw in err_str for kw in PERMANENT_ERROR_KEYWORDS):
                 logger.error(f"[AI] '{provider.name}' permanent error (bad key?): {e}")
                 await _record_usage(key_label, "error", f"[PERMANENT] {e}", raw_response=str(e))
+                _record_health(provider.id, "permanent")
                 continue
 
             # Daily quota exhausted → skip until tomorrow
@@ -396,25 +737,55 @@ async def analyze_text(text: str) -> float:
             if is_daily:
                 logger.warning(f"[AI] '{provider.name}' daily quota hit.")
                 await _record_usage(key_label, "rate_limit_day", str(e), raw_response=str(e))
+                _record_health(provider.id, "rate_limit_day")
                 continue
 
             # Per-minute rate limit → try next key immediately
             if any(kw in err_str for kw in MINUTE_RATE_KEYWORDS):
                 logger.warning(f"[AI] '{provider.name}' minute rate limit, trying next.")
                 await _record_usage(key_label, "rate_limit_minute", str(e))
+                _record_health(provider.id, "rate_limit_minute")
                 continue
 
             # Unknown error → log but try next
             logger.error(f"[AI] '{provider.name}' unknown error: {e}")
             await _record_usage(key_label, "error", str(e))
+            _record_health(provider.id, "error")
             continue
 
-    logger.warning("[AI] All providers exhausted or failed. Returning 0.0.")
-    return 0.0
+    logger.warning("[AI] All providers exhausted or failed. No verdict.")
+    return None
 
 
 # ─── Dashboard Stats Helper ───────────────────────────────────────────────────
 
+async def get_daily_quota_usage() -> float:
+    """Share (0.0–1.0) of today's finite provider quotas already used by the
+    live cascade. Providers without a real daily cap are ignored."""
+    async with get_db() as session:
+        result = await session.execute(
+            select(AIProvider).where(AIProvider.is_active == True, AIProvider.is_shadow == False)
+        )
+        providers = [
+            p for p in result.scalars().all()
+            if DAILY_LIMITS.get(p.provider_type, 99999) < 99999
+        ]
+        if not providers:
+            return 0.0
+        keys = {f"{p.provider_type}:{p.id}:{p.name}": DAILY_LIMITS[p.provider_type] for p in providers}
+        stats = await session.execute(
+            select(AIProviderStat).where(
+                AIProviderStat.provider_key.in_(keys),
+                AIProviderStat.stat_date == date.today(),
+            )
+        )
+        used = {
+            s.provider_key: keys[s.provider_key] if s.last_status == "rate_limit_day" else s.requests_count
+            for s in stats.scalars().all()
+        }
+    return min(1.0, sum(used.values()) / sum(keys.values()))
+
+
 async def get_provider_stats(days: int = 30) -> list[dict]:
     """Return usage stats for all providers for the last N days."""
     from datetime import timedelta
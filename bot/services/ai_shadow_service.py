@@ -0,0 +1,207 @@
+"""
+Vex - AI Shadow Traffic Service
+Mirrors a sample of real Layer-3 messages to candidate ("shadow") models so
+they can be judged under production load before being promoted.
+
+Mirroring is fire-and-forget: the content guard never waits for it, shadow
+calls run under their own concurrency cap, and their scores are only
+stored next to the live verdict — they never affect moderation.
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Optional, List
+
+from sqlalchemy import select, delete
+from sqlalchemy.orm import selectinload
+
+from db.database import get_db
+from db.models import AIProvider, AIShadowResult
+from bot.core.invalidation import on_invalidate
+from bot.core.config import (
+    get_ai_shadow_sample_rate, get_ai_thresholds,
+)
+from bot.services.ai_service import score_with_provider
+
+logger = logging.getLogger("vex.services.ai_shadow")
+
+# Concurrent shadow calls across all shadow models
+SHADOW_CONCURRENCY = 4
+# Mirrors waiting for a slot beyond this are dropped, not queued
+MAX_PENDING = 100
+RESULT_RETENTION_DAYS = 7
+_PRUNE_EVERY = 500
+
+_semaphore = asyncio.Semaphore(SHADOW_CONCURRENCY)
+_pending: set[asyncio.Task] = set()
+# (providers, rate); kept until an "ai_providers" or "config" event
+_config: Optional[tuple[List[AIProvider], float]] = None
+_writes = 0
+_dropped = 0
+
+
+def invalidate_shadow_cache() -> None:
+    """Forget the cached shadow models / sample rate."""
+    global _config
+    _config = None
+
+
+on_invalidate("ai_providers", lambda _key: invalidate_shadow_cache())
+on_invalidate("config", lambda _key: invalidate_shadow_cache())
+
+
+async def _load_config() -> tuple[List[AIProvider], float]:
+    global _config
+    if _config:
+        return _config
+    async with get_db() as session:
+        result = await session.execute(
+            select(AIProvider)
+            .options(selectinload(AIProvider.endpoint))
+            .where(AIProvider.is_active == True, AIProvider.is_shadow == True)
+            .order_by(AIProvider.priority)
+        )
+        providers = list(result.scalars().all())
+    rate = await get_ai_shadow_sample_rate()
+    _config = (providers, rate)
+    return _config
+
+
+def mirror_to_shadow(text: str, live_score: float, custom_rules: Optional[str]) -> None:
+    """Schedule a mirrored scoring of `text` (under the rules the live cascade
+    used) and return immediately."""
+    global _dropped
+    # Cheap rejection on the hot path once the config is cached
+    if _config:
+        if not _config[0] or random.random() >= _config[1]:
+            return
+    if len(_pending) >= MAX_PENDING:
+        _dropped += 1
+        return
+    task = asyncio.create_task(_mirror(text, live_score, custom_rules))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def _mirror(text: str, live_score: float, custom_rules: Optional[str]) -> None:
+    try:
+        cached = _config is not None
+        providers, rate = await _load_config()
+        # Sampled in mirror_to_shadow already when the config was cached
+        if not providers or (not cached and random.random() >= rate):
+            return
+        results = await asyncio.gather(
+            *(_score_one(p, text, custom_rules, live_score) for p in providers)
+        )
+        await _store(results)
+    except Exception as e:
+        logger.warning(f"[SHADOW] Mirror failed: {e}")
+
+
+async def _score_one(provider: AIProvider, text: str, custom_rules, live_score: float) -> AIShadowResult:
+    async with _semaphore:
+        start = time.perf_counter()
+        score, error = None, None
+        try:
+            score, _ = await score_with_provider(provider, text, custom_rules)
+        except Exception as e:
+            error = str(e)[:500]
+        elapsed = (time.perf_counter() - start) * 1000
+    logger.debug(f"[SHADOW] '{provider.name}' live={live_score:.2f} shadow={score} {elapsed:.0f}ms")
+    return AIShadowResult(
+        provider_id=provider.id,
+        live_score=live_score,
+        shadow_score=score,
+        latency_ms=round(elapsed, 1),
+        error=error,
+    )
+
+
+async def _store(results: List[AIShadowResult]) -> None:
+    global _writes
+    async with get_db() as session:
+        session.add_all(results)
+        _writes += len(results)
+        if _writes >= _PRUNE_EVERY:
+            _writes = 0
+            cutoff = datetime.utcnow() - timedelta(days=RESULT_RETENTION_DAYS)
+            await session.execute(delete(AIShadowResult).where(AIShadowResult.created_at < cutoff))
+
+
+# ─── Dashboard Summary ────────────────────────────────────────────────────────
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _bucket(score: float, alert: float, auto_delete: float) -> int:
+    """0 = no action, 1 = alert admins, 2 = auto-delete."""
+    return 2 if score >= auto_delete else 1 if score >= alert else 0
+
+
+async def get_shadow_summary(hours: int = 24) -> List[dict]:
+    """Per shadow model: volume, error rate, latency and agreement with the
+    live verdict (same action at the current thresholds) over the last N hours."""
+    cutoff = datetime.utcnow() - timedelta(hours=hours)
+    alert_thr, auto_del_thr = await get_ai_thresholds()
+
+    async with get_db() as session:
+        result = await session.execute(
+            select(AIProvider).where(AIProvider.is_shadow == True).order_by(AIProvider.priority)
+        )
+        providers = list(result.scalars().all())
+        rows_result = await session.execute(
+            select(AIShadowResult).where(AIShadowResult.created_at >= cutoff)
+        )
+        rows = list(rows_result.scalars().all())
+
+    by_provider: dict[int, list[AIShadowResult]] = {}
+    for r in rows:
+        by_provider.setdefault(r.provider_id, []).append(r)
+
+    summary = []
+    for p in providers:
+        items = by_provider.get(p.id, [])
+        scored = [r for r in items if r.shadow_score is not None]
+        agree = sum(
+            _bucket(r.shadow_score, alert_thr, auto_del_thr) == _bucket(r.live_score, alert_thr, auto_del_thr)
+            for r in scored
+        )
+        latencies = [r.latency_ms for r in scored]
+        last_error = next((r.error for r in sorted(items, key=lambda r: r.id, reverse=True) if r.error), None)
+        summary.append({
+            "provider_id": p.id,
+            "name": p.name,
+            "model": p.model,
+            "is_active": p.is_active,
+            "samples": len(items),
+            "errors": len(items) - len(scored),
+            "error_rate": round((len(items) - len(scored)) / len(items), 4) if items else None,
+            "agreement": round(agree / len(scored), 4) if scored else None,
+            "mean_abs_diff": round(
+                sum(abs(r.shadow_score - r.live_score) for r in scored) / len(scored), 4
+            ) if scored else None,
+            # Shadow would act where live did not / would stay silent where live acted
+            "would_flag_more": sum(
+                _bucket(r.shadow_score, alert_thr, auto_del_thr) > _bucket(r.live_score, alert_thr, auto_del_thr)
+                for r in scored
+            ),
+            "would_flag_less": sum(
+                _bucket(r.shadow_score, alert_thr, auto_del_thr) < _bucket(r.live_score, alert_thr, auto_del_thr)
+                for r in scored
+            ),
+            "latency_p50_ms": round(_percentile(latencies, 50), 1),
+            "latency_p95_ms": round(_percentile(latencies, 95), 1),
+            "last_error": last_error,
+        })
+    return summary
+
+
+def get_shadow_runtime() -> dict:
+    """In-process mirroring counters."""
+    return {"pending": len(_pending), "dropped": _dropped, "concurrency": SHADOW_CONCURRENCY}
@@ -0,0 +1,354 @@
+"""
+Vex - Admin Alert Aggregator
+Folds Layer-3 alerts into one live alert per offender or spam wave.
+
+Alerts are grouped in a sliding window by user and by fingerprint of the
+normalized text: a message joins an open alert group if its author or its
+text already belongs to one that has seen activity in the last few minutes.
+The group's admin-group message is edited in place (throttled) with a live
+counter, and its "delete all" / "keep all" buttons act on every pending
+message in it. A group with a single message looks and behaves exactly like
+a classic per-message alert. Alerts are sent and edited from background
+tasks, so submitting one never makes a handler wait on the ALERT lane.
+
+State is in memory only; after a restart, buttons on old aggregated alerts
+report that the alert expired.
+"""
+import asyncio
+import hashlib
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
+
+from bot.core.rate_limiter import Lane
+from bot.services.deletion_service import delete_message
+
+logger = logging.getLogger("vex.services.alert_aggregator")
+
+# A group stays open while it sees a new message at least this often …
+ALERT_WINDOW_SECONDS = 300
+# … but never longer than this, nor beyond this many messages
+MAX_GROUP_AGE_SECONDS = 3600
+MAX_GROUP_MESSAGES = 100
+# Minimum gap between two edits of the same alert
+EDIT_MIN_INTERVAL_SECONDS = 3.0
+# Resolved/expired groups kept so their buttons still work
+MAX_REMEMBERED_GROUPS = 1000
+
+
+@dataclass
+class AlertItem:
+    chat_id: int
+    message_id: int
+    user_id: int
+    user_name: str
+    text: str
+    score: float
+    auto_deleted: bool
+    deferred: bool
+    # Set when the message was caught by a rule rather than scored by the AI
+    reason: Optional[str] = None
+
+
+@dataclass
+class AlertGroup:
+    id: int
+    admin_group_id: int
+    opened_at: float = field(default_factory=time.monotonic)
+    last_seen: float = field(default_factory=time.monotonic)
+    items: list[AlertItem] = field(default_factory=list)
+    keys: set[tuple] = field(default_factory=set)
+    admin_message_id: Optional[int] = None
+    resolved: bool = False
+    last_edit: float = 0.0
+    edit_task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> list[AlertItem]:
+        return [i for i in self.items if not i.auto_deleted]
+
+    def is_open(self, now: float) -> bool:
+        return (
+            not self.resolved
+            and now - self.last_seen < ALERT_WINDOW_SECONDS
+            and now - self.opened_at < MAX_GROUP_AGE_SECONDS
+            and len(self.items) < MAX_GROUP_MESSAGES
+        )
+
+
+_ids = itertools.count(1)
+_open: dict[tuple, AlertGroup] = {}                        # ("user", id) / ("text", fp) → group
+_groups: "OrderedDict[int, AlertGroup]" = OrderedDict()    # group id → group
+_by_alert: dict[tuple[int, int], int] = {}                 # (admin chat, admin msg) → group id
+_tasks: set[asyncio.Task] = set()
+
+
+def configure_ids(start: int, step: int) -> None:
+    """Allocate group IDs as start, start+step, … — in fan-out mode a worker
+    uses its partition (ID % partition count routes the buttons back to it)."""
+    global _ids
+    _ids = itertools.count(start, step)
+
+
+def text_fingerprint(normalized_text: str) -> str:
+    """Fingerprint of already-normalized text (whitespace-insensitive)."""
+    return hashlib.sha1(" ".join(normalized_text.split()).encode("utf-8")).hexdigest()[:16]
+
+
+# ─── Collecting ───────────────────────────────────────────────────────────────
+
+def submit_alert(
+    bot: Bot,
+    admin_group_id: int,
+    item: AlertItem,
+    fingerprint: Optional[str] = None,
+) -> AlertGroup:
+    """Add a suspicious message to its alert group; the alert is sent or
+    edited in the background."""
+    now = time.monotonic()
+    keys = {("user", item.user_id)}
+    if fingerprint:
+        keys.add(("text", fingerprint))
+
+    group = next(
+        (g for g in (_open.get(k) for k in keys) if g and g.is_open(now) and g.admin_group_id == admin_group_id),
+        None,
+    )
+    if group is None:
+        group = AlertGroup(id=next(_ids), admin_group_id=admin_group_id)
+        _remember(group)
+    group.items.append(item)
+    group.last_seen = now
+    group.keys |= keys
+    for key in keys:
+        _open[key] = group
+    _prune(now)
+
+    if len(group.items) == 1:
+        task = asyncio.create_task(_send_first(bot, group))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+    else:
+        logger.info(f"[ALERTS] Alert #{group.id} now covers {len(group.items)} messages")
+        _schedule_edit(bot, group)
+    return group
+
+
+def _remember(group: AlertGroup) -> None:
+    _groups[group.id] = group
+    while len(_groups) > MAX_REMEMBERED_GROUPS:
+        _, old = _groups.popitem(last=False)
+        if old.admin_message_id:
+            _by_alert.pop((old.admin_group_id, old.admin_message_id), None)
+
+
+def _prune(now: float) -> None:
+    for key in [k for k, g in _open.items() if not g.is_open(now)]:
+        del _open[key]
+
+
+def _close(group: AlertGroup) -> None:
+    for key in group.keys:
+        if _open.get(key) is group:
+            del _open[key]
+
+
+# ─── Rendering ────────────────────────────────────────────────────────────────
+
+def _message_link(chat_id: int, message_id: int) -> str:
+    chat_id_clean = str(chat_id).lstrip("-").removeprefix("100")
+    return f"https://t.me/c/{chat_id_clean}/{message_id}"
+
+
+def render(group: AlertGroup) -> tuple[str, Optional[InlineKeyboardMarkup]]:
+    items = group.items
+    last = items[-1]
+
+    if len(items) == 1:
+        score_pct = int(last.score * 100)
+        cause = last.reason or f"نسبة الإساءة {score_pct}%"
+        if last.auto_deleted:
+            text = (
+                f"🗑️ **تم الحذف التلقائي — {cause}**\n\n"
+                f"👤 المستخدم: [{last.user_name}](tg://user?id={last.user_id})\n"
+                f"💬 الرسالة المحذوفة:\n`{last.text[:300]}`"
+            )
+        else:
+            text = (
+                f"⚠️ **اشتباه برسالة مسيئة بنسبة {score_pct}%**\n\n"
+                f"👤 المستخدم: [{last.user_name}](tg://user?id={last.user_id})\n"
+                f"💬 الرسالة الأصلية:\n`{last.text[:300]}`"
+            )
+    else:
+        users = {i.user_id: i.user_name for i in items}
+        if len(users) == 1:
+            who = f"👤 المستخدم: [{last.user_name}](tg://user?id={last.user_id})"
+        else:
+            who = f"👥 {len(users)} مستخدمين — آخرهم [{last.user_name}](tg://user?id={last.user_id})"
+        auto_deleted = sum(i.auto_deleted for i in items)
+        reasons = "".join(f"📌 {r}\n" for r in sorted({i.reason for i in items if i.reason}))
+        text = (
+            f"🚨 **تنبيهات مجمّعة — {len(items)} رسالة مشبوهة**\n\n"
+            f"{who}\n"
+            f"{reasons}"
+            f"📈 أعلى نسبة: {int(max(i.score for i in items) * 100)}%\n"
+            f"🗑️ حُذف تلقائياً: {auto_deleted} · ⏳ بانتظار القرار: {len(items) - auto_deleted}\n"
+            f"💬 آخر رسالة:\n`{last.text[:300]}`\n\n"
+            f"🕒 آخر تحديث: {datetime.now().strftime('%H:%M:%S')}"
+        )
+
+    if any(i.deferred for i in items):
+        text += "\n\n⏱ تحليل متأخر — كانت خدمات الذكاء الاصطناعي متعطلة وقت الإرسال"
+
+    if group.resolved:
+        return text, None
+    rows = []
+    pending = group.pending
+    if pending:
+        latest = pending[-1]
+        rows.append([InlineKeyboardButton("🔗 اذهب للرسالة", url=_message_link(latest.chat_id, latest.message_id))])
+        if len(items) == 1:
+            # Classic single-message buttons (also work after a restart)
+            rows.append([
+                InlineKeyboardButton("🗑️ احذف الرسالة", callback_data=f"guard_delete:{latest.chat_id}:{latest.message_id}"),
+                InlineKeyboardButton("✅ لا تحذف", callback_data=f"guard_keep:{latest.chat_id}:{latest.message_id}:{latest.user_id}"),
+            ])
+        else:
+            rows.append([
+                InlineKeyboardButton(f"🗑️ احذف الكل ({len(pending)})", callback_data=f"guard_delete_all:{group.id}"),
+                InlineKeyboardButton("✅ اترك الكل", callback_data=f"guard_keep_all:{group.id}"),
+            ])
+    if len({(i.chat_id, i.user_id) for i in items}) == 1:
+        # One sender in one group: their other recent messages can go too
+        rows.append([
+            InlineKeyboardButton("🧹 احذف رسائله الأخيرة", callback_data=f"guard_purge:{last.chat_id}:{last.user_id}"),
+        ])
+    return text, InlineKeyboardMarkup(rows) if rows else None
+
+
+# ─── Sending & Editing ────────────────────────────────────────────────────────
+
+async def _send(bot: Bot, group: AlertGroup) -> None:
+    text, keyboard = render(group)
+    message = await bot.send_message(
+        chat_id=group.admin_group_id,
+        text=text,
+        reply_markup=keyboard,
+        parse_mode="Markdown",
+        rate_limit_args=Lane.ALERT,
+    )
+    group.admin_message_id = message.message_id
+    group.last_edit = time.monotonic()
+    _by_alert[(group.admin_group_id, message.message_id)] = group.id
+    # Messages that joined while the first send was in flight
+    if len(group.items) > 1:
+        _schedule_edit(bot, group)
+
+
+async def _send_first(bot: Bot, group: AlertGroup) -> None:
+    try:
+        await _send(bot, group)
+    except Exception as e:
+        logger.error(f"[ALERTS] Could not send alert #{group.id}: {e}")
+        # No alert to fold into — let the next message start over
+        group.resolved = True
+        _close(group)
+
+
+def _schedule_edit(bot: Bot, group: AlertGroup) -> None:
+    if group.admin_message_id is None or (group.edit_task and not group.edit_task.done()):
+        return
+    group.edit_task = asyncio.create_task(_edit_later(bot, group))
+
+
+async def _edit_later(bot: Bot, group: AlertGroup) -> None:
+    delay = group.last_edit + EDIT_MIN_INTERVAL_SECONDS - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+    await _edit(bot, group)
+
+
+async def _edit(bot: Bot, group: AlertGroup, footer: str = "") -> None:
+    text, keyboard = render(group)
+    group.last_edit = time.monotonic()
+    try:
+        await bot.edit_message_text(
+            chat_id=group.admin_group_id,
+            message_id=group.admin_message_id,
+            text=text + footer,
+            reply_markup=keyboard,
+            parse_mode="Markdown",
+            rate_limit_args=Lane.ALERT,
+        )
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            logger.warning(f"[ALERTS] Could not edit alert #{group.id}: {e}")
+    except Exception as e:
+        logger.warning(f"[ALERTS] Could not edit alert #{group.id}: {e}")
+
+
+# ─── Admin Decisions ──────────────────────────────────────────────────────────
+
+def get_group(group_id: int) -> Optional[AlertGroup]:
+    return _groups.get(group_id)
+
+
+def resolve_alert(admin_group_id: int, admin_message_id: int) -> Optional[AlertGroup]:
+    """Close the group behind an alert (an admin decided on it) and return it."""
+    group_id = _by_alert.get((admin_group_id, admin_message_id))
+    group = _groups.get(group_id) if group_id else None
+    if group:
+        group.resolved = True
+        _close(group)
+    return group
+
+
+async def delete_all(bot: Bot, group: AlertGroup, admin_name: str, admin_id: int) -> tuple[int, int]:
+    """Delete every pending message of the group. Returns (deleted, failed)."""
+    group.resolved = True
+    _close(group)
+    if group.edit_task and not group.edit_task.done():
+        group.edit_task.cancel()
+    pending = group.pending
+    results = await asyncio.gather(*(delete_message(bot, i.chat_id, i.message_id) for i in pending))
+    deleted = sum(results)
+    for item, ok in zip(pending, results):
+        item.auto_deleted = item.auto_deleted or ok
+    footer = f"\n\n✅ **تم حذف {deleted} رسالة** بواسطة [{admin_name}](tg://user?id={admin_id})"
+    if deleted < len(pending):
+        footer += f"\n⚠️ تعذر حذف {len(pending) - deleted} (ربما حُذفت مسبقاً)"
+    await _edit(bot, group, footer)
+    logger.info(f"[ALERTS] Alert #{group.id}: admin {admin_id} deleted {deleted}/{len(pending)}")
+    return deleted, len(pending) - deleted
+
+
+async def keep_all(bot: Bot, group: AlertGroup, admin_name: str, admin_id: int) -> int:
+    """Leave every pending message of the group in place."""
+    group.resolved = True
+    _close(group)
+    if group.edit_task and not group.edit_task.done():
+        group.edit_task.cancel()
+    kept = len(group.pending)
+    await _edit(
+        bot, group,
+        f"\n\n✅ **تم السماح بـ {kept} رسالة** بواسطة [{admin_name}](tg://user?id={admin_id})",
+    )
+    logger.info(f"[ALERTS] Alert #{group.id}: admin {admin_id} kept {kept}")
+    return kept
+
+
+def get_alert_stats() -> dict:
+    now = time.monotonic()
+    open_groups = {id(g): g for g in _open.values() if g.is_open(now)}
+    return {
+        "open_groups": len(open_groups),
+        "open_messages": sum(len(g.items) for g in open_groups.values()),
+        "remembered_groups": len(_groups),
+    }
@@ -0,0 +1,74 @@
+"""
+Vex - Chat Context
+Last few normalized messages per group, so the AI can read a message in
+its conversation: a reply like "same to you" or an insult split over
+several messages is judged with what came before.
+
+Only groups whose AI policy enables context_messages are recorded. Each
+ring holds at most MAX_CONTEXT_MESSAGES texts of at most MAX_TEXT_CHARS,
+and at most MAX_CHATS groups are kept (least recently active go first).
+The context handed to the model is cut to a token budget: the replied-to
+message first, then the most recent messages that still fit.
+"""
+import logging
+from collections import OrderedDict, deque
+from typing import Optional
+
+from bot.services.ai_service import estimate_tokens
+
+logger = logging.getLogger("vex.services.chat_context")
+
+MAX_CONTEXT_MESSAGES = 10
+MAX_TEXT_CHARS = 300
+MAX_CHATS = 2_000
+
+_rings: "OrderedDict[int, deque]" = OrderedDict()    # chat → normalized texts, oldest first
+
+
+def remember(chat_id: int, text: str) -> None:
+    """Add a normalized message to the group's ring."""
+    ring = _rings.get(chat_id)
+    if ring is None:
+        ring = _rings[chat_id] = deque(maxlen=MAX_CONTEXT_MESSAGES)
+        if len(_rings) > MAX_CHATS:
+            _rings.popitem(last=False)
+    else:
+        _rings.move_to_end(chat_id)
+    ring.append(text[:MAX_TEXT_CHARS])
+
+
+def recent(chat_id: int, limit: int) -> list[str]:
+    """Up to `limit` of the group's latest messages, oldest first."""
+    ring = _rings.get(chat_id)
+    if not ring or limit <= 0:
+        return []
+    return list(ring)[-limit:]
+
+
+def build_context(history: list[str], reply_text: Optional[str], max_tokens: int) -> Optional[str]:
+    """Context block for the prompt within max_tokens (estimated): the
+    replied-to message, then as many of the latest messages as fit."""
+    budget = max_tokens
+    reply_line = None
+    if reply_text:
+        reply_line = f"↩ «{reply_text[:max(1, budget * 4 - 4)]}»"
+        budget -= estimate_tokens(reply_line)
+
+    lines = []
+    for text in reversed(history):
+        if text == reply_text:
+            continue
+        line = f"- «{text}»"
+        cost = estimate_tokens(line)
+        if cost > budget:
+            break
+        lines.append(line)
+        budget -= cost
+    lines.reverse()
+    if reply_line:
+        lines.append(reply_line)
+    return "\n".join(lines) or None
+
+
+def get_context_stats() -> dict:
+    return {"chats": len(_rings), "messages": sum(len(r) for r in _rings.values())}
@@ -0,0 +1,158 @@
+"""
+Vex - Deletion Coalescer
+Gathers pending message deletions per chat for a short window and sends
+them through the Bot API's bulk deleteMessages (up to 100 ids per call),
+so a raid costs a handful of requests instead of one per message.
+
+Every caller still gets its own result: True only if this request removed
+the message. Messages this bot already deleted are answered from memory,
+and a batch of one uses deleteMessage so a missing message is reported as
+already gone; neither counts as a deletion (bulk deletion cannot tell a
+message someone else removed from one it removed). Flood waits and network
+errors are retried, for single and bulk calls alike; if a bulk call still
+fails, each message in it is retried on its own.
+"""
+import asyncio
+import logging
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from telegram import Bot
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+logger = logging.getLogger("vex.services.deletion")
+
+COALESCE_WINDOW_SECONDS = 0.2
+MAX_BATCH = 100  # Bot API limit for deleteMessages
+# Tries per call on flood waits and network errors
+ATTEMPTS = 3
+# Longer flood waits are not waited out: the message is reported not deleted
+MAX_RETRY_AFTER_SECONDS = 60
+# Messages remembered as deleted, so repeated requests are not counted twice
+RECENT_DELETED = 10_000
+_GONE_ERRORS = ("message to delete not found",)
+
+
+def _seconds(retry_after) -> float:
+    return float(getattr(retry_after, "total_seconds", lambda: retry_after)())
+
+
+class DeletionCoalescer:
+    def __init__(self, window: float = COALESCE_WINDOW_SECONDS, max_batch: int = MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        # chat_id → {message_id: [futures]} (same id requested twice → one delete)
+        self._pending: dict[int, dict[int, list[asyncio.Future]]] = {}
+        self._timers: dict[int, asyncio.Task] = {}
+        self._flushing: set[asyncio.Task] = set()
+        self._deleted: "OrderedDict[tuple[int, int], None]" = OrderedDict()
+        self.stats: Counter = Counter()
+
+    async def delete(self, bot: Bot, chat_id: int, message_id: int) -> bool:
+        """Queue one deletion and wait for its own outcome."""
+        if (chat_id, message_id) in self._deleted:
+            self.stats["already_gone"] += 1
+            return False
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.setdefault(chat_id, {})
+        batch.setdefault(message_id, []).append(future)
+        self.stats["requested"] += 1
+
+        if len(batch) >= self.max_batch:
+            # Full: send now, later deletions start a new batch
+            timer = self._timers.pop(chat_id, None)
+            if timer:
+                timer.cancel()
+            del self._pending[chat_id]
+            task = asyncio.create_task(self._flush(bot, chat_id, batch))
+            self._flushing.add(task)
+            task.add_done_callback(self._flushing.discard)
+        elif chat_id not in self._timers:
+            self._timers[chat_id] = asyncio.create_task(self._flush_later(bot, chat_id))
+        return await future
+
+    async def _flush_later(self, bot: Bot, chat_id: int) -> None:
+        await asyncio.sleep(self.window)
+        self._timers.pop(chat_id, None)
+        batch = self._pending.pop(chat_id, None)
+        if batch:
+            await self._flush(bot, chat_id, batch)
+
+    async def _flush(self, bot: Bot, chat_id: int, batch: dict[int, list[asyncio.Future]]) -> None:
+        ids = sorted(batch)
+        # True deleted, None already gone, False failed
+        results: dict[int, Optional[bool]] = {}
+
+        if len(ids) == 1:
+            results[ids[0]] = await self._delete_one(bot, chat_id, ids[0])
+        else:
+            self.stats["bulk_calls"] += 1
+            try:
+                await self._retrying(lambda: bot.delete_messages(chat_id=chat_id, message_ids=ids))
+                results = {mid: True for mid in ids}
+                logger.info(f"[DELETE] Bulk-deleted {len(ids)} messages in {chat_id}")
+            except Exception as e:
+                logger.warning(f"[DELETE] Bulk delete of {len(ids)} in {chat_id} failed ({e}); retrying one by one")
+                self.stats["bulk_failures"] += 1
+                for mid in ids:
+                    results[mid] = await self._delete_one(bot, chat_id, mid)
+
+        for mid, futures in batch.items():
+            result = results.get(mid, False)
+            self.stats["deleted" if result else "already_gone" if result is None else "failed"] += 1
+            if result is not False:
+                self._remember(chat_id, mid)
+            for future in futures:
+                if not future.done():
+                    future.set_result(bool(result))
+
+    def _remember(self, chat_id: int, message_id: int) -> None:
+        self._deleted[(chat_id, message_id)] = None
+        if len(self._deleted) > RECENT_DELETED:
+            self._deleted.popitem(last=False)
+
+    async def _retrying(self, call):
+        """Await call(), retrying flood waits and network errors."""
+        for attempt in range(ATTEMPTS):
+            try:
+                return await call()
+            except RetryAfter as e:
+                delay = _seconds(e.retry_after)
+                if attempt == ATTEMPTS - 1 or delay > MAX_RETRY_AFTER_SECONDS:
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+            except BadRequest:
+                # A NetworkError too, but the same request would fail again
+                raise
+            except NetworkError:
+                if attempt == ATTEMPTS - 1:
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def _delete_one(self, bot: Bot, chat_id: int, message_id: int) -> Optional[bool]:
+        self.stats["single_calls"] += 1
+        try:
+            return bool(await self._retrying(lambda: bot.delete_message(chat_id=chat_id, message_id=message_id)))
+        except BadRequest as e:
+            if any(err in str(e).lower() for err in _GONE_ERRORS):
+                return None
+            logger.warning(f"[DELETE] Could not delete message {message_id} in {chat_id}: {e}")
+            return False
+        except Exception as e:
+            logger.warning(f"[DELETE] Could not delete message {message_id} in {chat_id}: {e}")
+            return False
+
+
+_coalescer = DeletionCoalescer()
+
+
+async def delete_message(bot: Bot, chat_id: int, message_id: int) -> bool:
+    """Delete a message through the coalescer. Returns True only if this
+    request deleted it (False if it failed or the message was already gone)."""
+    return await _coalescer.delete(bot, chat_id, message_id)
+
+
+def get_deletion_stats() -> dict:
+    return dict(_coalescer.stats)
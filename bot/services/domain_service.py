@@ -0,0 +1,350 @@
+"""
+Vex - Domain Reputation
+Per-group and global allow / deny lists of link domains. Rules live in a
+suffix trie keyed by reversed labels (com → example → www), so a rule on
+example.com covers every subdomain and a lookup walks at most one node per
+label; the most specific rule wins, and a group's rule beats a global one
+on the same domain.
+
+Hosts are taken from a message in one pass: a single regex over the text
+(which also finds every url entity, those are plain text) plus the hidden
+targets of text_link entities. Links on known shorteners are resolved to
+their target with a HEAD request that does not follow redirects; results
+are cached and lookups are bounded (MAX_CONCURRENT_RESOLVES at once, at
+most MAX_RESOLVES_PER_MINUTE), a shortener that cannot be resolved is
+judged as itself.
+
+The lists are reloaded after a "domain_rules" invalidation event (key:
+telegram group ID, None = global).
+"""
+import asyncio
+import logging
+import re
+import time
+from collections import Counter, OrderedDict, deque
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+from sqlalchemy import select
+from telegram import Message
+
+from db.database import get_db
+from db.models import DomainRule, ManagedGroup
+from bot.core.invalidation import on_invalidate, publish_invalidation
+
+logger = logging.getLogger("vex.services.domain")
+
+ACTIONS = ("allow", "deny")
+
+# Governed by the group's "telegram_link" media setting instead of "link"
+TELEGRAM_DOMAINS = ("t.me", "telegram.me", "telegram.dog")
+SHORTENERS = frozenset({
+    "bit.ly", "tinyurl.com", "t.co", "goo.gl", "ow.ly", "is.gd", "buff.ly",
+    "cutt.ly", "rebrand.ly", "shorturl.at", "rb.gy", "tiny.cc", "s.id",
+})
+RESOLVE_TIMEOUT_SECONDS = 3.0
+MAX_CONCURRENT_RESOLVES = 4
+MAX_RESOLVES_PER_MINUTE = 60
+RESOLVE_CACHE_SIZE = 5_000
+RESOLVE_TTL_SECONDS = 6 * 3600
+# Hosts judged per message (a wall of links is decided by its first ones)
+MAX_HOSTS = 20
+
+# scheme://host or www.host or bare domain with a known-looking TLD
+_URL_PATTERN = re.compile(
+    r"(?:https?://|www\.)[^\s<>\"']+|(?<![@\w.-])(?:[a-z0-9-]+\.)+[a-z]{2,}(?:/[^\s<>\"']*)?",
+    re.IGNORECASE,
+)
+_resolve_slots = asyncio.Semaphore(MAX_CONCURRENT_RESOLVES)
+_resolve_times: deque = deque()
+stats: Counter = Counter()
+
+
+def normalize_domain(value: str) -> Optional[str]:
+    """Bare lowercase host of a domain or URL ("https://WWW.Example.com/x" → "www.example.com")."""
+    value = value.strip().lower()
+    if not value:
+        return None
+    if "://" not in value:
+        value = "http://" + value
+    try:
+        host = urlsplit(value).hostname
+    except ValueError:
+        return None
+    if not host or "." not in host:
+        return None
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    return host.rstrip(".")
+
+
+class DomainTrie:
+    """Suffix trie over reversed domain labels."""
+
+    def __init__(self, rules=()):
+        self._root: dict = {}
+        self.size = 0
+        for domain, action in rules:
+            self.add(domain, action)
+
+    def add(self, domain: str, action: str) -> None:
+        node = self._root
+        for label in reversed(domain.split(".")):
+            node = node.setdefault(label, {})
+        if "" not in node:
+            self.size += 1
+        node[""] = action   # "" can never be a label
+
+    def lookup(self, host: str) -> tuple[Optional[str], int]:
+        """(action, matched labels) of the most specific rule covering `host`."""
+        node = self._root
+        action, depth = None, 0
+        for i, label in enumerate(reversed(host.split(".")), 1):
+            node = node.get(label)
+            if node is None:
+                break
+            if "" in node:
+                action, depth = node[""], i
+        return action, depth
+
+
+# ─── Extraction ───────────────────────────────────────────────
+
+def extract_urls(message: Message) -> List[str]:
+    """Every link in the message text / caption and behind text_link entities."""
+    text = message.text or message.caption or ""
+    urls = _URL_PATTERN.findall(text)
+    for entity in message.entities or message.caption_entities or ():
+        if entity.type == "text_link" and entity.url:
+            urls.append(entity.url)
+    return urls
+
+
+# ─── Shorteners ───────────────────────────────────────────────
+
+_resolved: "OrderedDict[str, tuple[float, Optional[str]]]" = OrderedDict()   # url → (time, host)
+
+
+def _take_resolve_budget() -> bool:
+    now = time.monotonic()
+    while _resolve_times and now - _resolve_times[0] > 60:
+        _resolve_times.popleft()
+    if len(_resolve_times) >= MAX_RESOLVES_PER_MINUTE:
+        return False
+    _resolve_times.append(now)
+    return True
+
+
+async def resolve_shortener(url: str) -> Optional[str]:
+    """Target host of a shortened link (cached), or None if unknown."""
+    if "://" not in url:
+        url = "https://" + url
+    cached = _resolved.get(url)
+    if cached and time.monotonic() - cached[0] < RESOLVE_TTL_SECONDS:
+        _resolved.move_to_end(url)
+        stats["resolve_cache_hits"] += 1
+        return cached[1]
+    if not _take_resolve_budget():
+        stats["resolve_throttled"] += 1
+        return None
+
+    import httpx
+    host = None
+    async with _resolve_slots:
+        try:
+            async with httpx.AsyncClient(timeout=RESOLVE_TIMEOUT_SECONDS, follow_redirects=False) as client:
+                resp = await client.head(url)
+            location = resp.headers.get("location")
+            if location:
+                host = normalize_domain(location)
+            stats["resolved"] += 1
+        except Exception as e:
+            stats["resolve_errors"] += 1
+            logger.debug(f"[DOMAINS] Could not resolve {url}: {e}")
+    _resolved[url] = (time.monotonic(), host)
+    if len(_resolved) > RESOLVE_CACHE_SIZE:
+        _resolved.popitem(last=False)
+    return host
+
+
+# ─── Lists ────────────────────────────────────────────────────
+
+_global: Optional[DomainTrie] = None
+_groups: dict[int, DomainTrie] = {}
+
+
+def invalidate_domain_rules(telegram_group_id: Optional[int] = None) -> None:
+    global _global
+    if telegram_group_id is None:
+        _global = None
+        _groups.clear()
+    else:
+        _groups.pop(telegram_group_id, None)
+
+
+on_invalidate("domain_rules", invalidate_domain_rules)
+
+
+async def _load(telegram_group_id: Optional[int]) -> DomainTrie:
+    async with get_db() as session:
+        query = select(DomainRule.domain, DomainRule.action)
+        if telegram_group_id is None:
+            query = query.where(DomainRule.group_id.is_(None))
+        else:
+            query = query.join(ManagedGroup, DomainRule.group_id == ManagedGroup.id).where(
+                ManagedGroup.telegram_group_id == telegram_group_id
+            )
+        rows = (await session.execute(query)).all()
+    return DomainTrie(rows)
+
+
+async def _tries(telegram_group_id: int) -> tuple[DomainTrie, DomainTrie]:
+    global _global
+    if _global is None:
+        _global = await _load(None)
+    group = _groups.get(telegram_group_id)
+    if group is None:
+        group = _groups[telegram_group_id] = await _load(telegram_group_id)
+    return group, _global
+
+
+def _judge(host: str, group: DomainTrie, global_: DomainTrie) -> Optional[str]:
+    group_action, group_depth = group.lookup(host)
+    global_action, global_depth = global_.lookup(host)
+    if group_action and group_depth >= global_depth:
+        return group_action
+    return global_action
+
+
+def is_telegram_host(host: str) -> bool:
+    return any(host == d or host.endswith("." + d) for d in TELEGRAM_DOMAINS)
+
+
+async def check_links(telegram_group_id: int, message: Message) -> tuple[Optional[str], List[str]]:
+    """Verdict on the links of a message: ("deny", [host]) if any host is
+    denied, ("allow", hosts) if every host is allowed, else (None, hosts
+    without a rule) and the group's link settings decide."""
+    links: dict[str, str] = {}          # host → first URL seen for it
+    for url in extract_urls(message):
+        host = normalize_domain(url)
+        if host and host not in links:
+            links[host] = url
+            if len(links) >= MAX_HOSTS:
+                break
+    if not links:
+        return None, []
+    stats["checked"] += 1
+
+    group, global_ = await _tries(telegram_group_id)
+    if not group.size and not global_.size:
+        return None, list(links)
+
+    unknown = []
+    for host, url in links.items():
+        action = _judge(host, group, global_)
+        if action is None and host in SHORTENERS:
+            target = await resolve_shortener(url)
+            if target:
+                action = _judge(target, group, global_)
+        if action == "deny":
+            stats["denied"] += 1
+            return "deny", [host]
+        if action is None:
+            unknown.append(host)
+    if not unknown:
+        stats["allowed"] += 1
+        return "allow", list(links)
+    return None, unknown
+
+
+# ─── Management ───────────────────────────────────────────────
+
+async def _group_db_id(session, telegram_group_id: int) -> Optional[int]:
+    result = await session.execute(
+        select(ManagedGroup.id).where(ManagedGroup.telegram_group_id == telegram_group_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def add_domain_rule(
+    telegram_group_id: Optional[int], domain: str, action: str, added_by: Optional[int] = None,
+) -> str:
+    """Allow or deny a domain (and its subdomains) in a group (None = everywhere).
+    An existing rule on the same domain is replaced."""
+    host = normalize_domain(domain)
+    if not host:
+        return "⚠️ نطاق غير صالح"
+    async with get_db() as session:
+        group_id = None
+        if telegram_group_id is not None:
+            group_id = await _group_db_id(session, telegram_group_id)
+            if group_id is None:
+                return "⚠️ المجموعة غير مفعلة"
+
+        result = await session.execute(
+            select(DomainRule).where(
+                DomainRule.group_id.is_(None) if group_id is None else DomainRule.group_id == group_id,
+                DomainRule.domain == host,
+            )
+        )
+        existing = result.scalar_one_or_none()
+        if existing:
+            if existing.action == action:
+                return "⚠️ القاعدة موجودة مسبقاً"
+            existing.action = action
+        else:
+            session.add(DomainRule(group_id=group_id, domain=host, action=action, added_by=added_by))
+
+    await publish_invalidation("domain_rules", telegram_group_id)
+    what = "السماح بالنطاق" if action == "allow" else "حظر النطاق"
+    where = "في جميع المجموعات" if telegram_group_id is None else "في هذه المجموعة"
+    return f"✅ تم {what} {host} {where}"
+
+
+async def list_domain_rules(group_db_id: Optional[int]) -> List[dict]:
+    """Domain rules of a group (None = global list) — used by the web dashboard."""
+    async with get_db() as session:
+        result = await session.execute(
+            select(DomainRule)
+            .where(DomainRule.group_id.is_(None) if group_db_id is None else DomainRule.group_id == group_db_id)
+            .order_by(DomainRule.domain)
+        )
+        return [
+            {
+                "id": r.id,
+                "domain": r.domain,
+                "action": r.action,
+                "created_at": r.created_at.isoformat() if r.created_at else None,
+            }
+            for r in result.scalars().all()
+        ]
+
+
+async def delete_domain_rule_by_id(rule_id: int) -> bool:
+    """Delete a domain rule by its DB primary key. Returns True if deleted."""
+    async with get_db() as session:
+        result = await session.execute(
+            select(DomainRule, ManagedGroup.telegram_group_id)
+            .outerjoin(ManagedGroup, DomainRule.group_id == ManagedGroup.id)
+            .where(DomainRule.id == rule_id)
+        )
+        row = result.one_or_none()
+        if not row:
+            return False
+        await session.delete(row[0])
+
+    await publish_invalidation("domain_rules", row[1])
+    return True
+
+
+def get_domain_stats() -> dict:
+    return {
+        "global_rules": _global.size if _global else None,
+        "cached_groups": len(_groups),
+        "resolved_cached": len(_resolved),
+        **{k: stats[k] for k in (
+            "checked", "denied", "allowed", "resolved", "resolve_cache_hits", "resolve_throttled", "resolve_errors",
+        )},
+    }
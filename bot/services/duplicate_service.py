@@ -0,0 +1,205 @@
+"""
+Vex - Duplicate Detection
+Rolling index of recent normalized messages across all managed groups,
+for copy-paste spam campaigns.
+
+Each message is matched first by exact fingerprint, then by a MinHash
+signature of its character 4-grams: texts whose estimated Jaccard
+similarity reaches MIN_SIMILARITY are the same message with small edits.
+Signatures are split into LSH_BANDS bands and indexed per band, so
+candidates are found with a few dict lookups instead of a scan (two texts
+at 0.8 similarity share a band ~98% of the time, at 0.3 only ~6%).
+
+Matching messages form a cluster. Once a cluster has spread over enough
+distinct groups, or over more than one group by enough distinct users,
+it is flagged: its earlier copies are returned for deletion, and later
+copies are deleted on sight without further analysis. The same text from
+several members of one group is ordinary chatter (greetings, du'a
+chains) and is never flagged. Clusters expire TTL_SECONDS after their
+last copy, and at most MAX_CLUSTERS are kept (least recently seen go
+first).
+"""
+import hashlib
+import itertools
+import logging
+import random
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from bot.services.alert_aggregator import text_fingerprint
+
+logger = logging.getLogger("vex.services.duplicates")
+
+# Shorter texts ("السلام عليكم") repeat naturally
+MIN_TEXT_CHARS = 25
+# A cluster is flagged once posted in this many groups, or by this many
+# users across at least MIN_GROUPS groups
+USER_THRESHOLD = 3
+GROUP_THRESHOLD = 3
+MIN_GROUPS = 2
+TTL_SECONDS = 900
+MAX_CLUSTERS = 20_000
+# Copies remembered per cluster (for deleting them once it is flagged)
+MAX_COPIES = 200
+
+SHINGLE = 4
+MIN_SIMILARITY = 0.7
+LSH_BANDS, LSH_ROWS = 8, 4
+NUM_PERM = LSH_BANDS * LSH_ROWS
+_PRIME = (1 << 61) - 1
+# Fixed seed: signatures must agree across restarts and processes
+_rng = random.Random(0x5EED)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(NUM_PERM)]
+
+
+@dataclass
+class Copy:
+    chat_id: int
+    message_id: int
+    user_id: int
+    user_name: str
+    text: str
+
+
+@dataclass
+class Cluster:
+    id: int
+    fingerprint: str
+    signature: tuple[int, ...]
+    last_seen: float = field(default_factory=time.monotonic)
+    users: set[int] = field(default_factory=set)
+    chats: set[int] = field(default_factory=set)
+    copies: list[Copy] = field(default_factory=list)
+    total: int = 0
+    flagged: bool = False
+
+
+def minhash(text: str) -> tuple[int, ...]:
+    """MinHash signature over the character shingles of `text`."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(text[i:i + SHINGLE].encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(max(1, len(text) - SHINGLE + 1))
+    ]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS)
+
+
+def similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def _bands(signature: tuple[int, ...]) -> list[tuple]:
+    return [(i, signature[i * LSH_ROWS:(i + 1) * LSH_ROWS]) for i in range(LSH_BANDS)]
+
+
+class DuplicateIndex:
+    def __init__(self, ttl: float = TTL_SECONDS, max_clusters: int = MAX_CLUSTERS):
+        self.ttl = ttl
+        self.max_clusters = max_clusters
+        self._ids = itertools.count(1)
+        self._clusters: "OrderedDict[int, Cluster]" = OrderedDict()   # by last activity
+        self._exact: dict[str, int] = {}                               # fingerprint → cluster
+        self._bands: dict[tuple, set[int]] = {}                        # (band, rows) → clusters
+        self.stats: Counter = Counter()
+
+    def _find_near(self, signature: tuple[int, ...]) -> Optional[Cluster]:
+        candidates = set().union(*(self._bands.get(b, ()) for b in _bands(signature)))
+        scored = [(similarity(self._clusters[c].signature, signature), c) for c in candidates]
+        best = max(scored, default=None)
+        if best and best[0] >= MIN_SIMILARITY:
+            self.stats["near"] += 1
+            return self._clusters[best[1]]
+        return None
+
+    def _add(self, fingerprint: str, signature: tuple[int, ...]) -> Cluster:
+        cluster = Cluster(id=next(self._ids), fingerprint=fingerprint, signature=signature)
+        self._clusters[cluster.id] = cluster
+        self._exact[fingerprint] = cluster.id
+        for band in _bands(signature):
+            self._bands.setdefault(band, set()).add(cluster.id)
+        return cluster
+
+    def _drop(self, cluster: Cluster) -> None:
+        del self._clusters[cluster.id]
+        if self._exact.get(cluster.fingerprint) == cluster.id:
+            del self._exact[cluster.fingerprint]
+        for band in _bands(cluster.signature):
+            members = self._bands.get(band)
+            if members:
+                members.discard(cluster.id)
+                if not members:
+                    del self._bands[band]
+
+    def _evict(self, now: float) -> None:
+        while self._clusters:
+            oldest = next(iter(self._clusters.values()))
+            if len(self._clusters) <= self.max_clusters and now - oldest.last_seen < self.ttl:
+                break
+            self._drop(oldest)
+            self.stats["evicted"] += 1
+
+    def check(self, normalized_text: str, copy: Copy) -> tuple[Optional[Cluster], list[Copy]]:
+        """Index one message. Returns its cluster if that is flagged, with the
+        copies to delete (this one included); otherwise (None, [])."""
+        text = " ".join(normalized_text.split())
+        if len(text) < MIN_TEXT_CHARS:
+            return None, []
+        now = time.monotonic()
+        self._evict(now)
+        self.stats["indexed"] += 1
+
+        fingerprint = text_fingerprint(text)
+        cluster_id = self._exact.get(fingerprint)
+        if cluster_id is not None:
+            self.stats["exact"] += 1
+            cluster = self._clusters[cluster_id]
+        else:
+            # Signatures are only computed for texts not seen verbatim
+            signature = minhash(text)
+            cluster = self._find_near(signature) or self._add(fingerprint, signature)
+        self._clusters.move_to_end(cluster.id)
+        cluster.last_seen = now
+        cluster.total += 1
+        cluster.users.add(copy.user_id)
+        cluster.chats.add(copy.chat_id)
+
+        if cluster.flagged:
+            self.stats["deleted_on_sight"] += 1
+            return cluster, [copy]
+        if len(cluster.copies) < MAX_COPIES:
+            cluster.copies.append(copy)
+        spread = len(cluster.chats) >= GROUP_THRESHOLD or (
+            len(cluster.chats) >= MIN_GROUPS and len(cluster.users) >= USER_THRESHOLD
+        )
+        if not spread:
+            return None, []
+
+        cluster.flagged = True
+        self.stats["flagged"] += 1
+        copies, cluster.copies = cluster.copies, []
+        logger.info(
+            f"[DUPES] Cluster #{cluster.id} flagged: {cluster.total} copies, "
+            f"{len(cluster.users)} users, {len(cluster.chats)} groups"
+        )
+        return cluster, copies
+
+    def metrics(self) -> dict:
+        return {
+            "clusters": len(self._clusters),
+            "flagged_clusters": sum(c.flagged for c in self._clusters.values()),
+            **{k: self.stats[k] for k in ("indexed", "exact", "near", "flagged", "deleted_on_sight", "evicted")},
+        }
+
+
+_index = DuplicateIndex()
+
+
+def check_duplicate(normalized_text: str, copy: Copy) -> tuple[Optional[Cluster], list[Copy]]:
+    """See DuplicateIndex.check."""
+    return _index.check(normalized_text, copy)
+
+
+def get_duplicate_stats() -> dict:
+    return _index.metrics()
@@ -0,0 +1,263 @@
+"""
+Vex - Strike Escalation
+Every message a filter deletes is a strike against its sender. Strikes are
+counted per (group, member) in BUCKET_SECONDS time buckets, so the count
+over a group's window is a sum of a few buckets and old strikes simply
+fall out. Reaching the mute rung mutes the member, reaching the ban rung
+bans them.
+
+Counters live in memory (bounded, least recently struck go first) and are
+written behind: changed entries are saved every FLUSH_INTERVAL_SECONDS
+and on shutdown, and loaded again on a member's next strike, so a restart
+does not wipe the ladder. Fan-out routes a group's updates to one
+process, which therefore owns that group's counters.
+
+The ladder lives in managed_groups.escalation_policy (overrides of
+DEFAULT_ESCALATION_POLICY), cached until a "group" invalidation event.
+"""
+import logging
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from bot.core.invalidation import on_invalidate
+from bot.services.group_service import get_group_escalation_policy
+from db.database import engine, get_db
+from db.models import MemberStrikes
+
+logger = logging.getLogger("vex.services.escalation")
+
+DEFAULT_ESCALATION_POLICY = {
+    "enabled": True,
+    # Strikes older than this no longer count
+    "window_minutes": 60,
+    # This many strikes in the window mute the member for mute_minutes …
+    "mute_strikes": 3,
+    "mute_minutes": 60,
+    # … and this many ban them (0 disables a rung)
+    "ban_strikes": 5,
+}
+BUCKET_SECONDS = 300
+MAX_WINDOW_MINUTES = 7 * 24 * 60
+MAX_TRACKED = 50_000
+FLUSH_INTERVAL_SECONDS = 60
+# Rows per upsert (SQLite caps the bound parameters of one statement)
+FLUSH_BATCH_SIZE = 100
+
+_policies: dict[int, dict] = {}
+# (chat, user) → {bucket start: strikes}, in order of the last strike
+_strikes: "OrderedDict[tuple[int, int], dict[int, int]]" = OrderedDict()
+_dirty: set[tuple[int, int]] = set()
+_evicted: dict[tuple[int, int], dict[int, int]] = {}     # dirty, out of memory, not yet written
+stats: Counter = Counter()
+
+
+def _invalidate(chat_id: Optional[int] = None) -> None:
+    if chat_id is None:
+        _policies.clear()
+    else:
+        _policies.pop(chat_id, None)
+
+
+on_invalidate("group", _invalidate)
+
+
+async def get_escalation_policy(chat_id: int) -> dict:
+    """Effective strike ladder for a group: defaults merged with its overrides."""
+    cached = _policies.get(chat_id)
+    if cached is not None:
+        return cached
+    overrides = await get_group_escalation_policy(chat_id) or {}
+    policy = {**DEFAULT_ESCALATION_POLICY, **{k: v for k, v in overrides.items() if k in DEFAULT_ESCALATION_POLICY}}
+    policy["window_minutes"] = max(1, min(MAX_WINDOW_MINUTES, int(policy["window_minutes"])))
+    _policies[chat_id] = policy
+    return policy
+
+
+# ─── Counters ─────────────────────────────────────────────────────────────────
+
+async def _load(key: tuple[int, int]) -> dict[int, int]:
+    async with get_db() as session:
+        row = await session.get(MemberStrikes, key)
+        return {int(start): int(count) for start, count in row.buckets} if row else {}
+
+
+async def _buckets(key: tuple[int, int]) -> dict[int, int]:
+    buckets = _strikes.get(key)
+    if buckets is not None:
+        _strikes.move_to_end(key)
+        return buckets
+
+    buckets = _evicted.get(key)
+    if buckets is None:
+        try:
+            buckets = await _load(key)
+            stats["loaded"] += 1
+        except Exception as e:
+            # Counted from zero; the stored row is merged over on the next flush
+            stats["load_errors"] += 1
+            logger.warning(f"[ESCALATION] Could not load strikes of {key}: {e}")
+            buckets = {}
+        # Another strike of the member may have loaded it meanwhile
+        if key in _strikes:
+            return _strikes[key]
+
+    _strikes[key] = buckets
+    while len(_strikes) > MAX_TRACKED:
+        old_key, old = _strikes.popitem(last=False)
+        if old_key in _dirty:
+            _evicted[old_key] = old
+    return buckets
+
+
+def _prune(buckets: dict[int, int], now: float) -> None:
+    oldest = now - MAX_WINDOW_MINUTES * 60 - BUCKET_SECONDS
+    for start in [s for s in buckets if s < oldest]:
+        del buckets[start]
+
+
+async def add_strike(chat_id: int, user_id: int) -> Optional[tuple[str, dict]]:
+    """Count a strike. Returns ("mute" | "ban", policy) when the member's
+    strikes within the window reach a rung, else None."""
+    policy = await get_escalation_policy(chat_id)
+    if not policy["enabled"]:
+        return None
+
+    now = time.time()
+    key = (chat_id, user_id)
+    buckets = await _buckets(key)
+    start = int(now // BUCKET_SECONDS * BUCKET_SECONDS)
+    buckets[start] = buckets.get(start, 0) + 1
+    _prune(buckets, now)
+    _dirty.add(key)
+    stats["strikes"] += 1
+
+    since = now - policy["window_minutes"] * 60
+    # A bucket counts while any part of it is inside the window
+    strikes = sum(n for s, n in buckets.items() if s + BUCKET_SECONDS > since)
+    if policy["ban_strikes"] and strikes >= policy["ban_strikes"]:
+        action = "ban"
+    elif policy["mute_strikes"] and strikes >= policy["mute_strikes"]:
+        action = "mute"
+    else:
+        return None
+
+    stats[action] += 1
+    logger.info(f"[ESCALATION] {strikes} strikes for {user_id} in {chat_id} → {action}")
+    if action == "ban":
+        # A banned member starts over if an admin lets them back in
+        buckets.clear()
+    return action, policy
+
+
+def get_strikes(chat_id: int, user_id: int, window_minutes: int) -> int:
+    """Strikes of a member within the last window_minutes (in-memory only)."""
+    since = time.time() - window_minutes * 60
+    buckets = _strikes.get((chat_id, user_id)) or _evicted.get((chat_id, user_id)) or {}
+    return sum(n for s, n in buckets.items() if s + BUCKET_SECONDS > since)
+
+
+def forgive(chat_id: int, user_id: int) -> None:
+    """Clear a member's strikes (e.g. an admin unmuted or unbanned them)."""
+    key = (chat_id, user_id)
+    buckets = _strikes.get(key)
+    if buckets is None:
+        buckets = _strikes[key] = {}
+    buckets.clear()
+    _evicted.pop(key, None)
+    _dirty.add(key)
+
+
+# ─── Write-behind ─────────────────────────────────────────────────────────────
+
+async def _write(rows: list[dict], empty: list[tuple[int, int]]) -> None:
+    async with get_db() as session:
+        if rows:
+            insert = pg_insert if engine.dialect.name == "postgresql" else sqlite_insert
+            stmt = insert(MemberStrikes).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[MemberStrikes.chat_id, MemberStrikes.user_id],
+                set_={"buckets": stmt.excluded.buckets, "updated_at": func.now()},
+            )
+            await session.execute(stmt)
+        for chat_id, user_id in empty:
+            await session.execute(
+                delete(MemberStrikes).where(MemberStrikes.chat_id == chat_id, MemberStrikes.user_id == user_id)
+            )
+
+
+async def flush_strikes() -> int:
+    """Write every changed counter (empty ones are deleted). Returns the
+    number written; what fails stays dirty for the next flush."""
+    if not _dirty:
+        return 0
+    now = time.time()
+    keys = list(_dirty)
+    _dirty.clear()
+    written = 0
+    for i in range(0, len(keys), FLUSH_BATCH_SIZE):
+        rows, empty = [], []
+        for key in keys[i:i + FLUSH_BATCH_SIZE]:
+            buckets = _strikes.get(key)
+            if buckets is None:
+                buckets = _evicted.get(key)
+            if buckets is None:
+                continue
+            _prune(buckets, now)
+            if buckets:
+                rows.append({"chat_id": key[0], "user_id": key[1], "buckets": sorted(buckets.items())})
+            else:
+                empty.append(key)
+        if not rows and not empty:
+            continue
+        try:
+            await _write(rows, empty)
+        except Exception as e:
+            stats["flush_errors"] += 1
+            logger.warning(f"[ESCALATION] Flush failed, {len(keys) - i} counters kept for retry: {e}")
+            _dirty.update(keys[i:])
+            keys = keys[:i]
+            break
+        written += len(rows) + len(empty)
+    for key in keys:
+        if key not in _dirty:
+            _evicted.pop(key, None)
+    stats["flushed"] += written
+    return written
+
+
+async def purge_expired() -> int:
+    """Delete stored counters not touched for the longest possible window."""
+    cutoff = datetime.utcnow() - timedelta(minutes=MAX_WINDOW_MINUTES)
+    async with get_db() as session:
+        result = await session.execute(delete(MemberStrikes).where(MemberStrikes.updated_at < cutoff))
+        return result.rowcount or 0
+
+
+async def escalation_flush_job(context) -> None:
+    """Periodic write-behind (job queue)."""
+    await flush_strikes()
+
+
+async def escalation_purge_job(context) -> None:
+    """Daily clean-up of stale counters (job queue)."""
+    try:
+        removed = await purge_expired()
+        if removed:
+            logger.info(f"[ESCALATION] Removed {removed} stale strike counters")
+    except Exception as e:
+        logger.warning(f"[ESCALATION] Purge failed: {e}")
+
+
+def get_escalation_stats() -> dict:
+    return {
+        "tracked": len(_strikes),
+        "dirty": len(_dirty),
+        "pending_evicted": len(_evicted),
+        **{k: stats[k] for k in ("strikes", "mute", "ban", "loaded", "flushed", "flush_errors", "load_errors")},
+    }
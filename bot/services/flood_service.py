@@ -0,0 +1,126 @@
+"""
+Vex - Anti-Flood
+Per (chat, user) sliding windows of message timestamps. Each entry is a
+ring of max_messages + 1 timestamps, so a check is O(1): the user is
+flooding when the ring is full and its oldest timestamp is still inside
+the window. Entries idle longer than IDLE_SECONDS are evicted, and
+MAX_TRACKED bounds the total (least recently active go first).
+
+Limits and the action (delete / mute / kick) live in
+managed_groups.flood_policy (overrides of DEFAULT_FLOOD_POLICY), cached
+until a "group" invalidation event.
+"""
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from bot.core.invalidation import on_invalidate
+from bot.services.group_service import get_group_flood_policy
+
+logger = logging.getLogger("vex.services.flood")
+
+DEFAULT_FLOOD_POLICY = {
+    "enabled": True,
+    # More than max_messages within window_seconds is a flood
+    "max_messages": 6,
+    "window_seconds": 10,
+    # delete = drop the extra messages; mute / kick also act on the sender
+    "action": "mute",
+    "mute_minutes": 10,
+}
+FLOOD_ACTIONS = ("delete", "mute", "kick")
+MAX_LIMIT = 50
+IDLE_SECONDS = 300
+MAX_TRACKED = 50_000
+
+
+@dataclass
+class _Entry:
+    times: deque = field(default_factory=deque)
+    # Until then the sender's messages are deleted without another action
+    punished_until: float = 0.0
+
+
+@dataclass
+class FloodVerdict:
+    policy: dict
+    # True for the message that crossed the limit: apply the group's action
+    punish: bool
+
+
+_policies: dict[int, dict] = {}
+_entries: "OrderedDict[tuple[int, int], _Entry]" = OrderedDict()
+stats: Counter = Counter()
+
+
+def _invalidate(chat_id: Optional[int] = None) -> None:
+    if chat_id is None:
+        _policies.clear()
+    else:
+        _policies.pop(chat_id, None)
+
+
+on_invalidate("group", _invalidate)
+
+
+async def get_flood_policy(chat_id: int) -> dict:
+    """Effective anti-flood policy for a group: defaults merged with its overrides."""
+    cached = _policies.get(chat_id)
+    if cached is not None:
+        return cached
+    overrides = await get_group_flood_policy(chat_id) or {}
+    policy = {**DEFAULT_FLOOD_POLICY, **{k: v for k, v in overrides.items() if k in DEFAULT_FLOOD_POLICY}}
+    policy["max_messages"] = max(1, min(MAX_LIMIT, int(policy["max_messages"])))
+    _policies[chat_id] = policy
+    return policy
+
+
+def _evict(now: float) -> None:
+    """Drop idle entries from the cold end; the dict is in activity order."""
+    while _entries:
+        key, entry = next(iter(_entries.items()))
+        if len(_entries) <= MAX_TRACKED and now - entry.times[-1] < IDLE_SECONDS:
+            break
+        del _entries[key]
+        stats["evicted"] += 1
+
+
+async def check_flood(chat_id: int, user_id: int) -> Optional[FloodVerdict]:
+    """Record one message. Returns a verdict when it exceeds the group's limit."""
+    policy = await get_flood_policy(chat_id)
+    if not policy["enabled"]:
+        return None
+
+    now = time.monotonic()
+    key = (chat_id, user_id)
+    limit = policy["max_messages"]
+    entry = _entries.get(key)
+    if entry is None or entry.times.maxlen != limit + 1:
+        entry = _entries[key] = _Entry(times=deque(maxlen=limit + 1))
+    _entries.move_to_end(key)
+    entry.times.append(now)
+    _evict(now)
+
+    if entry.punished_until > now:
+        stats["dropped"] += 1
+        return FloodVerdict(policy=policy, punish=False)
+    if len(entry.times) <= limit or now - entry.times[0] > policy["window_seconds"]:
+        return None
+
+    stats["floods"] += 1
+    # Extra messages are dropped for the mute, otherwise for one window
+    hold = policy["mute_minutes"] * 60 if policy["action"] == "mute" else policy["window_seconds"]
+    entry.punished_until = now + hold
+    logger.info(f"[FLOOD] User {user_id} flooding in {chat_id} ({limit + 1} msgs < {policy['window_seconds']}s)")
+    return FloodVerdict(policy=policy, punish=True)
+
+
+def forgive(chat_id: int, user_id: int) -> None:
+    """Forget a sender's history (exempt users that tripped the limit)."""
+    _entries.pop((chat_id, user_id), None)
+
+
+def get_flood_stats() -> dict:
+    return {"tracked": len(_entries), **{k: stats[k] for k in ("floods", "dropped", "evicted")}}
@@ -9,6 +9,7 @@ from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 
 from db.database import get_db
+from bot.core.invalidation import on_invalidate, publish_invalidation
 from db.models import (
     ManagedGroup, BlockedWord, AllowedWord, GroupSchedule,
     WelcomeConfig, RulesConfig,
@@ -16,6 +17,23 @@ from db.models import (
 
 logger = logging.getLogger("vex.services.group")
 
+# Read on every group message; kept until a "group" invalidation event
+_managed: dict[int, bool] = {}
+_blocked_words: dict[int, List[str]] = {}
+_media_settings: dict[int, dict] = {}
+
+
+def invalidate_group_cache(telegram_group_id: Optional[int] = None) -> None:
+    """Drop cached group settings (all groups if telegram_group_id is None)."""
+    for cache in (_managed, _blocked_words, _media_settings):
+        if telegram_group_id is None:
+            cache.clear()
+        else:
+            cache.pop(telegram_group_id, None)
+
+
+on_invalidate("group", invalidate_group_cache)
+
 
 async def get_group_by_id(group_db_id: int):
     """Return a ManagedGroup row by its DB primary key."""
@@ -60,7 +78,8 @@ async def activate_group(
         # Create default schedule config
         session.add(GroupSchedule(group=group))
 
-        return "✅ تم تفعيل المجموعة"
+    await publish_invalidation("group", telegram_group_id)
+    return "✅ تم تفعيل المجموعة"
 
 
 async def deactivate_group(telegram_group_id: int) -> str:
@@ -72,10 +91,13 @@ async def deactivate_group(telegram_group_id: int) -> str:
             )
         )
         group = result.scalar_one_or_none()
-        if group:
-            await session.delete(group)
-            return "☑️ تم الغاء تفعيل المجموعة"
-        return "⚠️ المجموعة ليست مفعلة"
+        if not group:
+            return "⚠️ المجموعة ليست مفعلة"
+        await session.delete(group)
+
+    await publish_invalidation("group", telegram_group_id)
+    await publish_invalidation("ai_policy", telegram_group_id)
+    return "☑️ تم الغاء تفعيل المجموعة"
 
 
 async def get_managed_group(telegram_group_id: int) -> Optional[ManagedGroup]:
@@ -106,14 +128,19 @@ async def list_managed_groups() -> List[ManagedGroup]:
 
 async def is_managed_group(telegram_group_id: int) -> bool:
     """Check if a group is managed"""
+    cached = _managed.get(telegram_group_id)
+    if cached is not None:
+        return cached
     async with get_db() as session:
         result = await session.execute(
-            select(ManagedGroup).where(
+            select(ManagedGroup.id).where(
                 ManagedGroup.telegram_group_id == telegram_group_id,
                 ManagedGroup.is_active == True,
             )
         )
-        return result.scalar_one_or_none() is not None
+        managed = result.scalar_one_or_none() is not None
+    _managed[telegram_group_id] = managed
+    return managed
 
 
 async def get_group_count() -> int:
@@ -127,20 +154,33 @@ async def get_group_count() -> int:
 
 # ─── Media Settings ────────────────────────────────────────────
 
+# Set once an admin toggles telegram_link; until then Telegram links follow
+# "link" (they did before they had their own setting)
+TELEGRAM_LINK_SET = "telegram_link_set"
+
+
+def media_setting_value(settings: dict, media_type: str) -> bool:
+    """Effective value of one media setting in a group's settings dict"""
+    if media_type == "telegram_link" and not settings.get(TELEGRAM_LINK_SET):
+        return settings.get("link", True) and settings.get("telegram_link", True)
+    return settings.get(media_type, True)
+
+
 async def get_group_media_setting(
     telegram_group_id: int, media_type: str
 ) -> bool:
     """Get a specific media setting for a group (True=allowed, False=blocked)"""
-    async with get_db() as session:
-        result = await session.execute(
-            select(ManagedGroup).where(
-                ManagedGroup.telegram_group_id == telegram_group_id
+    settings = _media_settings.get(telegram_group_id)
+    if settings is None:
+        async with get_db() as session:
+            result = await session.execute(
+                select(ManagedGroup.media_settings).where(
+                    ManagedGroup.telegram_group_id == telegram_group_id
+                )
             )
-        )
-        group = result.scalar_one_or_none()
-        if group and group.media_settings:
-            return group.media_settings.get(media_type, True)
-        return True
+            settings = result.scalar_one_or_none() or {}
+        _media_settings[telegram_group_id] = settings
+    return media_setting_value(settings, media_type)
 
 
 async def toggle_media_setting(
@@ -156,11 +196,16 @@ async def toggle_media_setting(
         group = result.scalar_one_or_none()
         if group:
             settings = dict(group.media_settings)
-            current = settings.get(media_type, True)
+            current = media_setting_value(settings, media_type)
             settings[media_type] = not current
+            if media_type == "telegram_link":
+                settings[TELEGRAM_LINK_SET] = True
             group.media_settings = settings
-            return settings[media_type]
-        return True
+        else:
+            return True
+
+    await publish_invalidation("group", telegram_group_id)
+    return settings[media_type]
 
 
 # ─── Permission Settings ──────────────────────────────────────
@@ -199,6 +244,144 @@ async def toggle_permission_setting(
         return True
 
 
+# ─── AI Policy ────────────────────────────────────────────────
+
+async def get_group_ai_policy(telegram_group_id: int) -> Optional[dict]:
+    """Raw per-group AI policy overrides (None = defaults)."""
+    async with get_db() as session:
+        result = await session.execute(
+            select(ManagedGroup.ai_policy).where(
+                ManagedGroup.telegram_group_id == telegram_group_id
+            )
+        )
+        return result.scalar_one_or_none()
+
+
+async def set_group_ai_policy(group_db_id: int, policy: Optional[dict]) -> bool:
+    """Replace a group's AI policy overrides. Returns False if not found."""
+    async with get_db() as session:
+        group = await session.get(ManagedGroup, group_db_id)
+        if not group:
+            return False
+        group.ai_policy = policy
+        telegram_group_id = group.telegram_group_id
+
+    await publish_invalidation("ai_policy", telegram_group_id)
+    return True
+
+
+# ─── AI Rules ─────────────────────────────────────────────────
+
+async def get_group_ai_rules(telegram_group_id: int) -> tuple[Optional[str], Optional[float], Optional[float]]:
+    """Raw per-group AI rules, alert and auto-delete thresholds (None = bot-wide)."""
+    async with get_db() as session:
+        result = await session.execute(
+            select(
+                ManagedGroup.ai_rules, ManagedGroup.ai_alert_threshold, ManagedGroup.ai_auto_delete_threshold,
+            ).where(ManagedGroup.telegram_group_id == telegram_group_id)
+        )
+        row = result.one_or_none()
+        return tuple(row) if row else (None, None, None)
+
+
+async def set_group_ai_rules(
+    group_db_id: int,
+    rules: Optional[str],
+    alert_threshold: Optional[float],
+    auto_delete_threshold: Optional[float],
+) -> bool:
+    """Replace a group's AI rules and thresholds. Returns False if not found."""
+    async with get_db() as session:
+        group = await session.get(ManagedGroup, group_db_id)
+        if not group:
+            return False
+        group.ai_rules = rules
+        group.ai_alert_threshold = alert_threshold
+        group.ai_auto_delete_threshold = auto_delete_threshold
+        telegram_group_id = group.telegram_group_id
+
+    await publish_invalidation("group", telegram_group_id)
+    return True
+
+
+# ─── Raid Policy ──────────────────────────────────────────────
+
+async def get_group_raid_policy(telegram_group_id: int) -> Optional[dict]:
+    """Raw per-group raid detection overrides (None = defaults)."""
+    async with get_db() as session:
+        result = await session.execute(
+            select(ManagedGroup.raid_policy).where(
+                ManagedGroup.telegram_group_id == telegram_group_id
+            )
+        )
+        return result.scalar_one_or_none()
+
+
+async def set_group_raid_policy(group_db_id: int, policy: Optional[dict]) -> bool:
+    """Replace a group's raid detection overrides. Returns False if not found."""
+    async with get_db() as session:
+        group = await session.get(ManagedGroup, group_db_id)
+        if not group:
+            return False
+        group.raid_policy = policy
+        telegram_group_id = group.telegram_group_id
+
+    await publish_invalidation("group", telegram_group_id)
+    return True
+
+
+# ─── Flood Policy ──────────────────────────────────────────────
+
+async def get_group_flood_policy(telegram_group_id: int) -> Optional[dict]:
+    """Raw per-group anti-flood overrides (None = defaults)."""
+    async with get_db() as session:
+        result = await session.execute(
+            select(ManagedGroup.flood_policy).where(
+                ManagedGroup.telegram_group_id == telegram_group_id
+            )
+        )
+        return result.scalar_one_or_none()
+
+
+async def set_group_flood_policy(group_db_id: int, policy: Optional[dict]) -> bool:
+    """Replace a group's anti-flood overrides. Returns False if not found."""
+    async with get_db() as session:
+        group = await session.get(ManagedGroup, group_db_id)
+        if not group:
+            return False
+        group.flood_policy = policy
+        telegram_group_id = group.telegram_group_id
+
+    await publish_invalidation("group", telegram_group_id)
+    return True
+
+
+# ─── Escalation Policy ─────────────────────────────────────────
+
+async def get_group_escalation_policy(telegram_group_id: int) -> Optional[dict]:
+    """Raw per-group strike ladder overrides (None = defaults)."""
+    async with get_db() as session:
+        result = await session.execute(
+            select(ManagedGroup.escalation_policy).where(
+                ManagedGroup.telegram_group_id == telegram_group_id
+            )
+        )
+        return result.scalar_one_or_none()
+
+
+async def set_group_escalation_policy(group_db_id: int, policy: Optional[dict]) -> bool:
+    """Replace a group's strike ladder overrides. Returns False if not found."""
+    async with get_db() as session:
+        group = await session.get(ManagedGroup, group_db_id)
+        if not group:
+            return False
+        group.escalation_policy = policy
+        telegram_group_id = group.telegram_group_id
+
+    await publish_invalidation("group", telegram_group_id)
+    return True
+
+
 # ─── Blocked Words ─────────────────────────────────────────────
 
 async def add_blocked_word(telegram_group_id: int, word: str) -> str:
@@ -224,7 +407,9 @@ async def add_blocked_word(telegram_group_id: int, word: str) -> str:
             return "⚠️ الكلمة محظورة مسبقاً"
 
         session.add(BlockedWord(group_id=group.id, word=word))
-        return f"✅ تم حظر الكلمة: {word}"
+
+    await publish_invalidation("group", telegram_group_id)
+    return f"✅ تم حظر الكلمة: {word}"
 
 
 async def remove_blocked_word(telegram_group_id: int, word: str) -> str:
@@ -246,24 +431,31 @@ async def remove_blocked_word(telegram_group_id: int, word: str) -> str:
             )
         )
         bw = existing.scalar_one_or_none()
-        if bw:
-            await session.delete(bw)
-            return f"✅ تم الغاء حظر الكلمة: {word}"
-        return "❌ الكلمة ليست محظورة"
+        if not bw:
+            return "❌ الكلمة ليست محظورة"
+        await session.delete(bw)
+
+    await publish_invalidation("group", telegram_group_id)
+    return f"✅ تم الغاء حظر الكلمة: {word}"
 
 
 async def list_blocked_words(telegram_group_id: int) -> List[str]:
     """List all blocked words in a group"""
+    cached = _blocked_words.get(telegram_group_id)
+    if cached is not None:
+        return cached
     async with get_db() as session:
         result = await session.execute(
-            select(ManagedGroup)
-            .options(selectinload(ManagedGroup.blocked_words))
-            .where(ManagedGroup.telegram_group_id == telegram_group_id)
+            select(BlockedWord.word)
+            .join(ManagedGroup, BlockedWord.group_id == ManagedGroup.id)
+            .where(
+                ManagedGroup.telegram_group_id == telegram_group_id,
+                BlockedWord.is_active == True,
+            )
         )
-        group = result.scalar_one_or_none()
-        if group:
-            return [bw.word for bw in group.blocked_words if bw.is_active]
-        return []
+        words = list(result.scalars().all())
+    _blocked_words[telegram_group_id] = words
+    return words
 
 
 async def list_blocked_words_with_ids(group_db_id: int) -> List[dict]:
@@ -282,13 +474,17 @@ async def delete_blocked_word_by_id(word_id: int) -> bool:
     """Delete a blocked word by its DB primary key. Returns True if deleted."""
     async with get_db() as session:
         result = await session.execute(
-            select(BlockedWord).where(BlockedWord.id == word_id)
+            select(BlockedWord, ManagedGroup.telegram_group_id)
+            .join(ManagedGroup, BlockedWord.group_id == ManagedGroup.id)
+            .where(BlockedWord.id == word_id)
         )
-        bw = result.scalar_one_or_none()
-        if bw:
-            await session.delete(bw)
-            return True
-        return False
+        row = result.one_or_none()
+        if not row:
+            return False
+        await session.delete(row[0])
+
+    await publish_invalidation("group", row[1])
+    return True
 
 
 async def clear_blocked_words(telegram_group_id: int) -> str:
@@ -306,8 +502,11 @@ async def clear_blocked_words(telegram_group_id: int) -> str:
                     BlockedWord.group_id == group.id
                 )
             )
-            return "✅ تم ازالة جميع الكلمات المحظورة"
-        return "⚠️ المجموعة غير مفعلة"
+        else:
+            return "⚠️ المجموعة غير مفعلة"
+
+    await publish_invalidation("group", telegram_group_id)
+    return "✅ تم ازالة جميع الكلمات المحظورة"
 
 
 async def check_blocked_word(telegram_group_id: int, text: str) -> bool:
@@ -340,10 +539,12 @@ async def update_welcome_message(telegram_group_id: int, message: str) -> str:
             .where(ManagedGroup.telegram_group_id == telegram_group_id)
         )
         group = result.scalar_one_or_none()
-        if group and group.welcome_config:
-            group.welcome_config.message = message
-            return "✅ تم تحديث رسالة الترحيب"
-        return "⚠️ خطأ في تحديث رسالة الترحيب"
+        if not group or not group.welcome_config:
+            return "⚠️ خطأ في تحديث رسالة الترحيب"
+        group.welcome_config.message = message
+
+    await publish_invalidation("group", telegram_group_id)
+    return "✅ تم تحديث رسالة الترحيب"
 
 
 async def toggle_welcome(telegram_group_id: int) -> bool:
@@ -355,10 +556,42 @@ async def toggle_welcome(telegram_group_id: int) -> bool:
             .where(ManagedGroup.telegram_group_id == telegram_group_id)
         )
         group = result.scalar_one_or_none()
-        if group and group.welcome_config:
-            group.welcome_config.is_active = not group.welcome_config.is_active
-            return group.welcome_config.is_active
-        return False
+        if not group or not group.welcome_config:
+            return False
+        group.welcome_config.is_active = not group.welcome_config.is_active
+
+    await publish_invalidation("group", telegram_group_id)
+    return group.welcome_config.is_active
+
+
+async def toggle_welcome_delete_last(telegram_group_id: int) -> bool:
+    """Toggle deleting the previous welcome when a new one is sent"""
+    async with get_db() as session:
+        result = await session.execute(
+            select(ManagedGroup)
+            .options(selectinload(ManagedGroup.welcome_config))
+            .where(ManagedGroup.telegram_group_id == telegram_group_id)
+        )
+        group = result.scalar_one_or_none()
+        if not group or not group.welcome_config:
+            return False
+        group.welcome_config.delete_last_message = not group.welcome_config.delete_last_message
+
+    await publish_invalidation("group", telegram_group_id)
+    return group.welcome_config.delete_last_message
+
+
+async def set_welcome_last_message(telegram_group_id: int, message_id: Optional[int]) -> None:
+    """Remember the latest welcome message (deleted when the next one is sent)."""
+    async with get_db() as session:
+        result = await session.execute(
+            select(WelcomeConfig)
+            .join(ManagedGroup, WelcomeConfig.group_id == ManagedGroup.id)
+            .where(ManagedGroup.telegram_group_id == telegram_group_id)
+        )
+        config = result.scalar_one_or_none()
+        if config:
+            config.last_message_id = message_id
 
 
 # ─── Rules Config ─────────────────────────────────────────────
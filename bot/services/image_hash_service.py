@@ -0,0 +1,257 @@
+"""
+Vex - Perceptual Image Hashes
+Catches known spam images even after re-encoding or resizing (which
+changes their file_unique_id): photos are reduced to a 64-bit difference
+hash (dHash) and looked up by Hamming distance in a BK-tree of known-bad
+hashes (blocked_image_hashes).
+
+Photos are only downloaded while the index is non-empty, one Telegram
+thumbnail per photo (the smallest size that is at least HASH_SOURCE_MIN_PX
+wide), through a bounded pool: at most MAX_CONCURRENT_DOWNLOADS at once,
+each at most MAX_DOWNLOAD_BYTES. Hashing runs in a small thread pool and
+results are remembered per file_unique_id.
+
+Needs Pillow; without it the stage is disabled. The index is reloaded after
+an "image_hashes" invalidation event.
+"""
+import asyncio
+import io
+import logging
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from sqlalchemy import select
+from telegram import Bot, PhotoSize
+
+from db.database import get_db
+from db.models import BlockedImageHash
+from bot.core.invalidation import on_invalidate, publish_invalidation
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger("vex.services.image_hash")
+
+# Hashes this close (in differing bits of 64) are the same image
+MAX_DISTANCE = 8
+MAX_CONCURRENT_DOWNLOADS = 4
+MAX_DOWNLOAD_BYTES = 512 * 1024
+HASH_SOURCE_MIN_PX = 64
+HASH_CACHE_SIZE = 10_000
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="vex-phash")
+_downloads = asyncio.Semaphore(MAX_CONCURRENT_DOWNLOADS)
+stats: Counter = Counter()
+
+
+# ─── Hashing ──────────────────────────────────────────────────
+
+def dhash(data: bytes) -> int:
+    """64-bit difference hash: brightness gradients of a 9×8 grayscale thumbnail."""
+    with Image.open(io.BytesIO(data)) as img:
+        pixels = list(img.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left, right = pixels[row * 9 + col], pixels[row * 9 + col + 1]
+            value = value << 1 | (left > right)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over Hamming distance: a search with radius r
+    only descends into children whose edge distance is within r of the
+    query's distance to the node (triangle inequality)."""
+
+    def __init__(self):
+        # node: [hash, ids, {distance: child}]
+        self._root: Optional[list] = None
+        self.size = 0
+
+    def add(self, value: int, item_id: int) -> None:
+        self.size += 1
+        if self._root is None:
+            self._root = [value, [item_id], {}]
+            return
+        node = self._root
+        while True:
+            d = hamming(value, node[0])
+            if d == 0:
+                node[1].append(item_id)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, [item_id], {}]
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> list[tuple[int, int]]:
+        """(distance, id) of every entry within `radius`, closest first."""
+        found = []
+        stack = [self._root] if self._root else []
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node[0])
+            if d <= radius:
+                found.extend((d, item_id) for item_id in node[1])
+            for edge, child in node[2].items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+        return sorted(found)
+
+
+# ─── Index ────────────────────────────────────────────────────
+
+_tree: Optional[BKTree] = None
+_hashes: "OrderedDict[str, int]" = OrderedDict()     # file_unique_id → dHash
+
+
+def invalidate_image_index(_key=None) -> None:
+    global _tree
+    _tree = None
+
+
+on_invalidate("image_hashes", invalidate_image_index)
+
+
+async def _load_tree() -> BKTree:
+    global _tree
+    if _tree is None:
+        async with get_db() as session:
+            rows = (await session.execute(select(BlockedImageHash.id, BlockedImageHash.phash))).all()
+        tree = BKTree()
+        for item_id, phash in rows:
+            tree.add(int(phash, 16), item_id)
+        _tree = tree
+    return _tree
+
+
+def is_available() -> bool:
+    return Image is not None
+
+
+def _hash_source(photo: tuple[PhotoSize, ...]) -> Optional[PhotoSize]:
+    for size in photo:      # smallest first
+        if min(size.width, size.height) >= HASH_SOURCE_MIN_PX:
+            return size
+    return photo[-1] if photo else None
+
+
+async def hash_photo(bot: Bot, photo: tuple[PhotoSize, ...]) -> Optional[int]:
+    """dHash of a photo (cached per file), or None if it cannot be fetched."""
+    source = _hash_source(photo)
+    if source is None or not is_available():
+        return None
+    key = photo[-1].file_unique_id
+    cached = _hashes.get(key)
+    if cached is not None:
+        _hashes.move_to_end(key)
+        stats["cache_hits"] += 1
+        return cached
+    if source.file_size and source.file_size > MAX_DOWNLOAD_BYTES:
+        stats["too_large"] += 1
+        return None
+
+    async with _downloads:
+        try:
+            file = await bot.get_file(source.file_id)
+            if file.file_size and file.file_size > MAX_DOWNLOAD_BYTES:
+                stats["too_large"] += 1
+                return None
+            data = bytes(await file.download_as_bytearray())
+        except Exception as e:
+            stats["download_errors"] += 1
+            logger.warning(f"[PHASH] Could not download {key}: {e}")
+            return None
+    stats["downloads"] += 1
+
+    try:
+        value = await asyncio.get_running_loop().run_in_executor(_executor, dhash, data)
+    except Exception as e:
+        stats["hash_errors"] += 1
+        logger.warning(f"[PHASH] Could not hash {key}: {e}")
+        return None
+    _hashes[key] = value
+    if len(_hashes) > HASH_CACHE_SIZE:
+        _hashes.popitem(last=False)
+    return value
+
+
+async def match_photo(bot: Bot, photo: tuple[PhotoSize, ...]) -> Optional[tuple[int, int]]:
+    """(distance, blocked hash ID) of the closest known-bad image, or None.
+    Downloads nothing while no image is blocked."""
+    if not is_available():
+        return None
+    tree = await _load_tree()
+    if not tree.size:
+        return None
+    value = await hash_photo(bot, photo)
+    if value is None:
+        return None
+    stats["checked"] += 1
+    hits = tree.search(value, MAX_DISTANCE)
+    if not hits:
+        return None
+    stats["matched"] += 1
+    return hits[0]
+
+
+# ─── Management ───────────────────────────────────────────────
+
+async def block_photo(bot: Bot, photo: tuple[PhotoSize, ...], label: Optional[str], added_by: int) -> str:
+    """Add a photo's hash to the known-bad index."""
+    if not is_available():
+        return "⚠️ فحص الصور غير متاح (مكتبة Pillow غير مثبتة)"
+    value = await hash_photo(bot, photo)
+    if value is None:
+        return "⚠️ تعذر تحميل الصورة"
+    phash = f"{value:016x}"
+    async with get_db() as session:
+        existing = await session.execute(select(BlockedImageHash.id).where(BlockedImageHash.phash == phash))
+        if existing.scalar_one_or_none():
+            return "⚠️ الصورة محظورة مسبقاً"
+        session.add(BlockedImageHash(phash=phash, label=label, added_by=added_by))
+
+    await publish_invalidation("image_hashes")
+    return "✅ تم حظر الصورة ونسخها المعدلة في جميع المجموعات"
+
+
+async def list_image_hashes() -> List[dict]:
+    async with get_db() as session:
+        result = await session.execute(select(BlockedImageHash).order_by(BlockedImageHash.created_at.desc()))
+        return [
+            {
+                "id": h.id,
+                "phash": h.phash,
+                "label": h.label,
+                "created_at": h.created_at.isoformat() if h.created_at else None,
+            }
+            for h in result.scalars().all()
+        ]
+
+
+async def delete_image_hash(hash_id: int) -> bool:
+    async with get_db() as session:
+        row = await session.get(BlockedImageHash, hash_id)
+        if not row:
+            return False
+        await session.delete(row)
+
+    await publish_invalidation("image_hashes")
+    return True
+
+
+def get_image_hash_stats() -> dict:
+    return {
+        "available": is_available(),
+        "indexed": _tree.size if _tree else None,
+        "cached_hashes": len(_hashes),
+        **{k: stats[k] for k in ("checked", "matched", "downloads", "cache_hits", "too_large", "download_errors")},
+    }
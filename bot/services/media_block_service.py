@@ -0,0 +1,192 @@
+"""
+Vex - Media Blocklist
+Blocks individual media files (by file_unique_id, stable across bots and
+re-uploads of the same file) and whole sticker packs (by set_name), per
+group or globally. The lists are held in memory as hash sets, so the check
+is O(1) with no download or AI call; they are reloaded after a
+"media_blocks" invalidation event (key: telegram group ID, None = global).
+"""
+import logging
+from typing import List, Optional
+
+from sqlalchemy import select
+from telegram import Message
+
+from db.database import get_db
+from db.models import BlockedMedia, ManagedGroup
+from bot.core.invalidation import on_invalidate, publish_invalidation
+
+logger = logging.getLogger("vex.services.media_block")
+
+KINDS = ("file", "sticker_set")
+
+
+class _Blocklist:
+    __slots__ = ("files", "sticker_sets")
+
+    def __init__(self, rows=()):
+        self.files: set[str] = set()
+        self.sticker_sets: set[str] = set()
+        for kind, value in rows:
+            (self.files if kind == "file" else self.sticker_sets).add(value)
+
+    def matches(self, file_unique_id: Optional[str], set_name: Optional[str]) -> bool:
+        return (file_unique_id is not None and file_unique_id in self.files) or (
+            set_name is not None and set_name in self.sticker_sets
+        )
+
+
+def media_fingerprint(message: Message) -> tuple[Optional[str], Optional[str], Optional[str]]:
+    """(file_unique_id, sticker set_name, media type) of a message's media."""
+    if message.sticker:
+        return message.sticker.file_unique_id, message.sticker.set_name, "sticker"
+    if message.photo:
+        return message.photo[-1].file_unique_id, None, "photo"
+    for media_type in ("animation", "video", "document", "voice", "audio", "video_note"):
+        media = getattr(message, media_type)
+        if media:
+            return media.file_unique_id, None, "gif" if media_type == "animation" else media_type
+    return None, None, None
+
+
+_global: Optional[_Blocklist] = None
+_groups: dict[int, _Blocklist] = {}
+
+
+def invalidate_media_blocks(telegram_group_id: Optional[int] = None) -> None:
+    global _global
+    if telegram_group_id is None:
+        _global = None
+        _groups.clear()
+    else:
+        _groups.pop(telegram_group_id, None)
+
+
+on_invalidate("media_blocks", invalidate_media_blocks)
+
+
+async def _load(telegram_group_id: Optional[int]) -> _Blocklist:
+    async with get_db() as session:
+        query = select(BlockedMedia.kind, BlockedMedia.value)
+        if telegram_group_id is None:
+            query = query.where(BlockedMedia.group_id.is_(None))
+        else:
+            query = query.join(ManagedGroup, BlockedMedia.group_id == ManagedGroup.id).where(
+                ManagedGroup.telegram_group_id == telegram_group_id
+            )
+        rows = (await session.execute(query)).all()
+    return _Blocklist(rows)
+
+
+async def is_media_blocked(
+    telegram_group_id: int, file_unique_id: Optional[str], set_name: Optional[str] = None,
+) -> bool:
+    """True if the file or its sticker pack is blocked here or globally."""
+    global _global
+    if _global is None:
+        _global = await _load(None)
+    group = _groups.get(telegram_group_id)
+    if group is None:
+        group = _groups[telegram_group_id] = await _load(telegram_group_id)
+    return _global.matches(file_unique_id, set_name) or group.matches(file_unique_id, set_name)
+
+
+# ─── Management ───────────────────────────────────────────────
+
+async def _group_db_id(session, telegram_group_id: int) -> Optional[int]:
+    result = await session.execute(
+        select(ManagedGroup.id).where(ManagedGroup.telegram_group_id == telegram_group_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def add_media_block(
+    telegram_group_id: Optional[int],
+    kind: str,
+    value: str,
+    media_type: Optional[str] = None,
+    added_by: Optional[int] = None,
+) -> str:
+    """Block a file or sticker pack in a group (None = in every group)."""
+    async with get_db() as session:
+        group_id = None
+        if telegram_group_id is not None:
+            group_id = await _group_db_id(session, telegram_group_id)
+            if group_id is None:
+                return "⚠️ المجموعة غير مفعلة"
+
+        existing = await session.execute(
+            select(BlockedMedia.id).where(
+                BlockedMedia.group_id.is_(None) if group_id is None else BlockedMedia.group_id == group_id,
+                BlockedMedia.kind == kind,
+                BlockedMedia.value == value,
+            )
+        )
+        if existing.scalar_one_or_none():
+            return "⚠️ محظورة مسبقاً"
+        session.add(BlockedMedia(
+            group_id=group_id, kind=kind, value=value, media_type=media_type, added_by=added_by,
+        ))
+
+    await publish_invalidation("media_blocks", telegram_group_id)
+    what = "حزمة الملصقات" if kind == "sticker_set" else "الوسائط"
+    where = "في جميع المجموعات" if telegram_group_id is None else "في هذه المجموعة"
+    return f"✅ تم حظر {what} {where}"
+
+
+async def remove_media_block(telegram_group_id: Optional[int], values: List[str]) -> str:
+    """Unblock any file / sticker pack among `values` in a group (None = global)."""
+    async with get_db() as session:
+        query = select(BlockedMedia).where(BlockedMedia.value.in_(values))
+        if telegram_group_id is None:
+            query = query.where(BlockedMedia.group_id.is_(None))
+        else:
+            group_id = await _group_db_id(session, telegram_group_id)
+            if group_id is None:
+                return "⚠️ المجموعة غير مفعلة"
+            query = query.where(BlockedMedia.group_id == group_id)
+        rows = (await session.execute(query)).scalars().all()
+        if not rows:
+            return "❌ ليست محظورة"
+        for row in rows:
+            await session.delete(row)
+
+    await publish_invalidation("media_blocks", telegram_group_id)
+    return "✅ تم الغاء الحظر"
+
+
+async def list_media_blocks(group_db_id: Optional[int]) -> List[dict]:
+    """Blocked media of a group (None = global list) — used by the web dashboard."""
+    async with get_db() as session:
+        result = await session.execute(
+            select(BlockedMedia)
+            .where(BlockedMedia.group_id.is_(None) if group_db_id is None else BlockedMedia.group_id == group_db_id)
+            .order_by(BlockedMedia.created_at.desc())
+        )
+        return [
+            {
+                "id": b.id,
+                "kind": b.kind,
+                "value": b.value,
+                "media_type": b.media_type,
+                "created_at": b.created_at.isoformat() if b.created_at else None,
+            }
+            for b in result.scalars().all()
+        ]
+
+
+async def delete_media_block_by_id(block_id: int) -> bool:
+    """Delete a blocklist entry by its DB primary key. Returns True if deleted."""
+    async with get_db() as session:
+        result = await session.execute(
+            select(BlockedMedia, ManagedGroup.telegram_group_id)
+            .outerjoin(ManagedGroup, BlockedMedia.group_id == ManagedGroup.id)
+            .where(BlockedMedia.id == block_id)
+        )
+        row = result.one_or_none()
+        if not row:
+            return False
+        await session.delete(row[0])
+
+    await publish_invalidation("media_blocks", row[1])
+    return True
@@ -0,0 +1,186 @@
+"""
+Vex - Raid Detection
+Per managed chat, sliding-window counters of joins, messages and
+moderation deletions, kept in memory as ring buffers of one-second buckets
+(no database writes on the message path). When a count crosses the
+group's threshold the chat enters raid mode for a cooldown:
+
+  - the registered lockdown handler closes the group (action "lock") and
+    reopens it when the cooldown ends
+  - the moderation pipeline switches to a strict, cheap mode (no AI,
+    blacklists and link removal only) — see is_raid_mode()
+
+Thresholds live in managed_groups.raid_policy (overrides of
+DEFAULT_RAID_POLICY), cached until a "group" invalidation event.
+"""
+import asyncio
+import logging
+import time
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from telegram import Bot
+
+from bot.core.invalidation import on_invalidate
+from bot.services.group_service import get_group_raid_policy
+
+logger = logging.getLogger("vex.services.raid")
+
+DEFAULT_RAID_POLICY = {
+    "enabled": True,
+    # Counters cover the last window_seconds
+    "window_seconds": 60,
+    "join_threshold": 20,
+    "message_threshold": 150,
+    "deletion_threshold": 25,
+    # lock = close the group for the cooldown; strict = strict moderation only
+    "action": "lock",
+    "cooldown_minutes": 10,
+}
+RAID_ACTIONS = ("lock", "strict")
+KINDS = ("joins", "messages", "deletions")
+MIN_WINDOW_SECONDS, MAX_WINDOW_SECONDS = 10, 600
+
+LockdownHandler = Callable[[Bot, int, dict, str], Awaitable[None]]
+
+
+class SlidingCounter:
+    """Events in the last `window` seconds: a ring of per-second buckets
+    with a running total, so add() and count() are O(1) amortized."""
+
+    __slots__ = ("window", "buckets", "last", "total")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buckets = array("I", bytes(4 * window))
+        self.last = int(time.monotonic())
+        self.total = 0
+
+    def _advance(self, now: int) -> None:
+        gap = now - self.last
+        if gap <= 0:
+            return
+        if gap >= self.window:
+            self.buckets = array("I", bytes(4 * self.window))
+            self.total = 0
+        else:
+            for second in range(self.last + 1, now + 1):
+                i = second % self.window
+                self.total -= self.buckets[i]
+                self.buckets[i] = 0
+        self.last = now
+
+    def add(self, n: int = 1) -> int:
+        now = int(time.monotonic())
+        self._advance(now)
+        self.buckets[now % self.window] += n
+        self.total += n
+        return self.total
+
+    def count(self) -> int:
+        self._advance(int(time.monotonic()))
+        return self.total
+
+
+@dataclass
+class _ChatState:
+    window: int
+    counters: dict[str, SlidingCounter] = field(default_factory=dict)
+    raid_until: float = 0.0
+    trigger: str = ""
+
+    def __post_init__(self):
+        self.counters = {kind: SlidingCounter(self.window) for kind in KINDS}
+
+
+_policies: dict[int, dict] = {}
+_chats: dict[int, _ChatState] = {}
+_lockdown_handler: Optional[LockdownHandler] = None
+_tasks: set[asyncio.Task] = set()
+stats: Counter = Counter()
+
+
+def _invalidate(chat_id: Optional[int] = None) -> None:
+    if chat_id is None:
+        _policies.clear()
+    else:
+        _policies.pop(chat_id, None)
+
+
+on_invalidate("group", _invalidate)
+
+
+async def get_raid_policy(chat_id: int) -> dict:
+    """Effective raid policy for a group: defaults merged with its overrides."""
+    cached = _policies.get(chat_id)
+    if cached is not None:
+        return cached
+    overrides = await get_group_raid_policy(chat_id) or {}
+    policy = {**DEFAULT_RAID_POLICY, **{k: v for k, v in overrides.items() if k in DEFAULT_RAID_POLICY}}
+    policy["window_seconds"] = max(MIN_WINDOW_SECONDS, min(MAX_WINDOW_SECONDS, int(policy["window_seconds"])))
+    _policies[chat_id] = policy
+    return policy
+
+
+def set_lockdown_handler(handler: LockdownHandler) -> None:
+    """handler(bot, chat_id, policy, trigger) runs when a chat enters raid mode."""
+    global _lockdown_handler
+    _lockdown_handler = handler
+
+
+def is_raid_mode(chat_id: int) -> bool:
+    """True while the chat is in raid mode (strict moderation)."""
+    state = _chats.get(chat_id)
+    return state is not None and state.raid_until > time.monotonic()
+
+
+def end_raid_mode(chat_id: int) -> None:
+    state = _chats.get(chat_id)
+    if state:
+        state.raid_until = 0.0
+
+
+async def record(bot: Bot, chat_id: int, kind: str, n: int = 1) -> bool:
+    """Count `n` events of `kind` (joins / messages / deletions) in a managed
+    chat. Returns True when this crossed the threshold and started raid mode."""
+    policy = await get_raid_policy(chat_id)
+    if not policy["enabled"] or n <= 0:
+        return False
+    state = _chats.get(chat_id)
+    if state is None or state.window != policy["window_seconds"]:
+        state = _chats[chat_id] = _ChatState(window=policy["window_seconds"])
+
+    total = state.counters[kind].add(n)
+    threshold = policy[f"{kind[:-1]}_threshold"]
+    now = time.monotonic()
+    if total < threshold or state.raid_until > now:
+        return False
+
+    state.raid_until = now + policy["cooldown_minutes"] * 60
+    state.trigger = f"{kind}:{total}/{policy['window_seconds']}s"
+    stats["raids"] += 1
+    logger.warning(f"[RAID] Chat {chat_id} entered raid mode ({state.trigger})")
+    if _lockdown_handler:
+        task = asyncio.create_task(_lockdown_handler(bot, chat_id, policy, kind))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+    return True
+
+
+def get_raid_status() -> dict:
+    now = time.monotonic()
+    return {
+        "raids": stats["raids"],
+        "active": [
+            {
+                "chat_id": chat_id,
+                "trigger": state.trigger,
+                "remaining_s": round(state.raid_until - now),
+            }
+            for chat_id, state in _chats.items()
+            if state.raid_until > now
+        ],
+        "tracked_chats": len(_chats),
+    }
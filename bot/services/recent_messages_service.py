@@ -0,0 +1,104 @@
+"""
+Vex - Recent Messages
+Ring of (message_id, user_id, time) per managed group, so a spammer's
+earlier messages can be found and deleted after the fact ("purge").
+
+Each ring holds at most PER_CHAT entries, and all rings together at most
+MAX_TOTAL: past that, the oldest entries of the least recently active
+group go first. Only IDs are kept, never text. Fan-out routes a group's
+updates to one process, which therefore holds that group's ring.
+
+Purges go through the deletion coalescer, so they leave as bulk
+deleteMessages calls of up to 100 IDs.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+
+from telegram import Bot
+
+from bot.services.deletion_service import delete_message
+
+logger = logging.getLogger("vex.services.recent_messages")
+
+PER_CHAT = 1_000
+MAX_TOTAL = 200_000
+DEFAULT_PURGE_MINUTES = 60
+# Telegram lets bots delete group messages for 48 hours
+MAX_PURGE_MINUTES = 48 * 60
+
+_rings: "OrderedDict[int, deque]" = OrderedDict()   # chat → (message_id, user_id, time), least active first
+_total = 0
+stats: Counter = Counter()
+
+
+def record(chat_id: int, message_id: int, user_id: int) -> None:
+    """Remember a group message (call once per message)."""
+    global _total
+    ring = _rings.get(chat_id)
+    if ring is None:
+        ring = _rings[chat_id] = deque(maxlen=PER_CHAT)
+    else:
+        _rings.move_to_end(chat_id)
+    if len(ring) < PER_CHAT:
+        _total += 1
+    ring.append((message_id, user_id, time.time()))
+
+    while _total > MAX_TOTAL:
+        cold_id, cold = next(iter(_rings.items()))
+        cold.popleft()
+        _total -= 1
+        stats["evicted"] += 1
+        if not cold:
+            del _rings[cold_id]
+
+
+def messages_of(chat_id: int, user_id: int, minutes: int = DEFAULT_PURGE_MINUTES) -> list[int]:
+    """IDs of the member's remembered messages from the last `minutes`."""
+    ring = _rings.get(chat_id)
+    if not ring:
+        return []
+    since = time.time() - minutes * 60
+    ids = []
+    for message_id, sender, ts in reversed(ring):
+        if ts < since:
+            break
+        if sender == user_id:
+            ids.append(message_id)
+    return ids
+
+
+def _forget(chat_id: int, user_id: int, ids: set[int]) -> None:
+    global _total
+    ring = _rings.get(chat_id)
+    if not ring:
+        return
+    kept = [e for e in ring if not (e[1] == user_id and e[0] in ids)]
+    _total -= len(ring) - len(kept)
+    if not kept:
+        # Eviction expects every ring to hold something
+        del _rings[chat_id]
+        return
+    ring.clear()
+    ring.extend(kept)
+
+
+async def purge_user(bot: Bot, chat_id: int, user_id: int, minutes: int = DEFAULT_PURGE_MINUTES) -> tuple[int, int]:
+    """Delete the member's messages from the last `minutes`.
+    Returns (deleted, found)."""
+    minutes = max(1, min(MAX_PURGE_MINUTES, int(minutes)))
+    ids = messages_of(chat_id, user_id, minutes)
+    if not ids:
+        return 0, 0
+    results = await asyncio.gather(*(delete_message(bot, chat_id, mid) for mid in ids))
+    _forget(chat_id, user_id, set(ids))
+    deleted = sum(results)
+    stats["purges"] += 1
+    stats["purged"] += deleted
+    logger.info(f"[PURGE] Deleted {deleted}/{len(ids)} messages of {user_id} in {chat_id} (last {minutes} min)")
+    return deleted, len(ids)
+
+
+def get_recent_stats() -> dict:
+    return {"chats": len(_rings), "messages": _total, **{k: stats[k] for k in ("purges", "purged", "evicted")}}
@@ -0,0 +1,219 @@
+"""
+Vex - Member Reputation
+Compact record per (group, member): when the bot first saw them, the last
+join it saw, messages posted, violations (deleted or AI-flagged messages)
+and alerts on them an admin answered with "keep".
+
+Records are held in a bounded LRU; a miss loads the row once (no row → a
+fresh record). Changes are written behind: dirty records are upserted in
+batches every FLUSH_INTERVAL_SECONDS and on shutdown, so a message never
+waits for a write. A dirty record pushed out of the LRU is kept aside
+until it has been flushed. Fan-out routes all updates and guard buttons
+of a group to one process, which therefore owns that group's records.
+"""
+import logging
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from db.database import engine, get_db
+from db.models import MemberReputation
+
+logger = logging.getLogger("vex.services.reputation")
+
+MAX_CACHED = 50_000
+FLUSH_INTERVAL_SECONDS = 30
+# Rows per upsert (SQLite caps the bound parameters of one statement)
+FLUSH_BATCH_SIZE = 100
+
+
+@dataclass(slots=True)
+class Reputation:
+    first_seen: float
+    # Set when the bot saw the join (time.time()); None for existing members
+    joined_at: Optional[float] = None
+    messages: int = 0
+    violations: int = 0
+    keeps: int = 0
+
+    @property
+    def open_violations(self) -> int:
+        """Violations not outweighed by admin "keep" decisions."""
+        return max(0, self.violations - self.keeps)
+
+    @property
+    def member_since(self) -> float:
+        return self.joined_at or self.first_seen
+
+
+_records: "OrderedDict[tuple[int, int], Reputation]" = OrderedDict()
+_dirty: set[tuple[int, int]] = set()
+_evicted: dict[tuple[int, int], Reputation] = {}     # dirty, out of the LRU, not yet written
+stats: Counter = Counter()
+
+
+def _to_datetime(ts: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None) if ts else None
+
+
+def _to_timestamp(dt: Optional[datetime]) -> Optional[float]:
+    return dt.replace(tzinfo=timezone.utc).timestamp() if dt else None
+
+
+# ─── Records ──────────────────────────────────────────────────────────────────
+
+async def _load(key: tuple[int, int]) -> Optional[Reputation]:
+    async with get_db() as session:
+        row = await session.get(MemberReputation, key)
+        if row is None:
+            return None
+        return Reputation(
+            first_seen=_to_timestamp(row.first_seen),
+            joined_at=_to_timestamp(row.joined_at),
+            messages=row.messages,
+            violations=row.violations,
+            keeps=row.keeps,
+        )
+
+
+async def get_reputation(chat_id: int, user_id: int) -> Reputation:
+    """The member's record (loaded on first use, created if new)."""
+    key = (chat_id, user_id)
+    record = _records.get(key)
+    if record is not None:
+        _records.move_to_end(key)
+        return record
+
+    record = _evicted.get(key)
+    if record is None:
+        try:
+            loaded = await _load(key)
+        except Exception as e:
+            # Scored as a stranger this time; nothing is cached or written
+            stats["load_errors"] += 1
+            logger.warning(f"[REPUTATION] Could not load {key}: {e}")
+            return Reputation(first_seen=time.time())
+        # Another message of the member may have loaded it meanwhile
+        record = _records.get(key)
+        if record is not None:
+            return record
+        if loaded is None:
+            record = Reputation(first_seen=time.time())
+            _dirty.add(key)
+            stats["created"] += 1
+        else:
+            record = loaded
+            stats["loaded"] += 1
+
+    _records[key] = record
+    while len(_records) > MAX_CACHED:
+        old_key, old = _records.popitem(last=False)
+        if old_key in _dirty:
+            _evicted[old_key] = old
+    return record
+
+
+async def note_message(chat_id: int, user_id: int) -> Reputation:
+    """Count a group message from a member (call for every checked message)."""
+    record = await get_reputation(chat_id, user_id)
+    record.messages += 1
+    _dirty.add((chat_id, user_id))
+    return record
+
+
+async def note_join(chat_id: int, user_id: int) -> None:
+    """Record that a member just joined the group."""
+    record = await get_reputation(chat_id, user_id)
+    record.joined_at = time.time()
+    record.messages = 0
+    _dirty.add((chat_id, user_id))
+
+
+async def note_violation(chat_id: int, user_id: int) -> None:
+    """Record a deleted or AI-flagged message of a member."""
+    record = await get_reputation(chat_id, user_id)
+    record.violations += 1
+    _dirty.add((chat_id, user_id))
+
+
+async def note_keep(chat_id: int, user_id: int) -> None:
+    """Record that an admin kept a member's flagged message."""
+    record = await get_reputation(chat_id, user_id)
+    record.keeps += 1
+    _dirty.add((chat_id, user_id))
+
+
+# ─── Write-behind ─────────────────────────────────────────────────────────────
+
+async def _upsert(rows: list[dict]) -> None:
+    insert = pg_insert if engine.dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(MemberReputation).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MemberReputation.chat_id, MemberReputation.user_id],
+        set_={
+            **{c: stmt.excluded[c] for c in ("first_seen", "joined_at", "messages", "violations", "keeps")},
+            "updated_at": func.now(),
+        },
+    )
+    async with get_db() as session:
+        await session.execute(stmt)
+
+
+async def flush_reputation() -> int:
+    """Write every changed record. Returns the number written; what fails
+    stays dirty for the next flush."""
+    if not _dirty:
+        return 0
+    keys = list(_dirty)
+    _dirty.clear()
+    written = 0
+    for i in range(0, len(keys), FLUSH_BATCH_SIZE):
+        batch = []
+        for key in keys[i:i + FLUSH_BATCH_SIZE]:
+            record = _records.get(key) or _evicted.get(key)
+            if record is not None:
+                batch.append({
+                    "chat_id": key[0],
+                    "user_id": key[1],
+                    "first_seen": _to_datetime(record.first_seen),
+                    "joined_at": _to_datetime(record.joined_at),
+                    "messages": record.messages,
+                    "violations": record.violations,
+                    "keeps": record.keeps,
+                })
+        if not batch:
+            continue
+        try:
+            await _upsert(batch)
+        except Exception as e:
+            stats["flush_errors"] += 1
+            logger.warning(f"[REPUTATION] Flush failed, {len(keys) - i} records kept for retry: {e}")
+            _dirty.update(keys[i:])
+            keys = keys[:i]
+            break
+        written += len(batch)
+    for key in keys:
+        if key not in _dirty:
+            _evicted.pop(key, None)
+    stats["flushed"] += written
+    return written
+
+
+async def reputation_flush_job(context) -> None:
+    """Periodic write-behind (job queue)."""
+    await flush_reputation()
+
+
+def get_reputation_stats() -> dict:
+    return {
+        "cached": len(_records),
+        "dirty": len(_dirty),
+        "pending_evicted": len(_evicted),
+        **{k: stats[k] for k in ("loaded", "created", "flushed", "flush_errors", "load_errors")},
+    }
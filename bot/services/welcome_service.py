@@ -0,0 +1,173 @@
+"""
+Vex - Welcome Engine
+Coalesces joins into one welcome per chat: new members are buffered for a
+short window and greeted together in a single message that mentions all
+of them. During a join wave a chat gets at most one welcome per
+MIN_INTERVAL_SECONDS, and the previous welcome is deleted when the group
+asks for it (its ID is saved in welcome_configs.last_message_id).
+
+The group's template is cached with {group} already rendered until the
+welcome settings change (a "group" invalidation event).
+"""
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+from telegram import Bot, User
+
+from bot.core.invalidation import on_invalidate
+from bot.core.rate_limiter import Lane
+from bot.services.deletion_service import delete_message
+from bot.services.group_service import get_welcome_config, set_welcome_last_message
+
+logger = logging.getLogger("vex.services.welcome")
+
+# Joins arriving within this window share one welcome
+COALESCE_WINDOW_SECONDS = 3.0
+# A chat gets at most one welcome this often; a join wave waits for the next slot
+MIN_INTERVAL_SECONDS = 15.0
+# Members mentioned by name; the rest are counted
+MAX_MENTIONS = 20
+
+
+@dataclass
+class WelcomeTemplate:
+    text: str                       # {group} already rendered
+    title: str
+    delete_last: bool
+    last_message_id: Optional[int]
+
+
+@dataclass
+class _Batch:
+    title: str
+    members: dict[int, User] = field(default_factory=dict)
+
+
+def _md(text: str) -> str:
+    """Escape user text for legacy Markdown."""
+    for ch in ("\\", "_", "*", "`", "["):
+        text = text.replace(ch, "\\" + ch)
+    return text
+
+
+def _mention(member: User) -> str:
+    # Link text is literal in legacy Markdown; only a bracket would end it early
+    name = (member.first_name or str(member.id)).replace("[", "").replace("]", "")
+    return f"[{name}](tg://user?id={member.id})"
+
+
+def _join(parts: list[str], total: int) -> str:
+    text = "، ".join(parts)
+    if total > len(parts):
+        text += f" و{total - len(parts)} آخرين"
+    return text
+
+
+def render_welcome(template: str, members: list[User]) -> str:
+    """Fill {name} / {username} with every member (template has {group} rendered)."""
+    shown = members[:MAX_MENTIONS]
+    names = [_mention(m) for m in shown]
+    usernames = [f"@{_md(m.username)}" if m.username else _mention(m) for m in shown]
+    return (
+        template
+        .replace("{name}", _join(names, len(members)))
+        .replace("{username}", _join(usernames, len(members)))
+    )
+
+
+class WelcomeEngine:
+    def __init__(self, window: float = COALESCE_WINDOW_SECONDS, min_interval: float = MIN_INTERVAL_SECONDS):
+        self.window = window
+        self.min_interval = min_interval
+        # chat_id → template, or None when the group has no active welcome
+        self._templates: dict[int, Optional[WelcomeTemplate]] = {}
+        self._pending: dict[int, _Batch] = {}
+        self._timers: dict[int, asyncio.Task] = {}
+        self._last_sent: dict[int, float] = {}
+        self.stats: Counter = Counter()
+
+    def invalidate(self, chat_id: Optional[int] = None) -> None:
+        if chat_id is None:
+            self._templates.clear()
+        else:
+            self._templates.pop(chat_id, None)
+
+    async def get_template(self, chat_id: int, title: str) -> Optional[WelcomeTemplate]:
+        if chat_id not in self._templates:
+            config = await get_welcome_config(chat_id)
+            if not config or not config.is_active or not config.message:
+                self._templates[chat_id] = None
+            else:
+                self._templates[chat_id] = WelcomeTemplate(
+                    text=config.message.replace("{group}", _md(title)),
+                    title=title,
+                    delete_last=config.delete_last_message,
+                    last_message_id=config.last_message_id,
+                )
+        template = self._templates[chat_id]
+        if template and template.title != title:
+            # Group renamed: re-render from the stored message
+            self._templates.pop(chat_id)
+            return await self.get_template(chat_id, title)
+        return template
+
+    async def add_members(self, bot: Bot, chat_id: int, title: str, members: list[User]) -> None:
+        """Buffer new members; the chat's welcome goes out when its window closes."""
+        if not await self.get_template(chat_id, title):
+            return
+        batch = self._pending.setdefault(chat_id, _Batch(title=title))
+        batch.title = title
+        for member in members:
+            batch.members[member.id] = member
+        self.stats["joins"] += len(members)
+
+        if chat_id not in self._timers:
+            now = time.monotonic()
+            next_slot = self._last_sent.get(chat_id, 0.0) + self.min_interval
+            delay = max(self.window, next_slot - now)
+            self._timers[chat_id] = asyncio.create_task(self._flush_later(bot, chat_id, delay))
+
+    async def _flush_later(self, bot: Bot, chat_id: int, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._timers.pop(chat_id, None)
+        batch = self._pending.pop(chat_id, None)
+        if batch and batch.members:
+            try:
+                await self._send(bot, chat_id, batch)
+            except Exception as e:
+                logger.warning(f"[WELCOME] Error sending welcome in {chat_id}: {e}")
+
+    async def _send(self, bot: Bot, chat_id: int, batch: _Batch) -> None:
+        template = await self.get_template(chat_id, batch.title)
+        if not template:
+            return
+        members = list(batch.members.values())
+        sent = await bot.send_message(
+            chat_id, render_welcome(template.text, members),
+            parse_mode="Markdown", rate_limit_args=Lane.ANNOUNCE,
+        )
+        self._last_sent[chat_id] = time.monotonic()
+        self.stats["welcomes"] += 1
+        self.stats["members_welcomed"] += len(members)
+
+        previous, template.last_message_id = template.last_message_id, sent.message_id
+        await set_welcome_last_message(chat_id, sent.message_id)
+        if template.delete_last and previous:
+            await delete_message(bot, chat_id, previous)
+
+
+_engine = WelcomeEngine()
+on_invalidate("group", _engine.invalidate)
+
+
+async def queue_welcome(bot: Bot, chat_id: int, title: str, members: list[User]) -> None:
+    """Welcome these members together with the chat's other recent joins."""
+    await _engine.add_members(bot, chat_id, title, members)
+
+
+def get_welcome_stats() -> dict:
+    return dict(_engine.stats)
@@ -39,10 +39,38 @@ async def init_db():
             "ALTER TABLE bot_config ADD COLUMN IF NOT EXISTS ai_debug_channel_id BIGINT",
             "ALTER TABLE bot_config ADD COLUMN IF NOT EXISTS ai_alert_threshold FLOAT DEFAULT 0.5",
             "ALTER TABLE bot_config ADD COLUMN IF NOT EXISTS ai_auto_delete_threshold FLOAT DEFAULT 0.9",
+            "ALTER TABLE bot_config ADD COLUMN IF NOT EXISTS ai_shadow_sample_rate FLOAT DEFAULT 0.1",
+            # Existing installs keep per-message debug posts; new ones get the
+            # model default ('digest') when setup creates the row
+            "ALTER TABLE bot_config ADD COLUMN IF NOT EXISTS ai_debug_mode VARCHAR(16) DEFAULT 'message'",
+            "ALTER TABLE bot_config ADD COLUMN IF NOT EXISTS ai_debug_sample_rate FLOAT DEFAULT 1.0",
+            "ALTER TABLE bot_config ADD COLUMN IF NOT EXISTS ai_debug_digest_interval INTEGER DEFAULT 300",
+            # ManagedGroup: per-group adaptive AI policy
+            "ALTER TABLE managed_groups ADD COLUMN IF NOT EXISTS ai_policy JSON",
+            # ManagedGroup: per-group raid detection thresholds
+            "ALTER TABLE managed_groups ADD COLUMN IF NOT EXISTS raid_policy JSON",
+            # ManagedGroup: per-group anti-flood limits and action
+            "ALTER TABLE managed_groups ADD COLUMN IF NOT EXISTS flood_policy JSON",
+            # ManagedGroup: per-group strike ladder
+            "ALTER TABLE managed_groups ADD COLUMN IF NOT EXISTS escalation_policy JSON",
+            # ManagedGroup: per-group AI rules and thresholds
+            "ALTER TABLE managed_groups ADD COLUMN IF NOT EXISTS ai_rules TEXT",
+            "ALTER TABLE managed_groups ADD COLUMN IF NOT EXISTS ai_alert_threshold FLOAT",
+            "ALTER TABLE managed_groups ADD COLUMN IF NOT EXISTS ai_auto_delete_threshold FLOAT",
             # AIProvider: base_url for self-hosted providers (LiteLLM)
             "ALTER TABLE ai_providers ADD COLUMN IF NOT EXISTS base_url VARCHAR(500)",
             # AIProvider: link to saved endpoint (connection profile)
             "ALTER TABLE ai_providers ADD COLUMN IF NOT EXISTS endpoint_id INTEGER REFERENCES ai_endpoints(id) ON DELETE CASCADE",
+            # AIProvider: shadow models receive mirrored traffic only
+            "ALTER TABLE ai_providers ADD COLUMN IF NOT EXISTS is_shadow BOOLEAN DEFAULT FALSE",
+            # AIProviderStat: one row per key and day (merge duplicates first)
+            "UPDATE ai_provider_stats SET requests_count = ("
+            " SELECT SUM(s.requests_count) FROM ai_provider_stats s"
+            " WHERE s.provider_key = ai_provider_stats.provider_key AND s.stat_date = ai_provider_stats.stat_date)"
+            " WHERE id IN (SELECT MAX(id) FROM ai_provider_stats GROUP BY provider_key, stat_date HAVING COUNT(*) > 1)",
+            "DELETE FROM ai_provider_stats WHERE id NOT IN ("
+            " SELECT MAX(id) FROM ai_provider_stats GROUP BY provider_key, stat_date)",
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_ai_provider_stats_key_date ON ai_provider_stats (provider_key, stat_date)",
             # AIProviderStat: raw response column
             "ALTER TABLE ai_provider_stats ADD COLUMN IF NOT EXISTS last_raw_response TEXT",
         ]
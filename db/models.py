@@ -6,7 +6,7 @@ from datetime import datetime
 from typing import Optional, List
 
 from sqlalchemy import (
-    BigInteger, Boolean, Date, DateTime, ForeignKey, Float, Integer, JSON,
+    BigInteger, Boolean, Date, DateTime, ForeignKey, Float, Index, Integer, JSON,
     String, Text, func
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
@@ -34,6 +34,14 @@ class BotConfig(Base):
     # AI thresholds — alert_threshold: notify admins; auto_delete_threshold: auto-delete
     ai_alert_threshold: Mapped[float] = mapped_column(Float, default=0.50)
     ai_auto_delete_threshold: Mapped[float] = mapped_column(Float, default=0.90)
+    # Share of Layer-3 messages mirrored to shadow models (0.0 – 1.0)
+    ai_shadow_sample_rate: Mapped[float] = mapped_column(Float, default=0.10)
+    # Debug channel delivery: "digest" (periodic summary) or "message" (one post per analysis)
+    ai_debug_mode: Mapped[str] = mapped_column(String(16), default="digest")
+    # Share of no-action analyses that reach the debug stream (alerts/deletes always do)
+    ai_debug_sample_rate: Mapped[float] = mapped_column(Float, default=1.0)
+    # Seconds between digest posts
+    ai_debug_digest_interval: Mapped[int] = mapped_column(Integer, default=300)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, server_default=func.now(), onupdate=func.now()
@@ -115,6 +123,19 @@ class ManagedGroup(Base):
         }
     )
 
+    # Adaptive Layer-3 policy overrides (JSON, None = defaults; see ai_policy_service)
+    ai_policy: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    # Raid detection overrides (JSON, None = defaults; see raid_service)
+    raid_policy: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    # Anti-flood overrides (JSON, None = defaults; see flood_service)
+    flood_policy: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    # Strike ladder overrides (JSON, None = defaults; see escalation_service)
+    escalation_policy: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    # Layer-3 rules and thresholds for this group (None = the bot-wide ones)
+    ai_rules: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    ai_alert_threshold: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    ai_auto_delete_threshold: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
     activated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
     # Relationships
@@ -163,6 +184,49 @@ class AllowedWord(Base):
     group: Mapped["ManagedGroup"] = relationship(back_populates="allowed_words")
 
 
+class BlockedMedia(Base):
+    """Blocked media fingerprint: one file (file_unique_id) or a whole
+    sticker pack (set_name), in one group or everywhere (group_id NULL)"""
+    __tablename__ = "blocked_media"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    group_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("managed_groups.id", ondelete="CASCADE"), nullable=True, index=True
+    )
+    kind: Mapped[str] = mapped_column(String(16))              # file | sticker_set
+    value: Mapped[str] = mapped_column(String(255))
+    media_type: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
+    added_by: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
+class DomainRule(Base):
+    """Allow / deny rule for a domain and all its subdomains, in one
+    group or everywhere (group_id NULL)"""
+    __tablename__ = "domain_rules"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    group_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("managed_groups.id", ondelete="CASCADE"), nullable=True, index=True
+    )
+    domain: Mapped[str] = mapped_column(String(255))
+    action: Mapped[str] = mapped_column(String(8))             # allow | deny
+    added_by: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
+class BlockedImageHash(Base):
+    """Perceptual hash (64-bit dHash, hex) of a known-bad image; matches
+    re-encoded or resized copies within a small Hamming distance"""
+    __tablename__ = "blocked_image_hashes"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    phash: Mapped[str] = mapped_column(String(16), index=True)
+    label: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    added_by: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
 class GroupSchedule(Base):
     """Scheduled lock/unlock times for a group"""
     __tablename__ = "group_schedules"
@@ -235,8 +299,12 @@ class SupportMessage(Base):
 
 
 class AIProviderStat(Base):
-    """Daily usage statistics per AI provider key"""
+    """Daily usage statistics per AI provider key (one row per key and day,
+    counted with an upsert)"""
     __tablename__ = "ai_provider_stats"
+    __table_args__ = (
+        Index("uq_ai_provider_stats_key_date", "provider_key", "stat_date", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     # Provider name: 'gemini_1', 'gemini_2', 'gemini_3', 'huggingface'
@@ -292,6 +360,107 @@ class AIProvider(Base):
     # Lower number = tried first
     priority: Mapped[int] = mapped_column(Integer, default=10)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # Shadow models never decide: they only receive mirrored traffic
+    is_shadow: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
     endpoint: Mapped[Optional["AIEndpoint"]] = relationship(back_populates="models")
+
+
+class AIEvalCorpus(Base):
+    """Labeled message corpus uploaded from the dashboard for offline
+    prompt / model evaluations"""
+    __tablename__ = "ai_eval_corpora"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(100))
+    # [{"text": "...", "label": 1}, ...] — label 1 = abusive, 0 = normal
+    items: Mapped[list] = mapped_column(JSON, default=list)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
+class AIShadowResult(Base):
+    """One mirrored Layer-3 message scored by a shadow model, stored next to
+    the live cascade score for comparison"""
+    __tablename__ = "ai_shadow_results"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    provider_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("ai_providers.id", ondelete="CASCADE"), index=True
+    )
+    live_score: Mapped[float] = mapped_column(Float)
+    # None when the shadow call failed
+    shadow_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    latency_ms: Mapped[float] = mapped_column(Float, default=0.0)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
+
+
+class AIRetryItem(Base):
+    """Layer-3 message that got no AI verdict (every provider failed),
+    waiting to be re-scored once providers recover"""
+    __tablename__ = "ai_retry_queue"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    chat_id: Mapped[int] = mapped_column(BigInteger)
+    message_id: Mapped[int] = mapped_column(BigInteger)
+    user_id: Mapped[int] = mapped_column(BigInteger)
+    user_name: Mapped[str] = mapped_column(String(200), default="")
+    original_text: Mapped[str] = mapped_column(Text)
+    normalized_text: Mapped[str] = mapped_column(Text)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
+
+
+class UpdateOutboxItem(Base):
+    """Telegram update published by the ingest process for the worker
+    process that owns its partition"""
+    __tablename__ = "update_outbox"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    partition_id: Mapped[int] = mapped_column(Integer, index=True)
+    payload: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
+
+
+class MemberReputation(Base):
+    """Reputation of a member in one group, written behind from the
+    in-memory record (see reputation_service)"""
+    __tablename__ = "member_reputation"
+
+    chat_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    first_seen: Mapped[datetime] = mapped_column(DateTime)
+    # Last join the bot saw (None for members who were there before it)
+    joined_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    messages: Mapped[int] = mapped_column(Integer, default=0)
+    # Deleted or AI-flagged messages
+    violations: Mapped[int] = mapped_column(Integer, default=0)
+    # Alerts on this member an admin answered with "keep"
+    keeps: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+
+class MemberStrikes(Base):
+    """Recent strikes of a member in one group as time buckets, written
+    periodically from memory (see escalation_service)"""
+    __tablename__ = "member_strikes"
+
+    chat_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    # [[bucket start (unix seconds), strikes], ...]
+    buckets: Mapped[list] = mapped_column(JSON, default=list)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), index=True)
+
+
+class CacheVersion(Base):
+    """Version counter per cache invalidation topic, bumped on every change
+    (key/origin describe the latest one)"""
+    __tablename__ = "cache_versions"
+
+    topic: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=1)
+    key: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    origin: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
@@ -8,6 +8,7 @@ import { UsersPage } from '@/pages/users'
 import { ProvidersPage } from '@/pages/providers'
 import { StatsPage } from '@/pages/stats'
 import { PromptPage } from '@/pages/prompt'
+import { EvalPage } from '@/pages/eval'
 import { LogsPage } from '@/pages/logs'
 import { useRoute } from '@/lib/router'
 import { api, UnauthorizedError, type Me } from '@/lib/api'
@@ -82,6 +83,7 @@ function renderPage(path: string) {
   if (path.startsWith('/providers')) return <ProvidersPage />
   if (path.startsWith('/stats')) return <StatsPage />
   if (path.startsWith('/prompt')) return <PromptPage />
+  if (path.startsWith('/eval')) return <EvalPage />
   if (path.startsWith('/logs')) return <LogsPage />
   return <OverviewPage />
 }
@@ -2,7 +2,7 @@ import { type ReactNode, useEffect, useState } from 'react'
 import { motion } from 'framer-motion'
 import {
   LayoutDashboard, Users2, UserX, Bot, LineChart, PencilRuler,
-  ScrollText, ChevronsLeft, ChevronsRight, LogOut, Menu, X,
+  FlaskConical, ScrollText, ChevronsLeft, ChevronsRight, LogOut, Menu, X,
 } from 'lucide-react'
 import { BrandMark } from '@/components/brand-mark'
 import { useRoute, navigate } from '@/lib/router'
@@ -32,6 +32,7 @@ const GROUPS: Group[] = [
       { path: '/providers', label: 'المزودون', sub: 'الاتصالات والموديلات', icon: Bot },
       { path: '/stats', label: 'الإحصائيات', sub: 'الاستخدام والأخطاء', icon: LineChart },
       { path: '/prompt', label: 'البرومبت', sub: 'القواعد والعتبات', icon: PencilRuler },
+      { path: '/eval', label: 'التقييم', sub: 'اختبار الموديلات والقواعد', icon: FlaskConical },
     ],
   },
   {
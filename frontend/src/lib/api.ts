@@ -38,6 +38,21 @@ export type Group = {
 
 export type BlockedWord = { id: number; word: string }
 
+export type MediaBlock = {
+  id: number
+  kind: 'file' | 'sticker_set'
+  value: string
+  media_type: string | null
+  created_at: string | null
+}
+
+export type DomainRule = {
+  id: number
+  domain: string
+  action: 'allow' | 'deny'
+  created_at: string | null
+}
+
 export type BlockedUser = {
   id: number
   telegram_id: number
@@ -63,6 +78,7 @@ export type AIModel = {
   provider_type: string
   priority: number
   is_active: boolean
+  is_shadow: boolean
   endpoint_id: number | null
   endpoint_name: string | null
 }
@@ -83,6 +99,15 @@ export type StatsData = {
   summaries: { label: string; total: number; today: number }[]
 }
 
+export type DebugSettings = {
+  mode: 'digest' | 'message'
+  sample_rate: number
+  digest_interval: number
+  buffered: number
+  queued: number
+  posted: number
+}
+
 export type PromptData = {
   has_providers: boolean
   current_rules: string
@@ -90,10 +115,161 @@ export type PromptData = {
   fixed_prefix: string
   fixed_suffix: string
   debug_channel_id: number | null
+  debug_settings: DebugSettings
   alert_threshold: number
   auto_delete_threshold: number
 }
 
+export type OutboundLane = {
+  queued: number
+  oldest_wait_s: number
+  granted: number
+  dropped: number
+  retry_after: number
+  avg_wait_ms: number
+  max_wait_ms: number
+}
+
+export type OutboundMetrics = {
+  lanes: Record<'delete' | 'alert' | 'announce' | 'debug', OutboundLane>
+  tracked_chats: number
+  global_blocked_s: number
+}
+
+export type AIPolicy = {
+  adaptive: boolean
+  new_user_hours: number
+  new_user_messages: number
+  established_rate: number
+  min_rate: number
+  queue_soft_limit: number
+  queue_hard_limit: number
+  quota_soft_limit: number
+  trusted_days: number
+  trusted_messages: number
+  strict_margin: number
+  context_messages: number
+  context_tokens: number
+}
+
+export type GroupAIRules = {
+  rules: string | null
+  alert_threshold: number | null
+  auto_delete_threshold: number | null
+}
+
+export type AIPolicyStatus = {
+  load: { backlog: number; quota_used: number; pressure: number }
+  decisions: Record<string, number>
+  tracked_members: number
+  reputation: {
+    cached: number
+    dirty: number
+    pending_evicted: number
+    loaded: number
+    created: number
+    flushed: number
+    flush_errors: number
+    load_errors: number
+  }
+  chat_context: { chats: number; messages: number }
+}
+
+export type RaidPolicy = {
+  enabled: boolean
+  window_seconds: number
+  join_threshold: number
+  message_threshold: number
+  deletion_threshold: number
+  action: 'lock' | 'strict'
+  cooldown_minutes: number
+}
+
+export type FloodPolicy = {
+  enabled: boolean
+  max_messages: number
+  window_seconds: number
+  action: 'delete' | 'mute' | 'kick'
+  mute_minutes: number
+}
+
+export type EscalationPolicy = {
+  enabled: boolean
+  window_minutes: number
+  mute_strikes: number
+  mute_minutes: number
+  ban_strikes: number
+}
+
+export type RaidStatus = {
+  raids: number
+  active: { chat_id: number; trigger: string; remaining_s: number }[]
+  tracked_chats: number
+}
+
+export type ShadowModelSummary = {
+  provider_id: number
+  name: string
+  model: string
+  is_active: boolean
+  samples: number
+  errors: number
+  error_rate: number | null
+  agreement: number | null
+  mean_abs_diff: number | null
+  would_flag_more: number
+  would_flag_less: number
+  latency_p50_ms: number
+  latency_p95_ms: number
+  last_error: string | null
+}
+
+export type ShadowData = {
+  sample_rate: number
+  runtime: { pending: number; dropped: number; concurrency: number }
+  models: ShadowModelSummary[]
+}
+
+export type EvalCorpus = {
+  id: number
+  name: string
+  size: number
+  positives: number
+  created_at: string | null
+}
+
+export type EvalModelResult = {
+  provider_id: number
+  name: string
+  model: string
+  done: number
+  errors: number
+  accuracy: number | null
+  precision: number | null
+  recall: number | null
+  false_deletes: number
+  latency_p50_ms: number
+  latency_p95_ms: number
+  est_tokens: number
+  est_tokens_per_msg: number
+  last_error: string | null
+}
+
+export type EvalJob = {
+  id: string
+  corpus_id: number
+  corpus_name: string
+  total: number
+  prompt_version: string
+  alert_threshold: number
+  auto_delete_threshold: number
+  status: 'running' | 'done' | 'cancelled' | 'failed'
+  error: string | null
+  started_at: number
+  finished_at: number | null
+  models: EvalModelResult[]
+}
+
 // ── Client ────────────────────────────────────────────────────────────────────
 
 export const api = {
@@ -119,6 +295,73 @@ export const api = {
     }),
   deleteGroupWord: (groupId: number, wordId: number) =>
     req<{ ok: boolean }>(`/groups/${groupId}/words/${wordId}`, { method: 'DELETE' }),
+  groupMediaBlocks: (groupId: number) =>
+    req<{ group: MediaBlock[]; global: MediaBlock[] }>(`/groups/${groupId}/media-blocks`),
+  addMediaBlock: (groupId: number, body: { kind: MediaBlock['kind']; value: string; is_global: boolean }) =>
+    req<{ ok: boolean; message: string }>(`/groups/${groupId}/media-blocks`, {
+      method: 'POST',
+      body: JSON.stringify(body),
+    }),
+  deleteMediaBlock: (blockId: number) =>
+    req<{ ok: boolean }>(`/media-blocks/${blockId}`, { method: 'DELETE' }),
+  groupDomains: (groupId: number) =>
+    req<{ group: DomainRule[]; global: DomainRule[] }>(`/groups/${groupId}/domains`),
+  addDomainRule: (groupId: number, body: { domain: string; action: DomainRule['action']; is_global: boolean }) =>
+    req<{ ok: boolean; message: string }>(`/groups/${groupId}/domains`, {
+      method: 'POST',
+      body: JSON.stringify(body),
+    }),
+  deleteDomainRule: (ruleId: number) =>
+    req<{ ok: boolean }>(`/domains/${ruleId}`, { method: 'DELETE' }),
+  outbound: () => req<OutboundMetrics>('/outbound'),
+  groupAiPolicy: (groupId: number) =>
+    req<{ policy: AIPolicy; defaults: AIPolicy; customized: boolean }>(`/groups/${groupId}/ai-policy`),
+  saveGroupAiPolicy: (groupId: number, policy: AIPolicy) =>
+    req<{ ok: boolean; message: string }>(`/groups/${groupId}/ai-policy`, {
+      method: 'POST',
+      body: JSON.stringify(policy),
+    }),
+  groupAiRules: (groupId: number) =>
+    req<GroupAIRules & {
+      effective: { version: string; alert_threshold: number; auto_delete_threshold: number }
+    }>(`/groups/${groupId}/ai-rules`),
+  saveGroupAiRules: (groupId: number, body: GroupAIRules) =>
+    req<{ ok: boolean; message: string }>(`/groups/${groupId}/ai-rules`, {
+      method: 'POST',
+      body: JSON.stringify(body),
+    }),
+  aiPolicyStatus: () => req<AIPolicyStatus>('/ai-policy/status'),
+  groupRaidPolicy: (groupId: number) =>
+    req<{ policy: RaidPolicy; defaults: RaidPolicy; customized: boolean }>(`/groups/${groupId}/raid-policy`),
+  saveGroupRaidPolicy: (groupId: number, policy: RaidPolicy) =>
+    req<{ ok: boolean; message: string }>(`/groups/${groupId}/raid-policy`, {
+      method: 'POST',
+      body: JSON.stringify(policy),
+    }),
+  raidStatus: () => req<RaidStatus>('/raid'),
+  groupFloodPolicy: (groupId: number) =>
+    req<{ policy: FloodPolicy; defaults: FloodPolicy; customized: boolean }>(`/groups/${groupId}/flood-policy`),
+  saveGroupFloodPolicy: (groupId: number, policy: FloodPolicy) =>
+    req<{ ok: boolean; message: string }>(`/groups/${groupId}/flood-policy`, {
+      method: 'POST',
+      body: JSON.stringify(policy),
+    }),
+
+  groupEscalationPolicy: (groupId: number) =>
+    req<{ policy: EscalationPolicy; defaults: EscalationPolicy; customized: boolean }>(
+      `/groups/${groupId}/escalation-policy`,
+    ),
+  saveGroupEscalationPolicy: (groupId: number, policy: EscalationPolicy) =>
+    req<{ ok: boolean; message: string }>(`/groups/${groupId}/escalation-policy`, {
+      method: 'POST',
+      body: JSON.stringify(policy),
+    }),
+
+  purgeGroupUser: (groupId: number, userId: number, minutes: number) =>
+    req<{ ok: boolean; deleted: number; found: number; message: string }>(`/groups/${groupId}/purge`, {
+      method: 'POST',
+      body: JSON.stringify({ user_id: userId, minutes }),
+    }),
 
   blockedUsers: () => req<BlockedUser[]>('/users/blocked'),
 
@@ -137,11 +380,19 @@ export const api = {
   deleteModel: (id: number) => req<{ ok: boolean }>(`/models/${id}`, { method: 'DELETE' }),
   toggleModel: (id: number) =>
     req<{ ok: boolean; is_active: boolean }>(`/models/${id}/toggle`, { method: 'POST' }),
+  toggleShadowModel: (id: number) =>
+    req<{ ok: boolean; is_shadow: boolean }>(`/models/${id}/shadow`, { method: 'POST' }),
   reorderModels: (ids: number[]) =>
     req<{ ok: boolean }>('/models/reorder', { method: 'POST', body: JSON.stringify({ ids }) }),
 
   aiStats: (days = 30) => req<StatsData>(`/ai-stats?days=${days}`),
   deleteAiStat: (id: number) => req<{ ok: boolean }>(`/ai-stats/${id}`, { method: 'DELETE' }),
+  shadow: (hours = 24) => req<ShadowData>(`/shadow?hours=${hours}`),
+  saveShadowRate: (sample_rate: number) =>
+    req<{ ok: boolean; message: string }>('/shadow/sample-rate', {
+      method: 'POST',
+      body: JSON.stringify({ sample_rate }),
+    }),
 
   prompt: () => req<PromptData>('/prompt'),
   savePrompt: (prompt: string) =>
@@ -157,6 +408,36 @@ export const api = {
       method: 'POST',
       body: JSON.stringify({ channel_id }),
     }),
+  saveDebugSettings: (body: { mode: DebugSettings['mode']; sample_rate: number; digest_interval: number }) =>
+    req<{ ok: boolean; message: string }>('/debug-settings', { method: 'POST', body: JSON.stringify(body) }),
+
+  evalCorpora: () => req<EvalCorpus[]>('/eval/corpora'),
+  addEvalCorpus: (name: string, content: string) =>
+    req<{ ok: boolean; id: number; size: number }>('/eval/corpora', {
+      method: 'POST',
+      body: JSON.stringify({ name, content }),
+    }),
+  deleteEvalCorpus: (id: number) => req<{ ok: boolean }>(`/eval/corpora/${id}`, { method: 'DELETE' }),
+  evalJobs: () => req<EvalJob[]>('/eval/jobs'),
+  startEvalJob: (body: {
+    corpus_id: number
+    model_ids: number[]
+    prompt_source: 'current' | 'default' | 'draft'
+    draft_rules?: string
+    endpoint_concurrency?: number
+  }) => req<{ ok: boolean; job: EvalJob }>('/eval/jobs', { method: 'POST', body: JSON.stringify(body) }),
+  cancelEvalJob: (id: string) => req<{ ok: boolean }>(`/eval/jobs/${id}/cancel`, { method: 'POST' }),
+  /** Live job progress over Server-Sent Events; returns a close() function. */
+  streamEvalJob: (id: string, onSnapshot: (job: EvalJob) => void) => {
+    const es = new EventSource(`/api/eval/jobs/${id}/stream`, { withCredentials: true })
+    es.onmessage = (e) => {
+      const job = JSON.parse(e.data) as EvalJob
+      onSnapshot(job)
+      if (job.status !== 'running') es.close()
+    }
+    es.onerror = () => es.close()
+    return () => es.close()
+  },
 
   logs: (lines = 500) => req<{ content: string }>(`/logs?lines=${lines}`),
 }
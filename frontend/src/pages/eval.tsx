@@ -0,0 +1,294 @@
+import { useEffect, useState } from 'react'
+import { motion } from 'framer-motion'
+import { FlaskConical, Loader2, Play, Square, Trash2, Upload } from 'lucide-react'
+import { Card } from '@/components/ui/card'
+import { Button } from '@/components/ui/button'
+import { Select, TextArea, TextField } from '@/components/ui/field'
+import { useToast } from '@/components/ui/toast'
+import { api, type AIModel, type EvalCorpus, type EvalJob } from '@/lib/api'
+import { useData } from '@/lib/use-data'
+import { cn } from '@/lib/utils'
+import { PageSpinner, EmptyState } from '@/pages/groups'
+
+export function EvalPage() {
+  const corpora = useData(() => api.evalCorpora())
+  const models = useData(() => api.models())
+  const jobs = useData(() => api.evalJobs())
+  const [live, setLive] = useState<EvalJob | null>(null)
+
+  // Follow the newest running job (e.g. after a page refresh)
+  useEffect(() => {
+    const running = jobs.data?.find((j) => j.status === 'running')
+    if (running && !live) follow(running.id)
+  }, [jobs.data]) // eslint-disable-line react-hooks/exhaustive-deps
+
+  const follow = (id: string) => api.streamEvalJob(id, (job) => {
+    setLive(job)
+    if (job.status !== 'running') jobs.refresh(true)
+  })
+
+  if (corpora.loading || models.loading) return <PageSpinner />
+
+  return (
+    <div className="mx-auto max-w-5xl space-y-6">
+      <CorpusCard corpora={corpora.data || []} onChanged={() => corpora.refresh(true)} />
+      <LaunchCard
+        corpora={corpora.data || []}
+        models={models.data || []}
+        onStarted={(job) => { setLive(job); follow(job.id) }}
+      />
+      {live && <JobCard job={live} />}
+      {jobs.data && jobs.data.filter((j) => j.id !== live?.id).map((j) => <JobCard key={j.id} job={j} />)}
+    </div>
+  )
+}
+
+function CorpusCard({ corpora, onChanged }: { corpora: EvalCorpus[]; onChanged: () => void }) {
+  const toast = useToast()
+  const [name, setName] = useState('')
+  const [content, setContent] = useState('')
+  const [busy, setBusy] = useState(false)
+
+  const readFile = async (file: File | undefined) => {
+    if (!file) return
+    setContent(await file.text())
+    if (!name) setName(file.name.replace(/\.[^.]+$/, ''))
+  }
+
+  const upload = async () => {
+    setBusy(true)
+    try {
+      const r = await api.addEvalCorpus(name, content)
+      toast('success', `تم رفع ${r.size} رسالة`)
+      setName('')
+      setContent('')
+      onChanged()
+    } catch (err) {
+      toast('error', err instanceof Error ? err.message : 'فشل الرفع')
+    } finally {
+      setBusy(false)
+    }
+  }
+
+  const remove = async (id: number) => {
+    try {
+      await api.deleteEvalCorpus(id)
+      onChanged()
+    } catch {
+      toast('error', 'فشل الحذف')
+    }
+  }
+
+  return (
+    <Card className="p-5">
+      <h2 className="text-sm font-semibold">📚 مجموعات الاختبار</h2>
+      <p className="mt-1 text-xs text-muted">
+        رسائل مصنّفة مسبقاً: سطر لكل رسالة بصيغة <code dir="ltr">label⇥text</code> أو JSON
+        (<code dir="ltr">1</code> = مسيئة، <code dir="ltr">0</code> = عادية)
+      </p>
+
+      {corpora.length > 0 && (
+        <div className="mt-4 flex flex-wrap gap-2">
+          {corpora.map((c) => (
+            <span key={c.id} className="inline-flex items-center gap-2 rounded-full bg-bg/60 px-3 py-1 text-xs ring-1 ring-border">
+              {c.name}
+              <span className="text-muted tabular-nums">{c.size} · {c.positives} مسيئة</span>
+              <button type="button" onClick={() => remove(c.id)} className="text-muted hover:text-danger" title="حذف">
+                <Trash2 className="size-3" />
+              </button>
+            </span>
+          ))}
+        </div>
+      )}
+
+      <div className="mt-4 grid gap-x-4 sm:grid-cols-2">
+        <TextField label="الاسم" value={name} onChange={(e) => setName(e.target.value)} />
+        <div className="mb-4">
+          <label className="mb-1.5 block text-sm font-medium text-muted">ملف</label>
+          <input
+            type="file"
+            accept=".txt,.tsv,.csv,.json,.jsonl"
+            onChange={(e) => readFile(e.target.files?.[0])}
+            className="block w-full text-xs text-muted file:me-3 file:rounded-lg file:border-0 file:bg-bg-elev file:px-3 file:py-2 file:text-ink"
+          />
+        </div>
+      </div>
+      <TextArea
+        dir="auto"
+        value={content}
+        onChange={(e) => setContent(e.target.value)}
+        placeholder={'1\tانت غبي\n0\tصباح الخير'}
+      />
+      <Button size="sm" onClick={upload} disabled={busy || !content.trim()}>
+        {busy ? <Loader2 className="animate-spin" /> : <Upload />}
+        رفع
+      </Button>
+    </Card>
+  )
+}
+
+function LaunchCard({
+  corpora, models, onStarted,
+}: {
+  corpora: EvalCorpus[]
+  models: AIModel[]
+  onStarted: (job: EvalJob) => void
+}) {
+  const toast = useToast()
+  const [corpusId, setCorpusId] = useState<number | null>(null)
+  const [selected, setSelected] = useState<number[]>([])
+  const [source, setSource] = useState<'current' | 'default' | 'draft'>('current')
+  const [draft, setDraft] = useState('')
+  const [concurrency, setConcurrency] = useState(4)
+  const [busy, setBusy] = useState(false)
+
+  useEffect(() => {
+    if (corpusId === null && corpora.length) setCorpusId(corpora[0].id)
+  }, [corpora, corpusId])
+
+  const toggle = (id: number) =>
+    setSelected((s) => (s.includes(id) ? s.filter((x) => x !== id) : [...s, id]))
+
+  const start = async () => {
+    if (corpusId === null) return
+    setBusy(true)
+    try {
+      const r = await api.startEvalJob({
+        corpus_id: corpusId,
+        model_ids: selected,
+        prompt_source: source,
+        draft_rules: draft,
+        endpoint_concurrency: concurrency,
+      })
+      onStarted(r.job)
+    } catch (err) {
+      toast('error', err instanceof Error ? err.message : 'فشل التشغيل')
+    } finally {
+      setBusy(false)
+    }
+  }
+
+  if (!corpora.length) {
+    return <EmptyState icon={<FlaskConical className="size-8" />} text="ارفع مجموعة اختبار أولاً لتتمكن من تقييم الموديلات" />
+  }
+
+  return (
+    <Card className="p-5">
+      <h2 className="text-sm font-semibold">🧪 تقييم جديد</h2>
+      <div className="mt-4 grid gap-x-4 sm:grid-cols-3">
+        <Select label="مجموعة الاختبار" value={corpusId ?? ''} onChange={(e) => setCorpusId(Number(e.target.value))}>
+          {corpora.map((c) => <option key={c.id} value={c.id}>{c.name}</option>)}
+        </Select>
+        <Select label="القواعد" value={source} onChange={(e) => setSource(e.target.value as typeof source)}>
+          <option value="current">القواعد المحفوظة حالياً</option>
+          <option value="default">القواعد الافتراضية</option>
+          <option value="draft">مسودة جديدة</option>
+        </Select>
+        <TextField
+          label="الطلبات المتزامنة لكل مزود"
+          type="number"
+          min={1}
+          max={32}
+          value={concurrency}
+          onChange={(e) => setConcurrency(Number(e.target.value) || 1)}
+        />
+      </div>
+      {source === 'draft' && (
+        <TextArea label="مسودة القواعد" value={draft} onChange={(e) => setDraft(e.target.value)} />
+      )}
+      <div className="mb-4 flex flex-wrap gap-2">
+        {models.map((m) => (
+          <button
+            key={m.id}
+            type="button"
+            onClick={() => toggle(m.id)}
+            className={cn(
+              'rounded-full px-3 py-1 text-xs ring-1 transition-colors',
+              selected.includes(m.id) ? 'bg-accent/15 text-ink ring-accent/40' : 'bg-bg/60 text-muted ring-border hover:text-ink'
+            )}
+          >
+            <span dir="ltr">{m.name}</span>
+            {!m.is_active && <span className="ms-1 text-muted">(متوقف)</span>}
+          </button>
+        ))}
+      </div>
+      <Button size="sm" onClick={start} disabled={busy || !selected.length || corpusId === null}>
+        {busy ? <Loader2 className="animate-spin" /> : <Play />}
+        تشغيل التقييم
+      </Button>
+    </Card>
+  )
+}
+
+const pct = (v: number | null) => (v === null ? '—' : `${Math.round(v * 100)}%`)
+
+function JobCard({ job }: { job: EvalJob }) {
+  const toast = useToast()
+  const running = job.status === 'running'
+
+  const cancel = async () => {
+    try {
+      await api.cancelEvalJob(job.id)
+    } catch {
+      toast('error', 'فشل الإيقاف')
+    }
+  }
+
+  return (
+    <motion.div initial={{ opacity: 0, y: 8 }} animate={{ opacity: 1, y: 0 }}>
+      <Card className="overflow-hidden p-5">
+        <div className="flex flex-wrap items-center gap-3">
+          <h3 className="text-sm font-semibold">{job.corpus_name}</h3>
+          <span className="rounded-full bg-bg/60 px-2 py-0.5 font-mono text-[11px] text-muted ring-1 ring-border" dir="ltr">
+            rules:{job.prompt_version}
+          </span>
+          <span className="text-[11px] text-muted">
+            تنبيه ≥ {pct(job.alert_threshold)} · حذف ≥ {pct(job.auto_delete_threshold)}
+          </span>
+          <span className={cn('ms-auto text-xs', running ? 'text-warning' : job.status === 'done' ? 'text-success' : 'text-danger')}>
+            {running && <Loader2 className="me-1 inline size-3 animate-spin" />}
+            {job.status}
+          </span>
+          {running && (
+            <Button size="sm" variant="danger" onClick={cancel}>
+              <Square />
+              إيقاف
+            </Button>
+          )}
+        </div>
+        <div className="mt-4 overflow-x-auto">
+          <table className="w-full text-xs tabular-nums">
+            <thead className="text-muted">
+              <tr className="text-start">
+                <th className="py-1.5 text-start font-medium">الموديل</th>
+                <th className="font-medium">التقدم</th>
+                <th className="font-medium">الدقة</th>
+                <th className="font-medium">Precision</th>
+                <th className="font-medium">Recall</th>
+                <th className="font-medium">حذف خاطئ</th>
+                <th className="font-medium">p50 / p95</th>
+                <th className="font-medium">توكن/رسالة</th>
+                <th className="font-medium">أخطاء</th>
+              </tr>
+            </thead>
+            <tbody>
+              {job.models.map((m) => (
+                <tr key={m.provider_id} className="border-t border-border text-center" title={m.last_error || undefined}>
+                  <td className="py-2 text-start font-mono" dir="ltr">{m.name}</td>
+                  <td>{m.done}/{job.total}</td>
+                  <td className="font-semibold">{pct(m.accuracy)}</td>
+                  <td>{pct(m.precision)}</td>
+                  <td>{pct(m.recall)}</td>
+                  <td className={cn(m.false_deletes > 0 && 'text-danger')}>{m.false_deletes}</td>
+                  <td dir="ltr">{Math.round(m.latency_p50_ms)} / {Math.round(m.latency_p95_ms)} ms</td>
+                  <td>{m.est_tokens_per_msg}</td>
+                  <td className={cn(m.errors > 0 && 'text-warning')}>{m.errors}</td>
+                </tr>
+              ))}
+            </tbody>
+          </table>
+        </div>
+      </Card>
+    </motion.div>
+  )
+}
@@ -1,11 +1,13 @@
-import { useState } from 'react'
+import { useEffect, useState } from 'react'
 import { AnimatePresence, motion } from 'framer-motion'
-import { Users2, Plus, Loader2, X, Ban, Trash2 } from 'lucide-react'
+import { Users2, Plus, Loader2, X, Ban, Trash2, Gauge, Save, ShieldAlert } from 'lucide-react'
 import { Card } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
-import { TextField, inputCls } from '@/components/ui/field'
+import { TextField, Select, Toggle, inputCls } from '@/components/ui/field'
 import { useToast } from '@/components/ui/toast'
-import { api, type Group, type BlockedWord } from '@/lib/api'
+import {
+  api, type AIPolicy, type EscalationPolicy, type FloodPolicy, type RaidPolicy, type Group, type BlockedWord, type MediaBlock, type DomainRule,
+} from '@/lib/api'
 import { useData } from '@/lib/use-data'
 import { cn, timeAgo } from '@/lib/utils'
 
@@ -16,6 +18,8 @@ export function GroupsPage() {
   const [gname, setGname] = useState('')
   const [busy, setBusy] = useState(false)
   const [wordsGroup, setWordsGroup] = useState<Group | null>(null)
+  const [policyGroup, setPolicyGroup] = useState<Group | null>(null)
+  const [protectionGroup, setProtectionGroup] = useState<Group | null>(null)
 
   const addGroup = async (e: React.FormEvent) => {
     e.preventDefault()
@@ -65,6 +69,14 @@ export function GroupsPage() {
                     <span>{timeAgo(g.activated_at)}</span>
                   </p>
                 </div>
+                <Button variant="outline" size="sm" onClick={() => setPolicyGroup(g)}>
+                  <Gauge className="size-3.5" />
+                  سياسة التحليل
+                </Button>
+                <Button variant="outline" size="sm" onClick={() => setProtectionGroup(g)}>
+                  <ShieldAlert className="size-3.5" />
+                  الحماية
+                </Button>
                 <Button variant="outline" size="sm" onClick={() => setWordsGroup(g)}>
                   <Ban className="size-3.5" />
                   الكلمات المحظورة
@@ -107,6 +119,16 @@ export function GroupsPage() {
           <WordsDrawer group={wordsGroup} onClose={() => setWordsGroup(null)} />
         )}
       </AnimatePresence>
+      <AnimatePresence>
+        {policyGroup && (
+          <PolicyDrawer group={policyGroup} onClose={() => setPolicyGroup(null)} />
+        )}
+      </AnimatePresence>
+      <AnimatePresence>
+        {protectionGroup && (
+          <ProtectionDrawer group={protectionGroup} onClose={() => setProtectionGroup(null)} />
+        )}
+      </AnimatePresence>
     </div>
   )
 }
@@ -214,12 +236,666 @@ function WordsDrawer({ group, onClose }: { group: Group; onClose: () => void })
               </AnimatePresence>
             </ul>
           )}
+          <MediaBlocks group={group} />
+          <DomainRules group={group} />
+        </div>
+      </motion.aside>
+    </motion.div>
+  )
+}
+
+const MEDIA_KIND_LABELS: Record<MediaBlock['kind'], string> = {
+  file: '🖼 ملف',
+  sticker_set: '🎭 حزمة ملصقات',
+}
+
+function MediaBlocks({ group }: { group: Group }) {
+  const { data, refresh } = useData(() => api.groupMediaBlocks(group.id))
+  const toast = useToast()
+  const [kind, setKind] = useState<MediaBlock['kind']>('sticker_set')
+  const [value, setValue] = useState('')
+  const [isGlobal, setIsGlobal] = useState(false)
+  const [busy, setBusy] = useState(false)
+
+  const add = async (e: React.FormEvent) => {
+    e.preventDefault()
+    if (!value.trim() || busy) return
+    setBusy(true)
+    try {
+      const r = await api.addMediaBlock(group.id, { kind, value: value.trim(), is_global: isGlobal })
+      toast('success', r.message)
+      setValue('')
+      refresh(true)
+    } catch (err) {
+      toast('error', err instanceof Error ? err.message : 'فشل الإضافة')
+    } finally {
+      setBusy(false)
+    }
+  }
+
+  const remove = async (b: MediaBlock) => {
+    try {
+      await api.deleteMediaBlock(b.id)
+      refresh(true)
+    } catch {
+      toast('error', 'فشل الحذف')
+    }
+  }
+
+  const entries = data ? [...data.group, ...data.global.map((b) => ({ ...b, global: true }))] : []
+
+  return (
+    <section className="mt-6 border-t border-border pt-5">
+      <h3 className="mb-1 text-xs font-semibold text-muted">🖼 الوسائط المحظورة</h3>
+      <p className="mb-3 text-xs text-muted/70">
+        أسرع طريقة: رد على الملصق أو الصورة في المجموعة بـ <code>#حظر_الوسائط</code> أو <code>#حظر_الحزمة</code>
+      </p>
+      <form onSubmit={add} className="mb-4 space-y-2">
+        <div className="flex gap-2">
+          <select
+            className={cn(inputCls, 'w-auto appearance-none')}
+            value={kind}
+            onChange={(e) => setKind(e.target.value as MediaBlock['kind'])}
+          >
+            <option value="sticker_set">حزمة ملصقات</option>
+            <option value="file">ملف (file_unique_id)</option>
+          </select>
+          <input
+            className={inputCls}
+            dir="ltr"
+            placeholder={kind === 'sticker_set' ? 'set_name' : 'file_unique_id'}
+            value={value}
+            onChange={(e) => setValue(e.target.value)}
+          />
+          <Button type="submit" size="sm" disabled={busy || !value.trim()}>
+            {busy ? <Loader2 className="animate-spin" /> : <Plus />}
+          </Button>
+        </div>
+        <label className="flex items-center gap-2 text-xs text-muted">
+          <input type="checkbox" checked={isGlobal} onChange={(e) => setIsGlobal(e.target.checked)} />
+          حظر في جميع المجموعات
+        </label>
+      </form>
+      {!data ? (
+        <PageSpinner />
+      ) : !entries.length ? (
+        <p className="text-center text-sm text-muted">لا توجد وسائط محظورة</p>
+      ) : (
+        <ul className="space-y-1.5">
+          {entries.map((b) => (
+            <li key={b.id} className="flex items-center gap-2 rounded-lg border border-border bg-bg/60 px-3 py-2 text-xs">
+              <span className="shrink-0">{MEDIA_KIND_LABELS[b.kind]}</span>
+              <span dir="ltr" className="min-w-0 flex-1 truncate font-mono text-muted">{b.value}</span>
+              {'global' in b && <span className="shrink-0 text-muted">🌐 عام</span>}
+              <button
+                type="button"
+                onClick={() => remove(b)}
+                className="grid size-5 shrink-0 place-items-center rounded-full text-muted hover:bg-danger/15 hover:text-danger"
+              >
+                <Trash2 className="size-3" />
+              </button>
+            </li>
+          ))}
+        </ul>
+      )}
+    </section>
+  )
+}
+
+function DomainRules({ group }: { group: Group }) {
+  const { data, refresh } = useData(() => api.groupDomains(group.id))
+  const toast = useToast()
+  const [action, setAction] = useState<DomainRule['action']>('allow')
+  const [domain, setDomain] = useState('')
+  const [isGlobal, setIsGlobal] = useState(false)
+  const [busy, setBusy] = useState(false)
+
+  const add = async (e: React.FormEvent) => {
+    e.preventDefault()
+    if (!domain.trim() || busy) return
+    setBusy(true)
+    try {
+      const r = await api.addDomainRule(group.id, { domain: domain.trim(), action, is_global: isGlobal })
+      toast('success', r.message)
+      setDomain('')
+      refresh(true)
+    } catch (err) {
+      toast('error', err instanceof Error ? err.message : 'فشل الإضافة')
+    } finally {
+      setBusy(false)
+    }
+  }
+
+  const remove = async (r: DomainRule) => {
+    try {
+      await api.deleteDomainRule(r.id)
+      refresh(true)
+    } catch {
+      toast('error', 'فشل الحذف')
+    }
+  }
+
+  const entries = data ? [...data.group, ...data.global.map((r) => ({ ...r, global: true }))] : []
+
+  return (
+    <section className="mt-6 border-t border-border pt-5">
+      <h3 className="mb-1 text-xs font-semibold text-muted">🔗 نطاقات الروابط</h3>
+      <p className="mb-3 text-xs text-muted/70">
+        القاعدة تشمل النطاقات الفرعية، وباقي الروابط تتبع إعداد الروابط في المجموعة
+      </p>
+      <form onSubmit={add} className="mb-4 space-y-2">
+        <div className="flex gap-2">
+          <select
+            className={cn(inputCls, 'w-auto appearance-none')}
+            value={action}
+            onChange={(e) => setAction(e.target.value as DomainRule['action'])}
+          >
+            <option value="allow">سماح</option>
+            <option value="deny">حظر</option>
+          </select>
+          <input
+            className={inputCls}
+            dir="ltr"
+            placeholder="example.com"
+            value={domain}
+            onChange={(e) => setDomain(e.target.value)}
+          />
+          <Button type="submit" size="sm" disabled={busy || !domain.trim()}>
+            {busy ? <Loader2 className="animate-spin" /> : <Plus />}
+          </Button>
+        </div>
+        <label className="flex items-center gap-2 text-xs text-muted">
+          <input type="checkbox" checked={isGlobal} onChange={(e) => setIsGlobal(e.target.checked)} />
+          تطبيق في جميع المجموعات
+        </label>
+      </form>
+      {!data ? (
+        <PageSpinner />
+      ) : !entries.length ? (
+        <p className="text-center text-sm text-muted">لا توجد قواعد</p>
+      ) : (
+        <ul className="space-y-1.5">
+          {entries.map((r) => (
+            <li key={r.id} className="flex items-center gap-2 rounded-lg border border-border bg-bg/60 px-3 py-2 text-xs">
+              <span className={cn('shrink-0', r.action === 'deny' ? 'text-danger' : 'text-success')}>
+                {r.action === 'deny' ? '⛔ حظر' : '✅ سماح'}
+              </span>
+              <span dir="ltr" className="min-w-0 flex-1 truncate font-mono text-muted">{r.domain}</span>
+              {'global' in r && <span className="shrink-0 text-muted">🌐 عام</span>}
+              <button
+                type="button"
+                onClick={() => remove(r)}
+                className="grid size-5 shrink-0 place-items-center rounded-full text-muted hover:bg-danger/15 hover:text-danger"
+              >
+                <Trash2 className="size-3" />
+              </button>
+            </li>
+          ))}
+        </ul>
+      )}
+    </section>
+  )
+}
+
+const POLICY_FIELDS: { key: Exclude<keyof AIPolicy, 'adaptive'>; label: string; hint: string; step?: number }[] = [
+  { key: 'new_user_messages', label: 'رسائل العضو الجديد', hint: 'كل رسائل العضو تُحلَّل حتى يتجاوز هذا العدد' },
+  { key: 'new_user_hours', label: 'ساعات بعد الانضمام', hint: 'العضو المنضم حديثاً تُحلَّل كل رسائله خلال هذه المدة' },
+  { key: 'established_rate', label: 'نسبة العينة للأعضاء القدامى', hint: 'عند عدم وجود ضغط (1 = كل الرسائل)', step: 0.05 },
+  { key: 'min_rate', label: 'أدنى نسبة عينة', hint: 'عند أقصى ضغط', step: 0.01 },
+  { key: 'queue_soft_limit', label: 'بداية التخفيف (طلبات معلقة)', hint: 'عدد طلبات التحليل الجارية والمؤجلة' },
+  { key: 'queue_hard_limit', label: 'أقصى تخفيف (طلبات معلقة)', hint: '' },
+  { key: 'quota_soft_limit', label: 'بداية التخفيف (استهلاك الحصة)', hint: 'نسبة من الحصة اليومية (0.7 = 70%)', step: 0.05 },
+  { key: 'trusted_days', label: 'أيام العضو الموثوق', hint: 'العضو الموثوق لا تُحلَّل رسائله (0 = تعطيل)' },
+  { key: 'trusted_messages', label: 'رسائل العضو الموثوق', hint: 'بدون مخالفات لم يسمح بها المشرفون' },
+  { key: 'strict_margin', label: 'هامش التشدد', hint: 'يُخفَّض به حدا التنبيه والحذف للأعضاء الجدد ومن سبق التنبيه عليهم', step: 0.05 },
+  { key: 'context_messages', label: 'رسائل السياق', hint: 'آخر رسائل المحادثة تُرسل مع الرسالة ليفهمها النموذج (0 = تعطيل، حتى 10)' },
+  { key: 'context_tokens', label: 'حد حجم السياق (رموز)', hint: 'تُقدَّم الرسالة المردود عليها ثم الأحدث فالأقدم' },
+]
+
+function PolicyDrawer({ group, onClose }: { group: Group; onClose: () => void }) {
+  const { data } = useData(() => api.groupAiPolicy(group.id))
+  const status = useData(() => api.aiPolicyStatus(), 5_000)
+  const toast = useToast()
+  const [policy, setPolicy] = useState<AIPolicy | null>(null)
+  const [busy, setBusy] = useState(false)
+
+  useEffect(() => {
+    if (data) setPolicy(data.policy)
+  }, [data])
+
+  const save = async () => {
+    if (!policy) return
+    setBusy(true)
+    try {
+      const r = await api.saveGroupAiPolicy(group.id, policy)
+      toast('success', r.message)
+    } catch (err) {
+      toast('error', err instanceof Error ? err.message : 'فشل الحفظ')
+    } finally {
+      setBusy(false)
+    }
+  }
+
+  const load = status.data?.load
+
+  return (
+    <motion.div
+      initial={{ opacity: 0 }}
+      animate={{ opacity: 1 }}
+      exit={{ opacity: 0 }}
+      className="fixed inset-0 z-[80] bg-bg/70 backdrop-blur-sm"
+      onClick={onClose}
+    >
+      <motion.aside
+        initial={{ x: '-100%' }}
+        animate={{ x: 0 }}
+        exit={{ x: '-100%' }}
+        transition={{ type: 'spring', bounce: 0.1, duration: 0.45 }}
+        className="absolute inset-y-0 start-0 flex w-[min(92vw,26rem)] flex-col border-e border-border glass-card"
+        onClick={(e) => e.stopPropagation()}
+      >
+        <header className="flex items-center justify-between gap-3 border-b border-border px-5 py-4">
+          <div className="min-w-0">
+            <h2 className="truncate text-sm font-semibold">⚖️ سياسة التحليل الذكي</h2>
+            <p className="truncate text-xs text-muted">{group.name}</p>
+          </div>
+          <button
+            type="button"
+            onClick={onClose}
+            className="grid size-8 shrink-0 place-items-center rounded-lg text-muted hover:bg-bg-elev hover:text-ink"
+          >
+            <X className="size-4" />
+          </button>
+        </header>
+
+        {load && (
+          <div className="grid grid-cols-3 gap-2 border-b border-border px-5 py-3 text-center text-[11px] text-muted tabular-nums">
+            <span>معلّق<br /><b className="text-sm text-ink">{load.backlog}</b></span>
+            <span>الحصة<br /><b className="text-sm text-ink">{Math.round(load.quota_used * 100)}%</b></span>
+            <span>الضغط<br /><b className={cn('text-sm', load.pressure > 0 ? 'text-warning' : 'text-ink')}>{Math.round(load.pressure * 100)}%</b></span>
+          </div>
+        )}
+
+        <div className="flex-1 overflow-y-auto p-5">
+          {!policy ? (
+            <PageSpinner />
+          ) : (
+            <>
+              <div className="mb-5">
+                <Toggle
+                  checked={policy.adaptive}
+                  onChange={(v) => setPolicy({ ...policy, adaptive: v })}
+                  label="التحليل التكيّفي"
+                  hint="الأعضاء الجدد ومن سبق التنبيه عليهم يُحلَّلون دائماً وبتشدد، والموثوقون لا يُحلَّلون، وبقية الأعضاء بعينة تقل مع الضغط"
+                />
+              </div>
+              {policy.adaptive && POLICY_FIELDS.map((f) => (
+                <TextField
+                  key={f.key}
+                  label={f.label}
+                  hint={f.hint || undefined}
+                  type="number"
+                  step={f.step ?? 1}
+                  min={0}
+                  dir="ltr"
+                  value={policy[f.key]}
+                  onChange={(e) => setPolicy({ ...policy, [f.key]: Number(e.target.value) })}
+                />
+              ))}
+              <Button size="sm" onClick={save} disabled={busy}>
+                {busy ? <Loader2 className="animate-spin" /> : <Save />}
+                حفظ
+              </Button>
+            </>
+          )}
+          <GroupRules group={group} />
         </div>
       </motion.aside>
     </motion.div>
   )
 }
 
+function GroupRules({ group }: { group: Group }) {
+  const { data, refresh } = useData(() => api.groupAiRules(group.id))
+  const toast = useToast()
+  const [rules, setRules] = useState('')
+  const [alert, setAlert] = useState('')
+  const [autoDelete, setAutoDelete] = useState('')
+  const [busy, setBusy] = useState(false)
+
+  useEffect(() => {
+    if (!data) return
+    setRules(data.rules ?? '')
+    setAlert(data.alert_threshold?.toString() ?? '')
+    setAutoDelete(data.auto_delete_threshold?.toString() ?? '')
+  }, [data])
+
+  const save = async () => {
+    setBusy(true)
+    try {
+      const r = await api.saveGroupAiRules(group.id, {
+        rules: rules.trim() || null,
+        alert_threshold: alert.trim() ? Number(alert) : null,
+        auto_delete_threshold: autoDelete.trim() ? Number(autoDelete) : null,
+      })
+      toast('success', r.message)
+      refresh(true)
+    } catch (err) {
+      toast('error', err instanceof Error ? err.message : 'فشل الحفظ')
+    } finally {
+      setBusy(false)
+    }
+  }
+
+  return (
+    <section className="mt-6 border-t border-border pt-5">
+      <h3 className="mb-1 text-xs font-semibold text-muted">📜 قواعد المجموعة</h3>
+      <p className="mb-3 text-xs text-muted/70">
+        اتركها فارغة لاستخدام القواعد والعتبات العامة للبوت
+        {data && <> (الحالية: تنبيه {data.effective.alert_threshold} / حذف {data.effective.auto_delete_threshold})</>}
+      </p>
+      <textarea
+        className={cn(inputCls, 'mb-3 min-h-28 resize-y leading-relaxed')}
+        value={rules}
+        onChange={(e) => setRules(e.target.value)}
+        placeholder="- الشتائم والألفاظ النابية …"
+      />
+      <div className="grid grid-cols-2 gap-2">
+        <TextField
+          label="عتبة التنبيه"
+          type="number"
+          step={0.05}
+          min={0}
+          max={1}
+          dir="ltr"
+          placeholder={data?.effective.alert_threshold.toString()}
+          value={alert}
+          onChange={(e) => setAlert(e.target.value)}
+        />
+        <TextField
+          label="عتبة الحذف التلقائي"
+          type="number"
+          step={0.05}
+          min={0}
+          max={1}
+          dir="ltr"
+          placeholder={data?.effective.auto_delete_threshold.toString()}
+          value={autoDelete}
+          onChange={(e) => setAutoDelete(e.target.value)}
+        />
+      </div>
+      <Button size="sm" onClick={save} disabled={busy || !data}>
+        {busy ? <Loader2 className="animate-spin" /> : <Save />}
+        حفظ القواعد
+      </Button>
+    </section>
+  )
+}
+
+const RAID_FIELDS: { key: Exclude<keyof RaidPolicy, 'enabled' | 'action'>; label: string; hint: string }[] = [
+  { key: 'window_seconds', label: 'نافذة الرصد (ثانية)', hint: 'تُحسب الأحداث خلال آخر هذه المدة (10–600)' },
+  { key: 'join_threshold', label: 'حد الانضمام', hint: 'عدد الأعضاء المنضمين خلال النافذة' },
+  { key: 'message_threshold', label: 'حد الرسائل', hint: 'عدد الرسائل خلال النافذة' },
+  { key: 'deletion_threshold', label: 'حد الرسائل المحذوفة', hint: 'رسائل حذفها البوت لمخالفتها خلال النافذة' },
+  { key: 'cooldown_minutes', label: 'مدة الحماية (دقيقة)', hint: 'تُفتح المجموعة ويعود الإشراف العادي بعدها' },
+]
+
+const FLOOD_FIELDS: { key: 'max_messages' | 'window_seconds'; label: string; hint: string }[] = [
+  { key: 'max_messages', label: 'أقصى عدد رسائل', hint: 'للعضو الواحد خلال المدة التالية (1–50)' },
+  { key: 'window_seconds', label: 'خلال (ثانية)', hint: '' },
+]
+
+const ESCALATION_FIELDS: { key: Exclude<keyof EscalationPolicy, 'enabled'>; label: string; hint: string }[] = [
+  { key: 'window_minutes', label: 'نافذة المخالفات (دقيقة)', hint: 'تُحسب الرسائل المحذوفة للعضو خلال آخر هذه المدة' },
+  { key: 'mute_strikes', label: 'مخالفات الكتم', hint: '0 = بدون كتم' },
+  { key: 'mute_minutes', label: 'مدة الكتم (دقيقة)', hint: '' },
+  { key: 'ban_strikes', label: 'مخالفات الحظر', hint: '0 = بدون حظر' },
+]
+
+function ProtectionDrawer({ group, onClose }: { group: Group; onClose: () => void }) {
+  const { data } = useData(() => api.groupRaidPolicy(group.id))
+  const floodData = useData(() => api.groupFloodPolicy(group.id))
+  const escalationData = useData(() => api.groupEscalationPolicy(group.id))
+  const status = useData(() => api.raidStatus(), 5_000)
+  const toast = useToast()
+  const [raid, setRaid] = useState<RaidPolicy | null>(null)
+  const [flood, setFlood] = useState<FloodPolicy | null>(null)
+  const [ladder, setLadder] = useState<EscalationPolicy | null>(null)
+  const [busy, setBusy] = useState(false)
+
+  useEffect(() => {
+    if (data) setRaid(data.policy)
+  }, [data])
+
+  useEffect(() => {
+    if (floodData.data) setFlood(floodData.data.policy)
+  }, [floodData.data])
+
+  useEffect(() => {
+    if (escalationData.data) setLadder(escalationData.data.policy)
+  }, [escalationData.data])
+
+  const save = async () => {
+    if (!raid || !flood || !ladder) return
+    setBusy(true)
+    try {
+      await api.saveGroupFloodPolicy(group.id, flood)
+      await api.saveGroupEscalationPolicy(group.id, ladder)
+      await api.saveGroupRaidPolicy(group.id, raid)
+      toast('success', 'تم حفظ إعدادات الحماية')
+    } catch (err) {
+      toast('error', err instanceof Error ? err.message : 'فشل الحفظ')
+    } finally {
+      setBusy(false)
+    }
+  }
+
+  const active = status.data?.active.find((a) => a.chat_id === group.telegram_group_id)
+
+  return (
+    <motion.div
+      initial={{ opacity: 0 }}
+      animate={{ opacity: 1 }}
+      exit={{ opacity: 0 }}
+      className="fixed inset-0 z-[80] bg-bg/70 backdrop-blur-sm"
+      onClick={onClose}
+    >
+      <motion.aside
+        initial={{ x: '-100%' }}
+        animate={{ x: 0 }}
+        exit={{ x: '-100%' }}
+        transition={{ type: 'spring', bounce: 0.1, duration: 0.45 }}
+        className="absolute inset-y-0 start-0 flex w-[min(92vw,26rem)] flex-col border-e border-border glass-card"
+        onClick={(e) => e.stopPropagation()}
+      >
+        <header className="flex items-center justify-between gap-3 border-b border-border px-5 py-4">
+          <div className="min-w-0">
+            <h2 className="truncate text-sm font-semibold">🛡 الحماية من الهجمات</h2>
+            <p className="truncate text-xs text-muted">{group.name}</p>
+          </div>
+          <button
+            type="button"
+            onClick={onClose}
+            className="grid size-8 shrink-0 place-items-center rounded-lg text-muted hover:bg-bg-elev hover:text-ink"
+          >
+            <X className="size-4" />
+          </button>
+        </header>
+
+        {active && (
+          <div className="border-b border-border bg-warning/10 px-5 py-3 text-xs text-warning">
+            🚨 وضع الهجوم مفعّل · متبقٍ {Math.ceil(active.remaining_s / 60)} دقيقة
+          </div>
+        )}
+
+        <div className="flex-1 overflow-y-auto p-5">
+          {!raid || !flood || !ladder ? (
+            <PageSpinner />
+          ) : (
+            <>
+              <h3 className="mb-3 text-xs font-semibold text-muted">🌊 منع التكرار</h3>
+              <div className="mb-5">
+                <Toggle
+                  checked={flood.enabled}
+                  onChange={(v) => setFlood({ ...flood, enabled: v })}
+                  label="منع التكرار"
+                  hint="رسائل العضو الزائدة تُحذف قبل أي فحص آخر"
+                />
+              </div>
+              {flood.enabled && (
+                <>
+                  {FLOOD_FIELDS.map((f) => (
+                    <TextField
+                      key={f.key}
+                      label={f.label}
+                      hint={f.hint || undefined}
+                      type="number"
+                      min={1}
+                      dir="ltr"
+                      value={flood[f.key]}
+                      onChange={(e) => setFlood({ ...flood, [f.key]: Number(e.target.value) })}
+                    />
+                  ))}
+                  <Select
+                    label="الإجراء مع المكرِّر"
+                    value={flood.action}
+                    onChange={(e) => setFlood({ ...flood, action: e.target.value as FloodPolicy['action'] })}
+                  >
+                    <option value="delete">حذف الرسائل الزائدة فقط</option>
+                    <option value="mute">كتم مؤقت</option>
+                    <option value="kick">طرد من المجموعة</option>
+                  </Select>
+                  {flood.action === 'mute' && (
+                    <TextField
+                      label="مدة الكتم (دقيقة)"
+                      type="number"
+                      min={1}
+                      dir="ltr"
+                      value={flood.mute_minutes}
+                      onChange={(e) => setFlood({ ...flood, mute_minutes: Number(e.target.value) })}
+                    />
+                  )}
+                </>
+              )}
+
+              <h3 className="mb-3 mt-2 border-t border-border pt-5 text-xs font-semibold text-muted">⚖️ سلم العقوبات</h3>
+              <div className="mb-5">
+                <Toggle
+                  checked={ladder.enabled}
+                  onChange={(v) => setLadder({ ...ladder, enabled: v })}
+                  label="تصعيد العقوبات"
+                  hint="كل رسالة تحذفها الفلاتر مخالفة؛ تكرارها يؤدي إلى الكتم ثم الحظر"
+                />
+              </div>
+              {ladder.enabled &&
+                ESCALATION_FIELDS.map((f) => (
+                  <TextField
+                    key={f.key}
+                    label={f.label}
+                    hint={f.hint || undefined}
+                    type="number"
+                    min={f.key.endsWith('_strikes') ? 0 : 1}
+                    dir="ltr"
+                    value={ladder[f.key]}
+                    onChange={(e) => setLadder({ ...ladder, [f.key]: Number(e.target.value) })}
+                  />
+                ))}
+
+              <h3 className="mb-3 mt-2 border-t border-border pt-5 text-xs font-semibold text-muted">🚨 الهجمات</h3>
+              <div className="mb-5">
+                <Toggle
+                  checked={raid.enabled}
+                  onChange={(v) => setRaid({ ...raid, enabled: v })}
+                  label="رصد الهجمات"
+                  hint="عند تجاوز أي حد تُفعَّل الحماية: بدون تحليل ذكي، وتُحذف الروابط مباشرة"
+                />
+              </div>
+              {raid.enabled && (
+                <>
+                  <Select
+                    label="الإجراء عند الهجوم"
+                    value={raid.action}
+                    onChange={(e) => setRaid({ ...raid, action: e.target.value as RaidPolicy['action'] })}
+                  >
+                    <option value="lock">قفل المجموعة مؤقتاً</option>
+                    <option value="strict">إشراف صارم فقط</option>
+                  </Select>
+                  {RAID_FIELDS.map((f) => (
+                    <TextField
+                      key={f.key}
+                      label={f.label}
+                      hint={f.hint}
+                      type="number"
+                      min={1}
+                      dir="ltr"
+                      value={raid[f.key]}
+                      onChange={(e) => setRaid({ ...raid, [f.key]: Number(e.target.value) })}
+                    />
+                  ))}
+                </>
+              )}
+              <Button size="sm" onClick={save} disabled={busy}>
+                {busy ? <Loader2 className="animate-spin" /> : <Save />}
+                حفظ
+              </Button>
+            </>
+          )}
+          <PurgeUser group={group} />
+        </div>
+      </motion.aside>
+    </motion.div>
+  )
+}
+
+function PurgeUser({ group }: { group: Group }) {
+  const toast = useToast()
+  const [userId, setUserId] = useState('')
+  const [minutes, setMinutes] = useState(60)
+  const [busy, setBusy] = useState(false)
+
+  const purge = async () => {
+    if (!userId.trim()) return
+    setBusy(true)
+    try {
+      const r = await api.purgeGroupUser(group.id, Number(userId), minutes)
+      toast('success', r.message)
+    } catch (err) {
+      toast('error', err instanceof Error ? err.message : 'فشل الحذف')
+    } finally {
+      setBusy(false)
+    }
+  }
+
+  return (
+    <section className="mt-6 border-t border-border pt-5">
+      <h3 className="mb-1 text-xs font-semibold text-muted">🧹 حذف رسائل عضو</h3>
+      <p className="mb-3 text-xs text-muted/70">تُحذف رسائل العضو الأخيرة التي ما زال البوت يتذكرها</p>
+      <div className="grid grid-cols-2 gap-2">
+        <TextField
+          label="معرّف العضو"
+          type="number"
+          dir="ltr"
+          value={userId}
+          onChange={(e) => setUserId(e.target.value)}
+        />
+        <TextField
+          label="خلال آخر (دقيقة)"
+          type="number"
+          min={1}
+          max={2880}
+          dir="ltr"
+          value={minutes}
+          onChange={(e) => setMinutes(Number(e.target.value))}
+        />
+      </div>
+      <Button size="sm" variant="danger" onClick={purge} disabled={busy || !userId.trim()}>
+        {busy ? <Loader2 className="animate-spin" /> : <Trash2 />}
+        حذف الرسائل
+      </Button>
+    </section>
+  )
+}
+
 export function PageSpinner() {
   return (
     <div className="grid place-items-center py-16 text-muted">
@@ -1,7 +1,7 @@
 import { motion } from 'framer-motion'
 import { Users, UserX, Users2, ShieldCheck, ArrowLeft, Bot, LineChart, PencilRuler } from 'lucide-react'
 import { Card } from '@/components/ui/card'
-import { api } from '@/lib/api'
+import { api, type OutboundMetrics } from '@/lib/api'
 import { useData } from '@/lib/use-data'
 import { navigate } from '@/lib/router'
 
@@ -18,8 +18,58 @@ const LINKS = [
   { path: '/prompt', label: 'محرر البرومبت', sub: 'قواعد المجموعة وعتبات الإجراء', icon: PencilRuler },
 ]
 
+const LANES = [
+  { key: 'delete' as const, label: 'الحذف والإجراءات' },
+  { key: 'alert' as const, label: 'تنبيهات المشرفين' },
+  { key: 'announce' as const, label: 'الترحيب والإعلانات' },
+  { key: 'debug' as const, label: 'قناة التتبع' },
+]
+
+function OutboundCard({ metrics }: { metrics: OutboundMetrics }) {
+  return (
+    <div>
+      <h2 className="mb-3 text-sm font-semibold text-muted">
+        طابور الإرسال إلى تيليجرام
+        {metrics.global_blocked_s > 0 && (
+          <span className="ms-2 text-warning">متوقف مؤقتاً {metrics.global_blocked_s}ث</span>
+        )}
+      </h2>
+      <Card className="overflow-x-auto p-4">
+        <table className="w-full text-xs tabular-nums">
+          <thead className="text-muted">
+            <tr>
+              <th className="py-1.5 text-start font-medium">المسار</th>
+              <th className="font-medium">بالانتظار</th>
+              <th className="font-medium">أُرسل</th>
+              <th className="font-medium">متوسط / أقصى انتظار</th>
+              <th className="font-medium">RetryAfter</th>
+              <th className="font-medium">أُسقط</th>
+            </tr>
+          </thead>
+          <tbody>
+            {LANES.map((l) => {
+              const lane = metrics.lanes[l.key]
+              return (
+                <tr key={l.key} className="border-t border-border text-center">
+                  <td className="py-2 text-start">{l.label}</td>
+                  <td className={lane.queued > 0 ? 'text-warning' : undefined}>{lane.queued}</td>
+                  <td>{lane.granted.toLocaleString('en')}</td>
+                  <td dir="ltr">{Math.round(lane.avg_wait_ms)} / {Math.round(lane.max_wait_ms)} ms</td>
+                  <td>{lane.retry_after}</td>
+                  <td className={lane.dropped > 0 ? 'text-danger' : undefined}>{lane.dropped}</td>
+                </tr>
+              )
+            })}
+          </tbody>
+        </table>
+      </Card>
+    </div>
+  )
+}
+
 export function OverviewPage() {
   const { data, loading } = useData(() => api.overview(), 30_000)
+  const outbound = useData(() => api.outbound(), 10_000)
 
   return (
     <div className="mx-auto max-w-5xl space-y-8">
@@ -79,6 +129,8 @@ export function OverviewPage() {
           })}
         </div>
       </div>
+
+      {outbound.data && <OutboundCard metrics={outbound.data} />}
     </div>
   )
 }
@@ -3,9 +3,9 @@ import { motion } from 'framer-motion'
 import { Loader2, Lock, RotateCcw, Save, Radio, BellRing, Trash } from 'lucide-react'
 import { Card } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
-import { TextField } from '@/components/ui/field'
+import { Select, TextField } from '@/components/ui/field'
 import { useToast } from '@/components/ui/toast'
-import { api } from '@/lib/api'
+import { api, type DebugSettings } from '@/lib/api'
 import { useData } from '@/lib/use-data'
 import { PageSpinner } from '@/pages/groups'
 
@@ -34,7 +34,11 @@ export function PromptPage() {
         autoDelete={data.auto_delete_threshold}
         onSaved={() => refresh(true)}
       />
-      <DebugChannelCard channelId={data.debug_channel_id} onSaved={() => refresh(true)} />
+      <DebugChannelCard
+        channelId={data.debug_channel_id}
+        settings={data.debug_settings}
+        onSaved={() => refresh(true)}
+      />
     </div>
   )
 }
@@ -216,7 +220,13 @@ function SliderRow({
   )
 }
 
-function DebugChannelCard({ channelId, onSaved }: { channelId: number | null; onSaved: () => void }) {
+function DebugChannelCard({
+  channelId, settings, onSaved,
+}: {
+  channelId: number | null
+  settings: DebugSettings
+  onSaved: () => void
+}) {
   const toast = useToast()
   const [value, setValue] = useState(channelId ? String(channelId) : '')
   const [busy, setBusy] = useState(false)
@@ -243,7 +253,7 @@ function DebugChannelCard({ channelId, onSaved }: { channelId: number | null; on
         قناة التتبع (Debug)
       </h2>
       <p className="mt-1 text-xs text-muted">
-        إذا فُعّلت، يرسل البوت نتيجة تحليل كل رسالة لهذه القناة
+        إذا فُعّلت، يرسل البوت نتائج التحليل لهذه القناة — كملخص دوري أو رسالة لكل تحليل
         {channelId ? ' — مفعّلة حالياً' : ' — متوقفة حالياً'}
       </p>
       <div className="mt-4 flex flex-wrap items-end gap-2">
@@ -267,6 +277,73 @@ function DebugChannelCard({ channelId, onSaved }: { channelId: number | null; on
           </Button>
         )}
       </div>
+      {channelId && <DebugSettingsForm settings={settings} onSaved={onSaved} />}
     </Card>
   )
 }
+
+function DebugSettingsForm({ settings, onSaved }: { settings: DebugSettings; onSaved: () => void }) {
+  const toast = useToast()
+  const [mode, setMode] = useState(settings.mode)
+  const [ratePct, setRatePct] = useState(Math.round(settings.sample_rate * 100))
+  const [minutes, setMinutes] = useState(Math.round(settings.digest_interval / 60))
+  const [busy, setBusy] = useState(false)
+
+  useEffect(() => {
+    setMode(settings.mode)
+    setRatePct(Math.round(settings.sample_rate * 100))
+    setMinutes(Math.round(settings.digest_interval / 60))
+  }, [settings.mode, settings.sample_rate, settings.digest_interval])
+
+  const save = async () => {
+    setBusy(true)
+    try {
+      const r = await api.saveDebugSettings({
+        mode,
+        sample_rate: Math.min(100, Math.max(0, ratePct)) / 100,
+        digest_interval: Math.max(1, minutes) * 60,
+      })
+      toast('success', r.message)
+      onSaved()
+    } catch (err) {
+      toast('error', err instanceof Error ? err.message : 'فشل الحفظ')
+    } finally {
+      setBusy(false)
+    }
+  }
+
+  return (
+    <div className="mt-5 border-t border-border pt-4">
+      <div className="grid gap-x-4 sm:grid-cols-3">
+        <Select label="طريقة الإرسال" value={mode} onChange={(e) => setMode(e.target.value as DebugSettings['mode'])}>
+          <option value="digest">ملخص دوري</option>
+          <option value="message">رسالة لكل تحليل</option>
+        </Select>
+        <TextField
+          label="عينة الرسائل بدون إجراء (%)"
+          hint="التنبيهات والحذف تُسجَّل دائماً"
+          type="number"
+          min={0}
+          max={100}
+          value={ratePct}
+          onChange={(e) => setRatePct(Number(e.target.value))}
+        />
+        {mode === 'digest' && (
+          <TextField
+            label="كل (دقيقة)"
+            hint={`في الانتظار: ${settings.buffered} تحليل`}
+            type="number"
+            min={1}
+            max={1440}
+            value={minutes}
+            onChange={(e) => setMinutes(Number(e.target.value))}
+          />
+        )}
+      </div>
+      <Button size="sm" variant="secondary" onClick={save} disabled={busy}>
+        {busy ? <Loader2 className="animate-spin" /> : <Save />}
+        حفظ الإعدادات
+      </Button>
+    </div>
+  )
+}
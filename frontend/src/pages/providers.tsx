@@ -9,7 +9,7 @@ import {
 } from '@dnd-kit/sortable'
 import { CSS } from '@dnd-kit/utilities'
 import {
-  Bot, Plug, Plus, Loader2, Trash2, Pencil, GripVertical, RefreshCw, Search,
+  Bot, Plug, Plus, Loader2, Trash2, Pencil, GripVertical, RefreshCw, Search, Ghost,
 } from 'lucide-react'
 import { Card } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
@@ -363,6 +363,16 @@ function ModelsSection({
     }
   }
 
+  const toggleShadow = async (m: AIModel) => {
+    try {
+      const r = await api.toggleShadowModel(m.id)
+      toast('success', r.is_shadow ? 'الموديل في وضع الظل — يستقبل نسخة من الرسائل دون أن يقرر' : 'عاد الموديل إلى السلسلة')
+      refresh()
+    } catch {
+      toast('error', 'فشل التبديل')
+    }
+  }
+
   const remove = async (m: AIModel) => {
     const ok = await confirm({
       title: `حذف الموديل «${m.name}»؟`,
@@ -405,6 +415,7 @@ function ModelsSection({
                   model={m}
                   index={i}
                   onToggle={() => toggle(m)}
+                  onToggleShadow={() => toggleShadow(m)}
                   onDelete={() => remove(m)}
                 />
               ))}
@@ -419,8 +430,8 @@ function ModelsSection({
 }
 
 function SortableModelCard({
-  model, index, onToggle, onDelete,
-}: { model: AIModel; index: number; onToggle: () => void; onDelete: () => void }) {
+  model, index, onToggle, onToggleShadow, onDelete,
+}: { model: AIModel; index: number; onToggle: () => void; onToggleShadow: () => void; onDelete: () => void }) {
   const { attributes, listeners, setNodeRef, transform, transition, isDragging } = useSortable({ id: model.id })
 
   return (
@@ -443,7 +454,7 @@ function SortableModelCard({
           <GripVertical className="size-4" />
         </button>
         <span className="grid size-7 shrink-0 place-items-center rounded-lg bg-gradient-to-br from-accent/25 to-accent/5 text-xs font-bold text-accent-from ring-1 ring-accent/25 tabular-nums">
-          {index + 1}
+          {model.is_shadow ? <Ghost className="size-3.5" /> : index + 1}
         </span>
         <div className="min-w-0 flex-1">
           <p className="truncate text-sm font-semibold">{model.name}</p>
@@ -455,9 +466,21 @@ function SortableModelCard({
               </span>
             )}
             <span className="font-mono" dir="ltr">{model.model}</span>
+            {model.is_shadow && <span className="text-warning">وضع الظل — لا يشارك في القرار</span>}
           </p>
         </div>
         <div className="flex shrink-0 items-center gap-2">
+          <button
+            type="button"
+            onClick={onToggleShadow}
+            className={cn(
+              'grid size-8 place-items-center rounded-lg hover:bg-bg-elev',
+              model.is_shadow ? 'text-warning' : 'text-muted hover:text-ink'
+            )}
+            title={model.is_shadow ? 'إعادة للسلسلة' : 'وضع الظل (تجربة على رسائل حقيقية دون تأثير)'}
+          >
+            <Ghost className="size-3.5" />
+          </button>
           <Toggle checked={model.is_active} onChange={onToggle} />
           <button
             type="button"
@@ -1,9 +1,11 @@
 import { useState } from 'react'
 import { AnimatePresence, motion } from 'framer-motion'
-import { LineChart, Trash2, CircleCheck, CircleAlert, Clock, ChevronDown } from 'lucide-react'
+import { LineChart, Trash2, CircleCheck, CircleAlert, Clock, ChevronDown, Ghost, Loader2, Save } from 'lucide-react'
 import { Card } from '@/components/ui/card'
+import { Button } from '@/components/ui/button'
+import { TextField } from '@/components/ui/field'
 import { useToast } from '@/components/ui/toast'
-import { api, type StatRow } from '@/lib/api'
+import { api, type ShadowData, type StatRow } from '@/lib/api'
 import { useData } from '@/lib/use-data'
 import { cn } from '@/lib/utils'
 import { PageSpinner, EmptyState } from '@/pages/groups'
@@ -38,9 +40,94 @@ const STATUS_META: Record<string, { label: string; cls: string; icon: typeof Cir
   rate_limit_day: { label: 'حد اليوم', cls: 'text-warning bg-warning/10 ring-warning/25', icon: Clock },
 }
 
+const pct = (v: number | null) => (v === null ? '—' : `${Math.round(v * 100)}%`)
+
+function ShadowSection({ data, onSaved }: { data: ShadowData; onSaved: () => void }) {
+  const toast = useToast()
+  const [rate, setRate] = useState(String(Math.round(data.sample_rate * 100)))
+  const [saving, setSaving] = useState(false)
+
+  const save = async () => {
+    setSaving(true)
+    try {
+      const r = await api.saveShadowRate(Math.max(0, Math.min(100, Number(rate) || 0)) / 100)
+      toast('success', r.message)
+      onSaved()
+    } catch {
+      toast('error', 'فشل الحفظ')
+    } finally {
+      setSaving(false)
+    }
+  }
+
+  return (
+    <section>
+      <div className="mb-3">
+        <h2 className="flex items-center gap-2 text-sm font-semibold">
+          <Ghost className="size-4 text-warning" />
+          موديلات الظل — مقارنة مع القرار الفعلي (٢٤ ساعة)
+        </h2>
+        <p className="mt-0.5 text-xs text-muted">
+          نسخة من رسائل الطبقة الثالثة تُرسل لهذه الموديلات في الخلفية — نتائجها لا تؤثر على الحذف أو التنبيه
+        </p>
+      </div>
+      <Card className="p-4">
+        <div className="flex flex-wrap items-end gap-3">
+          <div className="w-40">
+            <TextField
+              label="نسبة العينة (%)"
+              type="number"
+              min={0}
+              max={100}
+              value={rate}
+              onChange={(e) => setRate(e.target.value)}
+            />
+          </div>
+          <Button size="sm" className="mb-4" onClick={save} disabled={saving}>
+            {saving ? <Loader2 className="animate-spin" /> : <Save />}
+            حفظ
+          </Button>
+          <span className="mb-5 ms-auto text-[11px] text-muted tabular-nums">
+            قيد الانتظار {data.runtime.pending} · متروكة {data.runtime.dropped}
+          </span>
+        </div>
+        <div className="overflow-x-auto">
+          <table className="w-full text-xs tabular-nums">
+            <thead className="text-muted">
+              <tr>
+                <th className="py-1.5 text-start font-medium">الموديل</th>
+                <th className="font-medium">العينات</th>
+                <th className="font-medium">التطابق</th>
+                <th className="font-medium">فرق النتيجة</th>
+                <th className="font-medium">أشد / أخف</th>
+                <th className="font-medium">p50 / p95</th>
+                <th className="font-medium">الأخطاء</th>
+              </tr>
+            </thead>
+            <tbody>
+              {data.models.map((m) => (
+                <tr key={m.provider_id} className={cn('border-t border-border text-center', !m.is_active && 'opacity-55')} title={m.last_error || undefined}>
+                  <td className="py-2 text-start font-mono" dir="ltr">{m.name}</td>
+                  <td>{m.samples}</td>
+                  <td className="font-semibold">{pct(m.agreement)}</td>
+                  <td>{m.mean_abs_diff === null ? '—' : m.mean_abs_diff.toFixed(2)}</td>
+                  <td>{m.would_flag_more} / {m.would_flag_less}</td>
+                  <td dir="ltr">{Math.round(m.latency_p50_ms)} / {Math.round(m.latency_p95_ms)} ms</td>
+                  <td className={cn(m.errors > 0 && 'text-danger')}>{pct(m.error_rate)}</td>
+                </tr>
+              ))}
+            </tbody>
+          </table>
+        </div>
+      </Card>
+    </section>
+  )
+}
+
 export function StatsPage() {
   // Auto-refresh every 15s — the "live" feel
   const { data, loading, refresh } = useData(() => api.aiStats(30), 15_000)
+  const shadow = useData(() => api.shadow(24), 15_000)
   const toast = useToast()
 
   const remove = async (row: StatRow) => {
@@ -54,6 +141,9 @@ export function StatsPage() {
 
   return (
     <div className="mx-auto max-w-5xl space-y-8">
+      {shadow.data && shadow.data.models.length > 0 && (
+        <ShadowSection data={shadow.data} onSaved={() => shadow.refresh(true)} />
+      )}
       {loading && !data ? (
         <PageSpinner />
       ) : !data?.stats.length ? (
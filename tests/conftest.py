@@ -0,0 +1,15 @@
+"""
+Vex - Test Setup
+Tests import the bot's modules from the repository root, against a
+throwaway SQLite database unless DATABASE_URL is set.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(prefix='vex-tests-'), 'vex.db')}",
+)
@@ -0,0 +1,63 @@
+"""
+Vex - Alert Aggregator Tests
+Submitting an alert only updates memory; the send happens in the background.
+"""
+import asyncio
+from types import SimpleNamespace
+
+from bot.services import alert_aggregator
+from bot.services.alert_aggregator import AlertItem, submit_alert
+
+
+class SlowBot:
+    def __init__(self, fail=False):
+        self.release = asyncio.Event()
+        self.fail = fail
+        self.sent = []
+
+    async def send_message(self, **kwargs):
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("flood control")
+        self.sent.append(kwargs)
+        return SimpleNamespace(message_id=900 + len(self.sent))
+
+    async def edit_message_text(self, **kwargs):
+        pass
+
+
+def _item(user_id=5):
+    return AlertItem(
+        chat_id=-1001, message_id=10, user_id=user_id, user_name="u", text="spam",
+        score=0.8, auto_deleted=False, deferred=False,
+    )
+
+
+def test_submit_alert_does_not_wait_for_the_send():
+    async def scenario():
+        bot = SlowBot()
+        group = submit_alert(bot, -2002, _item())
+        assert group.admin_message_id is None and not bot.sent
+        bot.release.set()
+        await asyncio.gather(*alert_aggregator._tasks)
+        return bot, group
+
+    bot, group = asyncio.run(scenario())
+    assert len(bot.sent) == 1
+    assert group.admin_message_id == 901
+
+
+def test_failed_send_lets_the_next_alert_start_over():
+    async def scenario():
+        bot = SlowBot(fail=True)
+        first = submit_alert(bot, -2002, _item(user_id=6))
+        bot.release.set()
+        await asyncio.gather(*alert_aggregator._tasks)
+        second = submit_alert(SlowBot(), -2002, _item(user_id=6))
+        for task in list(alert_aggregator._tasks):
+            task.cancel()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.resolved
+    assert second is not first
@@ -0,0 +1,74 @@
+"""
+Vex - Deletion Coalescer Tests
+Single deletions are retried like bulk ones, and messages that were
+already gone are not reported as deleted.
+"""
+import asyncio
+
+from telegram.error import BadRequest, RetryAfter, TimedOut
+
+from bot.services.deletion_service import DeletionCoalescer
+
+
+class FakeBot:
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.calls = []
+
+    async def delete_message(self, chat_id, message_id):
+        self.calls.append(("one", message_id))
+        if self.failures:
+            raise self.failures.pop(0)
+        return True
+
+    async def delete_messages(self, chat_id, message_ids):
+        self.calls.append(("bulk", tuple(message_ids)))
+        if self.failures:
+            raise self.failures.pop(0)
+        return True
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_single_deletion_retries_flood_wait_and_network_errors():
+    bot = FakeBot([RetryAfter(0), TimedOut()])
+    coalescer = DeletionCoalescer(window=0)
+    assert _run(coalescer.delete(bot, -1001, 5)) is True
+    assert bot.calls == [("one", 5)] * 3
+    assert coalescer.stats["retries"] == 2
+
+
+def test_single_deletion_of_missing_message_is_not_a_deletion():
+    bot = FakeBot([BadRequest("Message to delete not found")])
+    coalescer = DeletionCoalescer(window=0)
+    assert _run(coalescer.delete(bot, -1001, 5)) is False
+    assert coalescer.stats["already_gone"] == 1
+    assert coalescer.stats["deleted"] == 0
+
+
+def test_already_deleted_message_is_not_counted_twice():
+    bot = FakeBot()
+    coalescer = DeletionCoalescer(window=0)
+
+    async def scenario():
+        first = await asyncio.gather(*(coalescer.delete(bot, -1001, mid) for mid in (1, 2, 3)))
+        again = await asyncio.gather(*(coalescer.delete(bot, -1001, mid) for mid in (2, 3, 4)))
+        return first, again
+
+    first, again = _run(scenario())
+    assert first == [True, True, True]
+    assert again == [False, False, True]
+    assert bot.calls == [("bulk", (1, 2, 3)), ("one", 4)]
+
+
+def test_bulk_deletion_retries_flood_wait_before_splitting():
+    bot = FakeBot([RetryAfter(0)])
+    coalescer = DeletionCoalescer(window=0)
+
+    async def scenario():
+        return await asyncio.gather(*(coalescer.delete(bot, -1001, mid) for mid in (1, 2)))
+
+    assert _run(scenario()) == [True, True]
+    assert bot.calls == [("bulk", (1, 2))] * 2
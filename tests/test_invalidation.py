@@ -0,0 +1,123 @@
+"""
+Vex - Cache Invalidation Tests
+The Postgres listener must keep receiving NOTIFY after keepalive pings.
+"""
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+
+from bot.core import invalidation
+
+
+class FakeDriver:
+    """asyncpg-like connection: NOTIFY is held while a transaction is open."""
+
+    def __init__(self):
+        self.in_transaction = False
+        self.held = []
+        self.callback = None
+
+    async def add_listener(self, channel, callback):
+        self.callback = callback
+
+    async def execute(self, sql):
+        pass  # autocommit
+
+    def notify(self, payload):
+        if self.in_transaction:
+            self.held.append(payload)
+        else:
+            self.callback(None, 0, invalidation.NOTIFY_CHANNEL, payload)
+
+
+class FakeConnection:
+    """SQLAlchemy AsyncConnection: execute() begins a transaction."""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    async def get_raw_connection(self):
+        return type("Raw", (), {"driver_connection": self.driver})()
+
+    async def execute(self, *args, **kwargs):
+        self.driver.in_transaction = True
+
+
+class FakeEngine:
+    def __init__(self, driver):
+        self.driver = driver
+
+    @asynccontextmanager
+    async def connect(self):
+        yield FakeConnection(self.driver)
+
+
+def _event(topic, version, key):
+    return json.dumps({"topic": topic, "key": key, "version": version, "origin": "other:1"})
+
+
+def test_notify_delivered_after_keepalive(monkeypatch):
+    driver = FakeDriver()
+    received = []
+
+    async def no_sync():
+        pass
+
+    monkeypatch.setattr(invalidation, "engine", FakeEngine(driver))
+    monkeypatch.setattr(invalidation, "_sync_versions", no_sync)
+    monkeypatch.setattr(invalidation, "KEEPALIVE_SECONDS", 0.01)
+    monkeypatch.setattr(invalidation, "_seen", {"test_fake": 0})
+    monkeypatch.setattr(invalidation, "_listeners", {"test_fake": [received.append]})
+
+    async def scenario():
+        task = asyncio.create_task(invalidation._listen_postgres())
+        await asyncio.sleep(0.1)        # several quiet keepalive periods
+        driver.notify(_event("test_fake", 1, 42))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert not driver.held
+    assert received == [42]
+
+
+@pytest.mark.skipif(not os.getenv("VEX_TEST_POSTGRES_URL"), reason="VEX_TEST_POSTGRES_URL not set")
+def test_notify_delivered_after_keepalive_postgres(monkeypatch):
+    import asyncpg
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = os.environ["VEX_TEST_POSTGRES_URL"]     # postgresql+asyncpg://…
+    engine = create_async_engine(url)
+    received = []
+
+    async def no_sync():
+        pass
+
+    monkeypatch.setattr(invalidation, "engine", engine)
+    monkeypatch.setattr(invalidation, "_sync_versions", no_sync)
+    monkeypatch.setattr(invalidation, "KEEPALIVE_SECONDS", 0.2)
+    monkeypatch.setattr(invalidation, "_seen", {"test_pg": 0})
+    monkeypatch.setattr(invalidation, "_listeners", {"test_pg": [received.append]})
+
+    async def scenario():
+        task = asyncio.create_task(invalidation._listen_postgres())
+        await asyncio.sleep(1.0)        # several keepalive pings
+        sender = await asyncpg.connect(url.replace("postgresql+asyncpg://", "postgresql://"))
+        try:
+            await sender.execute("SELECT pg_notify($1, $2)", invalidation.NOTIFY_CHANNEL, _event("test_pg", 1, 7))
+        finally:
+            await sender.close()
+        for _ in range(50):
+            if received:
+                break
+            await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await engine.dispose()
+
+    asyncio.run(scenario())
+    assert received == [7]
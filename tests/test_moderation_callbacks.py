@@ -0,0 +1,51 @@
+"""
+Vex - Moderation Callback Tests
+An admin's "keep" credits the member even when the alert group is gone
+(restart, eviction, or the callback handled by another process).
+"""
+import asyncio
+from types import SimpleNamespace
+
+from bot.handlers.antispam import moderation_callbacks
+
+
+class FakeQuery:
+    def __init__(self, data):
+        self.data = data
+        self.message = SimpleNamespace(chat_id=-1001, message_id=55, text="alert")
+        self.edits = []
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+    async def edit_message_text(self, **kwargs):
+        self.edits.append(kwargs)
+
+
+def _press(monkeypatch, data):
+    kept = []
+
+    async def note_keep(chat_id, user_id):
+        kept.append((chat_id, user_id))
+
+    monkeypatch.setattr(moderation_callbacks, "resolve_alert", lambda chat_id, message_id: None)
+    monkeypatch.setattr(moderation_callbacks, "note_keep", note_keep)
+    query = FakeQuery(data)
+    update = SimpleNamespace(
+        callback_query=query,
+        effective_user=SimpleNamespace(id=7, full_name="Admin", username=None),
+    )
+    asyncio.run(moderation_callbacks.handle_guard_keep(update, None))
+    return kept, query
+
+
+def test_keep_credits_member_without_alert_group(monkeypatch):
+    kept, query = _press(monkeypatch, "guard_keep:-100123:42:999")
+    assert kept == [(-100123, 999)]
+    assert query.edits
+
+
+def test_keep_without_user_id_and_alert_group_credits_nobody(monkeypatch):
+    kept, query = _press(monkeypatch, "guard_keep:-100123:42")
+    assert kept == []
+    assert query.edits
@@ -0,0 +1,115 @@
+"""
+Vex - Outbound Rate Limiter Tests
+Dispatch cost must not grow with the number of queued requests, and every
+lane is bounded.
+"""
+import asyncio
+import time
+
+import pytest
+
+from bot.core import rate_limiter
+from bot.core.rate_limiter import Lane, OutboundQueueFull, PriorityRateLimiter, _Waiter
+
+
+def _throttle(limiter, chat_id):
+    """Spend the chat's send allowance (1/s per chat, 20/min per group)."""
+    now = time.monotonic()
+    limiter._chat_bucket(chat_id).tokens = 0
+    limiter._chat_bucket(chat_id).updated = now
+    limiter._group_bucket(chat_id).tokens = 0
+    limiter._group_bucket(chat_id).updated = now
+
+
+def _queue(limiter, loop, lane, chat_id, is_send):
+    waiter = _Waiter(
+        seq=next(limiter._seq), lane=lane, chat_id=chat_id, is_send=is_send,
+        future=loop.create_future(),
+    )
+    limiter._lanes[lane].add(waiter)
+    return waiter
+
+
+def test_dispatch_skips_thousands_of_throttled_waiters(monkeypatch):
+    loop = asyncio.new_event_loop()
+    limiter = PriorityRateLimiter()
+    checks = []
+    chat_wait = limiter._chat_wait
+    monkeypatch.setattr(limiter, "_chat_wait", lambda w, now: checks.append(w) or chat_wait(w, now))
+
+    # A raid's worth of alerts held back by busy groups, and more in one group
+    for chat_id in range(-1000, -3000, -1):
+        _throttle(limiter, chat_id)
+        _queue(limiter, loop, Lane.ALERT, chat_id, True)
+    _throttle(limiter, -5000)
+    for _ in range(3000):
+        _queue(limiter, loop, Lane.ALERT, -5000, True)
+    delete = _queue(limiter, loop, Lane.DELETE, -7000, False)
+
+    now = time.monotonic()
+    ready, _ = limiter._next_ready(now)
+    assert ready is not None and ready[1].waiters[0] is delete
+    ready[1].waiters.popleft()
+    ready[0].size -= 1
+    ready[0].release(ready[1], now)
+
+    # The first pass learns when each throttled chat is due (one check per
+    # chat, not per waiter); later passes look at nothing until then
+    ready, wait = limiter._next_ready(now)
+    assert ready is None and wait > 0
+    assert len(checks) <= 2001 + 1
+    checks.clear()
+    for _ in range(100):
+        assert limiter._next_ready(time.monotonic())[0] is None
+    assert checks == []
+    loop.close()
+
+
+def test_deletions_flow_past_a_throttled_backlog():
+    async def scenario():
+        limiter = PriorityRateLimiter(global_rate=100_000)
+        await limiter.initialize()
+        _throttle(limiter, -5000)
+
+        async def call():
+            return True
+
+        sends = [
+            asyncio.create_task(limiter.process_request(call, (), {}, "sendMessage", {"chat_id": -5000}, None))
+            for _ in range(1500)
+        ]
+        start = time.monotonic()
+        deletes = await asyncio.wait_for(asyncio.gather(*(
+            limiter.process_request(call, (), {}, "deleteMessage", {"chat_id": -(i % 300) - 1}, None)
+            for i in range(3000)
+        )), timeout=10)
+        elapsed = time.monotonic() - start
+        for task in sends:
+            task.cancel()
+        await asyncio.gather(*sends, return_exceptions=True)
+        metrics = limiter.metrics()
+        await limiter.shutdown()
+        return deletes, elapsed, metrics
+
+    deletes, elapsed, metrics = asyncio.run(scenario())
+    assert all(deletes)
+    assert elapsed < 5
+    assert metrics["lanes"]["alert"]["queued"] == 0
+
+
+def test_lanes_are_bounded(monkeypatch):
+    monkeypatch.setitem(rate_limiter.LANE_LIMITS, Lane.DELETE, 10)
+
+    async def scenario():
+        limiter = PriorityRateLimiter()
+        limiter._wakeup = asyncio.Event()       # no dispatcher: everything waits
+        waiting = [asyncio.create_task(limiter._acquire(Lane.DELETE, -1, False)) for _ in range(10)]
+        await asyncio.sleep(0)
+        with pytest.raises(OutboundQueueFull):
+            await limiter._acquire(Lane.DELETE, -1, False)
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+        return len(limiter._lanes[Lane.DELETE])
+
+    assert asyncio.run(scenario()) == 0
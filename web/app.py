@@ -6,11 +6,10 @@ import logging
 import os
 
 import uvicorn
-from fastapi import FastAPI, Request
+from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.responses import RedirectResponse, Response
-from telegram import Update
 
 logger = logging.getLogger("vex.web")
 
@@ -24,7 +23,10 @@ app = FastAPI(title="Vex Dashboard", docs_url=None, redoc_url=None)
 
 # Import middleware early (before route includes)
 from web.auth import DashboardAuthMiddleware
+from web.webhook import WebhookFastPathMiddleware, ingest as webhook_ingest
 app.add_middleware(DashboardAuthMiddleware)
+# Added last → outermost: Telegram updates skip auth and routing entirely
+app.add_middleware(WebhookFastPathMiddleware)
 
 # Mount static files
 os.makedirs(STATIC_DIR, exist_ok=True)
@@ -42,6 +44,12 @@ _bot_app = None
 def set_bot_app(bot_app):
     global _bot_app
     _bot_app = bot_app
+    webhook_ingest.attach(bot_app)
+
+
+def get_bot_app():
+    """The running bot application (None during setup)."""
+    return _bot_app
 
 
 # Include routes
@@ -82,21 +90,7 @@ async def root():
     return RedirectResponse(url="/setup")
 
 
-@app.post("/telegram-update")
-async def telegram_webhook(request: Request):
-    """Receive Telegram updates via Webhook"""
-    global _bot_app
-    if not _bot_app:
-        return Response(status_code=503, content="Bot application is not running yet")
-        
-    try:
-        data = await request.json()
-        update = Update.de_json(data=data, bot=_bot_app.bot)
-        await _bot_app.update_queue.put(update)
-        return Response(status_code=200, content="OK")
-    except Exception as e:
-        logger.error(f"Error processing webhook update: {e}")
-        return Response(status_code=500, content="Internal Server Error")
+# POST /telegram-update is served by WebhookFastPathMiddleware (web/webhook.py)
 
 
 async def start_web_server(bot_app=None):
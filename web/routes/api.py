@@ -4,11 +4,13 @@ All endpoints live under /api and are guarded by the auth middleware
 (401 JSON instead of redirects). Login/logout manage the same signed cookie
 used previously by the Jinja dashboard.
 """
+import json
 import logging
 import os
+from typing import Optional
 
 from fastapi import APIRouter, Body, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import httpx
 from pydantic import BaseModel
 
@@ -20,19 +22,60 @@ from bot.services.user_service import get_user_count, get_blocked_count, list_bl
 from bot.services.group_service import (
     get_group_count, list_managed_groups, activate_group,
     list_blocked_words_with_ids, delete_blocked_word_by_id,
-    add_blocked_word, get_group_by_id,
+    add_blocked_word, get_group_by_id, set_group_ai_policy, set_group_raid_policy,
+    set_group_flood_policy, set_group_ai_rules, set_group_escalation_policy,
 )
 from bot.services.admin_service import get_admin_count
-from bot.services.ai_service import get_provider_stats, delete_provider_stat
+from bot.services.ai_service import (
+    get_provider_stats, delete_provider_stat, get_group_ai_config, get_verdict_cache_stats,
+)
 from bot.services.ai_provider_service import (
     list_providers, add_provider, delete_provider, toggle_provider,
-    reorder_providers,
+    toggle_provider_shadow, reorder_providers,
     list_endpoints, get_endpoint, add_endpoint, update_endpoint, delete_endpoint,
 )
+from bot.services.ai_eval_service import (
+    parse_corpus, add_corpus, list_corpora, delete_corpus,
+    start_eval_job, get_job, list_jobs, cancel_job, stream_job,
+)
+from bot.services.ai_policy_service import (
+    DEFAULT_AI_POLICY, get_policy, get_load, get_policy_stats,
+)
+from bot.services.raid_service import (
+    DEFAULT_RAID_POLICY, RAID_ACTIONS, get_raid_policy, get_raid_status,
+)
+from bot.services.flood_service import (
+    DEFAULT_FLOOD_POLICY, FLOOD_ACTIONS, get_flood_policy, get_flood_stats,
+)
+from bot.services.escalation_service import (
+    DEFAULT_ESCALATION_POLICY, get_escalation_policy, get_escalation_stats,
+)
+from bot.services.duplicate_service import get_duplicate_stats
+from bot.services.chat_context_service import get_context_stats
+from bot.services.recent_messages_service import purge_user, get_recent_stats, MAX_PURGE_MINUTES
+from bot.core.fanout import get_role
+from bot.services.image_hash_service import list_image_hashes, delete_image_hash, get_image_hash_stats
+from bot.services.media_block_service import (
+    KINDS as MEDIA_BLOCK_KINDS, add_media_block, list_media_blocks, delete_media_block_by_id,
+)
+from bot.services.domain_service import (
+    ACTIONS as DOMAIN_ACTIONS, add_domain_rule, list_domain_rules, delete_domain_rule_by_id,
+    normalize_domain, get_domain_stats,
+)
+from bot.services.ai_shadow_service import (
+    get_shadow_summary, get_shadow_runtime,
+)
+from bot.services.ai_debug_service import get_debug_runtime
+from bot.core.rate_limiter import get_outbound_metrics
+from bot.core.update_processor import get_update_metrics
+from web.webhook import get_webhook_metrics
+from bot.core.invalidation import get_invalidation_metrics
 from bot.core.config import (
     load_bot_config, get_ai_prompt_override, set_ai_prompt_override,
     get_ai_debug_channel_id, set_ai_debug_channel_id,
     get_ai_thresholds, set_ai_thresholds,
+    get_ai_shadow_sample_rate, set_ai_shadow_sample_rate,
+    get_ai_debug_settings, set_ai_debug_settings, DEBUG_MODES,
 )
 
 logger = logging.getLogger("vex.web.api")
@@ -105,6 +148,36 @@ async def api_overview():
     }
 
 
+@router.get("/outbound")
+async def api_outbound():
+    """Outbound Bot API queue: per-lane depth, waits, drops and RetryAfter hits."""
+    metrics = get_outbound_metrics()
+    if metrics is None:
+        return JSONResponse({"ok": False, "error": "البوت غير مشغّل"}, status_code=503)
+    return metrics
+
+
+@router.get("/updates")
+async def api_updates():
+    """Inbound update processing: workers in use, backlog and lag per chat."""
+    metrics = get_update_metrics()
+    if metrics is None:
+        return JSONResponse({"ok": False, "error": "البوت غير مشغّل"}, status_code=503)
+    return metrics
+
+
+@router.get("/webhook")
+async def api_webhook():
+    """Webhook ingestion: raw queue depth, accepted / shed / rejected updates."""
+    return get_webhook_metrics()
+
+
+@router.get("/invalidation")
+async def api_invalidation():
+    """Cache invalidation: transport, topic versions seen, published / received events."""
+    return get_invalidation_metrics()
+
+
 # ── Groups & blocked words ────────────────────────────────────────────────────
 
 @router.get("/groups")
@@ -171,6 +244,323 @@ async def api_group_words_delete(group_id: int, word_id: int):
     return {"ok": True}
 
 
+@router.get("/groups/{group_id}/media-blocks")
+async def api_group_media_blocks(group_id: int):
+    """Blocked files / sticker packs of the group, and the global list."""
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    return {"group": await list_media_blocks(group_id), "global": await list_media_blocks(None)}
+
+
+class MediaBlockBody(BaseModel):
+    kind: str
+    value: str
+    is_global: bool = False
+
+
+@router.post("/groups/{group_id}/media-blocks")
+async def api_group_media_blocks_add(group_id: int, body: MediaBlockBody):
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    if body.kind not in MEDIA_BLOCK_KINDS or not body.value.strip():
+        return JSONResponse({"ok": False, "error": "قيمة غير صالحة"}, status_code=400)
+    msg = await add_media_block(
+        None if body.is_global else group.telegram_group_id, body.kind, body.value.strip(),
+    )
+    return {"ok": True, "message": msg}
+
+
+@router.delete("/media-blocks/{block_id}")
+async def api_media_blocks_delete(block_id: int):
+    await delete_media_block_by_id(block_id)
+    return {"ok": True}
+
+
+@router.get("/groups/{group_id}/domains")
+async def api_group_domains(group_id: int):
+    """Link domain allow / deny rules of the group, and the global list."""
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    return {"group": await list_domain_rules(group_id), "global": await list_domain_rules(None)}
+
+
+class DomainRuleBody(BaseModel):
+    domain: str
+    action: str
+    is_global: bool = False
+
+
+@router.post("/groups/{group_id}/domains")
+async def api_group_domains_add(group_id: int, body: DomainRuleBody):
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    if body.action not in DOMAIN_ACTIONS or not normalize_domain(body.domain):
+        return JSONResponse({"ok": False, "error": "نطاق غير صالح"}, status_code=400)
+    msg = await add_domain_rule(None if body.is_global else group.telegram_group_id, body.domain, body.action)
+    return {"ok": True, "message": msg}
+
+
+@router.delete("/domains/{rule_id}")
+async def api_domains_delete(rule_id: int):
+    await delete_domain_rule_by_id(rule_id)
+    return {"ok": True}
+
+
+@router.get("/domains")
+async def api_domains():
+    """Domain rule stage counters: checks, denials, shortener lookups."""
+    return get_domain_stats()
+
+
+@router.get("/image-hashes")
+async def api_image_hashes():
+    """Known spam images (added with #حظر_الصورة) and perceptual-hash stage counters."""
+    return {"hashes": await list_image_hashes(), "stats": get_image_hash_stats()}
+
+
+@router.delete("/image-hashes/{hash_id}")
+async def api_image_hashes_delete(hash_id: int):
+    await delete_image_hash(hash_id)
+    return {"ok": True}
+
+
+@router.get("/groups/{group_id}/ai-policy")
+async def api_group_ai_policy(group_id: int):
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    return {
+        "policy": await get_policy(group.telegram_group_id),
+        "defaults": DEFAULT_AI_POLICY,
+        "customized": bool(group.ai_policy),
+    }
+
+
+@router.get("/groups/{group_id}/ai-rules")
+async def api_group_ai_rules(group_id: int):
+    """The group's own AI rules / thresholds (null = bot-wide) and the effective ones."""
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    effective = await get_group_ai_config(group.telegram_group_id)
+    return {
+        "rules": group.ai_rules,
+        "alert_threshold": group.ai_alert_threshold,
+        "auto_delete_threshold": group.ai_auto_delete_threshold,
+        "effective": {
+            "version": effective.version,
+            "alert_threshold": effective.alert_threshold,
+            "auto_delete_threshold": effective.auto_delete_threshold,
+        },
+    }
+
+
+class GroupAIRulesBody(BaseModel):
+    rules: Optional[str] = None
+    alert_threshold: Optional[float] = None
+    auto_delete_threshold: Optional[float] = None
+
+
+@router.post("/groups/{group_id}/ai-rules")
+async def api_group_ai_rules_save(group_id: int, body: GroupAIRulesBody):
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    for value in (body.alert_threshold, body.auto_delete_threshold):
+        if value is not None and not 0.0 <= value <= 1.0:
+            return JSONResponse({"ok": False, "error": "العتبات يجب أن تكون بين 0 و 1"}, status_code=400)
+    defaults = await get_group_ai_config(None)
+    alert = defaults.alert_threshold if body.alert_threshold is None else body.alert_threshold
+    auto_delete = defaults.auto_delete_threshold if body.auto_delete_threshold is None else body.auto_delete_threshold
+    if alert >= auto_delete:
+        return JSONResponse(
+            {"ok": False, "error": "عتبة التنبيه يجب أن تكون أقل من عتبة الحذف التلقائي"},
+            status_code=400,
+        )
+    rules = (body.rules or "").strip() or None
+    await set_group_ai_rules(group_id, rules, body.alert_threshold, body.auto_delete_threshold)
+    return {"ok": True, "message": "تم حفظ قواعد المجموعة"}
+
+
+def _policy_overrides(body: dict, defaults: dict) -> dict:
+    """Keys of `body` that differ from `defaults`, coerced to the default's type.
+    Raises ValueError naming the first invalid key."""
+    overrides = {}
+    for key, default in defaults.items():
+        if key not in body or body[key] == default:
+            continue
+        try:
+            overrides[key] = bool(body[key]) if isinstance(default, bool) else type(default)(body[key])
+        except (TypeError, ValueError):
+            raise ValueError(key)
+    return overrides
+
+
+@router.post("/groups/{group_id}/ai-policy")
+async def api_group_ai_policy_save(group_id: int, body: dict = Body(...)):
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    try:
+        overrides = _policy_overrides(body, DEFAULT_AI_POLICY)
+    except ValueError as e:
+        return JSONResponse({"ok": False, "error": f"قيمة غير صالحة: {e}"}, status_code=400)
+    await set_group_ai_policy(group_id, overrides or None)
+    return {"ok": True, "message": "تم حفظ سياسة التحليل"}
+
+
+@router.get("/groups/{group_id}/raid-policy")
+async def api_group_raid_policy(group_id: int):
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    return {
+        "policy": await get_raid_policy(group.telegram_group_id),
+        "defaults": DEFAULT_RAID_POLICY,
+        "customized": bool(group.raid_policy),
+    }
+
+
+@router.post("/groups/{group_id}/raid-policy")
+async def api_group_raid_policy_save(group_id: int, body: dict = Body(...)):
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    try:
+        overrides = _policy_overrides(body, DEFAULT_RAID_POLICY)
+        if overrides.get("action", "lock") not in RAID_ACTIONS:
+            raise ValueError("action")
+    except ValueError as e:
+        return JSONResponse({"ok": False, "error": f"قيمة غير صالحة: {e}"}, status_code=400)
+    await set_group_raid_policy(group_id, overrides or None)
+    return {"ok": True, "message": "تم حفظ إعدادات الحماية من الهجمات"}
+
+
+@router.get("/raid")
+async def api_raid():
+    """Raid detection: raids since start-up and chats currently in raid mode."""
+    return get_raid_status()
+
+
+@router.get("/groups/{group_id}/flood-policy")
+async def api_group_flood_policy(group_id: int):
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    return {
+        "policy": await get_flood_policy(group.telegram_group_id),
+        "defaults": DEFAULT_FLOOD_POLICY,
+        "customized": bool(group.flood_policy),
+    }
+
+
+@router.post("/groups/{group_id}/flood-policy")
+async def api_group_flood_policy_save(group_id: int, body: dict = Body(...)):
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    try:
+        overrides = _policy_overrides(body, DEFAULT_FLOOD_POLICY)
+        if overrides.get("action", "mute") not in FLOOD_ACTIONS:
+            raise ValueError("action")
+    except ValueError as e:
+        return JSONResponse({"ok": False, "error": f"قيمة غير صالحة: {e}"}, status_code=400)
+    await set_group_flood_policy(group_id, overrides or None)
+    return {"ok": True, "message": "تم حفظ إعدادات منع التكرار"}
+
+
+@router.get("/flood")
+async def api_flood():
+    """Anti-flood: tracked senders, floods stopped, messages dropped, idle evictions."""
+    return get_flood_stats()
+
+
+@router.get("/groups/{group_id}/escalation-policy")
+async def api_group_escalation_policy(group_id: int):
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    return {
+        "policy": await get_escalation_policy(group.telegram_group_id),
+        "defaults": DEFAULT_ESCALATION_POLICY,
+        "customized": bool(group.escalation_policy),
+    }
+
+
+@router.post("/groups/{group_id}/escalation-policy")
+async def api_group_escalation_policy_save(group_id: int, body: dict = Body(...)):
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    try:
+        overrides = _policy_overrides(body, DEFAULT_ESCALATION_POLICY)
+        for key in ("window_minutes", "mute_strikes", "mute_minutes", "ban_strikes"):
+            if overrides.get(key, 0) < 0:
+                raise ValueError(key)
+    except ValueError as e:
+        return JSONResponse({"ok": False, "error": f"قيمة غير صالحة: {e}"}, status_code=400)
+    await set_group_escalation_policy(group_id, overrides or None)
+    return {"ok": True, "message": "تم حفظ سلم العقوبات"}
+
+
+class PurgeBody(BaseModel):
+    user_id: int
+    minutes: int = 60
+
+
+@router.post("/groups/{group_id}/purge")
+async def api_group_purge(group_id: int, body: PurgeBody):
+    """Delete a member's recent messages in a group (last `minutes`)."""
+    from web.app import get_bot_app
+
+    group = await get_group_by_id(group_id)
+    if not group:
+        return JSONResponse({"ok": False, "error": "المجموعة غير موجودة"}, status_code=404)
+    bot_app = get_bot_app()
+    # Recent message IDs are held by the process that handles the group
+    if bot_app is None or get_role() == "ingest":
+        return JSONResponse(
+            {"ok": False, "error": "غير متاح في هذا الوضع — استخدم زر التنظيف في تنبيه المشرفين"},
+            status_code=409,
+        )
+    if not 1 <= body.minutes <= MAX_PURGE_MINUTES:
+        return JSONResponse({"ok": False, "error": "قيمة غير صالحة: minutes"}, status_code=400)
+    deleted, found = await purge_user(bot_app.bot, group.telegram_group_id, body.user_id, body.minutes)
+    return {"ok": True, "deleted": deleted, "found": found, "message": f"تم حذف {deleted} من {found} رسالة"}
+
+
+@router.get("/recent-messages")
+async def api_recent_messages():
+    """Recent-message rings: groups and IDs held, purges and messages purged since start-up."""
+    return get_recent_stats()
+
+
+@router.get("/escalation")
+async def api_escalation():
+    """Strike ladder: tracked members, strikes, mutes and bans since start-up, write-behind state."""
+    return get_escalation_stats()
+
+
+@router.get("/duplicates")
+async def api_duplicates():
+    """Cross-group duplicates: clusters indexed, exact / near matches, flagged waves."""
+    return get_duplicate_stats()
+
+
+@router.get("/ai-policy/status")
+async def api_ai_policy_status():
+    return {
+        "load": await get_load(),
+        **get_policy_stats(),
+        "verdict_cache": get_verdict_cache_stats(),
+        "chat_context": get_context_stats(),
+    }
+
+
 # ── Users ─────────────────────────────────────────────────────────────────────
 
 @router.get("/users/blocked")
@@ -296,6 +686,7 @@ def _model_json(p):
         "provider_type": p.provider_type,
         "priority": p.priority,
         "is_active": p.is_active,
+        "is_shadow": bool(p.is_shadow),
         "endpoint_id": p.endpoint_id,
         "endpoint_name": ep.name if ep else None,
     }
@@ -341,6 +732,14 @@ async def api_models_toggle(model_id: int):
     return {"ok": True, "is_active": state}
 
 
+@router.post("/models/{model_id}/shadow")
+async def api_models_shadow(model_id: int):
+    state = await toggle_provider_shadow(model_id)
+    if state is None:
+        return JSONResponse({"ok": False, "error": "الموديل غير موجود"}, status_code=404)
+    return {"ok": True, "is_shadow": state}
+
+
 class ReorderBody(BaseModel):
     ids: list[int]
 
@@ -378,6 +777,27 @@ async def api_ai_stats_delete(stat_id: int):
     return {"ok": True}
 
 
+# ── AI Shadow traffic ─────────────────────────────────────────────────────────
+
+@router.get("/shadow")
+async def api_shadow(hours: int = Query(24, ge=1, le=168)):
+    return {
+        "sample_rate": await get_ai_shadow_sample_rate(),
+        "runtime": get_shadow_runtime(),
+        "models": await get_shadow_summary(hours=hours),
+    }
+
+
+class ShadowRateBody(BaseModel):
+    sample_rate: float
+
+
+@router.post("/shadow/sample-rate")
+async def api_shadow_rate_save(body: ShadowRateBody):
+    await set_ai_shadow_sample_rate(body.sample_rate)
+    return {"ok": True, "message": "تم حفظ نسبة العينة"}
+
+
 # ── AI Prompt & thresholds ────────────────────────────────────────────────────
 
 @router.get("/prompt")
@@ -393,6 +813,7 @@ async def api_prompt():
         "fixed_prefix": FIXED_PREFIX_DISPLAY,
         "fixed_suffix": FIXED_SUFFIX_DISPLAY,
         "debug_channel_id": debug_ch,
+        "debug_settings": {**await get_ai_debug_settings(), **get_debug_runtime()},
         "alert_threshold": alert_thr,
         "auto_delete_threshold": auto_del_thr,
     }
@@ -451,6 +872,115 @@ async def api_debug_channel_save(body: DebugChannelBody):
     return {"ok": True, "message": "تم حفظ قناة التتبع"}
 
 
+class DebugSettingsBody(BaseModel):
+    mode: str = "digest"
+    sample_rate: float = 1.0
+    digest_interval: int = 300
+
+
+@router.post("/debug-settings")
+async def api_debug_settings_save(body: DebugSettingsBody):
+    if body.mode not in DEBUG_MODES:
+        return JSONResponse({"ok": False, "error": "وضع غير معروف"}, status_code=400)
+    await set_ai_debug_settings(body.mode, body.sample_rate, body.digest_interval)
+    return {"ok": True, "message": "تم حفظ إعدادات التتبع"}
+
+
+# ── AI Evaluation (labeled corpora → background jobs) ───────────────────────
+
+class CorpusBody(BaseModel):
+    name: str
+    # JSON array, JSON lines, or "label<TAB>text" lines
+    content: str
+
+
+@router.get("/eval/corpora")
+async def api_eval_corpora():
+    corpora = await list_corpora()
+    return [
+        {
+            "id": c.id,
+            "name": c.name,
+            "size": len(c.items or []),
+            "positives": sum(1 for i in (c.items or []) if i.get("label")),
+            "created_at": c.created_at.isoformat() if c.created_at else None,
+        }
+        for c in corpora
+    ]
+
+
+@router.post("/eval/corpora")
+async def api_eval_corpora_add(body: CorpusBody):
+    try:
+        items = parse_corpus(body.content)
+    except ValueError:
+        return JSONResponse({"ok": False, "error": "صيغة الملف غير صحيحة"}, status_code=400)
+    if not items:
+        return JSONResponse({"ok": False, "error": "لم يتم العثور على رسائل مصنّفة صالحة"}, status_code=400)
+    corpus = await add_corpus(body.name.strip() or "corpus", items)
+    return {"ok": True, "id": corpus.id, "size": len(items)}
+
+
+@router.delete("/eval/corpora/{corpus_id}")
+async def api_eval_corpora_delete(corpus_id: int):
+    await delete_corpus(corpus_id)
+    return {"ok": True}
+
+
+class EvalJobBody(BaseModel):
+    corpus_id: int
+    model_ids: list[int]
+    # current | default | draft
+    prompt_source: str = "current"
+    draft_rules: str = ""
+    endpoint_concurrency: int = 4
+
+
+@router.get("/eval/jobs")
+async def api_eval_jobs():
+    return list_jobs()
+
+
+@router.post("/eval/jobs")
+async def api_eval_jobs_start(body: EvalJobBody):
+    job = await start_eval_job(
+        corpus_id=body.corpus_id,
+        provider_ids=body.model_ids,
+        prompt_source=body.prompt_source,
+        draft_rules=body.draft_rules,
+        endpoint_concurrency=max(1, min(32, body.endpoint_concurrency)),
+    )
+    if not job:
+        return JSONResponse({"ok": False, "error": "المجموعة أو الموديلات المحددة غير موجودة"}, status_code=400)
+    return {"ok": True, "job": job.snapshot()}
+
+
+@router.post("/eval/jobs/{job_id}/cancel")
+async def api_eval_jobs_cancel(job_id: str):
+    return {"ok": cancel_job(job_id)}
+
+
+@router.get("/eval/jobs/{job_id}/stream")
+async def api_eval_jobs_stream(job_id: str):
+    """Server-Sent Events: one `data:` snapshot per progress step."""
+    job = get_job(job_id)
+    if not job:
+        return JSONResponse({"ok": False, "error": "المهمة غير موجودة"}, status_code=404)
+
+    async def events():
+        async for snapshot in stream_job(job):
+            if snapshot is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"data: {json.dumps(snapshot, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ── Logs ──────────────────────────────────────────────────────────────────────
 
 @router.get("/logs")
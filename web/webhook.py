@@ -0,0 +1,210 @@
+"""
+Vex - Webhook Fast Path
+Pure ASGI middleware that answers Telegram's webhook POSTs before the
+FastAPI stack (auth middleware, routing, request parsing) ever sees them.
+
+A request is checked against the X-Telegram-Bot-Api-Secret-Token header,
+its raw body is put on a bounded queue and 200 is returned immediately.
+When the queue is full the request is shed with 429 and Telegram retries
+it later. Background consumers decode the payloads (orjson when
+available), build Update objects and feed the bot's update queue, pausing
+while the bot is backed up so the bounded queue is where load is shed.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import time
+from collections import Counter
+from typing import Optional
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    # Fallback if orjson not installed - stdlib json accepts bytes too
+    import json
+
+    _loads = json.loads
+
+from telegram import Update
+
+logger = logging.getLogger("vex.web.webhook")
+
+WEBHOOK_PATH = "/telegram-update"
+SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+# Raw updates waiting for decoding; beyond this requests get 429
+QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "2000"))
+CONSUMERS = int(os.getenv("WEBHOOK_CONSUMERS", "2"))
+# Consumers pause while this many updates wait in the bot (update queue + processor)
+DOWNSTREAM_HIGH_WATER = int(os.getenv("WEBHOOK_DOWNSTREAM_HIGH_WATER", "500"))
+MAX_BODY_BYTES = 1024 * 1024
+
+
+# SECRET_KEY values shipped with the code and docker-compose.yml
+_PUBLIC_SECRET_KEYS = {"vex-dashboard-secret-key-change-me", "change-me-in-production"}
+_random_secret: Optional[str] = None
+
+
+def get_webhook_secret() -> str:
+    """WEBHOOK_SECRET, else a stable value derived from SECRET_KEY when that
+    is set to something other than a shipped default, else a random secret
+    for this process (set_webhook sends it to Telegram on every start).
+    Telegram allows 1-256 chars of A-Z, a-z, 0-9, _ and -."""
+    global _random_secret
+    explicit = os.getenv("WEBHOOK_SECRET")
+    if explicit:
+        return explicit
+    seed = os.getenv("SECRET_KEY")
+    if seed and seed not in _PUBLIC_SECRET_KEYS:
+        return hashlib.sha256(f"vex-webhook:{seed}".encode()).hexdigest()
+    if _random_secret is None:
+        # A secret derived from a public SECRET_KEY would let anyone post
+        # forged updates
+        _random_secret = secrets.token_urlsafe(32)
+        logger.warning(
+            "[WEBHOOK] Neither WEBHOOK_SECRET nor a custom SECRET_KEY is set; using a random "
+            "webhook secret until restart (set one if several replicas share the URL)"
+        )
+    return _random_secret
+
+
+class WebhookIngest:
+    """Bounded raw-update queue plus the consumers that drain it."""
+
+    def __init__(self, queue_size: int = QUEUE_SIZE, consumers: int = CONSUMERS):
+        self.queue_size = queue_size
+        self.consumers = consumers
+        self.secret = get_webhook_secret().encode()
+        self.bot_app = None
+        self.stats: Counter = Counter()
+        self.max_depth = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+
+    def attach(self, bot_app) -> None:
+        self.bot_app = bot_app
+
+    def start(self) -> None:
+        """Start the consumers (inside the running event loop)."""
+        if self._tasks or self.bot_app is None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.consumers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def offer(self, body: bytes) -> bool:
+        """Queue a raw update; False when full (caller sheds with 429)."""
+        try:
+            self._queue.put_nowait((time.monotonic(), body))
+        except asyncio.QueueFull:
+            self.stats["shed"] += 1
+            return False
+        self.stats["accepted"] += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    async def _consume(self) -> None:
+        downstream: asyncio.Queue = self.bot_app.update_queue
+        while True:
+            queued_at, body = await self._queue.get()
+            try:
+                update = Update.de_json(_loads(body), self.bot_app.bot)
+            except Exception as e:
+                self.stats["decode_errors"] += 1
+                logger.warning(f"[WEBHOOK] Dropped undecodable update: {e}")
+                continue
+            while self._downstream_depth() >= DOWNSTREAM_HIGH_WATER:
+                await asyncio.sleep(0.01)
+            await downstream.put(update)
+            self.stats["delivered"] += 1
+            self.stats["queue_ms_total"] += int((time.monotonic() - queued_at) * 1000)
+
+    def _downstream_depth(self) -> int:
+        """Updates the bot has received but not started: its update queue plus
+        whatever the update processor holds back (PTB drains the queue at once)."""
+        processor = getattr(self.bot_app, "update_processor", None)
+        return self.bot_app.update_queue.qsize() + getattr(processor, "backlog", 0)
+
+    def metrics(self) -> dict:
+        delivered = self.stats["delivered"]
+        return {
+            "running": bool(self._tasks),
+            "queued": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "max_depth": self.max_depth,
+            "downstream_queued": self._downstream_depth() if self.bot_app else 0,
+            "accepted": self.stats["accepted"],
+            "shed": self.stats["shed"],
+            "unauthorized": self.stats["unauthorized"],
+            "decode_errors": self.stats["decode_errors"],
+            "delivered": delivered,
+            "avg_queue_ms": round(self.stats["queue_ms_total"] / delivered, 1) if delivered else 0.0,
+        }
+
+
+ingest = WebhookIngest()
+
+
+def get_webhook_metrics() -> dict:
+    return ingest.metrics()
+
+
+async def _respond(send, status: int, body: bytes = b"", headers: Optional[list] = None) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"text/plain"), (b"content-length", str(len(body)).encode())]
+        + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class WebhookFastPathMiddleware:
+    """Serves WEBHOOK_PATH directly; every other request goes to the app.
+    Add it last so it wraps the other middleware."""
+
+    def __init__(self, app, ingest: WebhookIngest = ingest, path: str = WEBHOOK_PATH):
+        self.app = app
+        self.ingest = ingest
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path:
+            return await self.app(scope, receive, send)
+        if scope["method"] != "POST":
+            return await _respond(send, 405)
+
+        token = next((v for k, v in scope["headers"] if k == SECRET_HEADER), b"")
+        if not hmac.compare_digest(token, self.ingest.secret):
+            self.ingest.stats["unauthorized"] += 1
+            return await _respond(send, 403)
+
+        if self.ingest.bot_app is None:
+            return await _respond(send, 503, b"Bot application is not running yet")
+        self.ingest.start()
+
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                return await _respond(send, 413)
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+
+        if not self.ingest.offer(b"".join(chunks)):
+            return await _respond(send, 429, b"", [(b"retry-after", b"1")])
+        await _respond(send, 200, b"OK")